@@ -119,3 +119,10 @@ from . import m006_ensure_resilience_profiles
 from . import m007_blood_bank
 from . import m008_hlc
 from . import m009_walkaway
+from . import m010_item_stock
+from . import m011_sync_import_chunks
+from . import m012_blood_custody_state
+from . import m013_date_range_indexes
+from . import m014_analytics_rollups
+from . import m015_worker_coordination
+from . import m016_event_digest
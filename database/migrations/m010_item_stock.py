@@ -0,0 +1,24 @@
+"""
+MIRS Item Stock Projection Migration (m010)
+===========================================
+
+Creates the materialized stock ledger:
+- item_stock: per (station_id, item_code) running totals
+- trg_item_stock_*: triggers keeping item_stock in step with inventory_events
+
+Backfills item_stock by replaying the existing inventory_events log, so stock
+reads no longer aggregate the whole event history.
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.stock_ledger import replay_item_stock
+
+
+@migration(10, "item_stock_projection")
+def m010_item_stock(cursor: sqlite3.Cursor):
+    """Create item_stock projection and backfill from inventory_events"""
+    replay_item_stock(cursor)
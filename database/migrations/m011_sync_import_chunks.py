@@ -0,0 +1,21 @@
+"""
+MIRS Sync Import Progress Migration (m011)
+==========================================
+
+Creates sync_import_chunks: one row per applied chunk of a streamed
+(chunked NDJSON) sync package, so an interrupted import can resume from
+the next chunk and the package checksum can be re-verified afterwards.
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.sync_stream import ensure_sync_stream_schema
+
+
+@migration(11, "sync_import_chunks")
+def m011_sync_import_chunks(cursor: sqlite3.Cursor):
+    """Create chunk progress table for resumable sync imports"""
+    ensure_sync_stream_schema(cursor)
@@ -0,0 +1,25 @@
+"""
+MIRS Blood Custody State Migration (m012)
+=========================================
+
+Creates the chain-of-custody projection:
+- blood_unit_custody_state: per unit current step, patient_id, location,
+  first/last event time, bedside scan result
+- trg_custody_state_ai: trigger keeping it in step with CUSTODY_* events
+
+Backfills the projection by replaying the existing custody log, so bedside
+lookups (/api/blood/units/for-transfusion) no longer scan the whole history.
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.blood_custody import replay_custody_state
+
+
+@migration(12, "blood_custody_state")
+def m012_blood_custody_state(cursor: sqlite3.Cursor):
+    """Create blood_unit_custody_state projection and backfill from blood_unit_events"""
+    replay_custody_state(cursor)
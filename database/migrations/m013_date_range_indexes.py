@@ -0,0 +1,28 @@
+"""
+MIRS Date Range Index Migration (m013)
+======================================
+
+Creates the indexes behind the sargable (half-open timestamp range) date
+filters of the inventory / blood / dispense history queries and the
+analytics dashboard:
+- inventory_events(event_type, timestamp)
+- blood_events(station_id, timestamp)
+- dispense_records(created_at)
+- anesthesia_cases(created_at)
+- anesthesia_events(event_type, clinical_time)
+
+Tables not present on this station are skipped.
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.query_ranges import ensure_date_range_indexes
+
+
+@migration(13, "date_range_indexes")
+def m013_date_range_indexes(cursor: sqlite3.Cursor):
+    """Create indexes for half-open date range filters"""
+    ensure_date_range_indexes(cursor)
@@ -0,0 +1,28 @@
+"""
+MIRS Analytics Rollup Migration (m014)
+======================================
+
+Creates the daily analytics rollups and backfills them from history:
+- rollup_case_daily: cases by day and status (+ duration sums)
+- rollup_medication_daily: administrations / dose by day, drug and unit
+- rollup_resource_daily: equipment claims / checks / releases by day and unit
+- trg_rollup_*: triggers keeping the rollups in step with anesthesia_cases
+  and anesthesia_events
+
+Skipped on stations without the anesthesia tables (the tables get their
+rollup triggers from init_anesthesia_schema when the module is enabled).
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.analytics_rollup import replay_analytics_rollups, rollup_sources_present
+
+
+@migration(14, "analytics_rollups")
+def m014_analytics_rollups(cursor: sqlite3.Cursor):
+    """Create daily analytics rollups and backfill from anesthesia history"""
+    if rollup_sources_present(cursor):
+        replay_analytics_rollups(cursor)
@@ -0,0 +1,22 @@
+"""
+MIRS Worker Coordination Migration (m015)
+=========================================
+
+Creates the tables shared by uvicorn worker processes (`--workers N`):
+- worker_leases: worker slots and exclusive background jobs (TTL leases)
+- shared_generations: cross-worker cache invalidation counters
+- rate_limit_hits: sliding-window rate limits shared by all workers
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.worker_coordination import ensure_coordination_schema
+
+
+@migration(15, "worker_coordination")
+def m015_worker_coordination(cursor: sqlite3.Cursor):
+    """Create worker lease / shared generation / rate limit tables"""
+    ensure_coordination_schema(cursor)
@@ -0,0 +1,24 @@
+"""
+MIRS Event Digest Migration (m016)
+==================================
+
+Creates the Merkle-range digest over the unified events table and backfills it:
+- event_digest_buckets: (count, additive payload_hash digest) per hour of HLC time
+- trg_event_digest_*: triggers keeping the buckets in step with events
+
+Skipped when events still has the pre-m009 layout.
+
+All migrations are idempotent.
+"""
+
+import sqlite3
+from . import migration
+
+from services.event_digest import digest_source_present, replay_event_digest
+
+
+@migration(16, "event_digest")
+def m016_event_digest(cursor: sqlite3.Cursor):
+    """Create event digest buckets + triggers and backfill from events"""
+    if digest_source_present(cursor):
+        replay_event_digest(cursor)
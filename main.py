@@ -12,7 +12,7 @@ import logging
 import sys
 import socket
 from datetime import datetime, timedelta, time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from pathlib import Path
 import sqlite3
 import json
@@ -34,6 +34,10 @@ from enum import Enum
 IS_VERCEL = os.environ.get("VERCEL") == "1"
 PROJECT_ROOT = Path(__file__).parent
 
+# v3.6: 冷啟動計時 (各階段耗時，/api/health 回報)
+from services.schema_fingerprint import SchemaFingerprint, get_startup_timer
+startup_timer = get_startup_timer()
+
 from fastapi import FastAPI, HTTPException, status, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, HTMLResponse
@@ -45,41 +49,52 @@ import uvicorn
 import qrcode
 from io import BytesIO
 
-# v1.5.1新增: 麻醉模組
-try:
-    from routes.anesthesia import router as anesthesia_router, init_anesthesia_schema
-    ANESTHESIA_MODULE_AVAILABLE = True
-except ImportError as e:
-    ANESTHESIA_MODULE_AVAILABLE = False
-    anesthesia_router = None
-    init_anesthesia_schema = None
+# v3.6 新增: SQLite 連線池 + PRAGMA profile
+from services.db_pool import get_pool, get_pool_stats, close_all_pools
 
-# v1.1 新增: 處置模組 CIRS 整合
-try:
-    from routes.procedure import router as procedure_router
-    from routes.procedure import notify_cirs_procedure_claim, notify_cirs_procedure_done
-    PROCEDURE_MODULE_AVAILABLE = True
-except ImportError as e:
-    PROCEDURE_MODULE_AVAILABLE = False
-    procedure_router = None
+# v3.6 新增: 受管執行器 (阻塞 / CPU / 加密工作離開 event loop，分類限流 + 指標)
+from services.executor import run_in_executor, iterate_in_executor, get_executor, shutdown_executors
 
-# v1.5 新增: 手術代碼與自費項目模組
-try:
-    from routes.surgery_codes import router as surgery_codes_router, init_surgery_codes_schema
-    SURGERY_CODES_MODULE_AVAILABLE = True
-except ImportError as e:
-    SURGERY_CODES_MODULE_AVAILABLE = False
-    surgery_codes_router = None
-    init_surgery_codes_schema = None
+# v3.6 新增: 事件匯流排 (SSE /api/oxygen/events/stream 推播，取代每秒輪詢)
+from services.event_bus import get_event_bus
 
-# v2.9 新增: EMT Transfer 模組
-try:
-    from routes.transfer import router as transfer_router, init_transfer_schema
-    TRANSFER_MODULE_AVAILABLE = True
-except ImportError as e:
-    TRANSFER_MODULE_AVAILABLE = False
-    transfer_router = None
-    init_transfer_schema = None
+# v3.6 新增: 多 worker 協調 (worker slot / lease / 共享 generation)
+from services.worker_coordination import get_coordinator
+from services.sync_stream import (
+    SYNC_STREAM_MEDIA_TYPE, PackageParser, StreamImporter, SyncStreamError,
+    apply_sync_changes, checksum_of_changes, get_import_progress,
+    iter_package_stream, iter_sync_changes,
+)
+
+# v3.6 新增: 串流匯出 (fetchmany 批次 → CSV / NDJSON 區塊，無筆數上限，可 gzip)
+from services.streaming_export import (
+    CSV_MEDIA_TYPE, JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE,
+    iter_csv, iter_json_array, iter_ndjson, iter_query_rows, stream_export,
+)
+
+# v3.6: 日期篩選改為半開區間 (col >= start AND col < end+1)，可使用索引
+from services.query_ranges import add_day_range, add_item_code_search
+
+# v3.6 新增: 庫存帳本 (item_stock 物化投影，取代每次讀取的全表 SUM)
+from services.stock_ledger import (
+    ensure_item_stock_schema, get_on_hand, get_available,
+    rebuild_item_stock, verify_item_stock, ON_HAND_SQL,
+)
+
+# v3.6: 選用路由延遲載入 - 首次請求該 prefix 時才 import (見 services/lazy_router.py)
+from services.lazy_router import LazyRouterRegistry, LazyRouterMiddleware, module_available
+
+# v1.5.1新增: 麻醉模組 (延遲載入)
+ANESTHESIA_MODULE_AVAILABLE = module_available("routes.anesthesia")
+
+# v1.1 新增: 處置模組 CIRS 整合 (延遲載入)
+PROCEDURE_MODULE_AVAILABLE = module_available("routes.procedure")
+
+# v1.5 新增: 手術代碼與自費項目模組 (延遲載入)
+SURGERY_CODES_MODULE_AVAILABLE = module_available("routes.surgery_codes")
+
+# v2.9 新增: EMT Transfer 模組 (延遲載入)
+TRANSFER_MODULE_AVAILABLE = module_available("routes.transfer")
 
 # v3.0 Sprint 1: Inventory Engine (MIRS 資源引擎)
 try:
@@ -116,29 +131,14 @@ except ImportError as e:
     oxygen_tracking_router = None
     init_oxygen_schema = None
 
-# v3.3 新增: OTA 更新模組 (P1-04)
-try:
-    from routes.ota import router as ota_router
-    OTA_AVAILABLE = True
-except ImportError as e:
-    OTA_AVAILABLE = False
-    ota_router = None
+# v3.3 新增: OTA 更新模組 (P1-04) (延遲載入)
+OTA_AVAILABLE = module_available("routes.ota")
 
-# v3.4 新增: Analytics Dashboard (P2-02)
-try:
-    from routes.analytics import router as analytics_router
-    ANALYTICS_AVAILABLE = True
-except ImportError as e:
-    ANALYTICS_AVAILABLE = False
-    analytics_router = None
+# v3.4 新增: Analytics Dashboard (P2-02) (延遲載入)
+ANALYTICS_AVAILABLE = module_available("routes.analytics")
 
-# v3.5 新增: Disaster Recovery / Lifeboat (Walkaway Test)
-try:
-    from routes.dr import router as dr_router
-    DR_AVAILABLE = True
-except ImportError as e:
-    DR_AVAILABLE = False
-    dr_router = None
+# v3.5 新增: Disaster Recovery / Lifeboat (Walkaway Test) (延遲載入)
+DR_AVAILABLE = module_available("routes.dr")
 
 
 # ============================================================================
@@ -169,21 +169,13 @@ logger = setup_logging()
 # 選用套件載入 (需在 logger 初始化後)
 # ============================================================================
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
+# v3.6: 只檢查是否安裝，實際 import 延到使用處 (冷啟動不載入 pandas / reportlab)
+PANDAS_AVAILABLE = module_available("pandas")
+if not PANDAS_AVAILABLE:
     logger.warning("Pandas not available, some export features will be limited")
 
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+REPORTLAB_AVAILABLE = module_available("reportlab")
+if not REPORTLAB_AVAILABLE:
     logger.warning("ReportLab not available, PDF generation will be limited")
 
 
@@ -645,11 +637,18 @@ class DatabaseManager:
     # Singleton connection for in-memory mode
     _memory_connection = None
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, skip_init: bool = False):
         self.db_path = db_path
         self.is_memory = (db_path == ":memory:")
+        # v3.6: 模組 schema 初始化失敗紀錄 (有失敗則不記錄 fingerprint，下次開機重試)
+        self.schema_errors: List[str] = []
+        # v3.6: schema fingerprint 相符時由呼叫端要求跳過 init_database
+        self.schema_fast_path = skip_init and not self.is_memory
         logger.info(f"初始化資料庫: {db_path} (in-memory: {self.is_memory})")
-        self.init_database()
+        if self.schema_fast_path:
+            logger.info("✓ Schema fingerprint 相符，跳過資料庫結構初始化")
+        else:
+            self.init_database()
 
     def get_connection(self) -> sqlite3.Connection:
         """取得資料庫連接"""
@@ -662,10 +661,14 @@ class DatabaseManager:
                 DatabaseManager._memory_connection.row_factory = sqlite3.Row
             return NonClosingConnection(DatabaseManager._memory_connection)
         else:
-            # For file-based mode, create new connection
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            return conn
+            # For file-based mode, lease a pooled writer (PRAGMA profile applied once)
+            return get_pool(self.db_path).writer()
+
+    def get_read_connection(self) -> sqlite3.Connection:
+        """取得唯讀連接 (query_only，WAL 下不與寫入者互鎖)"""
+        if self.is_memory:
+            return self.get_connection()
+        return get_pool(self.db_path).reader()
 
     def close_connection(self, conn: sqlite3.Connection):
         """安全關閉連接 - 記憶體模式下不關閉"""
@@ -688,6 +691,7 @@ class DatabaseManager:
     def init_database(self):
         """初始化資料庫結構"""
         logger.info("開始初始化資料庫結構...")
+        self.schema_errors = []
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -847,6 +851,9 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_inventory_events_timestamp 
                 ON inventory_events(timestamp)
             """)
+
+            # 庫存帳本投影 (由 trigger 與事件同交易更新)
+            ensure_item_stock_schema(cursor)
             
             # 血袋庫存(支援多站點)
             cursor.execute("""
@@ -1362,25 +1369,31 @@ class DatabaseManager:
                 """, (blood_type, config.get_station_id()))
 
             # v1.5.1: 初始化麻醉模組 schema
-            if ANESTHESIA_MODULE_AVAILABLE and init_anesthesia_schema:
+            if ANESTHESIA_MODULE_AVAILABLE:
                 try:
+                    from routes.anesthesia import init_anesthesia_schema
                     init_anesthesia_schema(cursor)
                 except Exception as e:
                     logger.warning(f"麻醉模組 schema 初始化失敗: {e}")
+                    self.schema_errors.append(f"anesthesia: {e}")
 
             # v2.6: 初始化術式主檔模組 schema
-            if SURGERY_CODES_MODULE_AVAILABLE and init_surgery_codes_schema:
+            if SURGERY_CODES_MODULE_AVAILABLE:
                 try:
+                    from routes.surgery_codes import init_surgery_codes_schema
                     init_surgery_codes_schema(cursor)
                 except Exception as e:
                     logger.warning(f"術式主檔模組 schema 初始化失敗: {e}")
+                    self.schema_errors.append(f"surgery_codes: {e}")
 
             # v2.9: 初始化 EMT Transfer 模組 schema
-            if TRANSFER_MODULE_AVAILABLE and init_transfer_schema:
+            if TRANSFER_MODULE_AVAILABLE:
                 try:
+                    from routes.transfer import init_transfer_schema
                     init_transfer_schema(cursor)
                 except Exception as e:
                     logger.warning(f"EMT Transfer 模組 schema 初始化失敗: {e}")
+                    self.schema_errors.append(f"transfer: {e}")
 
             conn.commit()
             logger.info(f"✓ 資料庫初始化完成: {config.get_station_id()}")
@@ -1743,7 +1756,7 @@ class DatabaseManager:
         limit: int = 50
     ) -> List[Dict]:
         """查詢手術記錄"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
         
         try:
@@ -1797,47 +1810,48 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def export_surgery_records_csv(
+    def stream_surgery_records_csv(
         self,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
-    ) -> str:
-        """匯出手術記錄為 CSV"""
-        records = self.get_surgery_records(start_date, end_date, limit=10000)
-        
-        # 建立 CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # 寫入標題
-        writer.writerow([
+    ) -> Iterator[bytes]:
+        """串流匯出手術記錄 CSV (每筆耗材一列，無筆數上限)"""
+        where_clauses = []
+        params = []
+        if start_date:
+            where_clauses.append("r.record_date >= ?")
+            params.append(start_date)
+        if end_date:
+            where_clauses.append("r.record_date <= ?")
+            params.append(end_date)
+        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+
+        rows = iter_query_rows(self.get_read_connection, f"""
+            SELECT
+                r.record_number, r.record_date, r.patient_name, r.surgery_sequence,
+                r.surgery_type, r.surgeon_name, r.anesthesia_type, r.duration_minutes,
+                c.item_code, c.item_name, c.quantity, c.unit,
+                r.remarks, r.created_at
+            FROM surgery_records r
+            JOIN surgery_consumptions c ON c.surgery_id = r.id
+            WHERE {where_sql}
+            ORDER BY r.record_date DESC, r.surgery_sequence DESC, r.id, c.id
+        """, params)
+
+        return iter_csv([
             '記錄編號', '日期', '病患姓名', '當日第N台',
             '手術類型', '主刀醫師', '麻醉方式', '手術時長(分)',
             '耗材代碼', '耗材名稱', '數量', '單位',
             '備註', '建立時間'
-        ])
-        
-        # 寫入資料
-        for record in records:
-            for consumption in record['consumptions']:
-                writer.writerow([
-                    record['record_number'],
-                    record['record_date'],
-                    record['patient_name'],
-                    record['surgery_sequence'],
-                    record['surgery_type'],
-                    record['surgeon_name'],
-                    record.get('anesthesia_type', ''),
-                    record.get('duration_minutes', ''),
-                    consumption['item_code'],
-                    consumption['item_name'],
-                    consumption['quantity'],
-                    consumption['unit'],
-                    record.get('remarks', ''),
-                    record['created_at']
-                ])
-        
-        return output.getvalue()
+        ], rows, tuple)
+
+    def export_surgery_records_csv(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> str:
+        """匯出手術記錄為 CSV"""
+        return b"".join(self.stream_surgery_records_csv(start_date, end_date)).decode("utf-8")
 
     # ========== 手術記錄封存功能 (v1.4.5新增) ==========
 
@@ -1906,7 +1920,7 @@ class DatabaseManager:
 
     def get_archived_records(self, outcome: str = None, limit: int = 50) -> List[Dict]:
         """查詢已封存的手術記錄"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -1939,7 +1953,7 @@ class DatabaseManager:
 
     def get_stats(self, station_id: str = None) -> Dict[str, int]:
         """取得系統統計(支援站點過濾)"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -1951,7 +1965,7 @@ class DatabaseManager:
             # 短期方案：使用 INNER JOIN 只統計有進貨記錄的品項
             # v2.0 multi-station 將改為 LEFT JOIN + 自動初始化 + 設置精靈
             if station_id:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT COUNT(*) as count
                     FROM (
                         SELECT
@@ -1960,19 +1974,15 @@ class DatabaseManager:
                             stock.current_stock
                         FROM items i
                         INNER JOIN (
-                            SELECT item_code,
-                                   SUM(CASE WHEN event_type = 'RECEIVE' THEN quantity
-                                            WHEN event_type = 'CONSUME' THEN -quantity
-                                            ELSE 0 END) as current_stock
-                            FROM inventory_events
-                            WHERE station_id = ?
-                            GROUP BY item_code
+                            SELECT item_code, {ON_HAND_SQL} as current_stock
+                            FROM item_stock
+                            WHERE station_id = ? AND event_count > 0
                         ) stock ON i.item_code = stock.item_code
                     ) t
                     WHERE t.current_stock < t.min_stock
                 """, (station_id,))
             else:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT COUNT(*) as count
                     FROM (
                         SELECT
@@ -1981,11 +1991,8 @@ class DatabaseManager:
                             COALESCE(stock.current_stock, 0) as current_stock
                         FROM items i
                         LEFT JOIN (
-                            SELECT item_code,
-                                   SUM(CASE WHEN event_type = 'RECEIVE' THEN quantity
-                                            WHEN event_type = 'CONSUME' THEN -quantity
-                                            ELSE 0 END) as current_stock
-                            FROM inventory_events
+                            SELECT item_code, SUM({ON_HAND_SQL}) as current_stock
+                            FROM item_stock
                             GROUP BY item_code
                         ) stock ON i.item_code = stock.item_code
                     ) t
@@ -2071,16 +2078,7 @@ class DatabaseManager:
             if not item:
                 raise HTTPException(status_code=404, detail=f"物品代碼 {request.itemCode} 不存在")
             
-            cursor.execute("""
-                SELECT SUM(CASE WHEN event_type = 'RECEIVE' THEN quantity
-                               WHEN event_type = 'CONSUME' THEN -quantity
-                               ELSE 0 END) as current_stock
-                FROM inventory_events
-                WHERE item_code = ?
-            """, (request.itemCode,))
-            
-            result = cursor.fetchone()
-            current_stock = result['current_stock'] if result['current_stock'] else 0
+            current_stock = get_on_hand(cursor, request.itemCode)
             
             if current_stock < request.quantity:
                 raise HTTPException(
@@ -2263,7 +2261,7 @@ class DatabaseManager:
     
     def get_blood_inventory(self, station_id: str = None) -> List[Dict]:
         """取得血袋庫存(支援多站點)"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -2395,7 +2393,7 @@ class DatabaseManager:
 
     def get_emergency_blood_bags(self, status: str = None) -> List[Dict]:
         """取得緊急血袋清單"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -2545,7 +2543,7 @@ class DatabaseManager:
 
     def get_equipment_status(self, station_id: str = None) -> List[Dict[str, Any]]:
         """取得所有設備狀態 (v2.0 新增 type_code 與韌性相關欄位)"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -2578,25 +2576,11 @@ class DatabaseManager:
     
     def get_inventory_items(self) -> List[Dict]:
         """取得所有物品及庫存"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("""
-                SELECT
-                    i.item_code as code, i.item_name as name, i.unit, i.min_stock, i.category,
-                    COALESCE(stock.current_stock, 0) as current_stock
-                FROM items i
-                LEFT JOIN (
-                    SELECT item_code,
-                           SUM(CASE WHEN event_type = 'RECEIVE' THEN quantity
-                                    WHEN event_type = 'CONSUME' THEN -quantity
-                                    ELSE 0 END) as current_stock
-                    FROM inventory_events
-                    GROUP BY item_code
-                ) stock ON i.item_code = stock.item_code
-                ORDER BY i.category, i.item_name
-            """)
+            cursor.execute(self._inventory_items_query())
             return [dict(row) for row in cursor.fetchall()]
         finally:
             conn.close()
@@ -2610,7 +2594,7 @@ class DatabaseManager:
         limit: int = 100
     ) -> List[Dict]:
         """查詢庫存事件記錄"""
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         cursor = conn.cursor()
 
         try:
@@ -2621,17 +2605,11 @@ class DatabaseManager:
                 where_clauses.append("e.event_type = ?")
                 params.append(event_type)
 
-            if start_date:
-                where_clauses.append("DATE(e.timestamp) >= ?")
-                params.append(start_date)
-
-            if end_date:
-                where_clauses.append("DATE(e.timestamp) <= ?")
-                params.append(end_date)
+            add_day_range(where_clauses, params, "e.timestamp", start_date, end_date)
 
             if item_code:
-                where_clauses.append("e.item_code LIKE ?")
-                params.append(f"%{item_code}%")
+                # 模糊比對在小型 items / medicines 表進行，事件表以 item_code 索引查找
+                add_item_code_search(where_clauses, params, "e.item_code", item_code)
 
             where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
             params.append(limit)
@@ -2652,21 +2630,25 @@ class DatabaseManager:
         finally:
             conn.close()
 
-    def export_inventory_csv(self) -> str:
-        """匯出庫存資料為 CSV"""
-        items = self.get_inventory_items()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow([
-            '物品代碼', '物品名稱', '分類', '單位',
-            '當前庫存', '最小庫存', '庫存狀態'
-        ])
+    def _inventory_items_query(self) -> str:
+        return f"""
+            SELECT
+                i.item_code as code, i.item_name as name, i.unit, i.min_stock, i.category,
+                COALESCE(stock.current_stock, 0) as current_stock
+            FROM items i
+            LEFT JOIN (
+                SELECT item_code, SUM({ON_HAND_SQL}) as current_stock
+                FROM item_stock
+                GROUP BY item_code
+            ) stock ON i.item_code = stock.item_code
+            ORDER BY i.category, i.item_name
+        """
 
-        for item in items:
+    def stream_inventory_csv(self) -> Iterator[bytes]:
+        """串流匯出庫存 CSV"""
+        def to_row(item):
             status = '正常' if item['current_stock'] >= item['min_stock'] else '警戒'
-            writer.writerow([
+            return [
                 item['code'],
                 item['name'],
                 item['category'],
@@ -2674,52 +2656,83 @@ class DatabaseManager:
                 item['current_stock'],
                 item['min_stock'],
                 status
-            ])
+            ]
+
+        rows = iter_query_rows(self.get_read_connection, self._inventory_items_query())
+        return iter_csv([
+            '物品代碼', '物品名稱', '分類', '單位',
+            '當前庫存', '最小庫存', '庫存狀態'
+        ], rows, to_row)
 
-        return output.getvalue()
+    def stream_inventory_json(self, ndjson: bool = False) -> Iterator[bytes]:
+        """串流匯出庫存 JSON 陣列 (或 NDJSON，每列一筆)"""
+        rows = iter_query_rows(self.get_read_connection, self._inventory_items_query())
+        return iter_ndjson(rows) if ndjson else iter_json_array(rows)
 
-    def export_inventory_events_csv(
+    def stream_inventory_events_csv(
         self,
         event_type: Optional[str] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
-    ) -> str:
-        """匯出庫存事件記錄為 CSV"""
-        events = self.get_inventory_events(event_type, start_date, end_date, limit=10000)
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow([
-            '事件ID', '事件類型', '物品代碼', '物品名稱', '數量', '單位',
-            '批號', '效期', '備註', '站點', '操作員', '時間'
-        ])
+    ) -> Iterator[bytes]:
+        """串流匯出庫存事件 CSV (無筆數上限)"""
+        where_clauses = []
+        params = []
+        if event_type:
+            where_clauses.append("e.event_type = ?")
+            params.append(event_type)
+        add_day_range(where_clauses, params, "e.timestamp", start_date, end_date)
+        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
 
-        for event in events:
+        def to_row(event):
             event_type_text = '進貨' if event['event_type'] == 'RECEIVE' else '消耗'
-            writer.writerow([
+            return [
                 event['id'],
                 event_type_text,
                 event['item_code'],
                 event['item_name'],
                 event['quantity'],
                 event['unit'],
-                event.get('batch_number', ''),
-                event.get('expiry_date', ''),
-                event.get('remarks', ''),
+                event['batch_number'],
+                event['expiry_date'],
+                event['remarks'],
                 event['station_id'],
                 event['operator'],
                 event['timestamp']
-            ])
+            ]
 
-        return output.getvalue()
+        rows = iter_query_rows(self.get_read_connection, f"""
+            SELECT
+                e.id, e.event_type, e.item_code, i.item_name,
+                e.quantity, i.unit, e.batch_number, e.expiry_date,
+                e.remarks, e.station_id, e.operator, e.timestamp
+            FROM inventory_events e
+            LEFT JOIN items i ON e.item_code = i.item_code
+            WHERE {where_sql}
+            ORDER BY e.timestamp DESC
+        """, params)
+        return iter_csv([
+            '事件ID', '事件類型', '物品代碼', '物品名稱', '數量', '單位',
+            '批號', '效期', '備註', '站點', '操作員', '時間'
+        ], rows, to_row)
+
+    def export_inventory_csv(self) -> str:
+        """匯出庫存資料為 CSV"""
+        return b"".join(self.stream_inventory_csv()).decode("utf-8")
+
+    def export_inventory_events_csv(
+        self,
+        event_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> str:
+        """匯出庫存事件記錄為 CSV"""
+        return b"".join(self.stream_inventory_events_csv(event_type, start_date, end_date)).decode("utf-8")
 
     # ========== 聯邦架構 - 同步封包方法 (Phase 1) ==========
 
     def generate_sync_package(self, station_id: str, hospital_id: str, sync_type: str = "DELTA", since_timestamp: str = None) -> dict:
         """產生同步封包"""
-        import hashlib
-        import json
         from datetime import datetime
 
         conn = self.get_connection()
@@ -2731,116 +2744,13 @@ class DatabaseManager:
             package_id = f"PKG-{now.strftime('%Y%m%d-%H%M%S')}-{station_id}"
 
             # 收集變更記錄
-            changes = []
-
-            if sync_type == "DELTA" and since_timestamp:
-                # 增量同步：收集自 since_timestamp 以來的變更
-                tables_to_sync = {
-                    'inventory_events': 'timestamp',
-                    'blood_events': 'timestamp',
-                    'equipment_checks': 'timestamp',
-                    'surgery_records': 'created_at',
-                    'emergency_blood_bags': 'created_at'
-                }
-
-                for table, timestamp_col in tables_to_sync.items():
-                    try:
-                        cursor.execute(f"""
-                            SELECT * FROM {table}
-                            WHERE station_id = ? AND {timestamp_col} > ?
-                            ORDER BY {timestamp_col}
-                        """, (station_id, since_timestamp))
-
-                        rows = cursor.fetchall()
-                        logger.info(f"查詢表 {table}: 找到 {len(rows)} 筆變更記錄")
-
-                        for idx, row in enumerate(rows):
-                            try:
-                                row_dict = dict(row)
-                                change_dict = {
-                                    'table': table,
-                                    'operation': 'INSERT',
-                                    'data': row_dict,
-                                    'timestamp': row[timestamp_col]
-                                }
-                                changes.append(change_dict)
-                            except Exception as e:
-                                logger.error(f"無法序列化記錄 {table}[{idx}]: {str(e)}")
-                                logger.error(f"Record type: {type(row)}")
-                                logger.error(f"Record keys: {row.keys() if hasattr(row, 'keys') else 'N/A'}")
-                                raise
-                    except Exception as e:
-                        logger.error(f"查詢表 {table} 失敗: {str(e)}")
-                        raise
-
-            else:
-                # 全量同步：收集所有資料
+            if not (sync_type == "DELTA" and since_timestamp):
                 logger.info(f"開始全量同步: station_id={station_id}")
+            changes = list(iter_sync_changes(cursor, station_id, sync_type, since_timestamp, now.isoformat()))
 
-                # 定義需要同步的表及其時間戳欄位
-                full_sync_tables = [
-                    ('items', None, 'updated_at'),  # (table, filter_col, timestamp_col)
-                    ('inventory_events', 'station_id', 'timestamp'),
-                    ('blood_events', 'station_id', 'timestamp'),
-                    ('equipment_checks', 'station_id', 'timestamp'),
-                    ('surgery_records', 'station_id', 'created_at'),
-                ]
-
-                for table, filter_col, timestamp_col in full_sync_tables:
-                    try:
-                        # 建立查詢
-                        if filter_col:
-                            query = f"SELECT * FROM {table} WHERE {filter_col} = ?"
-                            cursor.execute(query, (station_id,))
-                        else:
-                            query = f"SELECT * FROM {table}"
-                            cursor.execute(query)
-
-                        rows = cursor.fetchall()
-                        logger.info(f"查詢表 {table}: 找到 {len(rows)} 筆記錄")
-
-                        for idx, row in enumerate(rows):
-                            try:
-                                row_dict = dict(row)
-                                # 獲取時間戳
-                                timestamp = row[timestamp_col] if timestamp_col in row.keys() else now.isoformat()
-
-                                change_dict = {
-                                    'table': table,
-                                    'operation': 'INSERT',
-                                    'data': row_dict,
-                                    'timestamp': timestamp
-                                }
-                                changes.append(change_dict)
-                            except Exception as e:
-                                logger.error(f"無法序列化記錄 {table}[{idx}]: {str(e)}")
-                                logger.error(f"Record type: {type(row)}")
-                                logger.error(f"Record keys: {row.keys() if hasattr(row, 'keys') else 'N/A'}")
-                                raise
-                    except Exception as e:
-                        logger.error(f"查詢表 {table} 失敗: {str(e)}")
-                        raise
-
-            # 計算校驗碼
+            # 計算校驗碼 (增量雜湊，不另建完整 JSON 字串)
             logger.info(f"成功收集 {len(changes)} 筆變更記錄")
-
-            try:
-                logger.debug("開始 JSON 序列化...")
-                package_content = json.dumps(changes, ensure_ascii=False, sort_keys=True)
-                logger.info(f"JSON 序列化成功，封包大小: {len(package_content)} bytes")
-            except TypeError as e:
-                logger.error(f"JSON 序列化失敗: {str(e)}")
-                logger.error(f"Changes count: {len(changes)}")
-                # 找出無法序列化的變更
-                for idx, change in enumerate(changes):
-                    try:
-                        json.dumps(change)
-                    except TypeError:
-                        logger.error(f"無法序列化的變更 [{idx}]: table={change.get('table')}, data_type={type(change.get('data'))}")
-                raise
-
-            checksum = hashlib.sha256(package_content.encode('utf-8')).hexdigest()
-            package_size = len(package_content.encode('utf-8'))
+            checksum, package_size = checksum_of_changes(changes)
             logger.debug(f"校驗碼: {checksum}")
 
             # 記錄封包到資料庫
@@ -2886,16 +2796,12 @@ class DatabaseManager:
 
     def import_sync_package(self, package_id: str, changes: List[dict], checksum: str, package_type: str = "FULL") -> dict:
         """匯入同步封包"""
-        import hashlib
-        import json
-
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
             # 驗證校驗碼
-            package_content = json.dumps(changes, ensure_ascii=False, sort_keys=True)
-            calculated_checksum = hashlib.sha256(package_content.encode('utf-8')).hexdigest()
+            calculated_checksum, _ = checksum_of_changes(changes)
 
             if calculated_checksum != checksum:
                 return {
@@ -2905,45 +2811,11 @@ class DatabaseManager:
                     "actual": calculated_checksum
                 }
 
-            # 套用變更
-            changes_applied = 0
-            conflicts = []
-
-            for change in changes:
-                table = change['table']
-                operation = change['operation']
-                data = change['data']
-
-                try:
-                    if operation == 'INSERT':
-                        # 建立 INSERT 語句
-                        columns = ', '.join(data.keys())
-                        placeholders = ', '.join(['?' for _ in data.keys()])
-                        query = f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})"
-                        cursor.execute(query, list(data.values()))
-                        changes_applied += 1
-
-                    elif operation == 'UPDATE':
-                        # 建立 UPDATE 語句(暫時簡化實作)
-                        set_clause = ', '.join([f"{k} = ?" for k in data.keys() if k != 'id'])
-                        query = f"UPDATE {table} SET {set_clause} WHERE id = ?"
-                        values = [v for k, v in data.items() if k != 'id'] + [data.get('id')]
-                        cursor.execute(query, values)
-                        changes_applied += 1
-
-                    elif operation == 'DELETE':
-                        # 建立 DELETE 語句
-                        cursor.execute(f"DELETE FROM {table} WHERE id = ?", (data.get('id'),))
-                        changes_applied += 1
+            # INSERT OR REPLACE 刪除舊列時需觸發 DELETE trigger，item_stock 才不會重複累加
+            cursor.execute("PRAGMA recursive_triggers = ON")
 
-                except Exception as e:
-                    conflicts.append({
-                        'table': table,
-                        'operation': operation,
-                        'error': str(e),
-                        'data': data
-                    })
-                    logger.warning(f"套用變更失敗: {table} - {e}")
+            # 套用變更
+            changes_applied, conflicts = apply_sync_changes(cursor, changes)
 
             # 記錄封包處理狀態
             cursor.execute("""
@@ -2975,50 +2847,105 @@ class DatabaseManager:
             logger.error(f"匯入同步封包失敗: {e}")
             raise
         finally:
+            conn.execute("PRAGMA recursive_triggers = OFF")
             conn.close()
 
     def upload_sync_package(self, station_id: str, package_id: str, changes: List[dict], checksum: str, package_type: str = "FULL") -> dict:
         """醫院層接收站點同步上傳"""
-        import hashlib
-        import json
+        # 匯入變更(複用 import_sync_package 邏輯，校驗碼於其中驗證一次)
+        result = self.import_sync_package(package_id, changes, checksum, package_type)
 
-        # 驗證校驗碼
-        package_content = json.dumps(changes, ensure_ascii=False, sort_keys=True)
-        calculated_checksum = hashlib.sha256(package_content.encode('utf-8')).hexdigest()
+        if result['success']:
+            self.mark_station_synced(station_id)
 
-        if calculated_checksum != checksum:
-            return {
-                "success": False,
-                "error": "校驗碼不符",
-                "expected": checksum,
-                "actual": calculated_checksum
-            }
+        return {
+            **result,
+            "station_id": station_id,
+            "response_package_id": f"PKG-RESPONSE-{package_id}"
+        }
 
-        # 匯入變更(複用 import_sync_package 邏輯)
-        result = self.import_sync_package(package_id, changes, checksum, package_type)
+    def mark_station_synced(self, station_id: str):
+        """更新站點同步狀態"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE stations
+                SET last_sync_at = CURRENT_TIMESTAMP,
+                    sync_status = 'SYNCED'
+                WHERE station_id = ?
+            """, (station_id,))
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"更新站點同步狀態失敗: {e}")
+        finally:
+            conn.close()
 
-        if result['success']:
-            # 更新站點同步狀態
+    def stream_sync_package(self, station_id: str, hospital_id: str, sync_type: str = "DELTA",
+                            since_timestamp: str = None) -> Tuple[str, Iterator[bytes]]:
+        """
+        產生串流同步封包 (chunked NDJSON)
+
+        逐批 fetchmany 讀取、逐區塊雜湊輸出；串流結束後才寫入 sync_packages。
+
+        Returns:
+            (package_id, 封包位元組迭代器)
+        """
+        now = datetime.now()
+        # 串流封包於結尾才登錄，加上隨機尾碼避免同秒封包ID衝突
+        package_id = f"PKG-{now.strftime('%Y%m%d-%H%M%S')}-{station_id}-{secrets.token_hex(3)}"
+        header = {
+            "package_id": package_id,
+            "package_type": sync_type,
+            "station_id": station_id,
+            "hospital_id": hospital_id,
+            "since_timestamp": since_timestamp,
+            "created_at": now.isoformat(),
+        }
+
+        def record(summary: dict):
             conn = self.get_connection()
-            cursor = conn.cursor()
             try:
-                cursor.execute("""
-                    UPDATE stations
-                    SET last_sync_at = CURRENT_TIMESTAMP,
-                        sync_status = 'SYNCED'
-                    WHERE station_id = ?
-                """, (station_id,))
+                conn.execute("""
+                    INSERT INTO sync_packages (
+                        package_id, package_type, source_type, source_id,
+                        destination_type, destination_id, hospital_id,
+                        transfer_method, package_size, checksum, changes_count, status
+                    )
+                    VALUES (?, ?, 'STATION', ?, 'HOSPITAL', ?, ?, 'MANUAL', ?, ?, ?, 'PENDING')
+                """, (
+                    package_id, sync_type, station_id, hospital_id, hospital_id,
+                    summary['package_size'], summary['checksum'], summary['changes_count']
+                ))
                 conn.commit()
+                logger.info(f"串流同步封包完成: {package_id} ({summary['changes_count']} 項變更, "
+                            f"{summary['chunks']} 區塊, {summary['package_size']} bytes)")
             except Exception as e:
-                logger.warning(f"更新站點同步狀態失敗: {e}")
+                # 封包已送出，登錄失敗不中斷串流
+                logger.error(f"保存串流封包記錄失敗: {package_id} - {e}")
             finally:
                 conn.close()
 
-        return {
-            **result,
-            "station_id": station_id,
-            "response_package_id": f"PKG-RESPONSE-{package_id}"
-        }
+        def generate() -> Iterator[bytes]:
+            conn = self.get_read_connection()
+            try:
+                changes = iter_sync_changes(conn.cursor(), station_id, sync_type, since_timestamp, now.isoformat())
+                yield from iter_package_stream(header, changes, on_complete=record)
+            finally:
+                conn.close()
+
+        return package_id, generate()
+
+    def open_sync_importer(self) -> StreamImporter:
+        """串流匯入器 (每區塊一個交易，可續傳)"""
+        return StreamImporter(self.get_connection())
+
+    def get_sync_import_progress(self, package_id: str) -> dict:
+        conn = self.get_connection()
+        try:
+            return get_import_progress(conn.cursor(), package_id)
+        finally:
+            conn.close()
 
 
 # ============================================================================
@@ -3039,6 +2966,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# v3.6: 延遲載入路由 (首次請求該 prefix 時 import + include_router)
+lazy_routers = LazyRouterRegistry(app)
+app.add_middleware(LazyRouterMiddleware, registry=lazy_routers)
+
 # ============================================================================
 # First-Run Detection & Setup Wizard Routes
 # ============================================================================
@@ -3467,6 +3398,20 @@ if IS_VERCEL:
 DATABASE_URL = os.environ.get('DATABASE_URL')
 USE_POSTGRES = DATABASE_URL is not None and IS_VERCEL
 
+# 定義 schema 的原始碼 (任何變更 -> 下次啟動走完整初始化)
+SCHEMA_SOURCES = [
+    "main.py", "config.py", "preload_data.py", "seeder_demo.py",
+    "services/stock_ledger.py", "services/blood_custody.py",
+    "services/query_ranges.py", "services/analytics_rollup.py",
+    "services/worker_coordination.py", "services/event_digest.py",
+    "routes/anesthesia.py", "routes/blood.py", "routes/transfer.py",
+    "routes/oxygen_tracking.py", "routes/surgery_codes.py",
+    "database/migrations/*.py",
+]
+schema_fingerprint: Optional[SchemaFingerprint] = None
+# v3.6: 模組層級 schema 步驟 (oxygen schema、auto-seed) 的失敗紀錄，見 run_schema_init
+schema_init_errors: List[str] = []
+
 if USE_POSTGRES:
     # 使用 PostgreSQL (Neon)
     try:
@@ -3479,7 +3424,15 @@ if USE_POSTGRES:
         USE_POSTGRES = False
 else:
     # 使用 SQLite
-    db = DatabaseManager(config.DATABASE_PATH)
+    # v3.6: Schema fingerprint - 版本與 DDL 原始碼未變且 sqlite_master 相符時跳過整段 schema 初始化
+    schema_fingerprint = SchemaFingerprint(
+        config.DATABASE_PATH, config.VERSION, str(PROJECT_ROOT), SCHEMA_SOURCES,
+        extra={"station_id": config.get_station_id(), "station_type": config.STATION_TYPE},
+    )
+    with startup_timer.phase("fingerprint_check"):
+        fast_path = not IS_VERCEL and schema_fingerprint.matches()
+    with startup_timer.phase("init_database"):
+        db = DatabaseManager(config.DATABASE_PATH, skip_init=fast_path)
 
 # Vercel: 如果使用 SQLite (in-memory)，初始化 demo 資料
 if IS_VERCEL and not USE_POSTGRES:
@@ -3487,8 +3440,9 @@ if IS_VERCEL and not USE_POSTGRES:
     _conn = db.get_connection()
     seed_mirs_demo(_conn)
     # v2.6: 初始化術式主檔 (surgery_codes, selfpay_items) at import time
-    if SURGERY_CODES_MODULE_AVAILABLE and init_surgery_codes_schema:
+    if SURGERY_CODES_MODULE_AVAILABLE:
         try:
+            from routes.surgery_codes import init_surgery_codes_schema
             _cursor = _conn.cursor()
             init_surgery_codes_schema(_cursor)
             _conn.commit()
@@ -3499,30 +3453,37 @@ if IS_VERCEL and not USE_POSTGRES:
 elif IS_VERCEL and USE_POSTGRES:
     logger.info("✓ [MIRS] Using Neon PostgreSQL - data persisted")
 
+SCHEMA_FAST_PATH = getattr(db, "schema_fast_path", False)
+startup_timer.fast_path = SCHEMA_FAST_PATH
+
 # v2.8.5: RPi 自動 seed - 如果資料庫是空的（新部署）
-if not IS_VERCEL:
-    try:
-        _conn = db.get_connection()
-        _cursor = _conn.cursor()
-        _cursor.execute("SELECT COUNT(*) FROM equipment")
-        _eq_count = _cursor.fetchone()[0]
-        if _eq_count == 0:
-            logger.info("[MIRS] 偵測到空資料庫，自動執行 seeder...")
-            from seeder_demo import seed_mirs_demo
-            seed_mirs_demo(_conn)
-            # 初始化術式主檔
-            if SURGERY_CODES_MODULE_AVAILABLE and init_surgery_codes_schema:
-                try:
-                    init_surgery_codes_schema(_cursor)
-                    _conn.commit()
-                    logger.info("✓ [MIRS] Surgery codes schema initialized")
-                except Exception as e:
-                    logger.warning(f"[MIRS] Surgery codes init warning: {e}")
-            logger.info("✓ [MIRS] RPi 自動 seed 完成")
-        else:
-            logger.info(f"[MIRS] 資料庫已有 {_eq_count} 筆設備，跳過 seed")
-    except Exception as e:
-        logger.warning(f"[MIRS] Auto-seed check failed: {e}")
+if not IS_VERCEL and not SCHEMA_FAST_PATH:
+    with startup_timer.phase("auto_seed"):
+        try:
+            _conn = db.get_connection()
+            _cursor = _conn.cursor()
+            _cursor.execute("SELECT COUNT(*) FROM equipment")
+            _eq_count = _cursor.fetchone()[0]
+            if _eq_count == 0:
+                logger.info("[MIRS] 偵測到空資料庫，自動執行 seeder...")
+                from seeder_demo import seed_mirs_demo
+                seed_mirs_demo(_conn)
+                # 初始化術式主檔
+                if SURGERY_CODES_MODULE_AVAILABLE:
+                    try:
+                        from routes.surgery_codes import init_surgery_codes_schema
+                        init_surgery_codes_schema(_cursor)
+                        _conn.commit()
+                        logger.info("✓ [MIRS] Surgery codes schema initialized")
+                    except Exception as e:
+                        logger.warning(f"[MIRS] Surgery codes init warning: {e}")
+                        schema_init_errors.append(f"auto_seed surgery_codes: {e}")
+                logger.info("✓ [MIRS] RPi 自動 seed 完成")
+            else:
+                logger.info(f"[MIRS] 資料庫已有 {_eq_count} 筆設備，跳過 seed")
+        except Exception as e:
+            logger.warning(f"[MIRS] Auto-seed check failed: {e}")
+            schema_init_errors.append(f"auto_seed: {e}")
 
 # ========== 背景任務：每日設備重置 (v1.4.5) ==========
 
@@ -3554,8 +3515,8 @@ async def daily_equipment_reset():
             await asyncio.sleep(3600)
 
 
-def run_migrations():
-    """執行資料庫遷移 - 確保 schema 更新"""
+def run_migrations() -> bool:
+    """執行資料庫遷移 - 確保 schema 更新 (回傳是否全部成功)"""
     conn = db.get_connection()
     cursor = conn.cursor()
     try:
@@ -4080,35 +4041,80 @@ def run_migrations():
             logger.info("✓ Migration: 建立 pharmacy_dispatch_items 表")
 
         conn.commit()
+        return True
     except Exception as e:
         logger.warning(f"Migration warning: {e}")
         import traceback
         traceback.print_exc()
+        return False
     finally:
         conn.close()
 
 
-@app.on_event("startup")
-async def startup_event():
-    """應用啟動時執行"""
+def run_schema_init() -> bool:
+    """
+    舊系統 + Idempotent migrations；回傳是否全部成功 (成功才記錄 fingerprint)
+
+    init_database 內的模組 schema、oxygen schema 與 auto-seed 若失敗 (例如開機時
+    database is locked) 也視為失敗，避免將未完成的結構記錄為 fingerprint 後永遠走快速路徑
+    """
     # 執行資料庫遷移 (舊系統 - 保留相容性)
-    run_migrations()
+    with startup_timer.phase("legacy_migrations"):
+        ok = run_migrations()
 
     # v2.8.6: 執行 Idempotent Migrations (新系統)
     try:
-        from database.migrations import run_migrations as run_idempotent_migrations, get_current_version
-        conn = db.get_connection()
-        applied = run_idempotent_migrations(conn)
-        version = get_current_version(conn)
-        conn.close()
+        with startup_timer.phase("idempotent_migrations"):
+            from database.migrations import run_migrations as run_idempotent_migrations, get_current_version
+            conn = db.get_connection()
+            applied = run_idempotent_migrations(conn)
+            version = get_current_version(conn)
+            conn.close()
         if applied > 0:
             logger.info(f"✓ [MIRS] Idempotent migrations applied: {applied}, current version: {version}")
         else:
             logger.info(f"✓ [MIRS] Migration version: {version} (up to date)")
     except ImportError:
         logger.warning("⚠ [MIRS] Idempotent migrations module not found")
+        ok = False
     except Exception as e:
         logger.error(f"⚠ [MIRS] Migration error: {e}")
+        ok = False
+
+    failed = getattr(db, "schema_errors", []) + schema_init_errors
+    if failed:
+        logger.warning(f"⚠ [MIRS] Schema init incomplete, fingerprint not recorded (retry next start): {'; '.join(failed)}")
+        ok = False
+    return ok
+
+
+@app.on_event("startup")
+async def startup_event():
+    """應用啟動時執行"""
+    if SCHEMA_FAST_PATH:
+        logger.info("✓ [MIRS] Schema fingerprint match - migrations skipped")
+    elif run_schema_init() and schema_fingerprint is not None and not db.is_memory:
+        # v3.6: 全部 schema 步驟成功後記錄 fingerprint，下次冷啟動可走快速路徑
+        try:
+            with startup_timer.phase("fingerprint_store"):
+                conn = db.get_connection()
+                try:
+                    schema_fingerprint.store(conn)
+                finally:
+                    conn.close()
+        except Exception as e:
+            logger.warning(f"[MIRS] Failed to record schema fingerprint: {e}")
+
+    # v3.6: --workers N - 取得 worker slot (HLC / UUIDv7 節點 id) 並開始續租 lease
+    coordinator = get_coordinator()
+    if not db.is_memory:
+        try:
+            await coordinator.start(config.DATABASE_PATH)
+            if coordinator.multi_worker:
+                get_event_bus().start_tail(config.DATABASE_PATH)
+        except Exception as e:
+            logger.error(f"[Workers] Failed to join worker group: {e}")
+            raise
 
     # v3.5: Initialize HLC (Hybrid Logical Clock) for Lifeboat
     try:
@@ -4129,14 +4135,15 @@ async def startup_event():
         logger.info("✓ [MIRS] Demo mode initialized with sample data")
     else:
         # 只在非 Vercel 環境啟動背景任務
-        asyncio.create_task(daily_equipment_reset())
+        # v3.6: 多 worker 時僅由持有 lease 的 worker 執行 (exclusive job)
+        await coordinator.exclusive_task("daily_equipment_reset", daily_equipment_reset)
         logger.info("✓ 每日設備重置背景任務已啟動 (07:00am)")
 
         # v1.9.1: Start OTA scheduler (if enabled)
         try:
-            from services.ota_scheduler import start_scheduler, OTA_SCHEDULER_ENABLED
+            from services.ota_scheduler import start_scheduler, stop_scheduler, OTA_SCHEDULER_ENABLED
             if OTA_SCHEDULER_ENABLED:
-                await start_scheduler()
+                await coordinator.run_exclusive("ota_scheduler", start_scheduler, stop_scheduler)
                 logger.info("✓ [OTA] Auto-update scheduler started")
             else:
                 logger.info("✓ [OTA] Scheduler disabled (MIRS_OTA_SCHEDULER_ENABLED=false)")
@@ -4145,10 +4152,41 @@ async def startup_event():
         except Exception as e:
             logger.warning(f"[OTA] Failed to start scheduler: {e}")
 
+        # v3.6: 血袋預約逾時排程 (到期即釋放，取代 GET 時清理)
+        if BLOOD_MODULE_AVAILABLE:
+            try:
+                from routes.blood import get_reservation_scheduler, get_availability_cache
+                await get_reservation_scheduler().start()
+                await get_availability_cache().start()  # 跨日重建可用性快取
+                logger.info("✓ [Blood] Reservation expiry scheduler started")
+            except Exception as e:
+                logger.warning(f"[Blood] Failed to start reservation scheduler: {e}")
+
+        # v3.6: USB 定期快照 (MIRS_USB_SNAPSHOT_DIR)
+        try:
+            from services.backup_engine import (
+                USB_SNAPSHOT_DIR, USB_SNAPSHOT_INTERVAL, start_usb_snapshots, stop_usb_snapshots,
+            )
+            if USB_SNAPSHOT_DIR and USB_SNAPSHOT_INTERVAL > 0:
+                await coordinator.run_exclusive(
+                    "usb_snapshots", lambda: start_usb_snapshots(config.DATABASE_PATH), stop_usb_snapshots)
+                logger.info("✓ [Backup] USB snapshot scheduler started")
+        except Exception as e:
+            logger.warning(f"[Backup] Failed to start USB snapshots: {e}")
+
+    startup_timer.mark_ready()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """應用關閉時執行"""
+    # 停止 exclusive jobs 並釋放 lease (其他 worker 可立即接手)
+    try:
+        await get_coordinator().stop()
+        await get_event_bus().stop_tail()
+    except Exception as e:
+        logger.warning(f"[Workers] Error leaving worker group: {e}")
+
     # Stop OTA scheduler
     try:
         from services.ota_scheduler import stop_scheduler
@@ -4159,6 +4197,48 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"[OTA] Error stopping scheduler: {e}")
 
+    # Stop blood reservation expiry scheduler
+    if BLOOD_MODULE_AVAILABLE:
+        from routes.blood import get_reservation_scheduler, get_availability_cache
+        await get_reservation_scheduler().stop()
+        await get_availability_cache().stop()
+
+    # Stop USB snapshot scheduler
+    try:
+        from services.backup_engine import stop_usb_snapshots
+        await stop_usb_snapshots()
+    except ImportError:
+        pass
+
+    # Stop PDF render worker pool
+    try:
+        from services.pdf_worker import shutdown_pdf_service
+        shutdown_pdf_service()
+    except ImportError:
+        pass
+
+    # Close shared CIRS Hub client (keep-alive connections)
+    try:
+        from services.cirs_client import close_hub_client
+        await close_hub_client()
+    except ImportError:
+        pass
+
+    # Flush buffered mobile last_seen updates
+    try:
+        from services.mobile import shutdown_mobile_services
+        shutdown_mobile_services()
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"[Mobile] Error flushing last_seen: {e}")
+
+    # Stop managed executor pools
+    shutdown_executors()
+
+    # 關閉連線池閒置連線 (WAL checkpoint 於最後一條連線關閉時完成)
+    close_all_pools()
+
 
 # ============================================================================
 # API 端點
@@ -4208,7 +4288,16 @@ async def health_check():
         "station_id": config.get_station_id(),
         "station_type": config.STATION_TYPE,
         "timestamp": datetime.now().isoformat(),
-        "demo_mode": IS_VERCEL
+        "demo_mode": IS_VERCEL,
+        "db_pool": get_pool_stats(),
+        "event_bus": get_event_bus().stats(),
+        "executor": get_executor().stats(),
+        "workers": get_coordinator().status(),
+        "startup": {
+            **startup_timer.report(),
+            "schema_fingerprint": schema_fingerprint.status() if schema_fingerprint else None,
+            "lazy_routers": lazy_routers.stats(),
+        },
     }
 
 
@@ -4538,13 +4627,7 @@ async def get_blood_events(
         where_clauses = ["station_id = ?"]
         params = [station_id]
 
-        if start_date:
-            where_clauses.append("DATE(timestamp) >= ?")
-            params.append(start_date)
-
-        if end_date:
-            where_clauses.append("DATE(timestamp) <= ?")
-            params.append(end_date)
+        add_day_range(where_clauses, params, "timestamp", start_date, end_date)
 
         if blood_type:
             where_clauses.append("blood_type = ?")
@@ -5437,6 +5520,7 @@ async def create_surgery_record(request: SurgeryRecordRequest):
     cirs_notified = False
     if result.get("cirsRegistrationRef") and PROCEDURE_MODULE_AVAILABLE:
         try:
+            from routes.procedure import notify_cirs_procedure_claim, notify_cirs_procedure_done
             actor_id = request.stationId or "MIRS-PROCEDURE"
             record_number = result.get("recordNumber")
 
@@ -5476,18 +5560,15 @@ async def get_surgery_records(
 @app.get("/api/surgery/export/csv")
 async def export_surgery_csv(
     start_date: Optional[str] = Query(None, description="開始日期 YYYY-MM-DD"),
-    end_date: Optional[str] = Query(None, description="結束日期 YYYY-MM-DD")
+    end_date: Optional[str] = Query(None, description="結束日期 YYYY-MM-DD"),
+    compress: bool = Query(False, alias="gzip", description="gzip 壓縮 (.csv.gz)")
 ):
-    """匯出手術記錄 CSV"""
+    """匯出手術記錄 CSV (串流，無筆數上限)"""
     try:
-        csv_content = db.export_surgery_records_csv(start_date, end_date)
-
         filename = f"surgery_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-        return StreamingResponse(
-            iter([csv_content]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        return await stream_export(
+            db.stream_surgery_records_csv(start_date, end_date),
+            filename, CSV_MEDIA_TYPE, compress
         )
     except Exception as e:
         logger.error(f"匯出 CSV 失敗: {e}")
@@ -5632,7 +5713,8 @@ async def resolve_inventory_error(request: dict):
 async def export_inventory_check_csv(
     station_id: Optional[str] = Query(None),
     from_date: Optional[str] = Query(None),
-    to_date: Optional[str] = Query(None)
+    to_date: Optional[str] = Query(None),
+    compress: bool = Query(False, alias="gzip", description="gzip 壓縮 (.csv.gz)")
 ):
     """
     匯出盤點記錄 CSV
@@ -5647,13 +5729,10 @@ async def export_inventory_check_csv(
         if to_date:
             checks = [c for c in checks if c.get("checked_at", "")[:10] <= to_date]
 
-        # 建立 CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["盤點ID", "盤點時間", "盤點人員", "總項目", "已確認", "錯誤", "待處理"])
-
-        for check in checks:
-            writer.writerow([
+        chunks = iter_csv(
+            ["盤點ID", "盤點時間", "盤點人員", "總項目", "已確認", "錯誤", "待處理"],
+            checks,
+            lambda check: [
                 check.get("check_id", ""),
                 check.get("checked_at", ""),
                 check.get("checker_name", ""),
@@ -5661,16 +5740,10 @@ async def export_inventory_check_csv(
                 check.get("confirmed_count", 0),
                 check.get("error_count", 0),
                 check.get("errors_pending", 0)
-            ])
-
-        csv_content = output.getvalue()
-        filename = f"inventory_check_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-        return StreamingResponse(
-            iter([csv_content]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            ]
         )
+        filename = f"inventory_check_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return await stream_export(chunks, filename, CSV_MEDIA_TYPE, compress)
     except Exception as e:
         logger.error(f"匯出盤點記錄失敗: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -5689,7 +5762,7 @@ async def emergency_dispense(request: EmergencyDispenseRequest):
     - 記錄緊急原因
     - 狀態設為 EMERGENCY
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -5808,7 +5881,7 @@ async def normal_dispense(request: NormalDispenseRequest):
     - 不立即扣庫存
     - 等待藥師 PIN 碼審核
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -5907,7 +5980,7 @@ async def approve_dispense(request: DispenseApprovalRequest):
     if request.pinCode != PHARMACIST_PIN:
         raise HTTPException(status_code=401, detail="PIN 碼錯誤，拒絕審核")
 
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6013,7 +6086,7 @@ async def get_pending_dispenses(
     - 預設顯示所有 PENDING 和 EMERGENCY
     - 藥師可以看到需要確認的緊急領用
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6065,7 +6138,7 @@ async def get_dispense_history(
     limit: int = Query(100, ge=1, le=500, description="最大回傳筆數")
 ):
     """查詢領用歷史記錄"""
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6073,13 +6146,10 @@ async def get_dispense_history(
         query = "SELECT * FROM dispense_records WHERE 1=1"
         params = []
 
-        if start_date:
-            query += " AND DATE(created_at) >= ?"
-            params.append(start_date)
-
-        if end_date:
-            query += " AND DATE(created_at) <= ?"
-            params.append(end_date)
+        date_clauses = []
+        add_day_range(date_clauses, params, "created_at", start_date, end_date)
+        for clause in date_clauses:
+            query += f" AND {clause}"
 
         if medicine_code:
             query += " AND medicine_code = ?"
@@ -6135,7 +6205,7 @@ class IngestReceiptRequest(BaseModel):
 def generate_dispatch_id() -> str:
     """Generate unique dispatch ID"""
     today = datetime.now().strftime('%Y%m%d')
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     cursor = conn.cursor()
     cursor.execute(
         "SELECT COUNT(*) FROM pharmacy_dispatch_orders WHERE dispatch_id LIKE ?",
@@ -6153,7 +6223,7 @@ async def create_dispatch(request: CreateDispatchRequest):
     - 驗證管制藥是否有 target_station_id
     - 不扣庫存，只建立草稿
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6176,18 +6246,8 @@ async def create_dispatch(request: CreateDispatchRequest):
             if not med_item:
                 raise HTTPException(status_code=404, detail=f"找不到藥品: {item.medicine_code}")
 
-            # 計算庫存 (從 inventory_events)
-            cursor.execute("""
-                SELECT COALESCE(SUM(CASE
-                    WHEN event_type = 'RECEIVE' THEN quantity
-                    WHEN event_type = 'CONSUME' THEN -quantity
-                    WHEN event_type = 'DISPATCH_RESERVE' THEN -quantity
-                    WHEN event_type = 'DISPATCH_RELEASE' THEN quantity
-                    ELSE 0 END), 0) as current_stock
-                FROM inventory_events WHERE item_code = ?
-            """, (item.medicine_code,))
-            stock_row = cursor.fetchone()
-            current_stock = stock_row['current_stock'] if stock_row else 0
+            # 計算庫存 (從 item_stock 帳本)
+            current_stock = get_available(cursor, item.medicine_code)
 
             # 檢查是否為管制藥 (從 medicines 資料表查詢)
             cursor.execute("""
@@ -6282,7 +6342,7 @@ async def reserve_dispatch(dispatch_id: str, request: ReserveDispatchRequest):
     - 檢查可用庫存
     - 增加 reserved_qty
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6307,17 +6367,7 @@ async def reserve_dispatch(dispatch_id: str, request: ReserveDispatchRequest):
         shortages = []
         for item in items:
             # 計算現有庫存
-            cursor.execute("""
-                SELECT COALESCE(SUM(CASE
-                    WHEN event_type = 'RECEIVE' THEN quantity
-                    WHEN event_type = 'CONSUME' THEN -quantity
-                    WHEN event_type = 'DISPATCH_RESERVE' THEN -quantity
-                    WHEN event_type = 'DISPATCH_RELEASE' THEN quantity
-                    ELSE 0 END), 0) as current_stock
-                FROM inventory_events WHERE item_code = ?
-            """, (item['medicine_code'],))
-            stock_row = cursor.fetchone()
-            available = stock_row['current_stock'] if stock_row else 0
+            available = get_available(cursor, item['medicine_code'])
 
             if item['quantity'] > available:
                 shortages.append({
@@ -6380,7 +6430,12 @@ async def get_dispatch_qr(dispatch_id: str):
     取得撥發單 QR Code (XIR1 格式)
     - 狀態必須是 RESERVED 或 DISPATCHED
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    return await run_in_executor("db", _build_dispatch_qr, dispatch_id)
+
+
+def _build_dispatch_qr(dispatch_id: str) -> dict:
+    """撥發單 XIR1 QR 分段 (同步 sqlite，經由 executor 執行)"""
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6478,7 +6533,7 @@ async def confirm_dispatch(dispatch_id: str, request: ConfirmDispatchRequest):
     - 扣除 current_stock
     - 冪等操作
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6582,7 +6637,7 @@ async def ingest_receipt(request: IngestReceiptRequest):
         # TODO: Verify signature
 
         # Update dispatch order
-        conn = sqlite3.connect(config.DATABASE_PATH)
+        conn = db.get_connection()
         cursor = conn.cursor()
 
         try:
@@ -6647,7 +6702,7 @@ async def list_dispatches(
     limit: int = Query(50, ge=1, le=200)
 ):
     """列出撥發單"""
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6689,7 +6744,7 @@ async def cancel_dispatch(dispatch_id: str):
     - 只能取消 DRAFT 或 RESERVED
     - RESERVED 需釋放保留庫存
     """
-    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn = db.get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -6758,35 +6813,32 @@ async def get_inventory_events(
 
 
 @app.get("/api/inventory/export/csv")
-async def export_inventory_csv():
-    """匯出庫存清單 CSV"""
+async def export_inventory_csv(
+    compress: bool = Query(False, alias="gzip", description="gzip 壓縮 (.csv.gz)")
+):
+    """匯出庫存清單 CSV (串流)"""
     try:
-        csv_content = db.export_inventory_csv()
-
         filename = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-        return StreamingResponse(
-            iter([csv_content]),
-            media_type="text/csv;charset=utf-8",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        return await stream_export(db.stream_inventory_csv(), filename, CSV_MEDIA_TYPE, compress)
     except Exception as e:
         logger.error(f"匯出庫存 CSV 失敗: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/inventory/export/json")
-async def export_inventory_json():
-    """匯出庫存清單 JSON"""
+async def export_inventory_json(
+    format: str = Query("json", description="json (陣列) 或 ndjson (每列一筆)"),
+    compress: bool = Query(False, alias="gzip", description="gzip 壓縮 (.gz)")
+):
+    """匯出庫存清單 JSON (串流)"""
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"無效的格式: {format}")
     try:
-        items = db.get_inventory_items()
-
-        filename = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-
-        return StreamingResponse(
-            iter([json.dumps(items, ensure_ascii=False, indent=2)]),
-            media_type="application/json;charset=utf-8",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        ndjson = format == "ndjson"
+        filename = f"inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+        return await stream_export(
+            db.stream_inventory_json(ndjson),
+            filename, NDJSON_MEDIA_TYPE if ndjson else JSON_MEDIA_TYPE, compress
         )
     except Exception as e:
         logger.error(f"匯出庫存 JSON 失敗: {e}")
@@ -6797,24 +6849,51 @@ async def export_inventory_json():
 async def export_inventory_events_csv(
     event_type: Optional[str] = Query(None, description="事件類型 RECEIVE/CONSUME"),
     start_date: Optional[str] = Query(None, description="開始日期 YYYY-MM-DD"),
-    end_date: Optional[str] = Query(None, description="結束日期 YYYY-MM-DD")
+    end_date: Optional[str] = Query(None, description="結束日期 YYYY-MM-DD"),
+    compress: bool = Query(False, alias="gzip", description="gzip 壓縮 (.csv.gz)")
 ):
-    """匯出庫存事件記錄 CSV"""
+    """匯出庫存事件記錄 CSV (串流，不再截斷於 10000 筆)"""
     try:
-        csv_content = db.export_inventory_events_csv(event_type, start_date, end_date)
-
         filename = f"inventory_events_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-        return StreamingResponse(
-            iter([csv_content]),
-            media_type="text/csv;charset=utf-8",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        return await stream_export(
+            db.stream_inventory_events_csv(event_type, start_date, end_date),
+            filename, CSV_MEDIA_TYPE, compress
         )
     except Exception as e:
         logger.error(f"匯出事件記錄 CSV 失敗: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ========== 庫存帳本 (item_stock) 維護 API (v3.6) ==========
+
+@app.get("/api/inventory/ledger/verify")
+async def verify_stock_ledger():
+    """重播 inventory_events 比對 item_stock，回報差異 (drift)"""
+    conn = db.get_connection()
+    try:
+        return verify_item_stock(conn)
+    except Exception as e:
+        logger.error(f"庫存帳本驗證失敗: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+
+@app.post("/api/inventory/ledger/rebuild")
+async def rebuild_stock_ledger():
+    """由 inventory_events 重建 item_stock"""
+    conn = db.get_connection()
+    try:
+        rows = rebuild_item_stock(conn)
+        return {"success": True, "rows": rows, "verify": verify_item_stock(conn)}
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"庫存帳本重建失敗: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+
 # ============================================================================
 # 緊急功能 API (v1.4.5新增)
 # ============================================================================
@@ -6822,10 +6901,13 @@ async def export_inventory_events_csv(
 @app.get("/api/emergency/quick-backup")
 async def emergency_quick_backup():
     """
-    緊急快速備份 - 直接下載資料庫檔案
+    緊急快速備份 - 下載資料庫快照
 
     戰時緊急撤離使用：最快速的資料保全方式
+    v3.6: SQLite online backup API 快照 (寫入中也一致，含 -wal 內容)，串流下載
     """
+    from services.backup_engine import snapshot_chunks
+
     try:
         db_path = Path(config.DATABASE_PATH)
 
@@ -6838,130 +6920,105 @@ async def emergency_quick_backup():
 
         logger.info(f"緊急快速備份: {filename}")
 
-        return FileResponse(
-            path=str(db_path),
+        # 先取第一段: 快照於此完成，失敗時仍可回 500
+        chunks = snapshot_chunks(str(db_path))
+        first = await run_in_executor("export", next, chunks, b"")
+
+        return StreamingResponse(
+            iterate_in_executor("export", chunks, first),
             media_type="application/octet-stream",
-            filename=filename
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"快速備份失敗: {e}")
         raise HTTPException(status_code=500, detail=f"備份失敗: {str(e)}")
 
 
-@app.get("/api/emergency/download-all")
-async def emergency_download_all():
-    """
-    緊急完整備份 - 生成包含所有資料的ZIP包
-
-    包含內容：
-    - database/: 完整資料庫
-    - exports/: CSV + JSON 分類資料
-    - config/: 站點設定檔
-    - README.txt: 使用說明
-    - manifest.json: 檔案清單與檢查碼
-    """
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"emergency_backup_{config.STATION_ID}_{timestamp}.zip"
-        zip_path = Path("exports") / zip_filename
-
-        # 確保exports目錄存在
-        zip_path.parent.mkdir(exist_ok=True)
+def _csv_bytes(rows: List[Dict[str, Any]], fieldnames: List[str]) -> bytes:
+    """CSV (utf-8-sig, Excel 可直接開啟)"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8-sig')
 
-        logger.info(f"開始生成完整備份包: {zip_filename}")
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 1. 加入資料庫
-            db_path = Path(config.DATABASE_PATH)
-            if db_path.exists():
-                zipf.write(db_path, f"database/{db_path.name}")
-                logger.info("✓ 資料庫已加入")
+def _query_dicts(cursor, sql: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    rows = cursor.execute(sql).fetchall()
+    cols = [desc[0] for desc in cursor.description]
+    return [dict(zip(cols, row)) for row in rows], cols
 
-            # 2. 導出CSV資料
-            exports_dir = Path("exports/temp")
-            exports_dir.mkdir(exist_ok=True, parents=True)
 
-            # 初始化變數
-            inventory_data = []
-            blood_data = []
-            equipment = []
+def _emergency_backup_entries(db_path: Path, infos: List[Dict[str, Any]]) -> Iterator[Tuple[str, Any]]:
+    """完整備份包的 ZIP 成員 (依序產生，直接寫入串流)"""
+    from services.backup_engine import snapshot_chunks
 
-            try:
-                # 導出庫存清單
-                inventory_data = db.get_inventory_items()
-                if inventory_data:
-                    csv_path = exports_dir / "inventory.csv"
-                    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=inventory_data[0].keys())
-                        writer.writeheader()
-                        writer.writerows([dict(item) for item in inventory_data])
-                    zipf.write(csv_path, "exports/inventory.csv")
-                    logger.info("✓ 庫存清單已導出")
-
-                # 導出血袋庫存
-                blood_data = db.get_blood_inventory()
-                if blood_data:
-                    csv_path = exports_dir / "blood_inventory.csv"
-                    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=['blood_type', 'quantity', 'station_id'])
-                        writer.writeheader()
-                        writer.writerows([dict(b) for b in blood_data])
-                    zipf.write(csv_path, "exports/blood_inventory.csv")
-                    logger.info("✓ 血袋庫存已導出")
+    # 1. 加入資料庫 (一致快照)
+    if db_path.exists():
+        yield f"database/{db_path.name}", snapshot_chunks(str(db_path))
+        logger.info("✓ 資料庫已加入")
 
-                # 導出設備清單
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                equipment = cursor.execute("SELECT * FROM equipment").fetchall()
-                if equipment:
-                    csv_path = exports_dir / "equipment.csv"
-                    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=[desc[0] for desc in cursor.description])
-                        writer.writeheader()
-                        writer.writerows([dict(zip([desc[0] for desc in cursor.description], row)) for row in equipment])
-                    zipf.write(csv_path, "exports/equipment.csv")
-                    logger.info("✓ 設備清單已導出")
+    # 2. 導出CSV資料
+    inventory_data = []
+    blood_data = []
+    equipment = []
 
-                # v1.2.8: 導出設備分項 (equipment_units)
-                try:
-                    units = cursor.execute("SELECT * FROM equipment_units").fetchall()
-                    if units:
-                        csv_path = exports_dir / "equipment_units.csv"
-                        with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                            writer = csv.DictWriter(f, fieldnames=[desc[0] for desc in cursor.description])
-                            writer.writeheader()
-                            writer.writerows([dict(zip([desc[0] for desc in cursor.description], row)) for row in units])
-                        zipf.write(csv_path, "exports/equipment_units.csv")
-                        logger.info("✓ 設備分項已導出")
-                except Exception as e:
-                    logger.warning(f"設備分項導出失敗: {e}")
+    try:
+        # 導出庫存清單
+        inventory_data = db.get_inventory_items()
+        if inventory_data:
+            yield "exports/inventory.csv", [_csv_bytes([dict(item) for item in inventory_data], list(inventory_data[0].keys()))]
+            logger.info("✓ 庫存清單已導出")
+
+        # 導出血袋庫存
+        blood_data = db.get_blood_inventory()
+        if blood_data:
+            yield "exports/blood_inventory.csv", [_csv_bytes([dict(b) for b in blood_data], ['blood_type', 'quantity', 'station_id'])]
+            logger.info("✓ 血袋庫存已導出")
+
+        # 導出設備清單
+        conn = db.get_read_connection()
+        try:
+            cursor = conn.cursor()
+            equipment, cols = _query_dicts(cursor, "SELECT * FROM equipment")
+            if equipment:
+                yield "exports/equipment.csv", [_csv_bytes(equipment, cols)]
+                logger.info("✓ 設備清單已導出")
 
-                # v1.2.8: 導出檢查歷史 (equipment_check_history)
-                try:
-                    history = cursor.execute("SELECT * FROM equipment_check_history ORDER BY check_time DESC LIMIT 1000").fetchall()
-                    if history:
-                        csv_path = exports_dir / "equipment_check_history.csv"
-                        with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                            writer = csv.DictWriter(f, fieldnames=[desc[0] for desc in cursor.description])
-                            writer.writeheader()
-                            writer.writerows([dict(zip([desc[0] for desc in cursor.description], row)) for row in history])
-                        zipf.write(csv_path, "exports/equipment_check_history.csv")
-                        logger.info("✓ 檢查歷史已導出")
-                except Exception as e:
-                    logger.warning(f"檢查歷史導出失敗: {e}")
+            # v1.2.8: 導出設備分項 (equipment_units)
+            try:
+                units, cols = _query_dicts(cursor, "SELECT * FROM equipment_units")
+                if units:
+                    yield "exports/equipment_units.csv", [_csv_bytes(units, cols)]
+                    logger.info("✓ 設備分項已導出")
+            except Exception as e:
+                logger.warning(f"設備分項導出失敗: {e}")
 
+            # v1.2.8: 導出檢查歷史 (equipment_check_history)
+            try:
+                history, cols = _query_dicts(cursor, "SELECT * FROM equipment_check_history ORDER BY check_time DESC LIMIT 1000")
+                if history:
+                    yield "exports/equipment_check_history.csv", [_csv_bytes(history, cols)]
+                    logger.info("✓ 檢查歷史已導出")
             except Exception as e:
-                logger.warning(f"部分資料導出失敗: {e}")
+                logger.warning(f"檢查歷史導出失敗: {e}")
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logger.warning(f"部分資料導出失敗: {e}")
 
-            # 3. 加入配置文件
-            config_path = Path("config/station_config.json")
-            if config_path.exists():
-                zipf.write(config_path, "config/station_config.json")
-                logger.info("✓ 配置文件已加入")
+    # 3. 加入配置文件
+    config_path = Path("config/station_config.json")
+    if config_path.exists():
+        yield "config/station_config.json", [config_path.read_bytes()]
+        logger.info("✓ 配置文件已加入")
 
-            # 4. 生成README
-            readme_content = f"""
+    # 4. 生成README
+    readme_content = f"""
 ==============================================
 醫療站庫存系統 - 緊急備份包
 ==============================================
@@ -7003,43 +7060,60 @@ manifest.json      檔案清單與檢查碼
 請妥善保管並定期更新
 ==============================================
 """
-            zipf.writestr("README.txt", readme_content.encode('utf-8'))
-            logger.info("✓ README已生成")
-
-            # 5. 生成manifest
-            manifest = {
-                "backup_time": datetime.now().isoformat(),
-                "station_id": config.STATION_ID,
-                "version": config.VERSION,
-                "files": {},
-                "statistics": {
-                    "total_items": len(inventory_data) if inventory_data else 0,
-                    "total_blood_types": len(blood_data) if blood_data else 0,
-                    "total_equipment": len(equipment) if equipment else 0
-                }
-            }
+    yield "README.txt", [readme_content.encode('utf-8')]
+    logger.info("✓ README已生成")
 
-            # 計算檔案檢查碼
-            for item in zipf.filelist:
-                if item.filename != "manifest.json":
-                    manifest["files"][item.filename] = {
-                        "size": item.file_size,
-                        "compressed_size": item.compress_size
-                    }
+    # 5. 生成manifest (infos 已含前面所有成員的大小)
+    manifest = {
+        "backup_time": datetime.now().isoformat(),
+        "station_id": config.STATION_ID,
+        "version": config.VERSION,
+        "files": {
+            info["name"]: {"size": info["size"], "compressed_size": info["compressed_size"]}
+            for info in infos
+        },
+        "statistics": {
+            "total_items": len(inventory_data) if inventory_data else 0,
+            "total_blood_types": len(blood_data) if blood_data else 0,
+            "total_equipment": len(equipment) if equipment else 0
+        }
+    }
+    yield "manifest.json", [json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')]
+    logger.info("✓ Manifest已生成")
+
+
+@app.get("/api/emergency/download-all")
+async def emergency_download_all():
+    """
+    緊急完整備份 - 生成包含所有資料的ZIP包
+
+    包含內容：
+    - database/: 完整資料庫
+    - exports/: CSV + JSON 分類資料
+    - config/: 站點設定檔
+    - README.txt: 使用說明
+    - manifest.json: 檔案清單與檢查碼
+
+    v3.6: ZIP 直接串流至回應 (不再於 exports/ 落地 zip 與暫存 CSV)；
+    資料庫為 online backup 快照
+    """
+    from services.backup_engine import iter_zip
 
-            zipf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
-            logger.info("✓ Manifest已生成")
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        zip_filename = f"emergency_backup_{config.STATION_ID}_{timestamp}.zip"
 
-        # 清理臨時目錄
-        if exports_dir.exists():
-            shutil.rmtree(exports_dir)
+        logger.info(f"開始生成完整備份包: {zip_filename}")
 
-        logger.info(f"完整備份包生成成功: {zip_filename}")
+        infos: List[Dict[str, Any]] = []
+        stream = iter_zip(_emergency_backup_entries(Path(config.DATABASE_PATH), infos), infos)
+        # 先取第一段: 資料庫快照於此完成，失敗時仍可回 500
+        first = await run_in_executor("export", next, stream, b"")
 
-        return FileResponse(
-            path=str(zip_path),
+        return StreamingResponse(
+            iterate_in_executor("export", stream, first),
             media_type="application/zip",
-            filename=zip_filename
+            headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
         )
 
     except Exception as e:
@@ -7047,154 +7121,162 @@ manifest.json      檔案清單與檢查碼
         raise HTTPException(status_code=500, detail=f"備份失敗: {str(e)}")
 
 
-@app.get("/api/export/upgrade-package")
-async def export_upgrade_package():
+@app.post("/api/emergency/usb-snapshot")
+async def emergency_usb_snapshot():
     """
-    匯出升級至多站版所需的完整資料包
-
-    用途：讓使用者從單站版升級至多站版時，匯出所有資料
-
-    包含內容：
-    - database/: 完整資料庫
-    - exports/: CSV + JSON 分類資料
-    - config/: 站點設定檔
-    - upgrade_info.json: 升級相容性資訊
+    立即寫入 USB 快照 (MIRS_USB_SNAPSHOT_DIR)，並依 MIRS_USB_SNAPSHOT_KEEP 輪替舊檔
     """
+    from services.backup_engine import get_usb_snapshot_scheduler
+
+    scheduler = get_usb_snapshot_scheduler(config.DATABASE_PATH)
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"mirs_upgrade_{config.STATION_ID}_{timestamp}.zip"
-        zip_path = Path("exports") / zip_filename
+        result = await run_in_executor("export", scheduler.snapshot_now, True)
+    except Exception as e:
+        logger.error(f"USB 快照失敗: {e}")
+        raise HTTPException(status_code=500, detail=f"USB 快照失敗: {str(e)}")
+    if result["status"] == "NO_TARGET":
+        raise HTTPException(status_code=503, detail="USB 快照目錄未設定或未掛載")
+    return result
 
-        # 確保exports目錄存在
-        zip_path.parent.mkdir(exist_ok=True)
 
-        logger.info(f"開始生成升級資料包: {zip_filename}")
+@app.get("/api/emergency/usb-snapshot")
+async def emergency_usb_snapshot_status():
+    """USB 快照排程狀態與現有快照清單"""
+    from services.backup_engine import get_usb_snapshot_scheduler
+    return get_usb_snapshot_scheduler(config.DATABASE_PATH).get_status()
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 1. 加入資料庫
-            db_path = Path(config.DATABASE_PATH)
-            if db_path.exists():
-                zipf.write(db_path, f"database/{db_path.name}")
-                logger.info("✓ 資料庫已加入")
 
-            # 2. 導出CSV資料
-            exports_dir = Path("exports/temp_upgrade")
-            exports_dir.mkdir(exist_ok=True, parents=True)
+def _write_upgrade_package(zip_path: Path):
+    """升級資料包 ZIP (同步: 資料庫快照 + CSV + 升級資訊)"""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # 1. 加入資料庫
+        db_path = Path(config.DATABASE_PATH)
+        if db_path.exists():
+            # v3.6: online backup 快照 (不直接複製寫入中的資料庫檔)
+            from services.backup_engine import snapshot_chunks
+            with zipf.open(f"database/{db_path.name}", "w", force_zip64=True) as member:
+                for chunk in snapshot_chunks(str(db_path)):
+                    member.write(chunk)
+            logger.info("✓ 資料庫已加入")
+
+        # 2. 導出CSV資料
+        exports_dir = Path("exports/temp_upgrade")
+        exports_dir.mkdir(exist_ok=True, parents=True)
+
+        inventory_data = []
+        blood_data = []
+        equipment = []
+        surgery_records = []
+        blood_bags = []
 
-            inventory_data = []
-            blood_data = []
-            equipment = []
-            surgery_records = []
-            blood_bags = []
+        try:
+            conn = db.get_connection()
+            cursor = conn.cursor()
 
+            # 導出庫存清單
+            inventory_data = db.get_inventory_items()
+            if inventory_data:
+                csv_path = exports_dir / "items.csv"
+                with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=inventory_data[0].keys())
+                    writer.writeheader()
+                    writer.writerows([dict(item) for item in inventory_data])
+                zipf.write(csv_path, "exports/items.csv")
+
+            # 導出血袋庫存
+            blood_data = db.get_blood_inventory()
+            if blood_data:
+                csv_path = exports_dir / "blood_inventory.csv"
+                with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=['blood_type', 'quantity', 'station_id'])
+                    writer.writeheader()
+                    writer.writerows([dict(b) for b in blood_data])
+                zipf.write(csv_path, "exports/blood_inventory.csv")
+
+            # 導出設備清單
+            equipment = cursor.execute("SELECT * FROM equipment").fetchall()
+            if equipment:
+                csv_path = exports_dir / "equipment.csv"
+                with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+                    cols = [desc[0] for desc in cursor.description]
+                    writer = csv.DictWriter(f, fieldnames=cols)
+                    writer.writeheader()
+                    writer.writerows([dict(zip(cols, row)) for row in equipment])
+                zipf.write(csv_path, "exports/equipment.csv")
+
+            # 導出處置記錄
+            surgery_records = cursor.execute("SELECT * FROM surgery_records").fetchall()
+            if surgery_records:
+                csv_path = exports_dir / "surgery_records.csv"
+                with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+                    cols = [desc[0] for desc in cursor.description]
+                    writer = csv.DictWriter(f, fieldnames=cols)
+                    writer.writeheader()
+                    writer.writerows([dict(zip(cols, row)) for row in surgery_records])
+                zipf.write(csv_path, "exports/surgery_records.csv")
+
+            # 導出血袋明細 (v1.4.2-plus)
             try:
-                conn = db.get_connection()
-                cursor = conn.cursor()
-
-                # 導出庫存清單
-                inventory_data = db.get_inventory_items()
-                if inventory_data:
-                    csv_path = exports_dir / "items.csv"
-                    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=inventory_data[0].keys())
-                        writer.writeheader()
-                        writer.writerows([dict(item) for item in inventory_data])
-                    zipf.write(csv_path, "exports/items.csv")
-
-                # 導出血袋庫存
-                blood_data = db.get_blood_inventory()
-                if blood_data:
-                    csv_path = exports_dir / "blood_inventory.csv"
-                    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=['blood_type', 'quantity', 'station_id'])
-                        writer.writeheader()
-                        writer.writerows([dict(b) for b in blood_data])
-                    zipf.write(csv_path, "exports/blood_inventory.csv")
-
-                # 導出設備清單
-                equipment = cursor.execute("SELECT * FROM equipment").fetchall()
-                if equipment:
-                    csv_path = exports_dir / "equipment.csv"
+                blood_bags = cursor.execute("SELECT * FROM blood_bags").fetchall()
+                if blood_bags:
+                    csv_path = exports_dir / "blood_bags.csv"
                     with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
                         cols = [desc[0] for desc in cursor.description]
                         writer = csv.DictWriter(f, fieldnames=cols)
                         writer.writeheader()
-                        writer.writerows([dict(zip(cols, row)) for row in equipment])
-                    zipf.write(csv_path, "exports/equipment.csv")
+                        writer.writerows([dict(zip(cols, row)) for row in blood_bags])
+                    zipf.write(csv_path, "exports/blood_bags.csv")
+            except:
+                pass  # 舊版本可能沒有這張表
 
-                # 導出處置記錄
-                surgery_records = cursor.execute("SELECT * FROM surgery_records").fetchall()
-                if surgery_records:
-                    csv_path = exports_dir / "surgery_records.csv"
+            # 導出領藥記錄
+            try:
+                dispense_records = cursor.execute("SELECT * FROM dispense_records").fetchall()
+                if dispense_records:
+                    csv_path = exports_dir / "dispense_records.csv"
                     with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
                         cols = [desc[0] for desc in cursor.description]
                         writer = csv.DictWriter(f, fieldnames=cols)
                         writer.writeheader()
-                        writer.writerows([dict(zip(cols, row)) for row in surgery_records])
-                    zipf.write(csv_path, "exports/surgery_records.csv")
-
-                # 導出血袋明細 (v1.4.2-plus)
-                try:
-                    blood_bags = cursor.execute("SELECT * FROM blood_bags").fetchall()
-                    if blood_bags:
-                        csv_path = exports_dir / "blood_bags.csv"
-                        with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                            cols = [desc[0] for desc in cursor.description]
-                            writer = csv.DictWriter(f, fieldnames=cols)
-                            writer.writeheader()
-                            writer.writerows([dict(zip(cols, row)) for row in blood_bags])
-                        zipf.write(csv_path, "exports/blood_bags.csv")
-                except:
-                    pass  # 舊版本可能沒有這張表
-
-                # 導出領藥記錄
-                try:
-                    dispense_records = cursor.execute("SELECT * FROM dispense_records").fetchall()
-                    if dispense_records:
-                        csv_path = exports_dir / "dispense_records.csv"
-                        with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
-                            cols = [desc[0] for desc in cursor.description]
-                            writer = csv.DictWriter(f, fieldnames=cols)
-                            writer.writeheader()
-                            writer.writerows([dict(zip(cols, row)) for row in dispense_records])
-                        zipf.write(csv_path, "exports/dispense_records.csv")
-                except:
-                    pass
+                        writer.writerows([dict(zip(cols, row)) for row in dispense_records])
+                    zipf.write(csv_path, "exports/dispense_records.csv")
+            except:
+                pass
 
-            except Exception as e:
-                logger.warning(f"部分資料導出失敗: {e}")
-
-            # 3. 加入配置文件
-            config_path = Path("config/station_config.json")
-            if config_path.exists():
-                zipf.write(config_path, "config/station_config.json")
-
-            # 4. 生成升級資訊
-            upgrade_info = {
-                "export_time": datetime.now().isoformat(),
-                "source_version": config.VERSION,
-                "source_station_id": config.STATION_ID,
-                "target_version": "2.0",
-                "compatibility": {
-                    "min_target_version": "2.0",
-                    "export_format": "v1"
-                },
-                "statistics": {
-                    "total_items": len(inventory_data) if inventory_data else 0,
-                    "total_blood_types": len(blood_data) if blood_data else 0,
-                    "total_equipment": len(equipment) if equipment else 0,
-                    "total_surgery_records": len(surgery_records) if surgery_records else 0,
-                    "total_blood_bags": len(blood_bags) if blood_bags else 0
-                },
-                "tables_exported": [
-                    "items", "blood_inventory", "equipment",
-                    "surgery_records", "blood_bags", "dispense_records"
-                ]
-            }
-            zipf.writestr("upgrade_info.json", json.dumps(upgrade_info, ensure_ascii=False, indent=2))
+        except Exception as e:
+            logger.warning(f"部分資料導出失敗: {e}")
+
+        # 3. 加入配置文件
+        config_path = Path("config/station_config.json")
+        if config_path.exists():
+            zipf.write(config_path, "config/station_config.json")
+
+        # 4. 生成升級資訊
+        upgrade_info = {
+            "export_time": datetime.now().isoformat(),
+            "source_version": config.VERSION,
+            "source_station_id": config.STATION_ID,
+            "target_version": "2.0",
+            "compatibility": {
+                "min_target_version": "2.0",
+                "export_format": "v1"
+            },
+            "statistics": {
+                "total_items": len(inventory_data) if inventory_data else 0,
+                "total_blood_types": len(blood_data) if blood_data else 0,
+                "total_equipment": len(equipment) if equipment else 0,
+                "total_surgery_records": len(surgery_records) if surgery_records else 0,
+                "total_blood_bags": len(blood_bags) if blood_bags else 0
+            },
+            "tables_exported": [
+                "items", "blood_inventory", "equipment",
+                "surgery_records", "blood_bags", "dispense_records"
+            ]
+        }
+        zipf.writestr("upgrade_info.json", json.dumps(upgrade_info, ensure_ascii=False, indent=2))
 
-            # 5. 生成 README
-            readme_content = f"""
+        # 5. 生成 README
+        readme_content = f"""
 ================================================
 MIRS 升級資料包 - 單站版 → 多站版
 ================================================
@@ -7241,11 +7323,38 @@ GitHub: https://github.com/cutemo0953/MIRS_v2.0_multi-station
 De Novo Orthopedics Inc. © 2024
 ================================================
 """
-            zipf.writestr("README.txt", readme_content.encode('utf-8'))
+        zipf.writestr("README.txt", readme_content.encode('utf-8'))
+
+    # 清理臨時目錄
+    if exports_dir.exists():
+        shutil.rmtree(exports_dir)
+
+
+@app.get("/api/export/upgrade-package")
+async def export_upgrade_package():
+    """
+    匯出升級至多站版所需的完整資料包
+
+    用途：讓使用者從單站版升級至多站版時，匯出所有資料
+
+    包含內容：
+    - database/: 完整資料庫
+    - exports/: CSV + JSON 分類資料
+    - config/: 站點設定檔
+    - upgrade_info.json: 升級相容性資訊
+    """
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        zip_filename = f"mirs_upgrade_{config.STATION_ID}_{timestamp}.zip"
+        zip_path = Path("exports") / zip_filename
 
-        # 清理臨時目錄
-        if exports_dir.exists():
-            shutil.rmtree(exports_dir)
+        # 確保exports目錄存在
+        zip_path.parent.mkdir(exist_ok=True)
+
+        logger.info(f"開始生成升級資料包: {zip_filename}")
+
+        # zip 壓縮 + CSV 匯出於 executor 執行，不阻塞其他請求
+        await run_in_executor("export", _write_upgrade_package, zip_path)
 
         logger.info(f"升級資料包生成成功: {zip_filename}")
 
@@ -7540,6 +7649,23 @@ async def view_emergency_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _render_qr_png(data: str) -> bytes:
+    """QR Code PNG (高容錯)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    img_io = BytesIO()
+    img.save(img_io, 'PNG')
+    return img_io.getvalue()
+
+
 @app.get("/api/emergency/qr-code")
 async def emergency_qr_code(request: Request):
     """
@@ -7558,23 +7684,8 @@ async def emergency_qr_code(request: Request):
         protocol = "https" if request.url.scheme == "https" else "http"
         qr_url = f"{protocol}://{host}/emergency/view"
 
-        # 生成QR Code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_url)
-        qr.make(fit=True)
-
-        # 生成圖片
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # 保存到BytesIO
-        img_io = BytesIO()
-        img.save(img_io, 'PNG')
-        img_io.seek(0)
+        # 生成QR Code (純 Python 運算，於 process pool 執行)
+        img_io = BytesIO(await run_in_executor("qr", _render_qr_png, qr_url))
 
         logger.info("緊急QR Code已生成")
 
@@ -7805,6 +7916,102 @@ async def upload_hospital_sync(request: SyncPackageUpload):
         raise HTTPException(status_code=500, detail=f"醫院層接收同步失敗: {str(e)}")
 
 
+# ========== 聯邦架構 - 串流同步封包 (chunked NDJSON) ==========
+
+@app.post("/api/station/sync/generate/stream")
+async def generate_station_sync_stream(request: SyncPackageGenerate):
+    """
+    【站點層】產生串流同步封包 (chunked NDJSON)
+
+    與 /api/station/sync/generate 相同的資料範圍，但以區塊串流輸出，
+    記憶體用量與資料量無關 (適合 Pi / 大量全量同步)。
+
+    格式: header 列 → (chunk 列 + 區塊內容)* → footer 列 (見 services/sync_stream.py)
+    """
+    if request.syncType not in ["DELTA", "FULL"]:
+        raise HTTPException(status_code=400, detail=f"無效的同步類型: {request.syncType}")
+
+    logger.info(f"開始產生串流同步封包: station={request.stationId}, type={request.syncType}, since={request.sinceTimestamp}")
+    package_id, body = db.stream_sync_package(
+        station_id=request.stationId,
+        hospital_id=request.hospitalId,
+        sync_type=request.syncType,
+        since_timestamp=request.sinceTimestamp
+    )
+    return StreamingResponse(
+        iterate_in_executor("export", body),
+        media_type=SYNC_STREAM_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{package_id}.ndjson"',
+            "X-MIRS-Package-Id": package_id,
+        }
+    )
+
+
+async def _import_sync_stream(request: Request, transfer_method: str) -> tuple:
+    """解析並逐區塊套用串流封包；回傳 (result, header)"""
+    def handle_items(importer: StreamImporter, items: list):
+        for kind, item in items:
+            importer.handle(kind, item)
+
+    parser = PackageParser()
+    importer = await run_in_executor("db", db.open_sync_importer)
+    try:
+        async for block in request.stream():
+            items = parser.feed(block)
+            if items:
+                await run_in_executor("db", handle_items, importer, items)
+        parser.close()
+        result = await run_in_executor("db", importer.result, 'UNKNOWN', transfer_method)
+        return result, importer.header or {}
+    except SyncStreamError as e:
+        package_id = importer.header.get("package_id") if importer.header else None
+        progress = await run_in_executor("db", db.get_sync_import_progress, package_id) if package_id else None
+        logger.error(f"✗ 串流封包匯入中止: {e}")
+        raise HTTPException(status_code=400, detail={
+            "error": str(e),
+            "package_id": package_id,
+            "next_chunk": progress["next_chunk"] if progress else 0,
+            "changes_applied": importer.changes_applied,
+        })
+    finally:
+        await run_in_executor("db", importer.close)
+
+
+@app.post("/api/station/sync/import/stream")
+async def import_station_sync_stream(request: Request):
+    """
+    【站點層】匯入串流同步封包
+
+    Body 為 chunked NDJSON 封包。每個區塊獨立驗證 (sha256) 並於單一交易中套用；
+    中斷後可從 next_chunk 續傳 (標頭 + 其後區塊 + 結尾)，已套用區塊會被略過。
+    """
+    result, _ = await _import_sync_stream(request, 'USB')
+    if result.get('success'):
+        logger.info(f"✓ 串流封包匯入成功: {result['package_id']} ({result['changes_applied']} 項變更)")
+    return result
+
+
+@app.post("/api/hospital/sync/upload/stream")
+async def upload_hospital_sync_stream(request: Request):
+    """【醫院層】接收站點串流同步上傳 (chunked NDJSON)"""
+    result, header = await _import_sync_stream(request, 'NETWORK')
+    station_id = header.get("station_id")
+    if result.get('success') and station_id:
+        db.mark_station_synced(station_id)
+    return {
+        **result,
+        "station_id": station_id,
+        "response_package_id": f"PKG-RESPONSE-{result.get('package_id')}"
+    }
+
+
+@app.get("/api/station/sync/import/{package_id}/progress")
+async def get_sync_import_progress(package_id: str):
+    """串流匯入進度 (續傳起點 next_chunk)"""
+    return db.get_sync_import_progress(package_id)
+
+
 @app.post("/api/hospital/transfer/coordinate")
 async def coordinate_hospital_transfer(request: HospitalTransferCoordinate):
     """
@@ -8939,31 +9146,17 @@ except ImportError as e:
 except Exception as e:
     logger.error(f"MIRS Mobile API 初始化失敗: {e}")
 
-# v1.5.1: 麻醉模組路由
-if ANESTHESIA_MODULE_AVAILABLE and anesthesia_router:
-    app.include_router(anesthesia_router)
-    logger.info("✓ MIRS Anesthesia Module v1.5.1 已啟用 (/api/anesthesia)")
-else:
-    logger.warning("麻醉模組未啟用")
+# v1.5.1: 麻醉模組路由 (v3.6: 延遲載入)
+lazy_routers.register("/api/anesthesia", "routes.anesthesia:router", "MIRS Anesthesia Module v1.5.1")
 
 # v1.1: 處置模組 CIRS 整合路由
-if PROCEDURE_MODULE_AVAILABLE and procedure_router:
-    app.include_router(procedure_router)
-    logger.info("✓ MIRS Procedure Module v1.0 已啟用 (/api/procedure)")
+lazy_routers.register("/api/procedure", "routes.procedure:router", "MIRS Procedure Module v1.0")
 
 # v1.5: 手術代碼與自費項目模組路由
-if SURGERY_CODES_MODULE_AVAILABLE and surgery_codes_router:
-    app.include_router(surgery_codes_router)
-    logger.info("✓ MIRS Surgery Codes Module v1.0 已啟用 (/api/surgery-codes)")
-else:
-    logger.warning("手術代碼模組未啟用")
+lazy_routers.register("/api/surgery-codes", "routes.surgery_codes:router", "MIRS Surgery Codes Module v1.0")
 
 # v2.9: EMT Transfer 模組路由
-if TRANSFER_MODULE_AVAILABLE and transfer_router:
-    app.include_router(transfer_router)
-    logger.info("✓ MIRS Transfer Module v1.0 已啟用 (/api/transfer)")
-else:
-    logger.warning("EMT Transfer 模組未啟用")
+lazy_routers.register("/api/transfer", "routes.transfer:router", "MIRS Transfer Module v1.0")
 
 # v3.0 Sprint 1: Inventory Engine (MIRS 資源引擎)
 if INVENTORY_ENGINE_AVAILABLE and inventory_engine_router:
@@ -8992,35 +9185,26 @@ else:
 
 # v3.2: Oxygen Tracking 氧氣追蹤模組
 if OXYGEN_TRACKING_AVAILABLE and oxygen_tracking_router:
-    try:
-        init_oxygen_schema()
-    except Exception as e:
-        logger.warning(f"Oxygen Tracking 初始化警告: {e}")
+    if not SCHEMA_FAST_PATH:
+        try:
+            with startup_timer.phase("oxygen_schema"):
+                init_oxygen_schema()
+        except Exception as e:
+            logger.warning(f"Oxygen Tracking 初始化警告: {e}")
+            schema_init_errors.append(f"oxygen_tracking: {e}")
     app.include_router(oxygen_tracking_router)
     logger.info("✓ MIRS Oxygen Tracking v1.0 已啟用 (/api/oxygen)")
 else:
     logger.warning("Oxygen Tracking 模組未啟用")
 
 # v3.3: OTA 更新模組 (P1-04)
-if OTA_AVAILABLE and ota_router:
-    app.include_router(ota_router)
-    logger.info("✓ MIRS OTA Update v1.0 已啟用 (/api/ota)")
-else:
-    logger.warning("OTA Update 模組未啟用")
+lazy_routers.register("/api/ota", "routes.ota:router", "MIRS OTA Update v1.0")
 
 # v3.4: Analytics Dashboard (P2-02)
-if ANALYTICS_AVAILABLE and analytics_router:
-    app.include_router(analytics_router)
-    logger.info("✓ MIRS Analytics Dashboard v1.0 已啟用 (/api/analytics)")
-else:
-    logger.warning("Analytics Dashboard 模組未啟用")
+lazy_routers.register("/api/analytics", "routes.analytics:router", "MIRS Analytics Dashboard v1.0")
 
 # v3.5: Disaster Recovery / Lifeboat (Walkaway Test)
-if DR_AVAILABLE and dr_router:
-    app.include_router(dr_router)
-    logger.info("✓ MIRS Disaster Recovery (Lifeboat) v1.0 已啟用 (/api/dr)")
-else:
-    logger.warning("Disaster Recovery (Lifeboat) 模組未啟用")
+lazy_routers.register("/api/dr", "routes.dr:router", "MIRS Disaster Recovery (Lifeboat) v1.0")
 
 
 class ResilienceConfigUpdate(BaseModel):
@@ -9241,6 +9425,51 @@ async def get_resilience_summary(station_id: Optional[str] = Query(None)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class ResilienceSimulateRequest(BaseModel):
+    """韌性情境模擬請求 (None = 使用站點設定)"""
+    samples: int = Field(5000, ge=1, le=100000, description="Monte Carlo 樣本數")
+    seed: Optional[int] = Field(None, ge=0, description="亂數種子 (預設由輸入推導，可重現)")
+    isolation_target_days: Optional[float] = Field(None, ge=1, le=30, description="預估孤立天數")
+    population_count: Optional[float] = Field(None, ge=0, le=100, description="等效插管人數")
+    population_growth: float = Field(0.0, ge=-1, le=10, description="人數成長比例 (0.3 = +30%)")
+    load_scale: float = Field(1.0, gt=0, le=10, description="電力負載倍數")
+    flow_scale: float = Field(1.0, gt=0, le=10, description="氧氣流量倍數")
+    extra_fuel_liters: float = Field(0.0, ge=0, description="額外油料 (L)")
+    extra_oxygen_liters: float = Field(0.0, ge=0, description="額外氧氣 (L)")
+    load_cv: float = Field(0.15, ge=0, le=2, description="負載變異係數")
+    flow_cv: float = Field(0.2, ge=0, le=2, description="氧氣流量變異係數")
+    level_cv: float = Field(0.1, ge=0, le=1, description="存量回報誤差")
+    fuel_rate_cv: float = Field(0.1, ge=0, le=2, description="油耗變異係數")
+
+
+@app.post("/api/resilience/simulate")
+async def simulate_resilience(
+    request: ResilienceSimulateRequest,
+    station_id: Optional[str] = Query(None)
+):
+    """
+    韌性情境模擬 (v3.6: Monte Carlo)
+
+    以韌性計算的電力/氧氣輸入為基準，套用情境覆寫後抽樣，
+    回傳各生命線 P10/P50/P90 時數與撐過孤立目標的機率。
+    結果依設定與庫存版本快取。
+    """
+    from services.resilience_simulator import NUMPY_AVAILABLE, Scenario, run_simulation
+    if not NUMPY_AVAILABLE:
+        raise HTTPException(status_code=503, detail="numpy not installed")
+
+    sid = station_id or config.get_station_id()
+    try:
+        return await run_in_executor(
+            "db", run_simulation, resilience_service, sid, Scenario(**request.model_dump())
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"韌性模擬失敗: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # Resource Intents API (v3.0 Stub - 待實作)
 # ============================================================================
@@ -10791,6 +11020,17 @@ async def get_lifecycle_events_v2(
 if __name__ == "__main__":
     # v1.4.8 單站版
 
+    # v3.6: --workers N (多核心; 預設 1 = 單一行程，行為不變)
+    import argparse
+    parser = argparse.ArgumentParser(description="MIRS server")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MIRS_WORKERS", "1")),
+                        help="uvicorn worker processes (default: MIRS_WORKERS or 1)")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    if workers > 1 and db.is_memory:
+        print("⚠️  in-memory 資料庫不支援多 worker，改用單一 worker")
+        workers = 1
+
     print("=" * 70)
     print(f"🏥 BORP備援手術站庫存管理系統（單站版）v{config.VERSION}")
     print("=" * 70)
@@ -10819,10 +11059,31 @@ if __name__ == "__main__":
     print("按 Ctrl+C 停止服務")
     print("=" * 70)
 
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=server_port,
-        log_level="info",
-        access_log=True
-    )
+    if workers > 1:
+        # 主行程先完成 schema 初始化並記錄 fingerprint，worker 啟動時走快速路徑 (避免 N 個行程同時遷移)
+        if not SCHEMA_FAST_PATH and run_schema_init() and schema_fingerprint is not None:
+            conn = db.get_connection()
+            try:
+                schema_fingerprint.store(conn)
+            finally:
+                conn.close()
+        close_all_pools()
+        os.environ["MIRS_WORKERS"] = str(workers)
+        print(f"👥 Workers: {workers}")
+        uvicorn.run(
+            "main:app",
+            app_dir=str(Path(__file__).parent),
+            host="0.0.0.0",
+            port=server_port,
+            workers=workers,
+            log_level="info",
+            access_log=True
+        )
+    else:
+        uvicorn.run(
+            app,
+            host="0.0.0.0",
+            port=server_port,
+            log_level="info",
+            access_log=True
+        )
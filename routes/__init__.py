@@ -1,7 +1,15 @@
 """
 MIRS Routes Package
-"""
 
-from .anesthesia import router as anesthesia_router, init_anesthesia_schema
+v3.6: 子模組不在此 eager import (routes.anesthesia 改為延遲載入)；
+保留舊的 `from routes import anesthesia_router` 相容寫法。
+"""
 
 __all__ = ['anesthesia_router', 'init_anesthesia_schema']
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import anesthesia
+        return getattr(anesthesia, "router" if name == "anesthesia_router" else name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,6 +8,10 @@ Provides aggregated statistics and analytics for:
 - Equipment utilization
 - Blood inventory (synced with Blood Bank PWA)
 
+v3.6: dashboard / daily / medication / equipment / oxygen endpoints read the
+daily rollup tables (services/analytics_rollup.py) maintained by triggers,
+so their cost no longer grows with months of anesthesia history.
+
 Version: 1.0
 Date: 2026-01-25
 Reference: DEV_SPEC_COMMERCIAL_APPLIANCE_v1.7 (P2-02)
@@ -22,6 +26,10 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+from services.db_pool import get_pool
+from services.query_ranges import add_day_range
+from services.analytics_rollup import rebuild_analytics_rollups, verify_analytics_rollups
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -32,10 +40,8 @@ DB_PATH = os.environ.get('MIRS_DB_PATH', 'medical_inventory.db')
 
 
 def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get read-only pooled database connection."""
+    return get_pool(DB_PATH).reader()
 
 
 # =============================================================================
@@ -112,21 +118,28 @@ async def get_dashboard_summary():
         week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
         month_ago = (now - timedelta(days=30)).strftime('%Y-%m-%d')
 
-        # Case counts
+        # Case counts (v3.6: 讀取每日彙總表，最多 31 天 x 狀態數列)
         cursor.execute("""
             SELECT
-                COUNT(CASE WHEN date(created_at) = ? THEN 1 END) as today,
-                COUNT(CASE WHEN date(created_at) >= ? THEN 1 END) as week,
-                COUNT(CASE WHEN date(created_at) >= ? THEN 1 END) as month,
-                COUNT(CASE WHEN status IN ('IN_PROGRESS', 'PACU') THEN 1 END) as active
-            FROM anesthesia_cases
-        """, (today, week_ago, month_ago))
+                COALESCE(SUM(CASE WHEN day = ? THEN case_count END), 0) as today,
+                COALESCE(SUM(CASE WHEN day >= ? THEN case_count END), 0) as week,
+                COALESCE(SUM(case_count), 0) as month
+            FROM rollup_case_daily
+            WHERE day >= ? AND day <= ?
+        """, (today, week_ago, month_ago, today))
         row = cursor.fetchone()
 
-        today_cases = row['today'] if row else 0
-        week_cases = row['week'] if row else 0
-        month_cases = row['month'] if row else 0
-        active_cases = row['active'] if row else 0
+        today_cases = int(row['today']) if row else 0
+        week_cases = int(row['week']) if row else 0
+        month_cases = int(row['month']) if row else 0
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(case_count), 0) as active
+            FROM rollup_case_daily
+            WHERE status IN ('IN_PROGRESS', 'PACU')
+        """)
+        row = cursor.fetchone()
+        active_cases = int(row['active']) if row else 0
 
         # Equipment summary
         equipment_summary = {}
@@ -212,14 +225,13 @@ async def get_case_summary(
 
     try:
         # Build date filter
-        date_filter = ""
+        date_clauses = []
         params = []
-        if start_date:
-            date_filter += " AND date(created_at) >= ?"
-            params.append(start_date)
-        if end_date:
-            date_filter += " AND date(created_at) <= ?"
-            params.append(end_date)
+        try:
+            add_day_range(date_clauses, params, "created_at", start_date, end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        date_filter = "".join(f" AND {clause}" for clause in date_clauses)
 
         # Total and by status
         cursor.execute(f"""
@@ -314,36 +326,33 @@ async def get_daily_stats(
     try:
         cursor.execute("""
             SELECT
-                date(created_at) as date,
-                COUNT(*) as case_count,
-                AVG(
-                    CASE WHEN anesthesia_end_at IS NOT NULL AND anesthesia_start_at IS NOT NULL
-                    THEN (julianday(anesthesia_end_at) - julianday(anesthesia_start_at)) * 24 * 60
-                    END
-                ) as avg_duration
-            FROM anesthesia_cases
-            WHERE created_at >= date('now', ?)
-            GROUP BY date(created_at)
-            ORDER BY date DESC
+                day as date,
+                SUM(case_count) as case_count,
+                SUM(anesthesia_min_sum) / NULLIF(SUM(anesthesia_min_n), 0) as avg_duration
+            FROM rollup_case_daily
+            WHERE day >= date('now', ?)
+            GROUP BY day
+            HAVING SUM(case_count) > 0
+            ORDER BY day DESC
         """, (f'-{days} days',))
 
-        results = []
-        for row in cursor.fetchall():
-            # Get medication count for this date
-            cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM anesthesia_events
-                WHERE event_type = 'MEDICATION_ADMIN'
-                  AND date(clinical_time) = ?
-            """, (row['date'],))
-            med_row = cursor.fetchone()
-            med_count = med_row['count'] if med_row else 0
+        case_rows = cursor.fetchall()
 
+        cursor.execute("""
+            SELECT day as date, SUM(administrations) as count
+            FROM rollup_medication_daily
+            WHERE day >= date('now', ?)
+            GROUP BY day
+        """, (f'-{days} days',))
+        med_counts = {r['date']: int(r['count']) for r in cursor.fetchall()}
+
+        results = []
+        for row in case_rows:
             results.append(DailyStats(
                 date=row['date'],
-                case_count=row['case_count'],
+                case_count=int(row['case_count']),
                 avg_duration_min=row['avg_duration'],
-                medication_count=med_count
+                medication_count=med_counts.get(row['date'], 0)
             ))
 
         return results
@@ -371,28 +380,27 @@ async def get_medication_usage(
     cursor = conn.cursor()
 
     try:
-        date_filter = ""
+        date_clauses = []
         params = []
-        if start_date:
-            date_filter += " AND date(clinical_time) >= ?"
-            params.append(start_date)
-        if end_date:
-            date_filter += " AND date(clinical_time) <= ?"
-            params.append(end_date)
+        try:
+            add_day_range(date_clauses, params, "day", start_date, end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        date_filter = "".join(f" AND {clause}" for clause in date_clauses)
 
         params.append(limit)
 
         cursor.execute(f"""
             SELECT
-                json_extract(payload, '$.drug_name') as drug_name,
-                COUNT(*) as administrations,
-                SUM(CAST(json_extract(payload, '$.dose') as REAL)) as total_dose,
-                json_extract(payload, '$.unit') as unit
-            FROM anesthesia_events
-            WHERE event_type = 'MEDICATION_ADMIN'
-              AND json_extract(payload, '$.drug_name') IS NOT NULL
+                drug_name,
+                SUM(administrations) as administrations,
+                CASE WHEN SUM(dose_count) > 0 THEN SUM(total_dose) END as total_dose,
+                unit
+            FROM rollup_medication_daily
+            WHERE drug_name != ''
               {date_filter}
             GROUP BY drug_name, unit
+            HAVING SUM(administrations) > 0
             ORDER BY administrations DESC
             LIMIT ?
         """, params)
@@ -400,9 +408,9 @@ async def get_medication_usage(
         return [
             MedicationUsage(
                 drug_name=r['drug_name'],
-                administrations=r['administrations'],
+                administrations=int(r['administrations']),
                 total_dose=r['total_dose'],
-                unit=r['unit']
+                unit=r['unit'] or None
             )
             for r in cursor.fetchall()
         ]
@@ -435,10 +443,10 @@ async def get_equipment_utilization():
                 eu.status,
                 eu.level_percent,
                 (
-                    SELECT COUNT(*)
-                    FROM anesthesia_events ae
-                    WHERE ae.event_type = 'RESOURCE_CLAIM'
-                      AND json_extract(ae.payload, '$.unit_id') = CAST(eu.id as TEXT)
+                    SELECT CAST(COALESCE(SUM(rr.event_count), 0) AS INTEGER)
+                    FROM rollup_resource_daily rr
+                    WHERE rr.unit_id = CAST(eu.id as TEXT)
+                      AND rr.event_type = 'RESOURCE_CLAIM'
                 ) as claim_count
             FROM equipment_units eu
             JOIN equipment e ON eu.equipment_id = e.id
@@ -497,15 +505,12 @@ async def get_oxygen_consumption(
                     WHEN eu.unit_serial LIKE 'E-%' THEN 'E-type'
                     ELSE 'Other'
                 END as cylinder_type,
-                COUNT(DISTINCT ae.id) as usage_events,
-                SUM(
-                    CAST(json_extract(ae.payload, '$.level_before') as REAL) -
-                    CAST(json_extract(ae.payload, '$.level_after') as REAL)
-                ) as level_drop_percent
-            FROM anesthesia_events ae
-            JOIN equipment_units eu ON CAST(eu.id as TEXT) = json_extract(ae.payload, '$.unit_id')
-            WHERE ae.event_type IN ('RESOURCE_CHECK', 'RESOURCE_RELEASE')
-              AND ae.clinical_time >= date('now', ?)
+                CAST(SUM(rr.event_count) AS INTEGER) as usage_events,
+                SUM(rr.level_drop_percent) as level_drop_percent
+            FROM rollup_resource_daily rr
+            JOIN equipment_units eu ON CAST(eu.id as TEXT) = rr.unit_id
+            WHERE rr.event_type IN ('RESOURCE_CHECK', 'RESOURCE_RELEASE')
+              AND rr.day >= date('now', ?)
             GROUP BY cylinder_type
         """, (f'-{days} days',))
 
@@ -531,6 +536,37 @@ async def get_oxygen_consumption(
         conn.close()
 
 
+# =============================================================================
+# Rollup Maintenance
+# =============================================================================
+
+@router.get("/rollups/verify")
+async def verify_rollups():
+    """重播 anesthesia_cases / anesthesia_events 比對每日彙總表，回報差異 (drift)"""
+    conn = get_db()
+    try:
+        return verify_analytics_rollups(conn)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=503, detail=f"Analytics rollups unavailable: {e}")
+    finally:
+        conn.close()
+
+
+@router.post("/rollups/rebuild")
+async def rebuild_rollups():
+    """回填: 由原始資料重建所有每日彙總表"""
+    conn = get_pool(DB_PATH).writer()
+    try:
+        rows = rebuild_analytics_rollups(conn)
+        return {"success": True, "rows": rows, "verify": verify_analytics_rollups(conn)}
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        logger.error(f"Analytics rollup rebuild failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+
 # =============================================================================
 # Health Check
 # =============================================================================
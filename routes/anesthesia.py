@@ -21,30 +21,23 @@ from enum import Enum
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel, Field
 
 import logging
 logger = logging.getLogger(__name__)
 
-# PDF Generation imports (lazy load to handle missing deps)
+# PDF Generation deps (v3.6: 只檢查是否安裝；實際 import 在 pdf_worker / demo 預覽內)
+import importlib.util
+
 # Jinja2 for HTML preview (works on Vercel)
-try:
-    from jinja2 import Environment, FileSystemLoader
-    JINJA2_ENABLED = True
-except ImportError:
-    JINJA2_ENABLED = False
+JINJA2_ENABLED = importlib.util.find_spec("jinja2") is not None
+if not JINJA2_ENABLED:
     logger.warning("HTML preview disabled: missing jinja2")
 
 # WeasyPrint + Matplotlib for PDF generation (requires system deps, NOT on Vercel)
-try:
-    from weasyprint import HTML as WeasyHTML
-    import matplotlib
-    matplotlib.use('Agg')  # Non-interactive backend
-    import matplotlib.pyplot as plt
-    PDF_ENABLED = True
-except ImportError:
-    PDF_ENABLED = False
+PDF_ENABLED = all(importlib.util.find_spec(name) is not None for name in ("weasyprint", "matplotlib"))
+if not PDF_ENABLED:
     logger.warning("PDF generation disabled: missing weasyprint or matplotlib")
 
 # v2.4: License-based PDF Watermark (P1-02)
@@ -59,6 +52,22 @@ except ImportError:
     apply_watermark_to_pdf = lambda buf, txt: buf
     logger.info("PDF watermark disabled: license service not available")
 
+# v2.6: PDF render worker pool + disk cache (non-blocking M0073)
+try:
+    from services.pdf_worker import get_pdf_service, compute_fingerprint, generate_vitals_chart
+    PDF_WORKER_ENABLED = True
+except ImportError:
+    PDF_WORKER_ENABLED = False
+    logger.info("PDF worker pool disabled: pdf_worker service not available")
+
+# v2.6: Incremental per-case projection (timeline / summary / I/O / PDF)
+from services.anesthesia_projection import (
+    get_projection_store, project_inserted_event, TIMELINE_GROUPS
+)
+
+# v3.6: Daily analytics rollups (trigger-maintained)
+from services.analytics_rollup import ensure_analytics_rollup_schema
+
 # v2.5: HLC (Hybrid Logical Clock) for distributed event ordering (P2-01)
 try:
     from services.hlc import HybridLogicalClock, hlc_now, get_hlc
@@ -1152,6 +1161,9 @@ def init_anesthesia_schema(cursor):
         ON anesthesia_cases(status, created_at DESC)
     """)
 
+    # v3.6: 分析儀表板每日彙總表 (由 trigger 與事件同交易更新)
+    ensure_analytics_rollup_schema(cursor)
+
     # Add O2 claim columns to equipment_units if not exist
     try:
         cursor.execute("ALTER TABLE equipment_units ADD COLUMN claimed_by_case_id TEXT")
@@ -1535,6 +1547,15 @@ def generate_event_id() -> str:
         return str(uuid.uuid4())
 
 
+def generate_event_ids(n: int) -> List[str]:
+    """n event IDs from one reserved UUIDv7 block (bulk paths: one lock + time check)"""
+    try:
+        from services.id_service import generate_event_ids as _generate_event_ids
+        return _generate_event_ids(n)
+    except ImportError:
+        return [str(uuid.uuid4()) for _ in range(n)]
+
+
 def generate_preop_id() -> str:
     """Generate unique preop ID"""
     return f"PREOP-{uuid.uuid4().hex[:8].upper()}"
@@ -1629,6 +1650,17 @@ def _record_to_events_table(
             0,  # Not acknowledged yet
         ))
 
+        if cursor.rowcount:
+            from services.event_bus import publish_event
+            publish_event(cursor, {
+                'event_id': event_id,
+                'entity_type': 'anesthesia_case',
+                'entity_id': case_id,
+                'event_type': event_type,
+                'ts_device': ts_device,
+                'payload': payload,
+            })
+
     except ImportError:
         # Services not available - skip dual-write (graceful degradation)
         logger.debug(f"Dual-write skipped: id_service or hlc not available")
@@ -1711,12 +1743,12 @@ async def create_case(request: CreateCaseRequest, actor_id: str = Query(...)):
         # v1.1: Notify CIRS to claim registration as ANESTHESIA (non-blocking)
         if request.cirs_registration_ref:
             try:
-                async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-                    await client.post(
-                        f"{CIRS_HUB_URL}/api/registrations/{request.cirs_registration_ref}/role-claim",
-                        json={"role": "ANESTHESIA", "actor_id": actor_id}
-                    )
-                    logger.info(f"CIRS registration {request.cirs_registration_ref} claimed as ANESTHESIA")
+                await get_hub_client().post(
+                    f"{CIRS_HUB_URL}/api/registrations/{request.cirs_registration_ref}/role-claim",
+                    json={"role": "ANESTHESIA", "actor_id": actor_id}
+                )
+                get_hub_client().cache.invalidate("waiting-anesthesia")
+                logger.info(f"CIRS registration {request.cirs_registration_ref} claimed as ANESTHESIA")
             except Exception as e:
                 logger.warning(f"Failed to notify CIRS of anesthesia claim: {e}")
 
@@ -2011,6 +2043,7 @@ async def add_event(case_id: str, request: AddEventRequest, actor_id: str = Quer
             request.corrects_event_id,
             request.correction_reason
         ))
+        project_inserted_event(cursor, case_id)
 
         # Handle milestone events that update case timestamps
         if request.event_type == EventType.MILESTONE:
@@ -2135,8 +2168,16 @@ async def get_events(
 
 
 @router.get("/cases/{case_id}/timeline")
-async def get_timeline(case_id: str):
-    """Get reconstructed timeline (grouped by type)"""
+async def get_timeline(
+    case_id: str,
+    since_version: Optional[int] = Query(None, description="Only events newer than this projection version")
+):
+    """Get reconstructed timeline (grouped by type)
+
+    v2.6: Served from the incremental case projection. Response includes
+    `version`; pass it back as ?since_version= to receive only new events
+    (`full: false`). `full: true` means the client must replace its copy.
+    """
     # v1.5.3: Vercel demo mode - return demo timeline
     if IS_VERCEL and case_id.startswith("ANES-DEMO"):
         # Get case start time from demo cases
@@ -2232,34 +2273,16 @@ async def get_timeline(case_id: str):
         }
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT * FROM anesthesia_events
-        WHERE case_id = ? AND is_correction = 0
-        ORDER BY clinical_time ASC
-    """, (case_id,))
-
-    events = [dict(row) for row in cursor.fetchall()]
-
-    # Parse payloads
-    for event in events:
-        event['payload'] = json.loads(event['payload']) if event['payload'] else {}
+    try:
+        projection = get_projection_store().get(conn.cursor(), case_id)
+    finally:
+        conn.close()
 
-    # Group by type (v1.6.1: 擴充分組以支援新事件類型)
-    timeline = {
-        'vitals': [e for e in events if e['event_type'] == 'VITAL_SIGN'],
-        'medications': [e for e in events if e['event_type'] == 'MEDICATION_ADMIN'],
-        'vasoactive': [e for e in events if e['event_type'] in ('VASOACTIVE_BOLUS', 'VASOACTIVE_INFUSION')],
-        'fluids': [e for e in events if e['event_type'] in ('FLUID_IN', 'FLUID_OUT', 'FLUID_BOLUS', 'BLOOD_PRODUCT')],
-        'airway': [e for e in events if e['event_type'] in ('AIRWAY_EVENT', 'VENT_SETTING_CHANGE')],
-        'anesthesia_depth': [e for e in events if e['event_type'] == 'ANESTHESIA_DEPTH_ADJUST'],
-        'milestones': [e for e in events if e['event_type'] == 'MILESTONE'],
-        'labs': [e for e in events if e['event_type'] == 'LAB_RESULT_POINT'],
-        'positioning': [e for e in events if e['event_type'] == 'POSITION_CHANGE'],
-        'notes': [e for e in events if e['event_type'] in ('NOTE', 'PROCEDURE_NOTE')],
-        'all': events
-    }
+    # Group by type (v1.6.1 分組, 見 TIMELINE_GROUPS) - one pass over the projection
+    full = projection.is_full(since_version)
+    timeline = projection.grouped(since_version=None if full else since_version)
+    timeline['version'] = projection.version
+    timeline['full'] = full
 
     return timeline
 
@@ -2617,21 +2640,31 @@ async def claim_oxygen_cylinder(case_id: str, request: ClaimOxygenRequest, actor
         try:
             event_id = generate_event_id()
             ts_device = int(time.time() * 1000)
+            claim_payload = {
+                "case_id": case_id,
+                "unit_serial": unit['unit_serial'],
+                "cylinder_type": cylinder_type,
+                "initial_level_percent": initial_level,
+                "initial_psi": request.initial_pressure_psi,
+                "capacity_liters": capacity,
+                "flow_rate_lpm": flow_rate
+            }
             cursor.execute("""
                 INSERT INTO events (id, event_id, entity_type, entity_id, event_type, ts_device, actor_id, payload)
                 VALUES (?, ?, 'equipment_unit', ?, 'OXYGEN_CLAIMED', ?, ?, ?)
             """, (
                 event_id, event_id, str(request.cylinder_unit_id), ts_device, actor_id,
-                json.dumps({
-                    "case_id": case_id,
-                    "unit_serial": unit['unit_serial'],
-                    "cylinder_type": cylinder_type,
-                    "initial_level_percent": initial_level,
-                    "initial_psi": request.initial_pressure_psi,
-                    "capacity_liters": capacity,
-                    "flow_rate_lpm": flow_rate
-                })
+                json.dumps(claim_payload)
             ))
+            from services.event_bus import publish_event
+            publish_event(cursor, {
+                'event_id': event_id,
+                'entity_type': 'equipment_unit',
+                'entity_id': str(request.cylinder_unit_id),
+                'event_type': 'OXYGEN_CLAIMED',
+                'ts_device': ts_device,
+                'payload': claim_payload,
+            })
         except Exception as e:
             logger.warning(f"Could not write to events table: {e}")
 
@@ -3256,12 +3289,11 @@ async def close_case(case_id: str, actor_id: str = Query(...)):
         # v1.1: Notify CIRS that anesthesia is done (non-blocking)
         if case['cirs_registration_ref']:
             try:
-                async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-                    await client.post(
-                        f"{CIRS_HUB_URL}/api/registrations/{case['cirs_registration_ref']}/anesthesia-done",
-                        json={"actor_id": actor_id}
-                    )
-                    logger.info(f"CIRS registration {case['cirs_registration_ref']} marked anesthesia done")
+                await get_hub_client().post(
+                    f"{CIRS_HUB_URL}/api/registrations/{case['cirs_registration_ref']}/anesthesia-done",
+                    json={"actor_id": actor_id}
+                )
+                logger.info(f"CIRS registration {case['cirs_registration_ref']} marked anesthesia done")
             except Exception as e:
                 logger.warning(f"Failed to notify CIRS of anesthesia completion: {e}")
 
@@ -3334,6 +3366,7 @@ async def quick_drug_admin(
                 id, case_id, event_type, clinical_time, payload, actor_id
             ) VALUES (?, ?, 'MEDICATION_ADMIN', datetime('now'), ?, ?)
         """, (event_id, case_id, json.dumps(payload), actor_id))
+        project_inserted_event(cursor, case_id)
 
         # v3.5: Dual-write to events table for Lifeboat (medication events are critical)
         _record_to_events_table(cursor, event_id, case_id, 'MEDICATION_ADMIN', payload, actor_id)
@@ -3412,6 +3445,7 @@ async def quick_vitals(
                 id, case_id, event_type, clinical_time, payload, actor_id
             ) VALUES (?, ?, 'VITAL_SIGN', datetime('now'), ?, ?)
         """, (event_id, case_id, json.dumps(vitals), actor_id))
+        project_inserted_event(cursor, case_id)
 
         conn.commit()
 
@@ -3466,6 +3500,9 @@ async def sync_batch(request: SyncBatchRequest):
     cursor = conn.cursor()
 
     results = []
+    # v3.6: 首個事件項目時整批預留事件 ID (一次鎖 + 一次時間檢查)，未用到的 ID 直接丟棄
+    #       於逐筆 try 內預留: 系統時間無效 (TimeValidityError) 只讓事件項目失敗
+    event_ids = None
 
     for item in request.items:
         try:
@@ -3515,7 +3552,9 @@ async def sync_batch(request: SyncBatchRequest):
                 if endpoint.startswith("/cases/") and "/events" in endpoint:
                     # Event creation
                     case_id = endpoint.split("/")[2]
-                    event_id = generate_event_id()
+                    if event_ids is None:
+                        event_ids = iter(generate_event_ids(len(request.items)))
+                    event_id = next(event_ids)
                     cursor.execute("""
                         INSERT INTO anesthesia_events (
                             id, case_id, event_type, clinical_time, payload,
@@ -3572,6 +3611,7 @@ async def sync_batch(request: SyncBatchRequest):
             })
 
     conn.commit()
+    conn.close()
 
     return {
         "processed": len(results),
@@ -4233,6 +4273,8 @@ async def check_can_close_case(case_id: str):
 import httpx
 from fastapi.responses import JSONResponse
 
+from services.cirs_client import HubResponseError, get_hub_client, hub_revision_of
+
 # CIRS Hub configuration
 CIRS_HUB_URL = os.getenv("CIRS_HUB_URL", "http://localhost:8090")
 CIRS_TIMEOUT = 5.0  # seconds
@@ -4317,6 +4359,16 @@ def make_xirs_response(data: dict, hub_revision: int = 0) -> JSONResponse:
     return JSONResponse(content=data, headers=headers)
 
 
+def _hub_cache_meta(entry, from_cache: bool) -> dict:
+    """online/source fields for a (possibly cached) Hub response."""
+    return {
+        "online": get_hub_client().is_available,
+        "source": "cache" if from_cache else "cirs_hub",
+        "cached": from_cache,
+        "cache_age_seconds": round(entry.age(), 1),
+    }
+
+
 @router.get("/proxy/cirs/waiting-list")
 async def get_cirs_waiting_list(
     status: Optional[str] = "waiting",
@@ -4327,66 +4379,68 @@ async def get_cirs_waiting_list(
     Returns patients waiting for procedures (for case creation).
 
     Gracefully handles offline scenarios by returning empty list with offline flag.
+    The last good Hub response is served instantly (source=cache) and
+    refreshed in the background; an unreachable Hub fails fast via the
+    shared client's circuit breaker.
 
     Response Headers:
     - X-XIRS-Protocol-Version: Contract version (1.0)
     - X-XIRS-Hub-Revision: Latest Hub revision number
     - X-XIRS-Station-Id: This satellite's station ID
     """
-    hub_revision = 0
+    hub = get_hub_client()
+
+    async def fetch():
+        # Use the waiting list endpoint (no auth required for Doctor PWA compatibility)
+        response = await hub.get(f"{CIRS_HUB_URL}/api/registrations/waiting/list")
+        # Extract hub revision from response headers if available
+        hub_revision = hub_revision_of(response)
+        if response.status_code != 200:
+            raise HubResponseError(response.status_code, hub_revision)
+
+        data = response.json()
+        # Transform CIRS data to MIRS format
+        # CIRS waiting list format: reg_id, patient_ref, display_name, triage, priority, etc.
+        patients = []
+        for reg in data.get("registrations", data if isinstance(data, list) else []):
+            patients.append({
+                "registration_id": reg.get("reg_id") or reg.get("id") or reg.get("registration_id"),
+                "patient_id": reg.get("patient_id") or reg.get("person_id"),
+                "patient_ref": reg.get("patient_ref"),  # Masked patient reference
+                "name": reg.get("display_name") or reg.get("patient_name") or reg.get("name"),
+                "age_group": reg.get("age_group"),
+                "dob": reg.get("dob"),
+                "sex": reg.get("gender") or reg.get("sex"),
+                "allergies": reg.get("allergies", []),
+                "weight_kg": reg.get("weight_kg"),
+                "blood_type": reg.get("blood_type"),
+                "triage_category": reg.get("triage") or reg.get("triage_category"),
+                "priority": reg.get("priority"),
+                "chief_complaint": reg.get("chief_complaint"),
+                "status": reg.get("status"),
+                "registered_at": reg.get("registered_at") or reg.get("created_at")
+            })
+        return patients, hub_revision
 
     try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            # Use the waiting list endpoint (no auth required for Doctor PWA compatibility)
-            response = await client.get(
-                f"{CIRS_HUB_URL}/api/registrations/waiting/list"
-            )
-
-            # Extract hub revision from response headers if available
-            hub_revision = int(response.headers.get("X-XIRS-Hub-Revision", 0))
-
-            if response.status_code == 200:
-                data = response.json()
-                # Transform CIRS data to MIRS format
-                # CIRS waiting list format: reg_id, patient_ref, display_name, triage, priority, etc.
-                patients = []
-                for reg in data.get("registrations", data if isinstance(data, list) else []):
-                    patients.append({
-                        "registration_id": reg.get("reg_id") or reg.get("id") or reg.get("registration_id"),
-                        "patient_id": reg.get("patient_id") or reg.get("person_id"),
-                        "patient_ref": reg.get("patient_ref"),  # Masked patient reference
-                        "name": reg.get("display_name") or reg.get("patient_name") or reg.get("name"),
-                        "age_group": reg.get("age_group"),
-                        "dob": reg.get("dob"),
-                        "sex": reg.get("gender") or reg.get("sex"),
-                        "allergies": reg.get("allergies", []),
-                        "weight_kg": reg.get("weight_kg"),
-                        "blood_type": reg.get("blood_type"),
-                        "triage_category": reg.get("triage") or reg.get("triage_category"),
-                        "priority": reg.get("priority"),
-                        "chief_complaint": reg.get("chief_complaint"),
-                        "status": reg.get("status"),
-                        "registered_at": reg.get("registered_at") or reg.get("created_at")
-                    })
-
-                return make_xirs_response({
-                    "online": True,
-                    "source": "cirs_hub",
-                    "patients": patients,
-                    "count": len(patients),
-                    "protocol_version": XIRS_PROTOCOL_VERSION
-                }, hub_revision)
-            else:
-                logger.warning(f"CIRS Hub returned {response.status_code}")
-                return make_xirs_response({
-                    "online": False,
-                    "source": "offline",
-                    "patients": [],
-                    "count": 0,
-                    "error": f"CIRS returned status {response.status_code}",
-                    "protocol_version": XIRS_PROTOCOL_VERSION
-                }, hub_revision)
+        entry, from_cache = await hub.cache.get("waiting-list", fetch)
+        return make_xirs_response({
+            **_hub_cache_meta(entry, from_cache),
+            "patients": entry.value,
+            "count": len(entry.value),
+            "protocol_version": XIRS_PROTOCOL_VERSION
+        }, entry.hub_revision)
 
+    except HubResponseError as e:
+        logger.warning(f"CIRS Hub returned {e.status_code}")
+        return make_xirs_response({
+            "online": False,
+            "source": "offline",
+            "patients": [],
+            "count": 0,
+            "error": str(e),
+            "protocol_version": XIRS_PROTOCOL_VERSION
+        }, e.hub_revision)
     except httpx.TimeoutException:
         logger.warning("CIRS Hub timeout - operating in offline mode")
         return make_xirs_response({
@@ -4432,8 +4486,6 @@ async def get_cirs_waiting_anesthesia():
 
     v1.5.2: 在 Vercel demo 模式下返回模擬資料供測試。
     """
-    hub_revision = 0
-
     # v1.5.2: Vercel demo mode - return simulated patients
     if IS_VERCEL:
         return make_xirs_response({
@@ -4447,58 +4499,59 @@ async def get_cirs_waiting_anesthesia():
             "protocol_version": XIRS_PROTOCOL_VERSION
         })
 
-    try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            # v1.1: 使用新的 waiting/anesthesia 端點
-            response = await client.get(
-                f"{CIRS_HUB_URL}/api/registrations/waiting/anesthesia"
-            )
-
-            hub_revision = int(response.headers.get("X-XIRS-Hub-Revision", 0))
-
-            if response.status_code == 200:
-                data = response.json()
-                # Transform CIRS data to MIRS format
-                patients = []
-                for reg in data.get("items", []):
-                    patients.append({
-                        "registration_id": reg.get("reg_id"),
-                        "patient_id": reg.get("person_id"),
-                        "patient_ref": reg.get("patient_ref"),
-                        "name": reg.get("display_name"),
-                        "age_group": reg.get("age_group"),
-                        "sex": reg.get("gender"),
-                        "triage_category": reg.get("triage"),
-                        "priority": reg.get("priority"),
-                        "chief_complaint": reg.get("chief_complaint"),
-                        "anesthesia_notes": reg.get("anesthesia_notes"),
-                        "consultation_by": reg.get("consultation_by"),
-                        "consultation_completed_at": reg.get("consultation_completed_at"),
-                        "waiting_minutes": reg.get("waiting_minutes"),
-                        "claimed_by": reg.get("anesthesia_claimed_by"),
-                        "claimed_at": reg.get("anesthesia_claimed_at")
-                    })
+    hub = get_hub_client()
+
+    async def fetch():
+        # v1.1: 使用新的 waiting/anesthesia 端點
+        response = await hub.get(f"{CIRS_HUB_URL}/api/registrations/waiting/anesthesia")
+        hub_revision = hub_revision_of(response)
+        if response.status_code != 200:
+            raise HubResponseError(response.status_code, hub_revision)
+
+        data = response.json()
+        # Transform CIRS data to MIRS format
+        patients = []
+        for reg in data.get("items", []):
+            patients.append({
+                "registration_id": reg.get("reg_id"),
+                "patient_id": reg.get("person_id"),
+                "patient_ref": reg.get("patient_ref"),
+                "name": reg.get("display_name"),
+                "age_group": reg.get("age_group"),
+                "sex": reg.get("gender"),
+                "triage_category": reg.get("triage"),
+                "priority": reg.get("priority"),
+                "chief_complaint": reg.get("chief_complaint"),
+                "anesthesia_notes": reg.get("anesthesia_notes"),
+                "consultation_by": reg.get("consultation_by"),
+                "consultation_completed_at": reg.get("consultation_completed_at"),
+                "waiting_minutes": reg.get("waiting_minutes"),
+                "claimed_by": reg.get("anesthesia_claimed_by"),
+                "claimed_at": reg.get("anesthesia_claimed_at")
+            })
+        return patients, hub_revision
 
-                return make_xirs_response({
-                    "online": True,
-                    "source": "cirs_hub",
-                    "queue": "ANESTHESIA",
-                    "patients": patients,
-                    "count": len(patients),
-                    "protocol_version": XIRS_PROTOCOL_VERSION
-                }, hub_revision)
-            else:
-                logger.warning(f"CIRS Hub waiting/anesthesia returned {response.status_code}")
-                return make_xirs_response({
-                    "online": False,
-                    "source": "offline",
-                    "queue": "ANESTHESIA",
-                    "patients": [],
-                    "count": 0,
-                    "error": f"CIRS returned status {response.status_code}",
-                    "protocol_version": XIRS_PROTOCOL_VERSION
-                }, hub_revision)
+    try:
+        entry, from_cache = await hub.cache.get("waiting-anesthesia", fetch)
+        return make_xirs_response({
+            **_hub_cache_meta(entry, from_cache),
+            "queue": "ANESTHESIA",
+            "patients": entry.value,
+            "count": len(entry.value),
+            "protocol_version": XIRS_PROTOCOL_VERSION
+        }, entry.hub_revision)
 
+    except HubResponseError as e:
+        logger.warning(f"CIRS Hub waiting/anesthesia returned {e.status_code}")
+        return make_xirs_response({
+            "online": False,
+            "source": "offline",
+            "queue": "ANESTHESIA",
+            "patients": [],
+            "count": 0,
+            "error": str(e),
+            "protocol_version": XIRS_PROTOCOL_VERSION
+        }, e.hub_revision)
     except httpx.TimeoutException:
         logger.warning("CIRS Hub timeout for waiting/anesthesia")
         return make_xirs_response({
@@ -4545,47 +4598,47 @@ async def get_cirs_patient_details(registration_id: str):
     - X-XIRS-Hub-Revision: Latest Hub revision number
     - X-XIRS-Station-Id: This satellite's station ID
     """
-    hub_revision = 0
+    hub = get_hub_client()
 
-    try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            response = await client.get(
-                f"{CIRS_HUB_URL}/api/registrations/{registration_id}"
-            )
+    async def fetch():
+        response = await hub.get(f"{CIRS_HUB_URL}/api/registrations/{registration_id}")
+        # Extract hub revision from response headers if available
+        hub_revision = hub_revision_of(response)
+        if response.status_code != 200:
+            raise HubResponseError(response.status_code, hub_revision)
 
-            # Extract hub revision from response headers if available
-            hub_revision = int(response.headers.get("X-XIRS-Hub-Revision", 0))
-
-            if response.status_code == 200:
-                reg = response.json()
-                return make_xirs_response({
-                    "online": True,
-                    "source": "cirs_hub",
-                    "patient": {
-                        "registration_id": reg.get("id") or reg.get("registration_id"),
-                        "patient_id": reg.get("patient_id"),
-                        "name": reg.get("patient_name") or reg.get("name"),
-                        "dob": reg.get("dob"),
-                        "sex": reg.get("sex"),
-                        "allergies": reg.get("allergies", []),
-                        "weight_kg": reg.get("weight_kg"),
-                        "blood_type": reg.get("blood_type"),
-                        "triage_category": reg.get("triage_category"),
-                        "chief_complaint": reg.get("chief_complaint"),
-                        "medical_history": reg.get("medical_history"),
-                        "current_medications": reg.get("current_medications"),
-                        "status": reg.get("status")
-                    },
-                    "protocol_version": XIRS_PROTOCOL_VERSION
-                }, hub_revision)
-            elif response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Registration not found in CIRS")
-            else:
-                raise HTTPException(
-                    status_code=502,
-                    detail=f"CIRS Hub error: {response.status_code}"
-                )
+        reg = response.json()
+        return {
+            "registration_id": reg.get("id") or reg.get("registration_id"),
+            "patient_id": reg.get("patient_id"),
+            "name": reg.get("patient_name") or reg.get("name"),
+            "dob": reg.get("dob"),
+            "sex": reg.get("sex"),
+            "allergies": reg.get("allergies", []),
+            "weight_kg": reg.get("weight_kg"),
+            "blood_type": reg.get("blood_type"),
+            "triage_category": reg.get("triage_category"),
+            "chief_complaint": reg.get("chief_complaint"),
+            "medical_history": reg.get("medical_history"),
+            "current_medications": reg.get("current_medications"),
+            "status": reg.get("status")
+        }, hub_revision
+
+    try:
+        entry, from_cache = await hub.cache.get(f"patient:{registration_id}", fetch)
+        return make_xirs_response({
+            **_hub_cache_meta(entry, from_cache),
+            "patient": entry.value,
+            "protocol_version": XIRS_PROTOCOL_VERSION
+        }, entry.hub_revision)
 
+    except HubResponseError as e:
+        if e.status_code == 404:
+            raise HTTPException(status_code=404, detail="Registration not found in CIRS")
+        raise HTTPException(
+            status_code=502,
+            detail=f"CIRS Hub error: {e.status_code}"
+        )
     except HTTPException:
         raise
     except httpx.TimeoutException:
@@ -4611,12 +4664,12 @@ async def get_hub_status():
     hub_revision = 0
     hub_error = None
 
+    hub = get_hub_client()
     try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            response = await client.get(f"{CIRS_HUB_URL}/api/health")
-            if response.status_code == 200:
-                hub_online = True
-                hub_revision = int(response.headers.get("X-XIRS-Hub-Revision", 0))
+        response = await hub.get(f"{CIRS_HUB_URL}/api/health")
+        if response.status_code == 200:
+            hub_online = True
+            hub_revision = hub_revision_of(response)
     except Exception as e:
         hub_error = str(e)
 
@@ -4627,6 +4680,7 @@ async def get_hub_status():
         "hub_online": hub_online,
         "hub_revision": hub_revision,
         "hub_error": hub_error,
+        "hub_client": hub.stats(),
         "last_sync": None,  # TODO: Track last sync time
         "pending_ops": 0,   # TODO: Count pending operations
     }, hub_revision)
@@ -5394,28 +5448,12 @@ async def get_enhanced_timeline(
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Get all events
-    query = """
-        SELECT * FROM anesthesia_events
-        WHERE case_id = ? AND is_correction = 0
-    """
-    params = [case_id]
-
-    if filter_type:
-        query += " AND event_type = ?"
-        params.append(filter_type)
-
-    query += " ORDER BY clinical_time ASC"
-    cursor.execute(query, params)
-
-    all_events = []
-    for row in cursor.fetchall():
-        event = dict(row)
-        event['payload'] = json.loads(event['payload']) if event['payload'] else {}
-        all_events.append(event)
+    # Get all events (v2.6: from the case projection)
+    projection = get_projection_store().get(cursor, case_id)
+    all_events = projection.events(event_types=[filter_type] if filter_type else None)
 
     if not include_pio_groups:
-        return {"timeline": all_events, "count": len(all_events)}
+        return {"timeline": all_events, "count": len(all_events), "version": projection.version}
 
     # Get PIO problems
     cursor.execute("""
@@ -5539,6 +5577,7 @@ async def get_enhanced_timeline(
 
     return {
         "case_id": case_id,
+        "version": projection.version,
         "timeline": timeline_items,
         "total_events": len(all_events),
         "pio_groups": len(pio_groups),
@@ -5686,14 +5725,9 @@ async def get_case_summary(case_id: str):
 
     case_info = dict(case)
 
-    # Event statistics
-    cursor.execute("""
-        SELECT event_type, COUNT(*) as count
-        FROM anesthesia_events
-        WHERE case_id = ? AND is_correction = 0
-        GROUP BY event_type
-    """, (case_id,))
-    event_stats = {row['event_type']: row['count'] for row in cursor.fetchall()}
+    # Event statistics (v2.6: from the case projection)
+    projection = get_projection_store().get(cursor, case_id)
+    event_stats = projection.counts_by_type()
 
     # Total events
     total_events = sum(event_stats.values())
@@ -5713,12 +5747,7 @@ async def get_case_summary(case_id: str):
     intervention_count = cursor.fetchone()['count']
 
     # Late entries
-    cursor.execute("""
-        SELECT COUNT(*) as count
-        FROM anesthesia_events
-        WHERE case_id = ? AND payload LIKE '%_late_entry%'
-    """, (case_id,))
-    late_entry_count = cursor.fetchone()['count']
+    late_entry_count = projection.late_entry_count()
 
     # Duration calculation
     duration_minutes = None
@@ -5732,6 +5761,7 @@ async def get_case_summary(case_id: str):
 
     return {
         "case_id": case_id,
+        "version": projection.version,
         "status": case_info['status'],
         "patient_name": case_info.get('patient_name'),
         "context_mode": case_info.get('context_mode'),
@@ -8562,14 +8592,11 @@ async def get_io_balance(case_id: str):
     try:
         cursor = conn.cursor()
 
-        # 取得所有相關事件
-        cursor.execute("""
-            SELECT event_type, payload FROM anesthesia_events
-            WHERE case_id = ? AND event_type IN ('IV_FLUID_GIVEN', 'FLUID_IN', 'FLUID_BOLUS', 'BLOOD_PRODUCT', 'FLUID_OUT', 'URINE_OUTPUT')
-            ORDER BY clinical_time
-        """, (case_id,))
-
-        events = cursor.fetchall()
+        # 取得所有相關事件 (v2.6: from the case projection, payloads already parsed)
+        events = get_projection_store().get(cursor, case_id).events(
+            include_corrections=True,
+            event_types=('IV_FLUID_GIVEN', 'FLUID_IN', 'FLUID_BOLUS', 'BLOOD_PRODUCT', 'FLUID_OUT', 'URINE_OUTPUT')
+        )
 
         # 分類計算
         input_crystalloid = 0
@@ -8583,7 +8610,7 @@ async def get_io_balance(case_id: str):
         blood_types = ['PRBC', 'pRBC', 'FFP', 'PLATELET', 'CRYOPRECIPITATE', 'WHOLE BLOOD']
 
         for event in events:
-            payload = json.loads(event["payload"]) if event["payload"] else {}
+            payload = event["payload"]
             event_type = event["event_type"]
 
             if event_type in ('IV_FLUID_GIVEN', 'FLUID_IN', 'FLUID_BOLUS'):
@@ -8649,91 +8676,12 @@ def _generate_vitals_chart(vitals: List[Dict], page_start: int, page_end: int) -
     Generate Matplotlib chart for BP/HR trends.
     Returns base64-encoded PNG image.
 
-    Chart is designed to align with vitals table below:
-    - Table has fixed 28px row-header + equal-width data columns
-    - Chart uses same structure: Y-axis area + data area
-    - Data points centered in each column
-    - No X-axis labels (table shows time below)
+    v2.6: Rendering lives in services.pdf_worker so it can run in the
+    PDF worker processes; this wrapper keeps the page-slice signature.
     """
-    if not PDF_ENABLED:
+    if not PDF_ENABLED or not PDF_WORKER_ENABLED:
         return ""
-
-    page_vitals = vitals[page_start:page_end]
-    if not page_vitals:
-        return ""
-
-    n_cols = len(page_vitals)
-
-    # Extract data - X position at column center (0.5, 1.5, 2.5, ...)
-    x_positions = []
-    sbp_values = []
-    dbp_values = []
-    hr_values = []
-
-    for i, v in enumerate(page_vitals):
-        x_positions.append(i + 0.5)  # Center of each column
-        sbp_values.append(v.get('sbp') or None)
-        dbp_values.append(v.get('dbp') or None)
-        hr_values.append(v.get('hr') or None)
-
-    # Create figure - wide aspect ratio to match table width
-    fig_width = 12  # Wide figure for better resolution
-    fig_height = 1.8
-    fig, ax = plt.subplots(figsize=(fig_width, fig_height), dpi=150)
-
-    # Set X-axis to match table columns (0 to n_cols)
-    ax.set_xlim(0, n_cols)
-    ax.set_ylim(0, 200)
-
-    # Plot BP (red/blue) and HR (green) with data points at column centers
-    if any(v is not None for v in sbp_values):
-        ax.plot(x_positions, sbp_values, 'r-', marker='o', markersize=4, linewidth=1.2, label='SBP')
-    if any(v is not None for v in dbp_values):
-        ax.plot(x_positions, dbp_values, 'b-', marker='o', markersize=4, linewidth=1.2, label='DBP')
-    if any(v is not None for v in hr_values):
-        ax.plot(x_positions, hr_values, 'g--', marker='s', markersize=4, linewidth=1.2, label='HR')
-
-    # Vertical grid lines at column boundaries for alignment reference
-    for i in range(n_cols + 1):
-        ax.axvline(x=i, color='#e0e0e0', linestyle='-', linewidth=0.3)
-
-    # Horizontal grid lines at Y values
-    for y in [50, 100, 150]:
-        ax.axhline(y=y, color='#e0e0e0', linestyle='-', linewidth=0.3)
-    ax.axhline(y=100, color='#ccc', linestyle='--', linewidth=0.5)  # 100 reference line
-
-    # Remove X-axis completely (table shows time)
-    ax.set_xticks([])
-    ax.set_xticklabels([])
-    ax.tick_params(axis='x', length=0)
-
-    # Y-axis: show ticks inside the plot area
-    ax.set_yticks([50, 100, 150, 200])
-    ax.tick_params(axis='y', labelsize=8, direction='in', pad=-22)
-    ax.yaxis.set_tick_params(labelleft=True)
-
-    # Remove Y-axis label (external label in HTML)
-    ax.set_ylabel('')
-
-    # Remove spines for cleaner look
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_linewidth(0.5)
-    ax.spines['left'].set_linewidth(0.5)
-
-    # Legend inside the plot area, upper right
-    ax.legend(fontsize=8, loc='upper right', framealpha=0.9, edgecolor='none')
-
-    # Zero margins - Y-axis label is external (in HTML wrapper)
-    # This makes the chart data area align with table data columns
-    plt.subplots_adjust(left=0.001, right=0.999, top=0.95, bottom=0.02)
-
-    # Convert to base64 PNG
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, facecolor='#fafafa', edgecolor='none')
-    plt.close(fig)
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode('utf-8')
+    return generate_vitals_chart(vitals[page_start:page_end])
 
 
 def _rebuild_state_from_events(events: List[Dict]) -> Dict:
@@ -8926,6 +8874,165 @@ def _rebuild_state_from_events(events: List[Dict]) -> Dict:
     return state
 
 
+def _load_pdf_context(case_id: str, hospital_name: str, hospital_address: str):
+    """
+    Load case + events and build the M0073 template context (DB work only).
+
+    Charts, Jinja2 and WeasyPrint run in the PDF worker pool.
+
+    Returns:
+        (context, fingerprint)
+    """
+    conn = get_db_connection()
+    watermark_text = get_watermark_text()
+    try:
+        cursor = conn.cursor()
+
+        # 1. Get case info
+        cursor.execute("""
+            SELECT * FROM anesthesia_cases WHERE id = ?
+        """, (case_id,))
+        case = cursor.fetchone()
+        if not case:
+            raise HTTPException(status_code=404, detail="Case not found")
+        case_dict = dict(case)
+
+        # 2-3. Events (chronological) -> state; cached per projection version
+        projection = get_projection_store().get(cursor, case_id)
+        state = projection.derived("pdf_state", lambda p: _rebuild_state_from_events(p.raw_events()))
+
+        # 4. Get IV lines from projection table (for additional details)
+        cursor.execute("""
+            SELECT * FROM anesthesia_iv_lines WHERE case_id = ? ORDER BY line_number
+        """, (case_id,))
+        iv_lines = [dict(row) for row in cursor.fetchall()]
+        if iv_lines:
+            state["iv_lines"] = [{
+                "line_number": iv.get("line_number", i+1),
+                "site": iv.get("site"),
+                "gauge": iv.get("gauge"),
+                "catheter_type": iv.get("catheter_type", "PERIPHERAL")
+            } for i, iv in enumerate(iv_lines)]
+
+        # 5. Paginate vitals (24 per page)
+        vitals = state["vitals"]
+        total_vitals = len(vitals)
+        total_pages = max(1, (total_vitals + VITALS_PER_PAGE - 1) // VITALS_PER_PAGE)
+
+        pages = []
+        for page_num in range(total_pages):
+            start_idx = page_num * VITALS_PER_PAGE
+            end_idx = min(start_idx + VITALS_PER_PAGE, total_vitals)
+            page_vitals = vitals[start_idx:end_idx]
+
+            # Format time display for each vital (compact format)
+            prev_hour = None
+            for i, v in enumerate(page_vitals):
+                if v.get("time"):
+                    try:
+                        t = datetime.fromisoformat(v["time"].replace("Z", "+00:00"))
+                        hour = t.strftime("%H")
+                        minute = t.strftime("%M")
+                        v["time_display"] = t.strftime("%H:%M")
+                        v["hour"] = hour
+                        v["minute"] = f":{minute}"
+                        # Show hour only when it changes
+                        v["show_hour"] = (hour != prev_hour)
+                        prev_hour = hour
+                    except:
+                        v["time_display"] = v["time"][:5] if len(v["time"]) >= 5 else v["time"]
+                        v["hour"] = ""
+                        v["minute"] = v["time_display"]
+                        v["show_hour"] = True
+                else:
+                    v["time_display"] = ""
+                    v["hour"] = ""
+                    v["minute"] = ""
+                    v["show_hour"] = False
+
+            # Drugs for this page (max 12 per page to prevent overflow)
+            DRUGS_PER_PAGE = 12
+            if page_num == 0:
+                page_drugs = state["drugs"][:DRUGS_PER_PAGE]
+            else:
+                remaining_drugs = state["drugs"][DRUGS_PER_PAGE:]
+                drug_start = (page_num - 1) * DRUGS_PER_PAGE
+                page_drugs = remaining_drugs[drug_start:drug_start + DRUGS_PER_PAGE]
+
+            # Format drug times
+            for d in page_drugs:
+                if d.get("time"):
+                    try:
+                        t = datetime.fromisoformat(d["time"].replace("Z", "+00:00"))
+                        d["time"] = t.strftime("%H:%M")
+                    except:
+                        d["time"] = d["time"][:5] if len(d["time"]) >= 5 else d["time"]
+
+            pages.append({
+                "page_number": page_num + 1,
+                "vitals": page_vitals,
+                "drugs": page_drugs,
+                "chart_image": ""  # drawn by the PDF worker
+            })
+
+        # 6. Prepare template context
+        context = {
+            "hospital_name": hospital_name,
+            "hospital_address": hospital_address,
+            "case_id": case_id,
+            "patient": {
+                "name": case_dict.get("patient_name", ""),
+                "chart_no": case_dict.get("patient_id", ""),
+                "gender": case_dict.get("patient_gender", ""),
+                "age": case_dict.get("patient_age", ""),
+                "weight": case_dict.get("patient_weight", ""),
+                "height": case_dict.get("patient_height", ""),
+                "blood_type": case_dict.get("blood_type", ""),
+                "asa_class": case_dict.get("asa_class", "")
+            },
+            "surgery": {
+                "name": case_dict.get("surgery_name", ""),
+                "procedure": case_dict.get("procedure", ""),
+                "date": case_dict.get("created_at", "")[:10] if case_dict.get("created_at") else "",
+                "or_room": case_dict.get("or_room", ""),
+                "surgeon": case_dict.get("surgeon_name", "")
+            },
+            "technique": state["technique"] or case_dict.get("planned_technique"),
+            "iv_lines": state["iv_lines"],
+            "monitors": state["monitors"],
+            "vent_settings": state["vent_settings"],
+            "agent_settings": state["agent_settings"],
+            "lab_data": state["lab_data"],
+            "io_balance": state["io_balance"],
+            "times": state["times"],
+            "anesthesiologist": state["anesthesiologist"],
+            "nurse": state["nurse"],
+            "diagnosis": case_dict.get("diagnosis", ""),
+            "operation": case_dict.get("operation", ""),
+            "preop_hb": case_dict.get("preop_hb"),
+            "preop_ht": case_dict.get("preop_ht"),
+            "preop_k": case_dict.get("preop_k"),
+            "preop_na": case_dict.get("preop_na"),
+            "estimated_blood_loss": case_dict.get("estimated_blood_loss"),
+            "blood_prepared": case_dict.get("blood_prepared"),
+            "blood_prepared_units": case_dict.get("blood_prepared_units"),
+            "pages": pages,
+            "total_pages": total_pages,
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "show_watermark": watermark_text is not None  # Show watermark if not licensed
+        }
+
+        # Cache key: everything the PDF depends on except generated_at
+        fingerprint = compute_fingerprint(
+            case_dict, projection.count, projection.max_rowid,
+            iv_lines, hospital_name, hospital_address, watermark_text
+        )
+        return context, fingerprint
+
+    finally:
+        conn.close()
+
+
 @router.get("/cases/{case_id}/pdf")
 async def generate_pdf(
     case_id: str,
@@ -9179,6 +9286,7 @@ async def generate_pdf(
         }
 
         # Render demo template
+        from jinja2 import Environment, FileSystemLoader
         template_dir = Path(__file__).parent.parent / "templates"
         env = Environment(loader=FileSystemLoader(str(template_dir)))
         template = env.get_template("anesthesia_record_m0073.html")
@@ -9190,202 +9298,142 @@ async def generate_pdf(
             headers={"Content-Disposition": f"inline; filename=anesthesia_{case_id}_demo.html"}
         )
 
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    if not PDF_WORKER_ENABLED:
+        raise HTTPException(status_code=503, detail="PDF worker pool not available")
+    pdf_service = get_pdf_service()
 
-        # 1. Get case info
-        cursor.execute("""
-            SELECT * FROM anesthesia_cases WHERE id = ?
-        """, (case_id,))
-        case = cursor.fetchone()
-        if not case:
-            raise HTTPException(status_code=404, detail="Case not found")
-        case_dict = dict(case)
+    # 1-6. Load case/events and build template context (DB only, fast)
+    context, fingerprint = _load_pdf_context(case_id, hospital_name, hospital_address)
 
-        # 2. Get all events (chronological order)
-        cursor.execute("""
-            SELECT * FROM anesthesia_events
-            WHERE case_id = ?
-            ORDER BY clinical_time ASC, recorded_at ASC
-        """, (case_id,))
-        events = [dict(row) for row in cursor.fetchall()]
+    # 7-8. HTML preview: render in the worker pool, never cached
+    if preview:
+        html_content = await pdf_service.render_inline(context, preview=True, with_charts=PDF_ENABLED)
+        return StreamingResponse(
+            io.BytesIO(html_content),
+            media_type="text/html",
+            headers={"Content-Disposition": f"inline; filename=anesthesia_{case_id}.html"}
+        )
 
-        # 3. Rebuild state from events (pure function)
-        state = _rebuild_state_from_events(events)
+    # 9-10. PDF + watermark (P1-02) in the worker pool; unchanged cases come from disk cache
+    watermark_text = get_watermark_text() if WATERMARK_ENABLED else None
+    if watermark_text:
+        logger.info(f"Applying watermark: {watermark_text}")
+    job = pdf_service.submit(case_id, fingerprint, context, watermark_text)
+    job = await pdf_service.wait(job["job_id"])
+    if job["status"] != "DONE":
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {job['error']}")
+
+    return FileResponse(
+        job["path"],
+        media_type="application/pdf",
+        filename=f"M0073_anesthesia_{case_id}.pdf"
+    )
 
-        # 4. Get IV lines from projection table (for additional details)
-        cursor.execute("""
-            SELECT * FROM anesthesia_iv_lines WHERE case_id = ? ORDER BY line_number
-        """, (case_id,))
-        iv_lines = [dict(row) for row in cursor.fetchall()]
-        if iv_lines:
-            state["iv_lines"] = [{
-                "line_number": iv.get("line_number", i+1),
-                "site": iv.get("site"),
-                "gauge": iv.get("gauge"),
-                "catheter_type": iv.get("catheter_type", "PERIPHERAL")
-            } for i, iv in enumerate(iv_lines)]
 
-        # 5. Paginate vitals (24 per page)
-        vitals = state["vitals"]
-        total_vitals = len(vitals)
-        total_pages = max(1, (total_vitals + VITALS_PER_PAGE - 1) // VITALS_PER_PAGE)
+@router.get("/cases/{case_id}/pdf/preview")
+async def preview_pdf(
+    case_id: str,
+    hospital_name: str = Query("谷盺生技責任醫院", description="Hospital name for header")
+):
+    """
+    Preview PDF as HTML (alias for /pdf?preview=true)
 
-        pages = []
-        for page_num in range(total_pages):
-            start_idx = page_num * VITALS_PER_PAGE
-            end_idx = min(start_idx + VITALS_PER_PAGE, total_vitals)
-            page_vitals = vitals[start_idx:end_idx]
+    GET /api/anesthesia/cases/{case_id}/pdf/preview
+    """
+    return await generate_pdf(case_id, preview=True, hospital_name=hospital_name)
 
-            # Format time display for each vital (compact format)
-            prev_hour = None
-            for i, v in enumerate(page_vitals):
-                if v.get("time"):
-                    try:
-                        t = datetime.fromisoformat(v["time"].replace("Z", "+00:00"))
-                        hour = t.strftime("%H")
-                        minute = t.strftime("%M")
-                        v["time_display"] = t.strftime("%H:%M")
-                        v["hour"] = hour
-                        v["minute"] = f":{minute}"
-                        # Show hour only when it changes
-                        v["show_hour"] = (hour != prev_hour)
-                        prev_hour = hour
-                    except:
-                        v["time_display"] = v["time"][:5] if len(v["time"]) >= 5 else v["time"]
-                        v["hour"] = ""
-                        v["minute"] = v["time_display"]
-                        v["show_hour"] = True
-                else:
-                    v["time_display"] = ""
-                    v["hour"] = ""
-                    v["minute"] = ""
-                    v["show_hour"] = False
 
-            # Generate chart for this page's vitals
-            chart_image = _generate_vitals_chart(vitals, start_idx, end_idx) if page_vitals else ""
+# =============================================================================
+# v2.6: PDF Render Jobs (worker pool + disk cache)
+# =============================================================================
 
-            # Drugs for this page (max 12 per page to prevent overflow)
-            DRUGS_PER_PAGE = 12
-            if page_num == 0:
-                page_drugs = state["drugs"][:DRUGS_PER_PAGE]
-            else:
-                remaining_drugs = state["drugs"][DRUGS_PER_PAGE:]
-                drug_start = (page_num - 1) * DRUGS_PER_PAGE
-                page_drugs = remaining_drugs[drug_start:drug_start + DRUGS_PER_PAGE]
+def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a PDF job (no filesystem path)."""
+    return {
+        "job_id": job["job_id"],
+        "case_id": job["case_id"],
+        "status": job["status"],
+        "cached": job["cached"],
+        "error": job["error"],
+        "download_url": f"/api/anesthesia/pdf/jobs/{job['job_id']}/download" if job["status"] == "DONE" else None,
+    }
 
-            # Format drug times
-            for d in page_drugs:
-                if d.get("time"):
-                    try:
-                        t = datetime.fromisoformat(d["time"].replace("Z", "+00:00"))
-                        d["time"] = t.strftime("%H:%M")
-                    except:
-                        d["time"] = d["time"][:5] if len(d["time"]) >= 5 else d["time"]
 
-            pages.append({
-                "page_number": page_num + 1,
-                "vitals": page_vitals,
-                "drugs": page_drugs,
-                "chart_image": chart_image
-            })
+@router.post("/cases/{case_id}/pdf/jobs")
+async def create_pdf_job(
+    case_id: str,
+    hospital_name: str = Query("谷盺生技責任醫院", description="Hospital name for header"),
+    hospital_address: str = Query("", description="Hospital address (optional)")
+):
+    """
+    Queue PDF generation without waiting for the render.
 
-        # 6. Prepare template context
-        context = {
-            "hospital_name": hospital_name,
-            "hospital_address": hospital_address,
-            "case_id": case_id,
-            "patient": {
-                "name": case_dict.get("patient_name", ""),
-                "chart_no": case_dict.get("patient_id", ""),
-                "gender": case_dict.get("patient_gender", ""),
-                "age": case_dict.get("patient_age", ""),
-                "weight": case_dict.get("patient_weight", ""),
-                "height": case_dict.get("patient_height", ""),
-                "blood_type": case_dict.get("blood_type", ""),
-                "asa_class": case_dict.get("asa_class", "")
-            },
-            "surgery": {
-                "name": case_dict.get("surgery_name", ""),
-                "procedure": case_dict.get("procedure", ""),
-                "date": case_dict.get("created_at", "")[:10] if case_dict.get("created_at") else "",
-                "or_room": case_dict.get("or_room", ""),
-                "surgeon": case_dict.get("surgeon_name", "")
-            },
-            "technique": state["technique"] or case_dict.get("planned_technique"),
-            "iv_lines": state["iv_lines"],
-            "monitors": state["monitors"],
-            "vent_settings": state["vent_settings"],
-            "agent_settings": state["agent_settings"],
-            "lab_data": state["lab_data"],
-            "io_balance": state["io_balance"],
-            "times": state["times"],
-            "anesthesiologist": state["anesthesiologist"],
-            "nurse": state["nurse"],
-            "diagnosis": case_dict.get("diagnosis", ""),
-            "operation": case_dict.get("operation", ""),
-            "preop_hb": case_dict.get("preop_hb"),
-            "preop_ht": case_dict.get("preop_ht"),
-            "preop_k": case_dict.get("preop_k"),
-            "preop_na": case_dict.get("preop_na"),
-            "estimated_blood_loss": case_dict.get("estimated_blood_loss"),
-            "blood_prepared": case_dict.get("blood_prepared"),
-            "blood_prepared_units": case_dict.get("blood_prepared_units"),
-            "pages": pages,
-            "total_pages": total_pages,
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "show_watermark": get_watermark_text() is not None  # Show watermark if not licensed
-        }
+    POST /api/anesthesia/cases/{case_id}/pdf/jobs
 
-        # 7. Render Jinja2 template
-        template_dir = Path(__file__).parent.parent / "templates"
-        env = Environment(loader=FileSystemLoader(str(template_dir)))
-        template = env.get_template("anesthesia_record_m0073.html")
-        html_content = template.render(**context)
-
-        # 8. Return HTML preview or PDF
-        if preview:
-            return StreamingResponse(
-                io.BytesIO(html_content.encode('utf-8')),
-                media_type="text/html",
-                headers={"Content-Disposition": f"inline; filename=anesthesia_{case_id}.html"}
-            )
+    Returns immediately with status DONE (cache hit) or PENDING;
+    poll GET /api/anesthesia/pdf/jobs/{job_id} and download when DONE.
+    """
+    if IS_VERCEL or not PDF_ENABLED or not PDF_WORKER_ENABLED:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF generation not available. Install: pip install weasyprint jinja2 matplotlib"
+        )
 
-        # 9. Convert to PDF with WeasyPrint
-        pdf_buffer = io.BytesIO()
-        WeasyHTML(string=html_content, base_url=str(template_dir)).write_pdf(pdf_buffer)
-        pdf_buffer.seek(0)
+    context, fingerprint = _load_pdf_context(case_id, hospital_name, hospital_address)
+    watermark_text = get_watermark_text() if WATERMARK_ENABLED else None
+    job = get_pdf_service().submit(case_id, fingerprint, context, watermark_text)
+    return _job_response(job)
 
-        # 10. Apply license-based watermark (P1-02)
-        watermark_text = get_watermark_text()
-        if watermark_text and WATERMARK_ENABLED:
-            logger.info(f"Applying watermark: {watermark_text}")
-            pdf_buffer = apply_watermark_to_pdf(pdf_buffer, watermark_text)
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=M0073_anesthesia_{case_id}.pdf"
-            }
-        )
+@router.get("/pdf/jobs/{job_id}")
+async def get_pdf_job(job_id: str):
+    """
+    PDF job status
 
-    finally:
-        conn.close()
+    GET /api/anesthesia/pdf/jobs/{job_id}
+    """
+    if not PDF_WORKER_ENABLED:
+        raise HTTPException(status_code=503, detail="PDF worker pool not available")
+    job = get_pdf_service().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    return _job_response(job)
 
 
-@router.get("/cases/{case_id}/pdf/preview")
-async def preview_pdf(
-    case_id: str,
-    hospital_name: str = Query("谷盺生技責任醫院", description="Hospital name for header")
-):
+@router.get("/pdf/jobs/{job_id}/download")
+async def download_pdf_job(job_id: str):
     """
-    Preview PDF as HTML (alias for /pdf?preview=true)
+    Download a finished PDF job
 
-    GET /api/anesthesia/cases/{case_id}/pdf/preview
+    GET /api/anesthesia/pdf/jobs/{job_id}/download
     """
-    return await generate_pdf(case_id, preview=True, hospital_name=hospital_name)
+    if not PDF_WORKER_ENABLED:
+        raise HTTPException(status_code=503, detail="PDF worker pool not available")
+    job = get_pdf_service().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    if job["status"] == "FAILED":
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {job['error']}")
+    if job["status"] != "DONE" or not Path(job["path"]).exists():
+        raise HTTPException(status_code=409, detail="PDF not ready")
+
+    return FileResponse(
+        job["path"],
+        media_type="application/pdf",
+        filename=f"M0073_anesthesia_{job['case_id']}.pdf"
+    )
+
+
+@router.get("/pdf/workers")
+async def get_pdf_worker_stats():
+    """
+    PDF worker pool + cache statistics
+
+    GET /api/anesthesia/pdf/workers
+    """
+    if not PDF_WORKER_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, "pdf_enabled": PDF_ENABLED, **get_pdf_service().stats()}
 
 
 # =============================================================================
@@ -23,9 +23,17 @@ from datetime import datetime, timedelta, date
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 
+from services.db_pool import get_pool, after_commit
+from services.blood_availability import BloodAvailabilityCache, bump_generation
+from services.blood_custody import record_scan
+from services.reservation_scheduler import ReservationExpiryScheduler
+from services.executor import run_in_executor
+from services.id_service import TimeValidityError, generate_event_ids
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -72,10 +80,12 @@ def validate_status_transition(current: str, target: str) -> bool:
 
 def get_db():
     """Get database connection"""
-    db_path = PROJECT_ROOT / "medical_inventory.db"
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool(PROJECT_ROOT / "medical_inventory.db").writer()
+
+
+def get_read_db():
+    """Get read-only database connection (pure read endpoints)"""
+    return get_pool(PROJECT_ROOT / "medical_inventory.db").reader()
 
 
 def log_blood_event(
@@ -86,10 +96,17 @@ def log_blood_event(
     reason: str = None,
     order_id: str = None,
     metadata: dict = None,
-    severity: str = "INFO"
+    severity: str = "INFO",
+    event_id: str = None
 ):
-    """記錄血袋事件 (Event Sourcing)"""
-    event_id = str(uuid.uuid4())
+    """
+    記錄血袋事件 (Event Sourcing)
+
+    CUSTODY_* 事件由 trg_custody_state_ai 於同一交易更新 blood_unit_custody_state
+    每個血袋寫入都經過此處: commit 後遞增 blood_units generation (可用性快取失效)
+    批次入庫可傳入預留的 event_id (generate_event_ids)
+    """
+    event_id = event_id or str(uuid.uuid4())
     cursor.execute("""
         INSERT INTO blood_unit_events (
             id, unit_id, order_id, event_type, actor, reason, metadata, severity, ts_server
@@ -104,6 +121,9 @@ def log_blood_event(
         json.dumps(metadata) if metadata else None,
         severity
     ))
+    # 於 INSERT 之後註冊: 此時已在交易中，確保 commit 後才遞增
+    # (交易外註冊會立即執行，讓並行重建以新 generation 快取到未提交前的資料)
+    after_commit(cursor, lambda: bump_generation("blood_units"))
     return event_id
 
 
@@ -343,11 +363,34 @@ DEFAULT_EXPIRY_DAYS = {
 # API Endpoints
 # ==============================================================================
 
+def _query_availability() -> List[Dict[str, Any]]:
+    with get_read_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM v_blood_availability ORDER BY blood_type, unit_type")
+        return [dict(row) for row in cursor.fetchall()]
+
+
+_availability_cache: Optional[BloodAvailabilityCache] = None
+
+
+def get_availability_cache() -> BloodAvailabilityCache:
+    """可用性快取 (main.py startup 啟動跨日重建計時器)"""
+    global _availability_cache
+    if _availability_cache is None:
+        _availability_cache = BloodAvailabilityCache(compute=lambda: _query_availability())
+    return _availability_cache
+
+
 @router.get("/availability")
-async def get_blood_availability():
+async def get_blood_availability(
+    request: Request = None,
+    blood_type: Optional[str] = None,
+    unit_type: Optional[str] = None
+):
     """
     取得血品可用性總覽 (View 驅動)
-    v2.5: 自動清理過期預約 (Lazy Cleanup)
+    v2.6: 純讀取 - 過期預約由 ReservationExpiryScheduler 於到期時釋放
+    v2.7: 記憶體快取 (血袋寫入或跨日時重建)；ETag / If-None-Match 未變更回 304
     """
     if IS_VERCEL:
         # Demo 模式 - 模擬戰時野戰醫院庫存
@@ -376,18 +419,20 @@ async def get_blood_availability():
             "demo": True
         }
 
-    with get_db() as conn:
-        # v2.5: Lazy cleanup of expired reservations
-        release_expired_reservations(conn)
+    cache = get_availability_cache()
+    # 命中直接回傳；需重建時 (sqlite 查詢) 交給 executor
+    snapshot = cache.fresh() or await run_in_executor("db", cache.get)
+    etag = cache.etag_for(snapshot, blood_type, unit_type)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
 
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM v_blood_availability ORDER BY blood_type, unit_type")
-        rows = cursor.fetchall()
+    if request is not None and etag in request.headers.get("if-none-match", ""):
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
 
-        return {
-            "success": True,
-            "data": [dict(row) for row in rows]
-        }
+    return JSONResponse({
+        "success": True,
+        "data": snapshot.select(blood_type, unit_type)
+    }, headers=headers)
 
 
 @router.get("/units")
@@ -399,6 +444,7 @@ async def list_blood_units(
 ):
     """
     列出血袋 (使用 v_blood_unit_status View)
+    v2.6: 純讀取 (過期預約由排程器釋放)
     """
     if IS_VERCEL:
         # Demo 模式 - 模擬戰時野戰醫院血袋列表
@@ -445,10 +491,7 @@ async def list_blood_units(
             "demo": True
         }
 
-    with get_db() as conn:
-        # v2.5: Lazy cleanup of expired reservations
-        release_expired_reservations(conn)
-
+    with get_read_db() as conn:
         cursor = conn.cursor()
 
         query = "SELECT * FROM v_blood_unit_status WHERE 1=1"
@@ -578,6 +621,13 @@ async def batch_receive_blood(data: SimpleBatchReceive):
     collection_date = datetime.now().strftime("%Y-%m-%d")
 
     created_ids = []
+    # v3.6: 整批預留 UUIDv7 事件 ID，避免逐筆取鎖
+    #       系統時間無效 (RTC 重置、未校時) 時退回 log_blood_event 的 uuid4
+    try:
+        event_ids = generate_event_ids(data.quantity)
+    except TimeValidityError as e:
+        logger.warning(f"[Blood] UUIDv7 unavailable, using uuid4 event IDs: {e}")
+        event_ids = [None] * data.quantity
 
     with get_db() as conn:
         cursor = conn.cursor()
@@ -612,7 +662,8 @@ async def batch_receive_blood(data: SimpleBatchReceive):
             log_blood_event(
                 cursor, unit_id, "RECEIVE", "mirs-tab",
                 f"簡易入庫: {data.blood_type} {data.unit_type}",
-                metadata=metadata
+                metadata=metadata,
+                event_id=event_ids[i]
             )
 
             created_ids.append(unit_id)
@@ -672,6 +723,7 @@ async def reserve_blood_unit(unit_id: str, data: BloodUnitReserve):
 
         log_blood_event(cursor, unit_id, "RESERVE", data.reserver_id, f"訂單: {data.order_id}", data.order_id)
         conn.commit()
+        get_reservation_scheduler().schedule(unit_id, reserve_expires_at)
 
         return {
             "success": True,
@@ -706,6 +758,7 @@ async def unreserve_blood_unit(unit_id: str, reason: str = None, actor: str = "s
 
         log_blood_event(cursor, unit_id, "UNRESERVE", actor, reason)
         conn.commit()
+        get_reservation_scheduler().cancel(unit_id)
 
         return {
             "success": True,
@@ -1190,10 +1243,11 @@ async def get_pending_orders_summary():
 # P4: Reserve Timeout (預約逾時自動釋放)
 # ==============================================================================
 
-def release_expired_reservations(conn: sqlite3.Connection = None) -> dict:
+def release_expired_reservations(conn: sqlite3.Connection = None, now: datetime = None) -> dict:
     """
     釋放過期的預約血袋
     v2.5: P4 自動釋放機制
+    v2.6: 由 ReservationExpiryScheduler 於到期時呼叫 (不再於 GET 時清理)
 
     Returns:
         dict: { released_count, unit_ids }
@@ -1204,15 +1258,17 @@ def release_expired_reservations(conn: sqlite3.Connection = None) -> dict:
         close_conn = True
 
     cursor = conn.cursor()
+    now = now or datetime.now()
 
     # 找出過期的預約
+    # v2.6: datetime() 正規化 ISO 'T' 分隔字串 (原字串比較在同日內永不成立)
     cursor.execute("""
         SELECT id, blood_type, reserved_for_order, reserved_by, reserve_expires_at
         FROM blood_units
         WHERE status = 'RESERVED'
           AND reserve_expires_at IS NOT NULL
-          AND reserve_expires_at < datetime('now', 'localtime')
-    """)
+          AND datetime(reserve_expires_at) <= datetime(?)
+    """, (now.isoformat(),))
 
     expired_units = cursor.fetchall()
     released_ids = []
@@ -1221,6 +1277,8 @@ def release_expired_reservations(conn: sqlite3.Connection = None) -> dict:
         unit_id = unit['id']
 
         # 更新狀態為 AVAILABLE
+        # v3.6: 條件式更新 - SELECT 之後可能已被領用/輸血/重新預約，
+        #       或由另一個 worker 釋放；僅在仍為過期預約時釋放並記錄事件
         cursor.execute("""
             UPDATE blood_units
             SET status = 'AVAILABLE',
@@ -1229,7 +1287,12 @@ def release_expired_reservations(conn: sqlite3.Connection = None) -> dict:
                 reserved_by = NULL,
                 reserve_expires_at = NULL
             WHERE id = ?
-        """, (unit_id,))
+              AND status = 'RESERVED'
+              AND reserve_expires_at IS NOT NULL
+              AND datetime(reserve_expires_at) <= datetime(?)
+        """, (unit_id, now.isoformat()))
+        if cursor.rowcount != 1:
+            continue
 
         # 記錄事件
         log_blood_event(
@@ -1255,6 +1318,31 @@ def release_expired_reservations(conn: sqlite3.Connection = None) -> dict:
     }
 
 
+def load_reservation_deadlines() -> List[tuple]:
+    """所有進行中預約的 (unit_id, reserve_expires_at)"""
+    with get_read_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, reserve_expires_at FROM blood_units
+            WHERE status = 'RESERVED' AND reserve_expires_at IS NOT NULL
+        """)
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+_reservation_scheduler: Optional[ReservationExpiryScheduler] = None
+
+
+def get_reservation_scheduler() -> ReservationExpiryScheduler:
+    """預約逾時排程器 (main.py startup 啟動)"""
+    global _reservation_scheduler
+    if _reservation_scheduler is None:
+        _reservation_scheduler = ReservationExpiryScheduler(
+            release=lambda now: release_expired_reservations(now=now),
+            load=load_reservation_deadlines,
+        )
+    return _reservation_scheduler
+
+
 @router.post("/reserve-timeout/process")
 async def process_reserve_timeout():
     """
@@ -1284,6 +1372,7 @@ async def get_reserve_timeout_status():
     """
     查詢即將過期的預約
     v2.5: P4 新增
+    v2.6: 附排程器狀態 (下一個到期時間、釋放延遲)
     """
     if IS_VERCEL:
         now = datetime.now()
@@ -1312,7 +1401,7 @@ async def get_reserve_timeout_status():
             "demo": True
         }
 
-    with get_db() as conn:
+    with get_read_db() as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -1351,7 +1440,8 @@ async def get_reserve_timeout_status():
             "success": True,
             "data": result,
             "expired_count": expired_count,
-            "expiring_soon_count": expiring_soon_count
+            "expiring_soon_count": expiring_soon_count,
+            "scheduler": get_reservation_scheduler().get_status()
         }
 
 
@@ -1903,56 +1993,39 @@ async def get_pending_custody(
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # 查詢已發血但未完成輸血的血袋
-        cursor.execute("""
-            SELECT bu.id, bu.blood_type, bu.unit_type, bu.status, bu.issued_at,
-                   bue.metadata, bue.ts_server
+        # 查詢已發血但未完成輸血的血袋 (v1.2: 監管鏈投影，不再掃描事件表)
+        query = """
+            SELECT bu.id, bu.blood_type, bu.unit_type, bu.issued_at,
+                   cs.current_step, cs.location, cs.last_event_at
             FROM blood_units bu
-            LEFT JOIN blood_unit_events bue ON bu.id = bue.unit_id
-                AND bue.event_type LIKE 'CUSTODY_%'
+            LEFT JOIN blood_unit_custody_state cs ON cs.unit_id = bu.id
             WHERE bu.status = 'ISSUED'
-            ORDER BY bu.issued_at DESC
-        """)
-
-        rows = cursor.fetchall()
-
-        # 處理結果 (按 unit_id 分組，取最新事件)
-        units_map = {}
-        for row in rows:
-            row = dict(row)
-            unit_id = row["id"]
-
-            if unit_id not in units_map:
-                units_map[unit_id] = {
-                    "unit_id": unit_id,
-                    "blood_type": row["blood_type"],
-                    "unit_type": row["unit_type"],
-                    "current_step": None,
-                    "next_step": None,
-                    "location": None,
-                    "elapsed_minutes": 0,
-                    "released_at": row["issued_at"]
-                }
-
-            if row.get("metadata"):
-                metadata = json.loads(row["metadata"])
-                step = metadata.get("step")
-                if step:
-                    units_map[unit_id]["current_step"] = step
-                    units_map[unit_id]["next_step"] = get_next_custody_step(step)
-                    units_map[unit_id]["location"] = metadata.get("location")
-
-                    if row.get("ts_server"):
-                        elapsed = int((datetime.now().timestamp() - row["ts_server"]) / 60)
-                        units_map[unit_id]["elapsed_minutes"] = elapsed
-
-        result = list(units_map.values())
-
-        # 過濾
+        """
+        params = []
         if location:
-            result = [r for r in result if r.get("location") == location]
+            query += " AND cs.location = ?"
+            params.append(location)
         if step:
-            result = [r for r in result if r.get("current_step") == step]
+            query += " AND cs.current_step = ?"
+            params.append(step)
+        query += " ORDER BY bu.issued_at DESC"
+        cursor.execute(query, params)
+
+        now_ts = datetime.now().timestamp()
+        result = []
+        for row in cursor.fetchall():
+            row = dict(row)
+            current_step = row["current_step"]
+            result.append({
+                "unit_id": row["id"],
+                "blood_type": row["blood_type"],
+                "unit_type": row["unit_type"],
+                "current_step": current_step,
+                "next_step": get_next_custody_step(current_step) if current_step else None,
+                "location": row["location"],
+                "elapsed_minutes": int((now_ts - row["last_event_at"]) / 60) if row["last_event_at"] else 0,
+                "released_at": row["issued_at"]
+            })
 
         # 只返回未完成的
         result = [r for r in result if r.get("next_step") is not None]
@@ -2033,39 +2106,31 @@ async def get_units_for_transfusion(
         cursor = conn.cursor()
 
         # 查詢已發給此病人且狀態為 ISSUED 或 IN_CLINICAL_AREA 的血袋
+        # v1.2: patient_id / location 由監管鏈投影 (blood_unit_custody_state) 直接篩選
+        # 尚無監管紀錄 (NULL) 的血袋沿用原規則保留
         query = """
-            SELECT bu.*, bue.metadata as last_custody_metadata
+            SELECT bu.id, bu.blood_type, bu.unit_type, bu.volume_ml, bu.expiry_date, bu.status,
+                   cs.current_step, cs.patient_id AS custody_patient_id,
+                   cs.location AS custody_location, cs.scan_status
             FROM blood_units bu
-            LEFT JOIN (
-                SELECT unit_id, metadata,
-                       ROW_NUMBER() OVER (PARTITION BY unit_id ORDER BY ts_server DESC) as rn
-                FROM blood_unit_events
-                WHERE event_type LIKE 'CUSTODY_%'
-            ) bue ON bu.id = bue.unit_id AND bue.rn = 1
+            LEFT JOIN blood_unit_custody_state cs ON cs.unit_id = bu.id
             WHERE bu.status IN ('ISSUED', 'IN_CLINICAL_AREA')
+              AND (cs.patient_id IS NULL OR cs.patient_id = ?)
+              AND (cs.location IS NULL OR cs.location = ?)
         """
-        params = []
+        params = [patient_id, location]
 
-        # 如果有 location 限縮 (從 custody metadata 取得)
-        # 注意：這需要血袋有被記錄過 location
+        # 血型篩選
+        if blood_type:
+            query += " AND bu.blood_type = ?"
+            params.append(blood_type)
 
-        cursor.execute(query)
+        cursor.execute(query, params)
         rows = cursor.fetchall()
 
         result = []
         for row in rows:
             row = dict(row)
-            metadata = json.loads(row.get("last_custody_metadata") or "{}")
-
-            # 檢查 patient_id 匹配
-            unit_patient_id = metadata.get("patient_id")
-            if unit_patient_id and unit_patient_id != patient_id:
-                continue
-
-            # 檢查 location 匹配
-            unit_location = metadata.get("location")
-            if unit_location and unit_location != location:
-                continue
 
             # 計算剩餘效期
             expiry = datetime.strptime(row["expiry_date"], "%Y-%m-%d")
@@ -2075,10 +2140,6 @@ async def get_units_for_transfusion(
             if hours_until_expiry <= 0:
                 continue
 
-            # 血型篩選
-            if blood_type and row["blood_type"] != blood_type:
-                continue
-
             result.append({
                 "id": row["id"],
                 "blood_type": row["blood_type"],
@@ -2087,9 +2148,10 @@ async def get_units_for_transfusion(
                 "expiry_date": row["expiry_date"],
                 "hours_until_expiry": hours_until_expiry,
                 "status": row["status"],
-                "location": unit_location,
-                "patient_id": unit_patient_id,
-                "custody_step": metadata.get("step"),
+                "location": row["custody_location"],
+                "patient_id": row["custody_patient_id"],
+                "custody_step": row["current_step"],
+                "scan_status": row["scan_status"],
                 "expiring_soon": hours_until_expiry < 24
             })
 
@@ -2156,7 +2218,12 @@ async def confirm_scan(data: ScanConfirmRequest):
         cursor.execute("SELECT * FROM blood_units WHERE id = ?", (data.scanned_unit_id,))
         scanned_unit = cursor.fetchone()
 
+        # v1.2: 掃碼結果寫入監管鏈投影 (床邊查詢可直接顯示)
+        if selected_unit:
+            record_scan(cursor, data.selected_unit_id, match)
+
         if match:
+            conn.commit()
             return {
                 "match": True,
                 "selected_unit_id": data.selected_unit_id,
@@ -5,6 +5,8 @@ Provides REST endpoints for Walkaway Test / Disaster Recovery:
 - GET /api/dr/health - Server identity and database fingerprint
 - GET /api/dr/export - Export events and snapshot for client backup
 - POST /api/dr/restore - Restore events and snapshot from client
+- GET /api/dr/digest - Merkle-range digest (anti-entropy: compare roots, descend, pull buckets)
+- GET /api/dr/digest/buckets/{bucket} - Events of one digest bucket
 
 Security:
 - Export: No PIN required (read-only)
@@ -25,6 +27,9 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Query, Request, Header
 from pydantic import BaseModel
 
+from services.db_pool import get_pool
+from services.executor import run_in_executor
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -67,6 +72,7 @@ class ExportResponse(BaseModel):
     server_uuid: str
     db_fingerprint: Optional[str]
     events: List[dict]
+    columns: Optional[Dict[str, List[Any]]] = None
     events_count: int
     pagination: dict
     snapshot: Optional[Dict[str, List[dict]]] = None
@@ -96,6 +102,8 @@ class RestoreResponse(BaseModel):
     rejected_event_ids: List[str]
     snapshot_tables_restored: List[str]
     message: str
+    elapsed_ms: float = 0.0
+    events_per_second: float = 0.0
 
 
 class RestoreHistoryResponse(BaseModel):
@@ -103,6 +111,27 @@ class RestoreHistoryResponse(BaseModel):
     sessions: List[dict]
 
 
+class DigestResponse(BaseModel):
+    """Response for the event digest: nodes are [index, count, hash]."""
+    root: str
+    events_count: int
+    bucket_ms: int
+    fanout: int
+    levels: int
+    level: int
+    parent: Optional[int] = None
+    nodes: List[list]
+
+
+class DigestBucketResponse(BaseModel):
+    """Response for one digest bucket."""
+    bucket: int
+    start_ms: int
+    end_ms: int
+    events_count: int
+    events: List[dict]
+
+
 # =============================================================================
 # Import Services
 # =============================================================================
@@ -116,12 +145,21 @@ try:
         is_time_valid,
     )
     from services.event_service import (
-        export_events,
+        EXPORT_COLUMNS,
+        estimate_event_count,
+        events_to_columns,
+        export_events_page,
         export_snapshot,
         restore_events_batch,
         get_event_count,
         get_last_hlc,
     )
+    from services.event_digest import (
+        bucket_events,
+        bucket_range_ms,
+        digest_nodes,
+        digest_root,
+    )
     DR_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"DR services not available: {e}")
@@ -133,10 +171,8 @@ except ImportError as e:
 # =============================================================================
 
 def get_db_connection() -> sqlite3.Connection:
-    """Get database connection with row factory."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get pooled database connection with row factory."""
+    return get_pool(DB_PATH).writer()
 
 
 def require_admin_pin(pin: Optional[str]):
@@ -211,11 +247,16 @@ async def dr_export(
     since_hlc: Optional[str] = Query(None, description="Export events after this HLC"),
     limit: int = Query(1000, ge=1, le=10000, description="Max events per page"),
     include_snapshot: bool = Query(False, description="Include current state snapshot"),
+    format: str = Query("rows", pattern="^(rows|columnar)$",
+                        description="rows: list of event dicts; columnar: {column: [values]}"),
 ):
     """
     Export events for client backup.
 
-    Supports cursor-based pagination via `since_hlc`.
+    Keyset pagination via `since_hlc` (pass `pagination.next_cursor`).
+    `pagination.total_count` is an estimate from the event digest counters.
+    `format=columnar` returns `columns` (one array per column) instead of
+    `events`, so large pages do not repeat every key per event.
     Optionally includes current state snapshot for immediate UI usability.
 
     No authentication required (read-only).
@@ -226,52 +267,62 @@ async def dr_export(
             detail="DR services not available"
         )
 
-    conn = get_db_connection()
-    try:
-        # Check time validity
-        time_valid, time_error = is_time_valid()
-        if not time_valid:
-            raise HTTPException(
-                status_code=503,
-                detail=f"System time invalid: {time_error}"
-            )
-
-        server_uuid = get_server_uuid(conn)
-        db_fingerprint = get_db_fingerprint(conn)
-
-        # Export events
-        events, has_more, total_count = export_events(
-            conn,
-            since_hlc=since_hlc,
-            limit=limit,
+    # Check time validity
+    time_valid, time_error = is_time_valid()
+    if not time_valid:
+        raise HTTPException(
+            status_code=503,
+            detail=f"System time invalid: {time_error}"
         )
 
-        # Determine next cursor
-        next_cursor = events[-1]['hlc'] if events and has_more else None
-
-        # Export snapshot if requested
-        snapshot = None
-        if include_snapshot:
-            snapshot = export_snapshot(conn)
-
-        now_ms = get_current_timestamp_ms()
-
-        return ExportResponse(
-            export_id=generate_event_id(),
-            exported_at=now_ms,
-            server_uuid=server_uuid,
-            db_fingerprint=db_fingerprint,
-            events=events,
-            events_count=len(events),
-            pagination={
-                "has_more": has_more,
-                "next_cursor": next_cursor,
-                "total_count": total_count,
-            },
-            snapshot=snapshot,
-        )
-    finally:
-        conn.close()
+    def read_export():
+        writer = get_db_connection()
+        try:
+            server_uuid = get_server_uuid(writer)     # cached after the first page
+        finally:
+            writer.close()
+
+        conn = get_pool(DB_PATH).reader()
+        try:
+            rows, has_more = export_events_page(conn, since_hlc=since_hlc, limit=limit)
+            return (
+                server_uuid,
+                get_db_fingerprint(conn),
+                rows,
+                has_more,
+                estimate_event_count(conn, since_hlc),
+                export_snapshot(conn) if include_snapshot else None,
+            )
+        finally:
+            conn.close()
+
+    server_uuid, db_fingerprint, rows, has_more, total_count, snapshot = \
+        await run_in_executor("db", read_export)
+
+    # Determine next cursor
+    next_cursor = rows[-1][EXPORT_COLUMNS.index('hlc')] if rows and has_more else None
+
+    if format == "columnar":
+        events, columns = [], events_to_columns(rows)
+    else:
+        events, columns = [dict(zip(EXPORT_COLUMNS, row)) for row in rows], None
+
+    return ExportResponse(
+        export_id=generate_event_id(),
+        exported_at=get_current_timestamp_ms(),
+        server_uuid=server_uuid,
+        db_fingerprint=db_fingerprint,
+        events=events,
+        columns=columns,
+        events_count=len(rows),
+        pagination={
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+            "total_count": total_count,
+            "total_is_estimate": bool(since_hlc),
+        },
+        snapshot=snapshot,
+    )
 
 
 @router.post("/restore", response_model=RestoreResponse)
@@ -311,8 +362,10 @@ async def dr_restore(
                 detail=f"System time invalid: {time_error}"
             )
 
-        # Perform restore
-        result = restore_events_batch(
+        # Perform restore (bulk insert; off the event loop for large batches)
+        result = await run_in_executor(
+            "db",
+            restore_events_batch,
             conn=conn,
             restore_session_id=request.restore_session_id,
             source_device_id=request.source_device_id,
@@ -325,7 +378,7 @@ async def dr_restore(
         logger.info(
             f"Restore batch {request.batch_number} from {request.source_device_id}: "
             f"{result.events_inserted} inserted, {result.events_already_present} existing, "
-            f"{result.events_rejected} rejected"
+            f"{result.events_rejected} rejected, {result.events_per_second:.0f} events/s"
         )
 
         return RestoreResponse(
@@ -339,6 +392,8 @@ async def dr_restore(
             rejected_event_ids=result.rejected_event_ids,
             snapshot_tables_restored=result.snapshot_tables_restored,
             message=result.message,
+            elapsed_ms=result.elapsed_ms,
+            events_per_second=result.events_per_second,
         )
     except HTTPException:
         raise
@@ -428,3 +483,84 @@ async def dr_stats():
         }
     finally:
         conn.close()
+
+
+@router.get("/digest", response_model=DigestResponse)
+async def dr_digest(
+    level: Optional[int] = Query(None, ge=0, description="Tree level (0 = hourly buckets); default: top level"),
+    parent: Optional[int] = Query(None, ge=0, description="Only children of this node at level + 1"),
+):
+    """
+    Merkle-range digest of the events table.
+
+    Anti-entropy: compare `root`; where it differs, request the children of
+    each differing node (`level`, `parent`) down to level 0, then pull only
+    those buckets via /api/dr/digest/buckets/{bucket}.
+
+    No authentication required (read-only).
+    """
+    if not DR_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DR services not available"
+        )
+
+    def read_digest():
+        conn = get_pool(DB_PATH).reader()
+        try:
+            result = digest_root(conn)
+            if level is not None:
+                result["nodes"] = digest_nodes(conn, level, parent)
+            return result
+        finally:
+            conn.close()
+
+    try:
+        result = await run_in_executor("db", read_digest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=503, detail=f"Event digest not available: {e}")
+
+    return DigestResponse(
+        level=result["levels"] if level is None else level,
+        parent=parent,
+        **result,
+    )
+
+
+@router.get("/digest/buckets/{bucket}", response_model=DigestBucketResponse)
+async def dr_digest_bucket(
+    bucket: int,
+    include_events: bool = Query(False, description="Full event rows instead of (event_id, payload_hash)"),
+):
+    """
+    Events of one digest bucket (one hour of HLC time).
+
+    No authentication required (read-only).
+    """
+    if not DR_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="DR services not available"
+        )
+
+    def read_bucket():
+        conn = get_pool(DB_PATH).reader()
+        try:
+            return bucket_events(conn, bucket, full=include_events)
+        finally:
+            conn.close()
+
+    try:
+        events = await run_in_executor("db", read_bucket)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=503, detail=f"Event digest not available: {e}")
+    start_ms, end_ms = bucket_range_ms(0, bucket)
+    return DigestBucketResponse(
+        bucket=bucket,
+        start_ms=start_ms,
+        end_ms=end_ms,
+        events_count=len(events),
+        events=events,
+    )
@@ -17,6 +17,9 @@ from typing import Optional, List
 from pydantic import BaseModel, Field
 from fastapi import APIRouter, Header, HTTPException, Depends
 
+from services.db_pool import get_pool
+from services.stock_ledger import get_available_many, ON_HAND_SQL
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/inventory", tags=["Inventory Engine"])
@@ -46,6 +49,7 @@ class ConsumeRequest(BaseModel):
     station_id: str = Field(..., description="來源站點 ID")
     operator: Optional[str] = Field(None, description="執行者")
     timestamp: Optional[int] = Field(None, description="執行時間 (ms)")
+    all_or_nothing: bool = Field(False, description="全部成功才扣減 (任一項失敗則整筆不寫入)")
 
 
 class ConsumeResult(BaseModel):
@@ -139,9 +143,7 @@ def verify_station_token(
 def _load_station_secret(station_id: str) -> Optional[str]:
     """從資料庫載入站點 secret"""
     try:
-        import sqlite3
-        conn = sqlite3.connect("medical_inventory.db")
-        conn.row_factory = sqlite3.Row
+        conn = _get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -166,192 +168,168 @@ def _load_station_secret(station_id: str) -> Optional[str]:
 # ============================================================
 
 def _get_db_connection():
-    """取得資料庫連線"""
-    import sqlite3
-    conn = sqlite3.connect("medical_inventory.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def _get_current_stock(cursor, item_code: str) -> float:
-    """計算當前庫存"""
-    cursor.execute("""
-        SELECT COALESCE(SUM(
-            CASE WHEN event_type = 'RECEIVE' THEN quantity
-                 WHEN event_type IN ('CONSUME', 'DISPATCH_RESERVE') THEN -quantity
-                 WHEN event_type = 'DISPATCH_RELEASE' THEN quantity
-                 ELSE 0 END
-        ), 0) as current_stock
-        FROM inventory_events
-        WHERE item_code = ?
-    """, (item_code,))
-    row = cursor.fetchone()
-    return float(row['current_stock']) if row else 0.0
-
-
-def _deduct_inventory(
-    item_code: str,
-    quantity: float,
-    intent_id: str,
-    execution_id: str,
-    person_id: Optional[str],
-    operator: Optional[str],
-    lot: Optional[str] = None
-) -> ConsumeResult:
-    """
-    執行庫存扣減
-
-    Returns:
-        ConsumeResult with status CONFIRMED or FAILED
-    """
-    conn = _get_db_connection()
-    cursor = conn.cursor()
+    """取得資料庫連線 (共用連線池)"""
+    return get_pool("medical_inventory.db").writer()
 
-    try:
-        # 1. 檢查物品是否存在
-        cursor.execute("SELECT item_code, item_name FROM items WHERE item_code = ?", (item_code,))
-        item = cursor.fetchone()
-        if not item:
-            conn.close()
-            return ConsumeResult(
-                item_code=item_code,
-                status="FAILED",
-                quantity_deducted=0,
-                remaining_stock=0,
-                error=f"ITEM_NOT_FOUND: {item_code}"
-            )
 
-        # 2. 檢查庫存
-        current_stock = _get_current_stock(cursor, item_code)
-        if current_stock < quantity:
-            conn.close()
-            return ConsumeResult(
-                item_code=item_code,
-                status="FAILED",
-                quantity_deducted=0,
-                remaining_stock=current_stock,
-                error=f"INSUFFICIENT_STOCK: need {quantity}, have {current_stock}"
-            )
+def _failed(item_code: str, error: str, remaining: float = 0) -> ConsumeResult:
+    return ConsumeResult(
+        item_code=item_code,
+        status="FAILED",
+        quantity_deducted=0,
+        remaining_stock=remaining,
+        error=error
+    )
 
-        # 3. 寫入 CONSUME 事件
-        remarks = f"[ENGINE] intent:{intent_id} exec:{execution_id}"
-        if person_id:
-            remarks += f" pt:{person_id}"
 
-        cursor.execute("""
-            INSERT INTO inventory_events (
-                event_type, item_code, quantity, batch_number,
-                remarks, operator, timestamp
-            ) VALUES ('CONSUME', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (item_code, quantity, lot, remarks, operator or "MIRS_ENGINE"))
+def _in_clause(values: List[str]) -> str:
+    return ",".join("?" * len(values))
 
-        conn.commit()
 
-        # 4. 計算剩餘庫存
-        remaining = _get_current_stock(cursor, item_code)
+def _deduct_batch(request: ConsumeRequest) -> List[ConsumeResult]:
+    """
+    批次扣減 (單一交易)
 
-        logger.info(f"✓ Inventory deducted: {item_code} x{quantity}, remaining: {remaining}")
+    1. BEGIN IMMEDIATE 取得寫鎖 (整批一次)
+    2. 一次查詢品項/血袋，以同一份 item_stock 快照驗證所有項目
+       (同品項多行依序累計扣減)
+    3. executemany 寫入 CONSUME 事件與血袋更新，commit 一次
 
-        return ConsumeResult(
-            item_code=item_code,
-            status="CONFIRMED",
-            quantity_deducted=quantity,
-            remaining_stock=remaining
-        )
+    all_or_nothing=True 時任一項失敗即整批不寫入。
+    DB 錯誤一律整批回滾 (不會留下半筆)。
 
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"Inventory deduction failed: {e}")
-        return ConsumeResult(
-            item_code=item_code,
-            status="FAILED",
-            quantity_deducted=0,
-            remaining_stock=0,
-            error=f"DB_ERROR: {str(e)}"
-        )
-    finally:
-        conn.close()
+    Returns:
+        與 request.items 同順序的 ConsumeResult
+    """
+    items = request.items
+    results: List[Optional[ConsumeResult]] = [None] * len(items)
 
+    remarks = f"[ENGINE] intent:{request.intent_id} exec:{request.execution_id}"
+    if request.person_id:
+        remarks += f" pt:{request.person_id}"
+    operator = request.operator or "MIRS_ENGINE"
 
-def _deduct_blood_unit(blood_unit_id: str, intent_id: str, person_id: Optional[str]) -> ConsumeResult:
-    """
-    扣減血品 (by unit_id)
+    stock_lines = [(i, item) for i, item in enumerate(items) if not item.blood_unit_id]
+    blood_lines = [(i, item) for i, item in enumerate(items) if item.blood_unit_id]
 
-    血品使用 blood_bags 表追蹤，狀態從 IN_STOCK → USED
-    """
     conn = _get_db_connection()
     cursor = conn.cursor()
 
     try:
-        # 1. 查找血袋
-        cursor.execute("""
-            SELECT bag_code, blood_type, volume_ml, status
-            FROM blood_bags
-            WHERE bag_code = ?
-        """, (blood_unit_id,))
-        bag = cursor.fetchone()
-
-        if not bag:
-            conn.close()
-            return ConsumeResult(
-                item_code=f"BLOOD:{blood_unit_id}",
-                status="FAILED",
-                quantity_deducted=0,
-                remaining_stock=0,
-                error=f"BLOOD_UNIT_NOT_FOUND: {blood_unit_id}"
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1. 一般物品: 存在性 + 庫存快照 (各一次查詢)
+        event_rows = []
+        snapshot = {}
+        if stock_lines:
+            codes = list(dict.fromkeys(item.item_code for _, item in stock_lines))
+            cursor.execute(
+                f"SELECT item_code FROM items WHERE item_code IN ({_in_clause(codes)})", codes
             )
-
-        if bag['status'] != 'IN_STOCK':
-            conn.close()
-            return ConsumeResult(
-                item_code=f"BLOOD:{blood_unit_id}",
-                status="FAILED",
-                quantity_deducted=0,
-                remaining_stock=0,
-                error=f"BLOOD_UNIT_NOT_AVAILABLE: status={bag['status']}"
-            )
-
-        # 2. 更新血袋狀態
-        cursor.execute("""
-            UPDATE blood_bags
-            SET status = 'USED', used_at = CURRENT_TIMESTAMP, used_for = ?
-            WHERE bag_code = ?
-        """, (f"intent:{intent_id} pt:{person_id or 'N/A'}", blood_unit_id))
-
-        # 3. 更新血庫庫存
-        cursor.execute("""
-            UPDATE blood_inventory
-            SET quantity = quantity - 1
-            WHERE blood_type = ?
-        """, (bag['blood_type'],))
-
-        # 4. 記錄血袋事件
-        cursor.execute("""
-            INSERT INTO blood_events (event_type, blood_type, quantity, operator, remarks)
-            VALUES ('CONSUME', ?, 1, 'MIRS_ENGINE', ?)
-        """, (bag['blood_type'], f"[ENGINE] intent:{intent_id} bag:{blood_unit_id}"))
+            known = {row[0] for row in cursor.fetchall()}
+            snapshot = get_available_many(cursor, [c for c in codes if c in known])
+            stock = dict(snapshot)
+
+            for i, item in stock_lines:
+                code = item.item_code
+                if code not in known:
+                    results[i] = _failed(code, f"ITEM_NOT_FOUND: {code}")
+                    continue
+                have = float(stock[code])
+                if have < item.quantity:
+                    results[i] = _failed(code, f"INSUFFICIENT_STOCK: need {item.quantity}, have {have}", have)
+                    continue
+                stock[code] = have - item.quantity
+                event_rows.append((code, item.quantity, item.lot, remarks, operator))
+                results[i] = ConsumeResult(
+                    item_code=code,
+                    status="CONFIRMED",
+                    quantity_deducted=item.quantity,
+                    remaining_stock=stock[code]
+                )
+
+        # 2. 血品: 使用 unit_id 追蹤 (blood_bags 狀態 IN_STOCK → USED)
+        bag_updates, inventory_updates, blood_events = [], [], []
+        if blood_lines:
+            bag_codes = list(dict.fromkeys(item.blood_unit_id for _, item in blood_lines))
+            cursor.execute(f"""
+                SELECT bag_code, blood_type, status FROM blood_bags
+                WHERE bag_code IN ({_in_clause(bag_codes)})
+            """, bag_codes)
+            bags = {row['bag_code']: row for row in cursor.fetchall()}
+            used = set()
+
+            for i, item in blood_lines:
+                unit_id = item.blood_unit_id
+                label = f"BLOOD:{unit_id}"
+                bag = bags.get(unit_id)
+                if not bag:
+                    results[i] = _failed(label, f"BLOOD_UNIT_NOT_FOUND: {unit_id}")
+                    continue
+                if bag['status'] != 'IN_STOCK' or unit_id in used:
+                    status = 'USED' if unit_id in used else bag['status']
+                    results[i] = _failed(label, f"BLOOD_UNIT_NOT_AVAILABLE: status={status}")
+                    continue
+                used.add(unit_id)
+                bag_updates.append((f"intent:{request.intent_id} pt:{request.person_id or 'N/A'}", unit_id))
+                inventory_updates.append((bag['blood_type'],))
+                blood_events.append((bag['blood_type'], f"[ENGINE] intent:{request.intent_id} bag:{unit_id}"))
+                results[i] = ConsumeResult(
+                    item_code=label,
+                    status="CONFIRMED",
+                    quantity_deducted=1,
+                    remaining_stock=-1  # Blood units are tracked individually
+                )
+
+        # 3. all-or-nothing: 任一失敗則不寫入
+        if request.all_or_nothing and any(r.status == "FAILED" for r in results):
+            conn.rollback()
+            for i, r in enumerate(results):
+                if r.status == "CONFIRMED":
+                    remaining = -1 if items[i].blood_unit_id else float(snapshot.get(r.item_code, 0))
+                    results[i] = _failed(r.item_code, "ROLLED_BACK: all_or_nothing", remaining)
+            return results
+
+        # 4. 寫入 (executemany) + 單次 commit
+        if event_rows:
+            cursor.executemany("""
+                INSERT INTO inventory_events (
+                    event_type, item_code, quantity, batch_number,
+                    remarks, operator, timestamp
+                ) VALUES ('CONSUME', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, event_rows)
+        if bag_updates:
+            cursor.executemany("""
+                UPDATE blood_bags
+                SET status = 'USED', used_at = CURRENT_TIMESTAMP, used_for = ?
+                WHERE bag_code = ?
+            """, bag_updates)
+            cursor.executemany("""
+                UPDATE blood_inventory
+                SET quantity = quantity - 1
+                WHERE blood_type = ?
+            """, inventory_updates)
+            cursor.executemany("""
+                INSERT INTO blood_events (event_type, blood_type, quantity, operator, remarks)
+                VALUES ('CONSUME', ?, 1, 'MIRS_ENGINE', ?)
+            """, blood_events)
 
         conn.commit()
 
-        logger.info(f"✓ Blood unit consumed: {blood_unit_id} ({bag['blood_type']})")
-
-        return ConsumeResult(
-            item_code=f"BLOOD:{blood_unit_id}",
-            status="CONFIRMED",
-            quantity_deducted=1,
-            remaining_stock=-1  # Blood units are tracked individually
+        logger.info(
+            f"✓ Batch deducted: {len(event_rows)} items, {len(bag_updates)} blood units "
+            f"({len(items) - len(event_rows) - len(bag_updates)} failed)"
         )
+        return results
 
     except Exception as e:
         conn.rollback()
-        logger.error(f"Blood unit consumption failed: {e}")
-        return ConsumeResult(
-            item_code=f"BLOOD:{blood_unit_id}",
-            status="FAILED",
-            quantity_deducted=0,
-            remaining_stock=0,
-            error=f"DB_ERROR: {str(e)}"
-        )
+        logger.error(f"Batch inventory deduction failed: {e}")
+        return [
+            _failed(f"BLOOD:{item.blood_unit_id}" if item.blood_unit_id else item.item_code,
+                    f"DB_ERROR: {str(e)}")
+            for item in items
+        ]
     finally:
         conn.close()
 
@@ -372,9 +350,11 @@ async def consume_inventory(
     1. CIRS 建立 execution 記錄
     2. CIRS 建立 resource_intent (status=PENDING_SYNC)
     3. CIRS 呼叫此端點
-    4. MIRS 扣庫存，回傳結果
+    4. MIRS 扣庫存 (整批單一交易)，回傳結果
     5. CIRS 更新 resource_intent status
 
+    all_or_nothing=true 時任一項失敗則整筆不扣減 (status=FAILED)。
+
     ## Headers
     - X-Station-Token: HMAC signature
     - X-Station-ID: 來源站點 ID
@@ -388,28 +368,7 @@ async def consume_inventory(
     logger.info(f"🔧 Consume request from {station.get('station_id')}: intent={request.intent_id}")
 
     mirs_ref = f"MIRS-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
-    results = []
-
-    for item in request.items:
-        if item.blood_unit_id:
-            # 血品: 使用 unit_id 追蹤
-            result = _deduct_blood_unit(
-                blood_unit_id=item.blood_unit_id,
-                intent_id=request.intent_id,
-                person_id=request.person_id
-            )
-        else:
-            # 一般物品
-            result = _deduct_inventory(
-                item_code=item.item_code,
-                quantity=item.quantity,
-                intent_id=request.intent_id,
-                execution_id=request.execution_id,
-                person_id=request.person_id,
-                operator=request.operator,
-                lot=item.lot
-            )
-        results.append(result)
+    results = _deduct_batch(request)
 
     # 判斷整體狀態
     confirmed_count = sum(1 for r in results if r.status == "CONFIRMED")
@@ -455,15 +414,12 @@ async def get_engine_status():
         today_stats = cursor.fetchone()
 
         # 低庫存警示
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT COUNT(*) as count
             FROM items i
             LEFT JOIN (
-                SELECT item_code,
-                       SUM(CASE WHEN event_type = 'RECEIVE' THEN quantity
-                                WHEN event_type = 'CONSUME' THEN -quantity
-                                ELSE 0 END) as current_stock
-                FROM inventory_events
+                SELECT item_code, SUM({ON_HAND_SQL}) as current_stock
+                FROM item_stock
                 GROUP BY item_code
             ) stock ON i.item_code = stock.item_code
             WHERE COALESCE(stock.current_stock, 0) < i.min_stock
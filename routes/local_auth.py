@@ -12,7 +12,6 @@ import os
 import json
 import hashlib
 import hmac
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import httpx
@@ -28,6 +27,10 @@ from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
+from services.db_pool import get_pool
+from services.cirs_client import get_hub_client
+from services.executor import run_in_executor
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -66,9 +69,7 @@ DB_PATH = os.getenv("MIRS_DB_PATH", "data/mirs.db")
 def get_snapshot_db():
     """Get snapshot database connection"""
     os.makedirs(os.path.dirname(DB_PATH) if os.path.dirname(DB_PATH) else ".", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool(DB_PATH).writer()
 
 
 def init_snapshot_tables():
@@ -146,47 +147,47 @@ async def sync_policy_snapshot(cirs_token: str = None) -> SnapshotSyncResult:
         if cirs_token:
             headers["Authorization"] = f"Bearer {cirs_token}"
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get station ID from env or generate
-            station_id = os.getenv("MIRS_STATION_ID", "MIRS-001")
-
-            response = await client.get(
-                f"{CIRS_HUB_URL}/api/auth/policy-snapshot",
-                params={"station_id": station_id},
-                headers=headers
-            )
+        # Get station ID from env or generate
+        station_id = os.getenv("MIRS_STATION_ID", "MIRS-001")
 
-            if response.status_code == 401:
-                return SnapshotSyncResult(
-                    success=False,
-                    error="Authentication required - please provide CIRS token"
-                )
-
-            if response.status_code != 200:
-                return SnapshotSyncResult(
-                    success=False,
-                    error=f"CIRS returned {response.status_code}: {response.text}"
-                )
+        response = await get_hub_client().get(
+            f"{CIRS_HUB_URL}/api/auth/policy-snapshot",
+            params={"station_id": station_id},
+            headers=headers,
+            timeout=30.0
+        )
 
-            snapshot = response.json()
+        if response.status_code == 401:
+            return SnapshotSyncResult(
+                success=False,
+                error="Authentication required - please provide CIRS token"
+            )
 
-            # Verify signature
-            if not verify_snapshot_signature(snapshot):
-                return SnapshotSyncResult(
-                    success=False,
-                    error="Snapshot signature verification failed"
-                )
+        if response.status_code != 200:
+            return SnapshotSyncResult(
+                success=False,
+                error=f"CIRS returned {response.status_code}: {response.text}"
+            )
 
-            # Store locally
-            store_snapshot(snapshot)
+        snapshot = response.json()
 
+        # Verify signature
+        if not verify_snapshot_signature(snapshot):
             return SnapshotSyncResult(
-                success=True,
-                snapshot_version=snapshot.get('snapshot_version'),
-                user_count=snapshot.get('user_count'),
-                expires_at=snapshot.get('expires_at')
+                success=False,
+                error="Snapshot signature verification failed"
             )
 
+        # Store locally
+        store_snapshot(snapshot)
+
+        return SnapshotSyncResult(
+            success=True,
+            snapshot_version=snapshot.get('snapshot_version'),
+            user_count=snapshot.get('user_count'),
+            expires_at=snapshot.get('expires_at')
+        )
+
     except httpx.RequestError as e:
         logger.warning(f"[MIRS] Failed to sync snapshot: {e}")
         return SnapshotSyncResult(
@@ -465,8 +466,9 @@ async def api_local_login(request: LocalLoginRequest):
 
     使用 Policy Snapshot 進行 PIN 驗證，
     適用於 MIRS 與 CIRS Hub 斷線時。
+    v3.6: bcrypt 驗證 + 快照查詢於 executor "auth" 類別執行 (不阻塞其他平板)
     """
-    return local_login(request.person_id, request.pin)
+    return await run_in_executor("auth", local_login, request.person_id, request.pin)
 
 
 @router.post("/sync-snapshot")
@@ -604,13 +606,12 @@ async def check_hub_connection() -> dict:
         }
 
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{CIRS_HUB_URL}/api/health")
-            return {
-                "connected": response.status_code == 200,
-                "hub_url": CIRS_HUB_URL,
-                "hub_status": response.json() if response.status_code == 200 else None
-            }
+        response = await get_hub_client().get(f"{CIRS_HUB_URL}/api/health")
+        return {
+            "connected": response.status_code == 200,
+            "hub_url": CIRS_HUB_URL,
+            "hub_status": response.json() if response.status_code == 200 else None
+        }
     except Exception as e:
         return {
             "connected": False,
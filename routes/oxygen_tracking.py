@@ -24,6 +24,9 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from services.db_pool import get_pool
+from services.event_bus import get_event_bus, publish_event
+
 # =============================================================================
 # Router Setup
 # =============================================================================
@@ -36,10 +39,8 @@ DB_PATH = os.environ.get("MIRS_DB_PATH", "medical_inventory.db")
 
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get database connection (pooled)"""
+    return get_pool(DB_PATH).writer()
 
 
 # =============================================================================
@@ -169,7 +170,7 @@ def create_oxygen_event(
         json.dumps(payload)
     ))
 
-    return {
+    event = {
         "event_id": event_id,
         "entity_type": "equipment_unit",
         "entity_id": str(entity_id),
@@ -178,6 +179,8 @@ def create_oxygen_event(
         "actor_id": actor_id,
         "payload": payload
     }
+    publish_event(cursor, event)  # SSE fan-out after commit
+    return event
 
 
 # =============================================================================
@@ -885,6 +888,76 @@ async def list_oxygen_units():
 # Phase 9: SSE Endpoint for Cross-Device Sync
 # =============================================================================
 
+SSE_HEARTBEAT_SECONDS = 15
+SSE_DB_CATCHUP_LIMIT = 1000
+
+
+def _event_row_to_message(row) -> dict:
+    """events row (either schema) -> SSE event message"""
+    keys = row.keys()
+    payload = (row['payload_json'] if 'payload_json' in keys else None) or \
+              (row['payload'] if 'payload' in keys else None) or '{}'
+    return {
+        'type': 'event',
+        'event_id': row['event_id'],
+        'entity_type': row['entity_type'],
+        'entity_id': row['entity_id'],
+        'event_type': row['event_type'],
+        'ts_device': row['ts_device'],
+        'payload': json.loads(payload)
+    }
+
+
+def _event_anchor(event_id: str) -> Optional[tuple]:
+    """(ts_device, event_id) of a known event, for DB catch-up."""
+    conn = get_pool(DB_PATH).reader()
+    try:
+        row = conn.execute("SELECT ts_device FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        return (row['ts_device'], event_id) if row else None
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def _latest_event_id() -> str:
+    conn = get_pool(DB_PATH).reader()
+    try:
+        row = conn.execute("SELECT event_id FROM events ORDER BY ts_device DESC LIMIT 1").fetchone()
+        return row['event_id'] if row else ''
+    except sqlite3.OperationalError:
+        return ''
+    finally:
+        conn.close()
+
+
+def _read_events_after(anchor: tuple, entity_type: Optional[str]) -> list:
+    """DB fallback for subscribers the ring buffer no longer covers."""
+    conn = get_pool(DB_PATH).reader()
+    try:
+        ts_device, event_id = anchor
+        rows = conn.execute("""
+            SELECT * FROM events
+            WHERE (ts_device > ? OR (ts_device = ? AND event_id > ?))
+            AND (entity_type = ? OR ? IS NULL)
+            ORDER BY ts_device ASC, event_id ASC
+            LIMIT ?
+        """, (ts_device, ts_device, event_id, entity_type, entity_type, SSE_DB_CATCHUP_LIMIT)).fetchall()
+        return [_event_row_to_message(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def _iter_events_after(anchor: tuple, entity_type: Optional[str]):
+    """All events after anchor, read in SSE_DB_CATCHUP_LIMIT pages."""
+    while True:
+        page = _read_events_after(anchor, entity_type)
+        yield from page
+        if len(page) < SSE_DB_CATCHUP_LIMIT:
+            return
+        anchor = (page[-1]['ts_device'], page[-1]['event_id'])
+
+
 @router.get("/events/stream")
 async def event_stream(
     entity_type: Optional[str] = Query(None),
@@ -894,6 +967,8 @@ async def event_stream(
     Server-Sent Events (SSE) endpoint for cross-device sync.
 
     BioMed / MIRS can subscribe to receive real-time event notifications.
+    Events are pushed from the in-process event bus (no per-client DB polling);
+    since_event_id replays from the ring buffer, or from the DB if too far behind.
 
     Note: This is for cross-device sync. Same-device uses xIRS.Bus (BroadcastChannel).
     """
@@ -911,57 +986,61 @@ async def event_stream(
         )
 
     async def generate() -> AsyncGenerator[str, None]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        last_id = since_event_id
+        bus = get_event_bus()
+        sub = bus.subscribe(entity_type)
 
         # Send connected message
         yield f"data: {json.dumps({'type': 'connected'})}\n\n"
 
         try:
+            anchor = _event_anchor(since_event_id) if since_event_id else None
+            seq = bus.seq_of(since_event_id) if since_event_id else None
+            sent_ids = set()
+
+            if seq is None and anchor:
+                # Client is behind the ring buffer - catch up from the DB once
+                seq = bus.head_seq
+                for event_data in _iter_events_after(anchor, entity_type):
+                    sent_ids.add(event_data['event_id'])
+                    anchor = (event_data['ts_device'], event_data['event_id'])
+                    yield f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
+            elif seq is None:
+                # First connection - just report latest event ID
+                seq = bus.head_seq
+                last_id = bus.last_event_id() or _latest_event_id()
+                anchor = _event_anchor(last_id) if last_id else None
+                yield f"data: {json.dumps({'type': 'sync', 'last_event_id': last_id})}\n\n"
+
             while True:
-                # Query for new events
-                if last_id:
-                    cursor.execute("""
-                        SELECT * FROM events
-                        WHERE id > ?
-                        AND (entity_type = ? OR ? IS NULL)
-                        ORDER BY ts_device ASC
-                        LIMIT 100
-                    """, (last_id, entity_type, entity_type))
-                else:
-                    # First connection - just get latest event ID
-                    cursor.execute("SELECT id FROM events ORDER BY ts_device DESC LIMIT 1")
-                    row = cursor.fetchone()
-                    last_id = row['id'] if row else ''
-                    yield f"data: {json.dumps({'type': 'sync', 'last_event_id': last_id})}\n\n"
-                    await asyncio.sleep(1)
+                items, _ = bus.read_since(seq)
+
+                if items is None:
+                    # Fell out of the ring (slow client) - DB fallback from last delivered event
+                    seq = bus.head_seq
+                    for event_data in (_iter_events_after(anchor, entity_type) if anchor else []):
+                        sent_ids.add(event_data['event_id'])
+                        anchor = (event_data['ts_device'], event_data['event_id'])
+                        yield f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
                     continue
 
-                events = cursor.fetchall()
-
-                for event in events:
-                    event_data = {
-                        'type': 'event',
-                        'event_id': event['event_id'],
-                        'entity_type': event['entity_type'],
-                        'entity_id': event['entity_id'],
-                        'event_type': event['event_type'],
-                        'ts_device': event['ts_device'],
-                        'payload': json.loads(event['payload'])
-                    }
-                    yield f"data: {json.dumps(event_data)}\n\n"
-                    last_id = event['id']
-
-                # Heartbeat every 30 seconds
-                yield f"data: {json.dumps({'type': 'heartbeat', 'ts': int(time.time() * 1000)})}\n\n"
+                for item_seq, event in items:
+                    seq = item_seq
+                    anchor = (event['ts_device'], event['event_id'])
+                    if not sub.matches(event) or event['event_id'] in sent_ids:
+                        continue
+                    yield f"data: {json.dumps({'type': 'event', **event}, ensure_ascii=False)}\n\n"
+                if items:
+                    continue
 
-                await asyncio.sleep(1)  # Poll interval
+                # Caught up - wait for the next publish (heartbeat when idle)
+                sent_ids.clear()
+                if not await sub.wait(SSE_HEARTBEAT_SECONDS):
+                    yield f"data: {json.dumps({'type': 'heartbeat', 'ts': int(time.time() * 1000)})}\n\n"
 
         except asyncio.CancelledError:
             pass
         finally:
-            conn.close()
+            sub.close()
 
     return StreamingResponse(
         generate(),
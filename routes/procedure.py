@@ -31,6 +31,7 @@ XIRS_PROTOCOL_VERSION = "1.1"
 # Try to import httpx (optional dependency)
 try:
     import httpx
+    from services.cirs_client import HubResponseError, get_hub_client, hub_revision_of
     HTTPX_AVAILABLE = True
 except ImportError:
     HTTPX_AVAILABLE = False
@@ -81,66 +82,67 @@ async def get_cirs_waiting_procedure():
             "protocol_version": XIRS_PROTOCOL_VERSION
         })
 
-    hub_revision = 0
+    hub = get_hub_client()
+
+    async def fetch():
+        response = await hub.get(f"{CIRS_HUB_URL}/api/registrations/waiting/procedure")
+        hub_revision = hub_revision_of(response)
+        if response.status_code != 200:
+            raise HubResponseError(response.status_code, hub_revision)
+
+        data = response.json()
+        # Transform CIRS data to MIRS format
+        patients = []
+        for reg in data.get("items", []):
+            patients.append({
+                "registration_id": reg.get("reg_id"),
+                "patient_id": reg.get("person_id"),
+                "patient_ref": reg.get("patient_ref"),
+                "name": reg.get("display_name"),
+                "age_group": reg.get("age_group"),
+                "sex": reg.get("gender"),
+                "triage_category": reg.get("triage"),
+                "priority": reg.get("priority"),
+                "chief_complaint": reg.get("chief_complaint"),
+                "procedure_notes": reg.get("procedure_notes"),
+                "consultation_by": reg.get("consultation_by"),
+                "consultation_completed_at": reg.get("consultation_completed_at"),
+                "waiting_minutes": reg.get("waiting_minutes"),
+                "claimed_by": reg.get("procedure_claimed_by"),
+                "claimed_at": reg.get("procedure_claimed_at")
+            })
+        # v1.2: 加入 timestamp 支援離線判斷
+        hub_timestamp = response.headers.get("Date", datetime.now().isoformat())
+        return {"patients": patients, "hub_timestamp": hub_timestamp}, hub_revision
 
     try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            response = await client.get(
-                f"{CIRS_HUB_URL}/api/registrations/waiting/procedure"
-            )
-
-            hub_revision = int(response.headers.get("X-XIRS-Hub-Revision", 0))
-
-            if response.status_code == 200:
-                data = response.json()
-                # Transform CIRS data to MIRS format
-                patients = []
-                for reg in data.get("items", []):
-                    patients.append({
-                        "registration_id": reg.get("reg_id"),
-                        "patient_id": reg.get("person_id"),
-                        "patient_ref": reg.get("patient_ref"),
-                        "name": reg.get("display_name"),
-                        "age_group": reg.get("age_group"),
-                        "sex": reg.get("gender"),
-                        "triage_category": reg.get("triage"),
-                        "priority": reg.get("priority"),
-                        "chief_complaint": reg.get("chief_complaint"),
-                        "procedure_notes": reg.get("procedure_notes"),
-                        "consultation_by": reg.get("consultation_by"),
-                        "consultation_completed_at": reg.get("consultation_completed_at"),
-                        "waiting_minutes": reg.get("waiting_minutes"),
-                        "claimed_by": reg.get("procedure_claimed_by"),
-                        "claimed_at": reg.get("procedure_claimed_at")
-                    })
-
-                # v1.2: 加入 timestamp 支援離線判斷
-                local_timestamp = datetime.now().isoformat()
-                hub_timestamp = response.headers.get("Date", local_timestamp)
-
-                return make_xirs_response({
-                    "online": True,
-                    "source": "cirs_hub",
-                    "queue": "PROCEDURE",
-                    "patients": patients,
-                    "count": len(patients),
-                    "protocol_version": XIRS_PROTOCOL_VERSION,
-                    "hub_timestamp": hub_timestamp,
-                    "local_timestamp": local_timestamp
-                }, hub_revision)
-            else:
-                logger.warning(f"CIRS Hub waiting/procedure returned {response.status_code}")
-                return make_xirs_response({
-                    "online": False,
-                    "source": "offline",
-                    "queue": "PROCEDURE",
-                    "patients": [],
-                    "count": 0,
-                    "error": f"CIRS returned status {response.status_code}",
-                    "protocol_version": XIRS_PROTOCOL_VERSION,
-                    "local_timestamp": datetime.now().isoformat()
-                }, hub_revision)
+        # v1.3: 共用 Hub client + stale-while-revalidate 快取
+        entry, from_cache = await hub.cache.get("waiting-procedure", fetch)
+        return make_xirs_response({
+            "online": hub.is_available,
+            "source": "cache" if from_cache else "cirs_hub",
+            "cached": from_cache,
+            "cache_age_seconds": round(entry.age(), 1),
+            "queue": "PROCEDURE",
+            "patients": entry.value["patients"],
+            "count": len(entry.value["patients"]),
+            "protocol_version": XIRS_PROTOCOL_VERSION,
+            "hub_timestamp": entry.value["hub_timestamp"],
+            "local_timestamp": datetime.now().isoformat()
+        }, entry.hub_revision)
 
+    except HubResponseError as e:
+        logger.warning(f"CIRS Hub waiting/procedure returned {e.status_code}")
+        return make_xirs_response({
+            "online": False,
+            "source": "offline",
+            "queue": "PROCEDURE",
+            "patients": [],
+            "count": 0,
+            "error": str(e),
+            "protocol_version": XIRS_PROTOCOL_VERSION,
+            "local_timestamp": datetime.now().isoformat()
+        }, e.hub_revision)
     except httpx.TimeoutException:
         logger.warning("CIRS Hub timeout for waiting/procedure")
         return make_xirs_response({
@@ -199,18 +201,19 @@ async def notify_cirs_procedure_claim(registration_id: str, actor_id: str) -> bo
         return False
 
     try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            response = await client.post(
-                f"{CIRS_HUB_URL}/api/registrations/{registration_id}/role-claim",
-                json={"role": "PROCEDURE", "actor_id": actor_id}
-            )
-
-            if response.status_code == 200:
-                logger.info(f"Successfully claimed registration {registration_id} for PROCEDURE")
-                return True
-            else:
-                logger.warning(f"Failed to claim registration: {response.status_code}")
-                return False
+        hub = get_hub_client()
+        response = await hub.post(
+            f"{CIRS_HUB_URL}/api/registrations/{registration_id}/role-claim",
+            json={"role": "PROCEDURE", "actor_id": actor_id}
+        )
+
+        if response.status_code == 200:
+            hub.cache.invalidate("waiting-procedure")
+            logger.info(f"Successfully claimed registration {registration_id} for PROCEDURE")
+            return True
+        else:
+            logger.warning(f"Failed to claim registration: {response.status_code}")
+            return False
 
     except Exception as e:
         logger.warning(f"Failed to notify CIRS of procedure claim: {e}")
@@ -243,21 +246,20 @@ async def notify_cirs_procedure_done(
         return False
 
     try:
-        async with httpx.AsyncClient(timeout=CIRS_TIMEOUT) as client:
-            response = await client.post(
-                f"{CIRS_HUB_URL}/api/registrations/{registration_id}/procedure-done",
-                json={
-                    "procedure_record_id": procedure_record_id,
-                    "actor_id": actor_id
-                }
-            )
-
-            if response.status_code == 200:
-                logger.info(f"Successfully notified CIRS procedure done for {registration_id}")
-                return True
-            else:
-                logger.warning(f"Failed to notify procedure done: {response.status_code}")
-                return False
+        response = await get_hub_client().post(
+            f"{CIRS_HUB_URL}/api/registrations/{registration_id}/procedure-done",
+            json={
+                "procedure_record_id": procedure_record_id,
+                "actor_id": actor_id
+            }
+        )
+
+        if response.status_code == 200:
+            logger.info(f"Successfully notified CIRS procedure done for {registration_id}")
+            return True
+        else:
+            logger.warning(f"Failed to notify procedure done: {response.status_code}")
+            return False
 
     except Exception as e:
         logger.warning(f"Failed to notify CIRS of procedure completion: {e}")
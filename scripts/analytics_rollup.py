@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+MIRS Analytics Rollup Maintenance Script
+Verifies or rebuilds (backfills) the daily analytics rollups by replaying
+anesthesia_cases / anesthesia_events.
+
+Usage:
+    python scripts/analytics_rollup.py --verify
+    python scripts/analytics_rollup.py --rebuild
+    python scripts/analytics_rollup.py --verify --db /path/to/medical_inventory.db
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.analytics_rollup import (
+    rebuild_analytics_rollups, rollup_sources_present, verify_analytics_rollups,
+)
+
+# Configuration
+DB_PATH = Path(__file__).parent.parent / "medical_inventory.db"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify / rebuild MIRS analytics rollups")
+    parser.add_argument("--db", default=str(DB_PATH), help="Database path")
+    parser.add_argument("--verify", action="store_true", help="Report drift between rollups and source tables")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild rollups from source tables (backfill)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"MIRS Analytics Rollups")
+        print(f"=" * 50)
+        print(f"Database: {args.db}")
+
+        if not rollup_sources_present(conn.cursor()):
+            print("❌ anesthesia_cases / anesthesia_events not found (anesthesia module not initialized)")
+            return 1
+
+        if args.rebuild:
+            rows = rebuild_analytics_rollups(conn)
+            for table, count in rows.items():
+                print(f"\n✅ {table} rebuilt: {count} rows")
+
+        report = verify_analytics_rollups(conn)
+        print(f"\nChecked: {report['checked']} rollup rows")
+        if report['ok']:
+            print("✅ No drift")
+            return 0
+
+        print(f"❌ Drift: {len(report['drift'])} mismatches")
+        for d in report['drift'][:50]:
+            print(f"  - {d['table']} {d['key']} {d['column']}: "
+                  f"expected {d['expected']}, actual {d['actual']}")
+        if not args.rebuild:
+            print("\nRun with --rebuild to repair.")
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    exit(main())
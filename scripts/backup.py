@@ -10,11 +10,15 @@ Usage:
 """
 
 import argparse
-import shutil
 import sqlite3
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backup_engine import backup_to_file
+
 # Configuration
 DB_PATH = Path(__file__).parent.parent / "medical_inventory.db"
 BACKUP_DIR = Path(__file__).parent.parent / "backups"
@@ -68,19 +72,14 @@ def backup_database(version: str = None, label: str = None) -> Path:
     backup_name = "_".join(parts) + ".db"
     backup_path = BACKUP_DIR / backup_name
 
-    # Copy database
-    shutil.copy2(DB_PATH, backup_path)
+    # Online backup (consistent even while the server is writing; includes -wal pages).
+    # backup_to_file runs PRAGMA quick_check on the snapshot - file sizes no longer
+    # match the live DB (WAL / free pages), so the old size check does not apply.
+    backup_to_file(str(DB_PATH), backup_path)
 
-    # Verify backup
     if not backup_path.exists():
         raise RuntimeError("Backup file was not created")
 
-    original_size = DB_PATH.stat().st_size
-    backup_size = backup_path.stat().st_size
-
-    if original_size != backup_size:
-        raise RuntimeError(f"Backup size mismatch: {original_size} vs {backup_size}")
-
     return backup_path
 
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+MIRS Event Digest Maintenance Script
+Verifies or rebuilds (backfills) the Merkle-range event digest by replaying
+the events table, and prints the current root.
+
+Usage:
+    python scripts/event_digest.py --verify
+    python scripts/event_digest.py --rebuild
+    python scripts/event_digest.py --verify --db /path/to/medical_inventory.db
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.event_digest import (
+    digest_root, digest_source_present, rebuild_event_digest, verify_event_digest,
+)
+
+# Configuration
+DB_PATH = Path(__file__).parent.parent / "medical_inventory.db"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify / rebuild the MIRS event digest")
+    parser.add_argument("--db", default=str(DB_PATH), help="Database path")
+    parser.add_argument("--verify", action="store_true", help="Report drift between digest buckets and events")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild digest buckets from events (backfill)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"MIRS Event Digest")
+        print(f"=" * 50)
+        print(f"Database: {args.db}")
+
+        if not digest_source_present(conn.cursor()):
+            print("❌ Unified events table not found (run migrations first)")
+            return 1
+
+        if args.rebuild:
+            print(f"\n✅ Rebuilt {rebuild_event_digest(conn)} buckets")
+        elif not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_digest_buckets'").fetchone():
+            print("❌ event_digest_buckets not found (run migrations, or --rebuild)")
+            return 2
+
+        report = verify_event_digest(conn)
+        print(f"\nChecked: {report['checked']} buckets")
+        if report['ok']:
+            root = digest_root(conn)
+            print(f"✅ No drift - root {root['root']} over {root['events_count']} events")
+            return 0
+
+        print(f"❌ Drift: {len(report['drift'])} buckets")
+        for d in report['drift'][:50]:
+            print(f"  - bucket {d['bucket']}: expected {d['expected']}, actual {d['actual']}")
+        if not args.rebuild:
+            print("\nRun with --rebuild to repair.")
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    exit(main())
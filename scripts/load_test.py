@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+MIRS Multi-Worker Load Test
+Starts `python main.py --workers N` for each N against a scratch database and
+measures throughput / latency of typical PWA read endpoints, showing how the
+server scales across cores.
+
+Usage:
+    python scripts/load_test.py                          # workers 1,2,4 - 15 s each
+    python scripts/load_test.py --workers 1,4 --duration 30 --concurrency 64
+    python scripts/load_test.py --url http://192.168.1.10:8000   # existing server only
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+DEFAULT_PATHS = [
+    "/api/items",
+    "/api/stats",
+    "/api/equipment/status",
+    "/api/inventory/events?limit=50",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def wait_ready(base_url, timeout=90):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/api/health") as resp:
+                    if resp.status == 200:
+                        return True
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    return False
+
+
+async def run_load(base_url, paths, duration, concurrency):
+    latencies = []
+    errors = 0
+    pids = set()
+    stop_at = time.monotonic() + duration
+
+    async def client(session, offset):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                async with session.get(f"{base_url}{path}") as resp:
+                    await resp.read()
+                    if resp.status >= 400:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.monotonic()
+        await asyncio.gather(*(client(session, n) for n in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+        # 各 worker 的 /api/health 回報自己的 pid: 確認請求確實分散
+        for _ in range(concurrency * 2):
+            async with session.get(f"{base_url}/api/health") as resp:
+                pids.add((await resp.json()).get("workers", {}).get("pid"))
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "pids": len(pids),
+    }
+
+
+def start_server(workers, port, workdir):
+    env = dict(os.environ, MIRS_PORT=str(port), MIRS_WORKERS=str(workers),
+               MIRS_DB_PATH=str(workdir / "medical_inventory.db"))
+    return subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "main.py"), "--workers", str(workers)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def print_row(label, result, baseline):
+    speedup = result["rps"] / baseline if baseline else 1.0
+    print(f"{label:>8} | {result['rps']:>9.1f} | {result['p50']:>7.1f} | {result['p95']:>7.1f} | "
+          f"{result['errors']:>6} | {result['pids']:>4} | {speedup:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MIRS multi-worker load test")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the spawned servers")
+    parser.add_argument("--paths", default=",".join(DEFAULT_PATHS), help="Comma-separated GET paths")
+    parser.add_argument("--url", help="Benchmark an already running server instead")
+    args = parser.parse_args()
+    paths = [p for p in args.paths.split(",") if p]
+
+    print(f"MIRS Load Test")
+    print(f"=" * 70)
+    print(f"CPU cores: {os.cpu_count()}  concurrency: {args.concurrency}  duration: {args.duration}s")
+    print(f"Paths: {', '.join(paths)}")
+    print(f"=" * 70)
+    print(f"{'workers':>8} | {'req/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'errors':>6} | {'pids':>4} | speedup")
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+        if not asyncio.run(wait_ready(base_url)):
+            print(f"❌ Server not reachable: {base_url}")
+            return 1
+        print_row("remote", asyncio.run(run_load(base_url, paths, args.duration, args.concurrency)), 0)
+        return 0
+
+    baseline = 0.0
+    workdir = Path(tempfile.mkdtemp(prefix="mirs-load-"))
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            process = start_server(workers, args.port, workdir)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                if not asyncio.run(wait_ready(base_url)):
+                    print(f"❌ Server with {workers} workers did not start")
+                    return 1
+                asyncio.run(run_load(base_url, paths, 2, args.concurrency))   # warm-up
+                result = asyncio.run(run_load(base_url, paths, args.duration, args.concurrency))
+            finally:
+                stop_server(process)
+            baseline = baseline or result["rps"]
+            print_row(str(workers), result, baseline)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"=" * 70)
+    if (os.cpu_count() or 1) < 2:
+        print("⚠️  Single-core host: more workers cannot add throughput here")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
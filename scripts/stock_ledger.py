@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+MIRS Stock Ledger Maintenance Script
+Verifies or rebuilds the item_stock projection by replaying inventory_events.
+
+Usage:
+    python scripts/stock_ledger.py --verify
+    python scripts/stock_ledger.py --rebuild
+    python scripts/stock_ledger.py --verify --db /path/to/medical_inventory.db
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.stock_ledger import rebuild_item_stock, verify_item_stock
+
+# Configuration
+DB_PATH = Path(__file__).parent.parent / "medical_inventory.db"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify / rebuild MIRS item_stock ledger")
+    parser.add_argument("--db", default=str(DB_PATH), help="Database path")
+    parser.add_argument("--verify", action="store_true", help="Report drift between item_stock and inventory_events")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild item_stock from inventory_events")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"MIRS Stock Ledger")
+        print(f"=" * 50)
+        print(f"Database: {args.db}")
+
+        if args.rebuild:
+            rows = rebuild_item_stock(conn)
+            print(f"\n✅ item_stock rebuilt: {rows} rows")
+
+        report = verify_item_stock(conn)
+        print(f"\nChecked: {report['checked']} (station, item) pairs")
+        if report['ok']:
+            print("✅ No drift")
+            return 0
+
+        print(f"❌ Drift: {len(report['drift'])} mismatches")
+        for d in report['drift'][:50]:
+            print(f"  - {d['station_id']}/{d['item_code']} {d['column']}: "
+                  f"expected {d['expected']}, actual {d['actual']}")
+        if not args.rebuild:
+            print("\nRun with --rebuild to repair.")
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,265 @@
+"""
+MIRS Analytics Rollups - Pre-aggregated daily tables for the analytics dashboard
+
+Provides:
+- rollup_case_daily        (day, status): case count + anesthesia / surgery minutes
+- rollup_medication_daily  (day, drug_name, unit): administrations + total dose
+- rollup_resource_daily    (day, unit_id, event_type): RESOURCE_CLAIM / CHECK /
+                           RELEASE counts + cylinder level drop (oxygen liters)
+- Triggers on anesthesia_cases / anesthesia_events keeping the rollups in step
+  (updated inside the same transaction as the source write, like item_stock)
+- Rebuild / verify by replaying the source tables (backfill job)
+
+Triggers and the replay are generated from the same ROLLUPS spec, so an
+incremental update and a full backfill always agree.
+
+Usage:
+    python scripts/analytics_rollup.py --verify
+    python scripts/analytics_rollup.py --rebuild
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Rollup Definitions
+# =============================================================================
+
+
+def _json(field: str) -> str:
+    """json_extract on the row payload; malformed JSON yields NULL instead of aborting the write."""
+    return f"json_extract(CASE WHEN json_valid({{r}}.payload) THEN {{r}}.payload END, '$.{field}')"
+
+
+def _minutes(start: str, end: str) -> str:
+    return f"(julianday({{r}}.{end}) - julianday({{r}}.{start})) * 24 * 60"
+
+
+@dataclass(frozen=True)
+class Rollup:
+    table: str
+    source: str
+    keys: Tuple[Tuple[str, str], ...]        # (column, expression over {r})
+    measures: Tuple[Tuple[str, str], ...]    # (column, per-row value over {r})
+    where: str                               # row filter over {r}
+    watch: Tuple[str, ...]                   # source columns that move a row between buckets
+    indexes: Tuple[Tuple[str, str], ...] = ()
+
+    def expr(self, template: str, prefix: str) -> str:
+        return template.replace("{r}", prefix)
+
+    @property
+    def key_columns(self) -> List[str]:
+        return [c for c, _ in self.keys]
+
+    @property
+    def measure_columns(self) -> List[str]:
+        return [c for c, _ in self.measures]
+
+
+ROLLUPS = [
+    Rollup(
+        table="rollup_case_daily",
+        source="anesthesia_cases",
+        keys=(
+            ("day", "COALESCE(date({r}.created_at), '')"),
+            ("status", "COALESCE({r}.status, '')"),
+        ),
+        measures=(
+            ("case_count", "1"),
+            ("anesthesia_min_sum", f"COALESCE({_minutes('anesthesia_start_at', 'anesthesia_end_at')}, 0)"),
+            ("anesthesia_min_n", f"({_minutes('anesthesia_start_at', 'anesthesia_end_at')}) IS NOT NULL"),
+            ("surgery_min_sum", f"COALESCE({_minutes('surgery_start_at', 'surgery_end_at')}, 0)"),
+            ("surgery_min_n", f"({_minutes('surgery_start_at', 'surgery_end_at')}) IS NOT NULL"),
+        ),
+        where="1",
+        watch=("created_at", "status", "anesthesia_start_at", "anesthesia_end_at",
+               "surgery_start_at", "surgery_end_at"),
+        indexes=(("idx_rollup_case_daily_status", "status, day"),),
+    ),
+    Rollup(
+        table="rollup_medication_daily",
+        source="anesthesia_events",
+        keys=(
+            ("day", "COALESCE(date({r}.clinical_time), '')"),
+            ("drug_name", f"COALESCE({_json('drug_name')}, '')"),
+            ("unit", f"COALESCE({_json('unit')}, '')"),
+        ),
+        measures=(
+            ("administrations", "1"),
+            ("total_dose", f"COALESCE(CAST({_json('dose')} AS REAL), 0)"),
+            ("dose_count", f"{_json('dose')} IS NOT NULL"),
+        ),
+        where="{r}.event_type = 'MEDICATION_ADMIN'",
+        watch=("event_type", "clinical_time", "payload"),
+    ),
+    Rollup(
+        table="rollup_resource_daily",
+        source="anesthesia_events",
+        keys=(
+            ("day", "COALESCE(date({r}.clinical_time), '')"),
+            ("unit_id", f"CAST({_json('unit_id')} AS TEXT)"),
+            ("event_type", "{r}.event_type"),
+        ),
+        measures=(
+            ("event_count", "1"),
+            ("level_drop_percent",
+             f"COALESCE(CAST({_json('level_before')} AS REAL) - CAST({_json('level_after')} AS REAL), 0)"),
+        ),
+        where=f"{{r}}.event_type IN ('RESOURCE_CLAIM', 'RESOURCE_CHECK', 'RESOURCE_RELEASE') "
+              f"AND {_json('unit_id')} IS NOT NULL",
+        watch=("event_type", "clinical_time", "payload"),
+        indexes=(("idx_rollup_resource_daily_unit", "unit_id, event_type"),),
+    ),
+]
+
+ROLLUP_SOURCES = sorted({r.source for r in ROLLUPS})
+
+
+def _upsert_sql(rollup: Rollup, prefix: str, sign: str) -> str:
+    """UPSERT applying one source row (NEW/OLD) to the rollup (used inside triggers)."""
+    columns = rollup.key_columns + rollup.measure_columns
+    values = [rollup.expr(e, prefix) for _, e in rollup.keys] + \
+             [f"{sign}({rollup.expr(e, prefix)})" for _, e in rollup.measures]
+    updates = ",\n                ".join(f"{c} = {c} + excluded.{c}" for c in rollup.measure_columns)
+    return f"""
+        INSERT INTO {rollup.table} ({", ".join(columns)})
+        SELECT {", ".join(values)}
+        WHERE ({rollup.expr(rollup.where, prefix)})
+        ON CONFLICT({", ".join(rollup.key_columns)}) DO UPDATE SET
+                {updates};
+    """
+
+
+def _replay_select(rollup: Rollup) -> str:
+    keys = [rollup.expr(e, "src") for _, e in rollup.keys]
+    sums = [f"SUM({rollup.expr(e, 'src')}) AS {c}" for c, e in rollup.measures]
+    return f"""
+        SELECT {", ".join(f"{k} AS {c}" for k, c in zip(keys, rollup.key_columns))},
+               {", ".join(sums)}
+        FROM {rollup.source} AS src
+        WHERE ({rollup.expr(rollup.where, "src")})
+        GROUP BY {", ".join(keys)}
+    """
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+
+def rollup_sources_present(cursor: sqlite3.Cursor) -> bool:
+    placeholders = ",".join("?" * len(ROLLUP_SOURCES))
+    cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+                   ROLLUP_SOURCES)
+    return cursor.fetchone()[0] == len(ROLLUP_SOURCES)
+
+
+def ensure_analytics_rollup_schema(cursor: sqlite3.Cursor):
+    """
+    Create rollup tables and their source triggers (idempotent).
+
+    Must be called after anesthesia_cases / anesthesia_events exist.
+    """
+    for rollup in ROLLUPS:
+        key_defs = ", ".join(f"{c} TEXT NOT NULL" for c in rollup.key_columns)
+        measure_defs = ", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in rollup.measure_columns)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup.table} (
+                {key_defs},
+                {measure_defs},
+                PRIMARY KEY ({", ".join(rollup.key_columns)})
+            )
+        """)
+        for name, columns in rollup.indexes:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {rollup.table}({columns})")
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{rollup.table}_ai
+            AFTER INSERT ON {rollup.source}
+            BEGIN
+                {_upsert_sql(rollup, 'NEW', '')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{rollup.table}_ad
+            AFTER DELETE ON {rollup.source}
+            BEGIN
+                {_upsert_sql(rollup, 'OLD', '-')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{rollup.table}_au
+            AFTER UPDATE OF {", ".join(rollup.watch)} ON {rollup.source}
+            BEGIN
+                {_upsert_sql(rollup, 'OLD', '-')}
+                {_upsert_sql(rollup, 'NEW', '')}
+            END
+        """)
+
+
+# =============================================================================
+# Rebuild / Verify
+# =============================================================================
+
+def replay_analytics_rollups(cursor: sqlite3.Cursor) -> Dict[str, int]:
+    """
+    Rewrite every rollup from its source table (no commit; caller owns the transaction).
+
+    Returns:
+        {rollup table: rows written}
+    """
+    ensure_analytics_rollup_schema(cursor)
+    written = {}
+    for rollup in ROLLUPS:
+        cursor.execute(f"DELETE FROM {rollup.table}")
+        columns = rollup.key_columns + rollup.measure_columns
+        cursor.execute(f"INSERT INTO {rollup.table} ({', '.join(columns)}) {_replay_select(rollup)}")
+        written[rollup.table] = cursor.rowcount
+    return written
+
+
+def rebuild_analytics_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Backfill: replay the source tables and rewrite all rollups from scratch."""
+    written = replay_analytics_rollups(conn.cursor())
+    conn.commit()
+    logger.info(f"[AnalyticsRollup] rollups rebuilt: {written}")
+    return written
+
+
+def verify_analytics_rollups(conn: sqlite3.Connection) -> Dict:
+    """
+    Replay the source tables and compare against the stored rollups.
+
+    Returns:
+        {"ok": bool, "checked": int, "drift": [{table, key, column, expected, actual}]}
+    """
+    cursor = conn.cursor()
+    drift: List[Dict] = []
+    checked = 0
+    for rollup in ROLLUPS:
+        n_keys = len(rollup.keys)
+        columns = rollup.measure_columns
+
+        cursor.execute(_replay_select(rollup))
+        expected = {tuple(row[:n_keys]): row[n_keys:] for row in cursor.fetchall()}
+        cursor.execute(f"SELECT {', '.join(rollup.key_columns + columns)} FROM {rollup.table}")
+        actual = {tuple(row[:n_keys]): row[n_keys:] for row in cursor.fetchall()}
+
+        zero = (0,) * len(columns)
+        for key in sorted(set(expected) | set(actual)):
+            checked += 1
+            exp = expected.get(key, zero)
+            act = actual.get(key, zero)
+            for col, e, a in zip(columns, exp, act):
+                if abs((e or 0) - (a or 0)) > 1e-6:
+                    drift.append({"table": rollup.table, "key": list(key),
+                                  "column": col, "expected": e, "actual": a})
+
+    return {"ok": not drift, "checked": checked, "drift": drift}
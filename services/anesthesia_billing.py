@@ -16,6 +16,8 @@ from enum import Enum
 from typing import Optional, Tuple, List, Dict, Any
 from dataclasses import dataclass
 
+from .db_pool import get_pool
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -204,9 +206,7 @@ def calculate_billing_quantity(
 
 def get_db_connection(db_path: str = "database/mirs.db") -> sqlite3.Connection:
     """取得資料庫連線"""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool(db_path).writer()
 
 
 def get_medicine_info(cursor: sqlite3.Cursor, medicine_code: str) -> Optional[MedicineInfo]:
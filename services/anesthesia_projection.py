@@ -0,0 +1,272 @@
+"""
+MIRS Anesthesia Case Projection - Incremental per-case state cache
+
+Provides:
+- In-memory projection of anesthesia_events per case (parsed payloads,
+  chronological order, grouping by timeline section)
+- Per-case version derived from the DB (MAX(rowid) + row count), so every
+  worker hands out the same version for the same rows and readers can ask
+  any worker for deltas (?since_version=)
+- Incremental apply from writers (after commit) and cheap DB validation
+  on read (COUNT + MAX(rowid)), so rows written by other paths
+  (sync batch, billing, other workers) are picked up without a full reload
+- Cached derived state (e.g. PDF state = f(events)) per version
+
+Environment:
+- MIRS_CASE_PROJECTION_MAX   cases kept in memory (default: 32, LRU)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import bisect
+import copy
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .db_pool import after_commit
+
+logger = logging.getLogger(__name__)
+
+CASE_PROJECTION_MAX = int(os.environ.get("MIRS_CASE_PROJECTION_MAX", "32"))
+
+# version = (max_rowid << VERSION_COUNT_BITS) | row count
+VERSION_COUNT_BITS = 20
+_VERSION_COUNT_MASK = (1 << VERSION_COUNT_BITS) - 1
+
+# Timeline 分組 (v1.6.1 擴充分組)
+TIMELINE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    'vitals': ('VITAL_SIGN',),
+    'medications': ('MEDICATION_ADMIN',),
+    'vasoactive': ('VASOACTIVE_BOLUS', 'VASOACTIVE_INFUSION'),
+    'fluids': ('FLUID_IN', 'FLUID_OUT', 'FLUID_BOLUS', 'BLOOD_PRODUCT'),
+    'airway': ('AIRWAY_EVENT', 'VENT_SETTING_CHANGE'),
+    'anesthesia_depth': ('ANESTHESIA_DEPTH_ADJUST',),
+    'milestones': ('MILESTONE',),
+    'labs': ('LAB_RESULT_POINT',),
+    'positioning': ('POSITION_CHANGE',),
+    'notes': ('NOTE', 'PROCEDURE_NOTE'),
+}
+_GROUP_OF = {t: group for group, types in TIMELINE_GROUPS.items() for t in types}
+
+
+class _Entry:
+    __slots__ = ('rowid', 'sort_key', 'event', 'raw_payload')
+
+    def __init__(self, rowid: int, row: Dict[str, Any]):
+        self.rowid = rowid
+        self.raw_payload = row.get('payload')
+        event = dict(row)
+        event.pop('rowid', None)
+        event['payload'] = json.loads(self.raw_payload) if self.raw_payload else {}
+        self.event = event
+        # Same ordering as "ORDER BY clinical_time ASC, recorded_at ASC"
+        self.sort_key = (event.get('clinical_time') or '', event.get('recorded_at') or '', rowid)
+
+    @property
+    def is_correction(self) -> bool:
+        return bool(self.event.get('is_correction'))
+
+
+class CaseProjection:
+    """Projection of one case. Mutated only under the store lock."""
+
+    def __init__(self, case_id: str):
+        self.case_id = case_id
+        self.max_rowid = 0
+        self._entries: List[_Entry] = []
+        self._keys: List[tuple] = []
+        self._rowids = set()
+        self._derived: Dict[str, Tuple[int, Any]] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self._entries)
+
+    @property
+    def version(self) -> int:
+        """Same value in every worker for the same rows (no per-process counter)."""
+        return (self.max_rowid << VERSION_COUNT_BITS) | (self.count & _VERSION_COUNT_MASK)
+
+    def apply(self, row: Dict[str, Any]) -> bool:
+        """Apply one anesthesia_events row (with rowid). Returns False if already applied."""
+        rowid = row['rowid']
+        if rowid in self._rowids:
+            return False
+        entry = _Entry(rowid, row)
+        pos = bisect.bisect_right(self._keys, entry.sort_key)
+        self._keys.insert(pos, entry.sort_key)
+        self._entries.insert(pos, entry)
+        self._rowids.add(rowid)
+        self.max_rowid = max(self.max_rowid, rowid)
+        return True
+
+    def _select(self, include_corrections: bool, event_types: Optional[Iterable[str]],
+                since_version: Optional[int]) -> List[_Entry]:
+        types = set(event_types) if event_types else None
+        since_rowid = None if since_version is None else since_version >> VERSION_COUNT_BITS
+        return [
+            e for e in self._entries
+            if (include_corrections or not e.is_correction)
+            and (types is None or e.event['event_type'] in types)
+            and (since_rowid is None or e.rowid > since_rowid)
+        ]
+
+    def events(self, include_corrections: bool = False, event_types: Optional[Iterable[str]] = None,
+               since_version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Parsed events in chronological order."""
+        return [e.event for e in self._select(include_corrections, event_types, since_version)]
+
+    def raw_events(self) -> List[Dict[str, Any]]:
+        """Events with the stored JSON payload (input of _rebuild_state_from_events)."""
+        return [{**e.event, 'payload': e.raw_payload} for e in self._entries]
+
+    def grouped(self, since_version: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Timeline grouping in one pass (corrections excluded)."""
+        groups: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TIMELINE_GROUPS}
+        all_events = []
+        for e in self._select(False, None, since_version):
+            all_events.append(e.event)
+            group = _GROUP_OF.get(e.event['event_type'])
+            if group:
+                groups[group].append(e.event)
+        groups['all'] = all_events
+        return groups
+
+    def counts_by_type(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for e in self._entries:
+            if not e.is_correction:
+                counts[e.event['event_type']] = counts.get(e.event['event_type'], 0) + 1
+        return counts
+
+    def late_entry_count(self) -> int:
+        return sum(1 for e in self._entries if e.raw_payload and '_late_entry' in e.raw_payload)
+
+    def derived(self, name: str, builder: Callable[['CaseProjection'], Any]) -> Any:
+        """Derived value cached per version (returned as a deep copy)."""
+        cached = self._derived.get(name)
+        if not cached or cached[0] != self.version:
+            cached = (self.version, builder(self))
+            self._derived[name] = cached
+        return copy.deepcopy(cached[1])
+
+    def is_full(self, since_version: Optional[int]) -> bool:
+        """
+        True if a client at since_version cannot be served a delta.
+
+        A delta is only valid while the rows the client already has are all
+        still there: same number of rows up to its max rowid (deletes, or a
+        version this DB never produced, force a full reload).
+        """
+        if since_version is None or since_version < 0:
+            return True
+        since_rowid = since_version >> VERSION_COUNT_BITS
+        if since_rowid > self.max_rowid:
+            return True
+        kept = sum(1 for rowid in self._rowids if rowid <= since_rowid)
+        return kept & _VERSION_COUNT_MASK != since_version & _VERSION_COUNT_MASK
+
+
+class ProjectionStore:
+    """LRU of case projections validated against anesthesia_events."""
+
+    def __init__(self, max_cases: int = CASE_PROJECTION_MAX):
+        self.max_cases = max_cases
+        self._lock = threading.RLock()
+        self._cases: 'OrderedDict[str, CaseProjection]' = OrderedDict()
+        self._stats = {"hits": 0, "incremental": 0, "rebuilds": 0, "applied": 0}
+
+    def get(self, cursor, case_id: str) -> CaseProjection:
+        """
+        Projection for a case, synchronized with the DB.
+
+        Cost when nothing changed: one COUNT/MAX(rowid) query on the case index.
+        """
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM anesthesia_events WHERE case_id = ?
+        """, (case_id,))
+        count, max_rowid = cursor.fetchone()
+
+        with self._lock:
+            proj = self._cases.get(case_id)
+            if proj is not None:
+                self._cases.move_to_end(case_id)
+                if proj.count == count and proj.max_rowid == max_rowid:
+                    self._stats["hits"] += 1
+                    return proj
+
+                if max_rowid > proj.max_rowid and count > proj.count:
+                    cursor.execute("""
+                        SELECT rowid, * FROM anesthesia_events
+                        WHERE case_id = ? AND rowid > ?
+                        ORDER BY rowid
+                    """, (case_id, proj.max_rowid))
+                    for row in cursor.fetchall():
+                        proj.apply(dict(row))
+                    if proj.count == count:
+                        self._stats["incremental"] += 1
+                        return proj
+
+            # Full rebuild (first read, deleted rows, or gaps)
+            new_proj = CaseProjection(case_id)
+            cursor.execute("""
+                SELECT rowid, * FROM anesthesia_events WHERE case_id = ? ORDER BY rowid
+            """, (case_id,))
+            for row in cursor.fetchall():
+                new_proj.apply(dict(row))
+            self._stats["rebuilds"] += 1
+
+            self._cases[case_id] = new_proj
+            self._cases.move_to_end(case_id)
+            while len(self._cases) > self.max_cases:
+                self._cases.popitem(last=False)
+            return new_proj
+
+    def apply(self, case_id: str, row: Dict[str, Any]):
+        """Apply a committed row to a cached projection (no-op if not cached)."""
+        with self._lock:
+            proj = self._cases.get(case_id)
+            if proj is not None and proj.apply(row):
+                self._stats["applied"] += 1
+
+    def invalidate(self, case_id: Optional[str] = None):
+        with self._lock:
+            if case_id is None:
+                self._cases.clear()
+            else:
+                self._cases.pop(case_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cases": len(self._cases), "max_cases": self.max_cases, **self._stats}
+
+
+_store = ProjectionStore()
+
+
+def get_projection_store() -> ProjectionStore:
+    """Get the process-wide case projection store."""
+    return _store
+
+
+def project_inserted_event(cursor, case_id: str):
+    """
+    Schedule the row just inserted with this cursor for the case projection.
+
+    Call right after INSERT INTO anesthesia_events; the row is applied once
+    the transaction commits (dropped on rollback).
+    """
+    rowid = cursor.lastrowid
+    if not rowid:
+        return
+    cursor.execute("SELECT rowid, * FROM anesthesia_events WHERE rowid = ?", (rowid,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    row = dict(row)
+    after_commit(cursor, lambda: _store.apply(case_id, row))
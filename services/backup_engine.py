@@ -0,0 +1,375 @@
+"""
+MIRS Backup Engine - Consistent online backups via the SQLite backup API
+
+Provides:
+- online_backup(): sqlite3 Connection.backup in paged steps (writers get
+  the lock between steps); falls back to a single step if concurrent
+  writes keep restarting the copy
+- backup_to_file(): atomic snapshot file (tmp + os.replace, quick_check)
+- snapshot_chunks(): consistent snapshot bytes for streaming responses
+  (in memory via serialize() below MIRS_BACKUP_MEMORY_LIMIT, otherwise a
+  temporary snapshot file that is removed afterwards)
+- iter_zip(): write a ZIP straight into the response stream (no zip on disk)
+- UsbSnapshotScheduler: periodic snapshots to a USB mount with rotation;
+  skipped while the database is unchanged (PRAGMA data_version)
+
+Copying the live .db file (shutil / FileResponse) while writers are active
+can produce a torn database, and misses pages still in the -wal file.
+
+Environment:
+- MIRS_BACKUP_STEP_PAGES       pages per backup step (default: 256)
+- MIRS_BACKUP_STEP_SLEEP       seconds between steps (default: 0.005)
+- MIRS_BACKUP_MEMORY_LIMIT     max DB size snapshotted in memory (default: 64 MB)
+- MIRS_USB_SNAPSHOT_DIR        USB mount for periodic snapshots (default: disabled)
+- MIRS_USB_SNAPSHOT_INTERVAL   seconds between snapshots (default: 900)
+- MIRS_USB_SNAPSHOT_KEEP       snapshots kept on the USB (default: 5)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+BACKUP_STEP_PAGES = int(os.environ.get("MIRS_BACKUP_STEP_PAGES", "256"))
+BACKUP_STEP_SLEEP = float(os.environ.get("MIRS_BACKUP_STEP_SLEEP", "0.005"))
+BACKUP_MAX_RESTARTS = 3
+BACKUP_MEMORY_LIMIT = int(os.environ.get("MIRS_BACKUP_MEMORY_LIMIT", str(64 * 1024 * 1024)))
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+USB_SNAPSHOT_DIR = os.environ.get("MIRS_USB_SNAPSHOT_DIR", "")
+USB_SNAPSHOT_INTERVAL = int(os.environ.get("MIRS_USB_SNAPSHOT_INTERVAL", "900"))
+USB_SNAPSHOT_KEEP = int(os.environ.get("MIRS_USB_SNAPSHOT_KEEP", "5"))
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+# =============================================================================
+# Backup
+# =============================================================================
+
+@contextmanager
+def _source_connection(db_path: str):
+    """Pooled read-only connection to the live DB (raw sqlite3 for .backup)."""
+    conn = get_pool(str(db_path)).reader()
+    try:
+        yield conn.raw_connection
+    finally:
+        conn.close()
+
+
+def online_backup(src: sqlite3.Connection, dest: sqlite3.Connection,
+                  pages: int = BACKUP_STEP_PAGES, sleep: float = BACKUP_STEP_SLEEP) -> Dict[str, Any]:
+    """
+    Copy src into dest with the SQLite online backup API.
+
+    Paged steps release the source lock between steps. A write from another
+    connection restarts the copy; after BACKUP_MAX_RESTARTS restarts the
+    copy is redone in one step (in WAL mode that only holds a read snapshot,
+    so writers are still not blocked).
+    """
+    started = time.monotonic()
+    state = {"steps": 0, "restarts": 0, "pages": 0, "last_remaining": None}
+
+    def progress(status, remaining, total):
+        state["steps"] += 1
+        state["pages"] = total
+        if state["last_remaining"] is not None and remaining > state["last_remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state["last_remaining"] = remaining
+
+    single_step = pages <= 0
+    if not single_step:
+        try:
+            src.backup(dest, pages=pages, progress=progress, sleep=sleep)
+        except _TooManyRestarts:
+            logger.info(f"Backup restarted {state['restarts']}x under concurrent writes - finishing in one step")
+            single_step = True
+    if single_step:
+        src.backup(dest)
+        state["steps"] += 1
+
+    return {
+        "pages": state["pages"],
+        "steps": state["steps"],
+        "restarts": state["restarts"],
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+def backup_to_file(db_path: str, dest_path: Path, pages: int = BACKUP_STEP_PAGES,
+                   verify: bool = True) -> Dict[str, Any]:
+    """
+    Write a consistent snapshot of db_path to dest_path (atomic replace).
+
+    The snapshot is converted to rollback-journal mode so it is a single
+    self-contained file.
+    """
+    dest_path = Path(dest_path)
+    tmp_path = dest_path.with_name(dest_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    dest = sqlite3.connect(str(tmp_path))
+    try:
+        with _source_connection(db_path) as src:
+            stats = online_backup(src, dest, pages=pages)
+        dest.execute("PRAGMA journal_mode=DELETE")
+        if verify:
+            result = dest.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                raise RuntimeError(f"Snapshot failed quick_check: {result}")
+    except Exception:
+        dest.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    dest.close()
+
+    with open(tmp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest_path)
+    return {**stats, "path": str(dest_path), "size": dest_path.stat().st_size}
+
+
+def _db_size(db_path: str) -> int:
+    size = 0
+    for suffix in ("", "-wal"):
+        p = Path(str(db_path) + suffix)
+        if p.exists():
+            size += p.stat().st_size
+    return size
+
+
+def snapshot_chunks(db_path: str, chunk_size: int = STREAM_CHUNK_SIZE,
+                    spool_dir: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Consistent snapshot of the DB as a byte stream.
+
+    Small databases are backed up into memory and serialized; larger ones go
+    through a temporary snapshot file (removed once streamed).
+    """
+    if _db_size(db_path) <= BACKUP_MEMORY_LIMIT and hasattr(sqlite3.Connection, "serialize"):
+        dest = sqlite3.connect(":memory:")
+        try:
+            with _source_connection(db_path) as src:
+                online_backup(src, dest)
+            data = memoryview(dest.serialize())
+        finally:
+            dest.close()
+        if len(data) >= 20:
+            # Header bytes 18-19 = 1: rollback-journal file (as journal_mode=DELETE)
+            head = bytearray(data[:chunk_size])
+            head[18:20] = b"\x01\x01"
+            yield bytes(head)
+            start = len(head)
+        else:
+            start = 0
+        for offset in range(start, len(data), chunk_size):
+            yield bytes(data[offset:offset + chunk_size])
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="mirs-snapshot-", dir=spool_dir)
+    try:
+        snap = Path(tmp_dir) / "snapshot.db"
+        backup_to_file(db_path, snap, verify=False)
+        with open(snap, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# =============================================================================
+# Streaming ZIP
+# =============================================================================
+
+class _ZipSink:
+    """Write-only, non-seekable file object collecting zip output."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        if self._parts:
+            data = b"".join(self._parts)
+            self._parts = []
+            yield data
+
+
+def iter_zip(entries: Iterable[Tuple[str, Iterable[bytes]]],
+             infos: Optional[List[Dict[str, Any]]] = None) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive built from (arcname, byte chunks) entries.
+
+    Entries are consumed lazily, so an entry may inspect `infos` (sizes of
+    the members written before it), e.g. for a manifest.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for arcname, chunks in entries:
+            with zf.open(arcname, "w", force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    yield from sink.drain()
+            if infos is not None:
+                info = zf.getinfo(arcname)
+                infos.append({"name": arcname, "size": info.file_size, "compressed_size": info.compress_size})
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+# =============================================================================
+# USB Snapshots
+# =============================================================================
+
+class UsbSnapshotScheduler:
+    """Periodic DB snapshots to a USB path, keeping the newest `keep` files."""
+
+    def __init__(self, db_path: str, target_dir: str, interval: int = USB_SNAPSHOT_INTERVAL,
+                 keep: int = USB_SNAPSHOT_KEEP, prefix: str = "mirs"):
+        self.db_path = str(db_path)
+        self.target_dir = Path(target_dir) if target_dir else None
+        self.interval = interval
+        self.keep = max(1, keep)
+        self.prefix = prefix
+        self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+        self._watch: Optional[sqlite3.Connection] = None
+        self._last_version: Optional[int] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    def _data_version(self) -> int:
+        # data_version changes whenever another connection commits
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def snapshots(self) -> List[Path]:
+        if not self.target_dir or not self.target_dir.is_dir():
+            return []
+        return sorted(self.target_dir.glob(f"{self.prefix}_*.db"))
+
+    def snapshot_now(self, force: bool = False) -> Dict[str, Any]:
+        """Take a snapshot if the DB changed since the last one (blocking)."""
+        now = datetime.now().isoformat()
+        if not self.target_dir or not self.target_dir.is_dir():
+            self.last_result = {"status": "NO_TARGET", "at": now, "target_dir": str(self.target_dir or "")}
+            return self.last_result
+
+        version = self._data_version()
+        if not force and self._last_version is not None and version == self._last_version:
+            self.last_result = {"status": "UNCHANGED", "at": now}
+            return self.last_result
+
+        # 毫秒時間戳: 檔名唯一且依字典序即時間序 (輪替用)
+        name = f"{self.prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}.db"
+        result = backup_to_file(self.db_path, self.target_dir / name)
+        self._last_version = version
+
+        removed = []
+        for old in self.snapshots()[:-self.keep]:
+            try:
+                old.unlink()
+                removed.append(old.name)
+            except OSError as e:
+                logger.warning(f"USB snapshot rotation failed for {old}: {e}")
+
+        self.last_result = {"status": "CREATED", "at": now, **result, "rotated_out": removed}
+        logger.info(f"✓ USB snapshot: {result['path']} ({result['size']} bytes, {result['seconds']}s)")
+        return self.last_result
+
+    async def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"USB snapshot scheduler started (dir: {self.target_dir}, every {self.interval}s, keep {self.keep})")
+
+    async def stop(self):
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+
+    async def _run_loop(self):
+        while self.is_running:
+            try:
+                await asyncio.to_thread(self.snapshot_now)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.last_result = {"status": "FAILED", "at": datetime.now().isoformat(), "error": str(e)}
+                logger.error(f"USB snapshot failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "target_dir": str(self.target_dir) if self.target_dir else None,
+            "target_available": bool(self.target_dir and self.target_dir.is_dir()),
+            "interval_seconds": self.interval,
+            "keep": self.keep,
+            "snapshots": [p.name for p in self.snapshots()],
+            "last_result": self.last_result,
+        }
+
+
+_usb_scheduler: Optional[UsbSnapshotScheduler] = None
+
+
+def get_usb_snapshot_scheduler(db_path: Optional[str] = None) -> UsbSnapshotScheduler:
+    """Get the process-wide USB snapshot scheduler (created on first call)."""
+    global _usb_scheduler
+    if _usb_scheduler is None:
+        if db_path is None:
+            raise RuntimeError("USB snapshot scheduler not initialised")
+        _usb_scheduler = UsbSnapshotScheduler(db_path, USB_SNAPSHOT_DIR)
+    return _usb_scheduler
+
+
+async def start_usb_snapshots(db_path: str) -> bool:
+    """Start periodic snapshots if MIRS_USB_SNAPSHOT_DIR is set and interval > 0."""
+    scheduler = get_usb_snapshot_scheduler(db_path)
+    if not USB_SNAPSHOT_DIR or USB_SNAPSHOT_INTERVAL <= 0:
+        return False
+    await scheduler.start()
+    return True
+
+
+async def stop_usb_snapshots():
+    if _usb_scheduler is not None:
+        await _usb_scheduler.stop()
@@ -0,0 +1,174 @@
+"""
+MIRS Blood Availability Cache - In-process v_blood_availability snapshot
+
+Provides:
+- Per-table generation counters; blood write endpoints bump "blood_units"
+  after their transaction commits (via log_blood_event). Under --workers N
+  the counters live in SQLite (worker_coordination.shared_generations)
+- BloodAvailabilityCache: rows keyed by (blood_type, unit_type), rebuilt only
+  when the generation or the local date changed (expiry classification in the
+  view depends on DATE('now', 'localtime'))
+- Content-hash ETag so unchanged polls can be answered with 304
+- Day-rollover timer that rebuilds the snapshot just after local midnight
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .worker_coordination import is_multi_worker, shared_generation
+
+logger = logging.getLogger(__name__)
+
+AvailabilityKey = Tuple[str, str]
+
+_generations: Dict[str, int] = {}
+_generation_lock = threading.Lock()
+
+
+def bump_generation(table: str):
+    """Mark a table as changed (call after commit)."""
+    if is_multi_worker():
+        # v3.6: 其他 worker 的快取也要失效 -> SQLite 共享計數器
+        shared_generation(table, bump=True)
+        return
+    with _generation_lock:
+        _generations[table] = _generations.get(table, 0) + 1
+
+
+def get_generation(table: str) -> int:
+    if is_multi_worker():
+        return shared_generation(table)
+    with _generation_lock:
+        return _generations.get(table, 0)
+
+
+@dataclass
+class AvailabilitySnapshot:
+    rows: Dict[AvailabilityKey, Dict[str, Any]]
+    etag: str
+    generation: int
+    day: date
+    built_at: datetime
+
+    def select(self, blood_type: Optional[str] = None, unit_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [
+            row for (bt, ut), row in self.rows.items()
+            if (blood_type is None or bt == blood_type) and (unit_type is None or ut == unit_type)
+        ]
+
+
+class BloodAvailabilityCache:
+    """Snapshot of v_blood_availability, invalidated by generation or date change."""
+
+    TABLE = "blood_units"
+
+    def __init__(self, compute: Callable[[], List[Dict[str, Any]]],
+                 clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            compute: blocking query returning the view rows (ordered)
+        """
+        self._compute = compute
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[AvailabilitySnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "rebuilds": 0, "not_modified": 0}
+
+    def fresh(self) -> Optional[AvailabilitySnapshot]:
+        """Cached snapshot if still valid (no I/O), else None."""
+        if is_multi_worker():
+            return None  # generation is in SQLite: checked by get() off the event loop
+        snapshot = self._snapshot
+        if (snapshot is not None and snapshot.generation == get_generation(self.TABLE)
+                and snapshot.day == self._clock().date()):
+            self._stats["hits"] += 1
+            return snapshot
+        return None
+
+    def get(self) -> AvailabilitySnapshot:
+        """Current snapshot (rebuilt if blood_units changed or the day rolled over)."""
+        snapshot = self.fresh()
+        if snapshot is not None:
+            return snapshot
+
+        generation = get_generation(self.TABLE)
+        today = self._clock().date()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.generation == generation and snapshot.day == today:
+                self._stats["hits"] += 1
+                return snapshot
+            # 先讀 generation 再查詢: 查詢期間的寫入會使下次 get() 重建
+            rows = self._compute()
+            body = json.dumps(rows, sort_keys=True, default=str).encode("utf-8")
+            self._snapshot = AvailabilitySnapshot(
+                rows={(row["blood_type"], row["unit_type"]): row for row in rows},
+                etag=f'"{hashlib.sha1(body).hexdigest()[:16]}"',
+                generation=generation,
+                day=today,
+                built_at=self._clock(),
+            )
+            self._stats["rebuilds"] += 1
+            return self._snapshot
+
+    def etag_for(self, snapshot: AvailabilitySnapshot, blood_type: Optional[str] = None,
+                 unit_type: Optional[str] = None) -> str:
+        if blood_type is None and unit_type is None:
+            return snapshot.etag
+        return f'{snapshot.etag[:-1]}-{blood_type or "*"}-{unit_type or "*"}"'
+
+    def record_not_modified(self):
+        self._stats["not_modified"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    # =========================================================================
+    # Day rollover
+    # =========================================================================
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._rollover_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _rollover_loop(self):
+        while True:
+            now = self._clock()
+            next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep((next_midnight - now).total_seconds() + 1)
+            try:
+                self.invalidate()
+                await asyncio.to_thread(self.get)
+                logger.info("[Blood] Availability cache rebuilt for new day")
+            except Exception as e:
+                logger.warning(f"[Blood] Availability rollover rebuild failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "generation": get_generation(self.TABLE),
+            "cached_generation": snapshot.generation if snapshot else None,
+            "built_at": snapshot.built_at.isoformat() if snapshot else None,
+            "keys": len(snapshot.rows) if snapshot else 0,
+        }
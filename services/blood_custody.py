@@ -0,0 +1,172 @@
+"""
+MIRS Blood Custody State - Materialized per-unit chain-of-custody projection
+
+Provides:
+- blood_unit_custody_state projection keyed by unit_id
+  (current custody step, patient_id, location, first/last event time)
+- Trigger that keeps the projection in step with CUSTODY_* rows in
+  blood_unit_events (updated inside the same transaction as the event write)
+- Bedside scan result (scan-confirm) on the same row
+- Rebuild by replaying the custody log
+
+patient_id / location keep the latest non-NULL value: auto-filled emergency
+steps without a location do not clear where the unit was delivered.
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import logging
+import sqlite3
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CUSTODY_EVENT_PATTERN = "CUSTODY_%"
+
+
+def _meta(prefix: str, key: str) -> str:
+    """json_extract guarded against NULL/invalid metadata (never fails the event insert)."""
+    return f"CASE WHEN json_valid({prefix}.metadata) THEN json_extract({prefix}.metadata, '$.{key}') END"
+
+
+def _values(prefix: str) -> str:
+    """Projection column values for one blood_unit_events row (NEW or a table alias)."""
+    return f"""
+            {prefix}.unit_id,
+            COALESCE({_meta(prefix, 'step')}, substr({prefix}.event_type, 9)),
+            {_meta(prefix, 'patient_id')},
+            {_meta(prefix, 'location')},
+            {prefix}.ts_server, {prefix}.ts_server, {prefix}.id, 1, CURRENT_TIMESTAMP"""
+
+
+_COLUMNS = """
+            unit_id, current_step, patient_id, location,
+            first_event_at, last_event_at, last_event_id, event_count, updated_at"""
+
+_ON_CONFLICT = """
+        ON CONFLICT(unit_id) DO UPDATE SET
+            current_step = excluded.current_step,
+            patient_id = COALESCE(excluded.patient_id, patient_id),
+            location = COALESCE(excluded.location, location),
+            first_event_at = COALESCE(first_event_at, excluded.first_event_at),
+            last_event_at = excluded.last_event_at,
+            last_event_id = excluded.last_event_id,
+            event_count = event_count + 1,
+            updated_at = CURRENT_TIMESTAMP"""
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+
+def ensure_custody_state_schema(cursor: sqlite3.Cursor):
+    """
+    Create blood_unit_custody_state and its blood_unit_events trigger (idempotent).
+
+    Must be called after blood_unit_events exists.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blood_unit_custody_state (
+            unit_id TEXT PRIMARY KEY,
+            current_step TEXT,
+            patient_id TEXT,
+            location TEXT,
+            first_event_at INTEGER,
+            last_event_at INTEGER,
+            last_event_id TEXT,
+            event_count INTEGER NOT NULL DEFAULT 0,
+            scan_status TEXT,              -- MATCH / MISMATCH (scan-confirm)
+            scan_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_custody_state_patient_location
+        ON blood_unit_custody_state(patient_id, location)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_custody_state_step
+        ON blood_unit_custody_state(current_step)
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_custody_state_ai
+        AFTER INSERT ON blood_unit_events
+        WHEN NEW.event_type LIKE '{CUSTODY_EVENT_PATTERN}'
+        BEGIN
+            INSERT INTO blood_unit_custody_state ({_COLUMNS}
+            ) VALUES ({_values('NEW')}
+            )
+            {_ON_CONFLICT};
+        END
+    """)
+
+
+# =============================================================================
+# Writes
+# =============================================================================
+
+def record_scan(cursor: sqlite3.Cursor, unit_id: str, matched: bool):
+    """記錄床邊掃碼結果 (scan-confirm; caller owns the transaction)"""
+    cursor.execute("""
+        INSERT INTO blood_unit_custody_state (unit_id, scan_status, scan_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(unit_id) DO UPDATE SET
+            scan_status = excluded.scan_status,
+            scan_at = excluded.scan_at,
+            updated_at = CURRENT_TIMESTAMP
+    """, (unit_id, "MATCH" if matched else "MISMATCH"))
+
+
+# =============================================================================
+# Reads
+# =============================================================================
+
+def get_custody_state(cursor: sqlite3.Cursor, unit_id: str) -> Optional[dict]:
+    cursor.execute("SELECT * FROM blood_unit_custody_state WHERE unit_id = ?", (unit_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([d[0] for d in cursor.description], row))
+
+
+# =============================================================================
+# Rebuild
+# =============================================================================
+
+def replay_custody_state(cursor: sqlite3.Cursor) -> int:
+    """
+    Rewrite blood_unit_custody_state from the custody log (no commit; caller
+    owns the transaction). Scan results are kept.
+
+    Returns:
+        Number of custody events replayed
+    """
+    ensure_custody_state_schema(cursor)
+    cursor.execute("""
+        UPDATE blood_unit_custody_state SET
+            current_step = NULL, patient_id = NULL, location = NULL,
+            first_event_at = NULL, last_event_at = NULL, last_event_id = NULL,
+            event_count = 0
+    """)
+    cursor.execute(f"""
+        INSERT INTO blood_unit_custody_state ({_COLUMNS}
+        )
+        SELECT {_values('e')}
+        FROM blood_unit_events e
+        WHERE e.event_type LIKE '{CUSTODY_EVENT_PATTERN}'
+        ORDER BY e.ts_server, e.rowid
+        {_ON_CONFLICT}
+    """)
+    replayed = cursor.rowcount
+    cursor.execute("DELETE FROM blood_unit_custody_state WHERE event_count = 0 AND scan_status IS NULL")
+    return replayed
+
+
+def rebuild_custody_state(conn: sqlite3.Connection) -> int:
+    """Replay the custody log into blood_unit_custody_state and commit."""
+    replayed = replay_custody_state(conn.cursor())
+    conn.commit()
+    logger.info(f"[BloodCustody] custody state rebuilt from {replayed} events")
+    return replayed
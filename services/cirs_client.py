@@ -0,0 +1,309 @@
+"""
+MIRS CIRS Hub Client - Shared HTTP client for Hub-Satellite calls
+
+Provides:
+- One keep-alive httpx.AsyncClient for all CIRS Hub calls
+  (replaces a new client + TCP/TLS handshake per request)
+- Circuit breaker: after N consecutive failures the Hub is treated as
+  offline and calls fail immediately (HubUnavailableError) instead of
+  waiting for the full timeout; one probe is let through after a cooldown
+- Stale-while-revalidate cache for read endpoints (waiting lists, patient
+  details), tagged with X-XIRS-Hub-Revision: cached data is served
+  instantly while a background task refreshes it
+
+HubUnavailableError subclasses httpx.ConnectError, so existing
+"Hub not reachable" handlers keep working unchanged.
+
+Environment:
+- MIRS_CIRS_TIMEOUT              request timeout seconds (default: 5)
+- MIRS_CIRS_CONNECT_TIMEOUT      connect timeout seconds (default: 2)
+- MIRS_CIRS_BREAKER_FAILURES     consecutive failures to open (default: 3)
+- MIRS_CIRS_BREAKER_COOLDOWN     seconds before a probe (default: 30)
+- MIRS_CIRS_CACHE_FRESH          seconds served without refresh (default: 5)
+- MIRS_CIRS_CACHE_MAX_STALE      seconds a stale entry may be served (default: 86400)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CIRS_TIMEOUT = float(os.environ.get("MIRS_CIRS_TIMEOUT", "5"))
+CIRS_CONNECT_TIMEOUT = float(os.environ.get("MIRS_CIRS_CONNECT_TIMEOUT", "2"))
+BREAKER_FAILURES = int(os.environ.get("MIRS_CIRS_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("MIRS_CIRS_BREAKER_COOLDOWN", "30"))
+CACHE_FRESH_SECONDS = float(os.environ.get("MIRS_CIRS_CACHE_FRESH", "5"))
+CACHE_MAX_STALE_SECONDS = float(os.environ.get("MIRS_CIRS_CACHE_MAX_STALE", "86400"))
+
+
+class HubUnavailableError(httpx.ConnectError):
+    """Circuit is open - Hub treated as offline without a network call."""
+
+
+class HubResponseError(Exception):
+    """Hub answered with a non-200 status (not cached)."""
+
+    def __init__(self, status_code: int, hub_revision: int = 0):
+        super().__init__(f"CIRS returned status {status_code}")
+        self.status_code = status_code
+        self.hub_revision = hub_revision
+
+
+def hub_revision_of(response: httpx.Response) -> int:
+    """X-XIRS-Hub-Revision header as int (0 if missing/invalid)."""
+    try:
+        return int(response.headers.get("X-XIRS-Hub-Revision", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+# =============================================================================
+# Circuit Breaker
+# =============================================================================
+
+class CircuitBreaker:
+    """CLOSED -> OPEN after consecutive failures -> HALF_OPEN probe after cooldown."""
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True if a request may go out (at most one probe while half-open)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._clock() - self._opened_at < self.cooldown or self._probe_in_flight:
+                self._stats["rejected"] += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("CIRS Hub reachable again - circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """End a request that says nothing about Hub health (e.g. cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning(f"CIRS Hub failed {self._failures}x - circuit open for {self.cooldown:.0f}s")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures, **self._stats}
+
+
+# =============================================================================
+# Stale-While-Revalidate Cache
+# =============================================================================
+
+@dataclass
+class CacheEntry:
+    value: Any
+    hub_revision: int
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class HubResponseCache:
+    """Last good Hub response per key, refreshed in the background when stale."""
+
+    def __init__(self, fresh_seconds: float = CACHE_FRESH_SECONDS,
+                 max_stale_seconds: float = CACHE_MAX_STALE_SECONDS):
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries: Dict[str, CacheEntry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def _store(self, key: str, value: Any, hub_revision: int) -> CacheEntry:
+        current = self._entries.get(key)
+        if current is not None and hub_revision and hub_revision < current.hub_revision:
+            # Older Hub revision than what we already have - keep ours
+            current.fetched_at = time.time()
+            return current
+        entry = CacheEntry(value=value, hub_revision=hub_revision, fetched_at=time.time())
+        self._entries[key] = entry
+        return entry
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, int]]]):
+        try:
+            value, revision = await fetch()
+            self._store(key, value, revision)
+            self._stats["refreshes"] += 1
+        except Exception as e:
+            self._stats["refresh_errors"] += 1
+            logger.debug(f"CIRS cache refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, int]]]) -> Tuple[CacheEntry, bool]:
+        """
+        Cached value for key.
+
+        Args:
+            fetch: coroutine returning (value, hub_revision); raises on failure
+
+        Returns:
+            (entry, from_cache) - from_cache is False only when fetch ran inline
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.age() < self.fresh_seconds:
+            self._stats["hits"] += 1
+            return entry, True
+
+        if entry is not None and entry.age() < self.max_stale_seconds:
+            self._stats["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+            return entry, True
+
+        self._stats["misses"] += 1
+        value, revision = await fetch()
+        return self._store(key, value, revision), False
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "refreshing": len(self._refreshing), **self._stats}
+
+
+# =============================================================================
+# Client
+# =============================================================================
+
+class CirsHubClient:
+    """Shared keep-alive client guarded by the circuit breaker."""
+
+    def __init__(self, timeout: float = CIRS_TIMEOUT, connect_timeout: float = CIRS_CONNECT_TIMEOUT,
+                 breaker: Optional[CircuitBreaker] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = httpx.Timeout(timeout, connect=min(connect_timeout, timeout))
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = HubResponseCache()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            # httpx clients are bound to the loop that created them
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                transport=self._transport,
+            )
+            self._loop = loop
+        return self._client
+
+    @property
+    def is_available(self) -> bool:
+        """False while the circuit is open (Hub considered offline)."""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if not self.breaker.allow():
+            raise HubUnavailableError("CIRS Hub offline (circuit open)")
+        try:
+            response = await self._get_client().request(method, url, **kwargs)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (client aborted, shutdown) or not the Hub's fault:
+            # free the half-open probe slot without counting a failure
+            self.breaker.release_probe()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            try:
+                await self._client.aclose()
+            except RuntimeError:
+                pass  # loop already gone
+        self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"breaker": self.breaker.stats(), "cache": self.cache.stats()}
+
+
+_hub_client: Optional[CirsHubClient] = None
+
+
+def get_hub_client() -> CirsHubClient:
+    """Get the process-wide CIRS Hub client."""
+    global _hub_client
+    if _hub_client is None:
+        _hub_client = CirsHubClient()
+    return _hub_client
+
+
+async def close_hub_client():
+    """Close the shared client (app shutdown)."""
+    if _hub_client is not None:
+        await _hub_client.aclose()
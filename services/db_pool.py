@@ -0,0 +1,356 @@
+"""
+MIRS SQLite Connection Pool
+
+Provides:
+- One pooled connection provider per database file
+- Tunable PRAGMA profiles (SD card vs SSD) applied once per connection
+- Separate writer and reader connections (readers are query_only)
+- Pool statistics for /api/health style diagnostics
+- after_commit() hooks (e.g. event bus publish only once the write is durable)
+
+Profiles are selected with MIRS_DB_PROFILE (default: sdcard).
+
+Usage:
+    from services.db_pool import get_pool
+
+    conn = get_pool("medical_inventory.db").writer()
+    try:
+        ...
+        conn.commit()
+    finally:
+        conn.close()   # returns the connection to the pool
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# PRAGMA Profiles
+# =============================================================================
+
+PRAGMA_PROFILES: Dict[str, Dict[str, Union[str, int]]] = {
+    # Raspberry Pi microSD: 少寫入、小快取、WAL checkpoint 較頻繁
+    "sdcard": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -8192,          # 8 MB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    },
+    # NVMe / SSD: 較大快取與 mmap
+    "ssd": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -32768,         # 32 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,
+    },
+}
+
+DEFAULT_PROFILE = os.environ.get("MIRS_DB_PROFILE", "sdcard")
+MAX_IDLE_WRITERS = int(os.environ.get("MIRS_DB_MAX_IDLE_WRITERS", "2"))
+MAX_IDLE_READERS = int(os.environ.get("MIRS_DB_MAX_IDLE_READERS", "4"))
+
+
+def apply_pragmas(conn: sqlite3.Connection, profile: Dict[str, Union[str, int]], readonly: bool = False):
+    """Apply a PRAGMA profile to a freshly opened connection."""
+    for name, value in profile.items():
+        if name == "journal_mode":
+            continue  # persistent per database file, set once by the pool
+        conn.execute(f"PRAGMA {name} = {value}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+
+
+# =============================================================================
+# Commit Hooks
+# =============================================================================
+
+# id(raw sqlite3.Connection) -> callbacks waiting for the current transaction
+_commit_hooks: Dict[int, List[Callable[[], None]]] = {}
+
+
+def _raw_of(conn_or_cursor) -> sqlite3.Connection:
+    if isinstance(conn_or_cursor, sqlite3.Cursor):
+        return conn_or_cursor.connection
+    if isinstance(conn_or_cursor, PooledConnection):
+        return conn_or_cursor.raw_connection
+    return conn_or_cursor
+
+
+def after_commit(conn_or_cursor, callback: Callable[[], None]):
+    """
+    Run callback once the current transaction of a pooled connection commits.
+
+    Callbacks are dropped if the transaction rolls back (or the connection is
+    returned to the pool uncommitted). Connections that are not pooled, or not
+    inside a transaction, run the callback immediately.
+    """
+    raw = _raw_of(conn_or_cursor)
+    hooks = _commit_hooks.get(id(raw))
+    if hooks is None or not raw.in_transaction:
+        _run_callback(callback)
+        return
+    hooks.append(callback)
+
+
+def _run_callback(callback: Callable[[], None]):
+    try:
+        callback()
+    except Exception as e:
+        logger.warning(f"[DBPool] after_commit callback failed: {e}")
+
+
+def _run_commit_hooks(raw: sqlite3.Connection):
+    hooks = _commit_hooks.get(id(raw))
+    if not hooks:
+        return
+    pending = hooks[:]
+    hooks.clear()
+    for callback in pending:
+        _run_callback(callback)
+
+
+# =============================================================================
+# Pooled Connection
+# =============================================================================
+
+class PooledConnection:
+    """
+    sqlite3.Connection proxy whose close() returns the connection to the pool.
+
+    Behaves like a regular connection for callers (cursor/execute/commit/
+    rollback/row_factory/context manager), so existing code paths that call
+    conn.close() in a finally block work unchanged.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection, readonly: bool):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_readonly', readonly)
+
+    def _raw(self) -> sqlite3.Connection:
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._raw(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw(), name, value)
+
+    def cursor(self, *args):
+        return self._raw().cursor(*args)
+
+    def execute(self, *args):
+        return self._raw().execute(*args)
+
+    def executemany(self, *args):
+        return self._raw().executemany(*args)
+
+    def commit(self):
+        raw = self._raw()
+        result = raw.commit()
+        _run_commit_hooks(raw)
+        return result
+
+    def rollback(self):
+        raw = self._raw()
+        _commit_hooks.get(id(raw), []).clear()
+        return raw.rollback()
+
+    @property
+    def raw_connection(self) -> sqlite3.Connection:
+        """Underlying sqlite3.Connection (for APIs such as Connection.backup)."""
+        return self._raw()
+
+    def __enter__(self):
+        self._raw().__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        raw = self._raw()
+        result = raw.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            _run_commit_hooks(raw)
+        else:
+            _commit_hooks.get(id(raw), []).clear()
+        return result
+
+    def close(self):
+        """Return the connection to the pool (idempotent)."""
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            return
+        object.__setattr__(self, '_conn', None)
+        self._pool._release(conn, self._readonly)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# =============================================================================
+# Connection Pool
+# =============================================================================
+
+class ConnectionPool:
+    """Per-database pool of configured writer and reader connections."""
+
+    def __init__(
+        self,
+        db_path: str,
+        profile: Optional[str] = None,
+        max_idle_writers: int = MAX_IDLE_WRITERS,
+        max_idle_readers: int = MAX_IDLE_READERS,
+    ):
+        self.db_path = db_path
+        self.profile_name = profile or DEFAULT_PROFILE
+        if self.profile_name not in PRAGMA_PROFILES:
+            logger.warning(f"[DBPool] Unknown profile '{self.profile_name}', using sdcard")
+            self.profile_name = "sdcard"
+        self.profile = PRAGMA_PROFILES[self.profile_name]
+        self.max_idle = {False: max_idle_writers, True: max_idle_readers}
+
+        self._lock = threading.Lock()
+        self._idle: Dict[bool, List[sqlite3.Connection]] = {False: [], True: []}
+        self._journal_mode_set = False
+        self._stats = {"created": 0, "reused": 0, "discarded": 0, "in_use": 0}
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        busy_timeout = int(self.profile.get("busy_timeout", 5000))
+        conn = sqlite3.connect(self.db_path, timeout=busy_timeout / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+
+        if not self._journal_mode_set and "journal_mode" in self.profile:
+            try:
+                mode = conn.execute(f"PRAGMA journal_mode = {self.profile['journal_mode']}").fetchone()[0]
+                logger.info(f"[DBPool] {self.db_path}: journal_mode={mode}, profile={self.profile_name}")
+            except sqlite3.OperationalError as e:
+                logger.warning(f"[DBPool] Could not set journal_mode on {self.db_path}: {e}")
+            self._journal_mode_set = True
+
+        apply_pragmas(conn, self.profile, readonly=readonly)
+        return conn
+
+    def _acquire(self, readonly: bool) -> PooledConnection:
+        conn = None
+        with self._lock:
+            if self._idle[readonly]:
+                conn = self._idle[readonly].pop()
+                self._stats["reused"] += 1
+            self._stats["in_use"] += 1
+        if conn is None:
+            try:
+                conn = self._connect(readonly)
+            except Exception:
+                with self._lock:
+                    self._stats["in_use"] -= 1
+                raise
+            with self._lock:
+                self._stats["created"] += 1
+        _commit_hooks[id(conn)] = []
+        return PooledConnection(self, conn, readonly)
+
+    def writer(self) -> PooledConnection:
+        """Connection for read-write work (legacy call sites default here)."""
+        return self._acquire(readonly=False)
+
+    def reader(self) -> PooledConnection:
+        """query_only connection; never takes the write lock under WAL."""
+        return self._acquire(readonly=True)
+
+    def _release(self, conn: sqlite3.Connection, readonly: bool):
+        _commit_hooks.pop(id(conn), None)  # uncommitted work is rolled back below
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # Broken connection - drop it
+            with self._lock:
+                self._stats["in_use"] -= 1
+                self._stats["discarded"] += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+
+        with self._lock:
+            self._stats["in_use"] -= 1
+            if len(self._idle[readonly]) < self.max_idle[readonly]:
+                self._idle[readonly].append(conn)
+                return
+            self._stats["discarded"] += 1
+        conn.close()
+
+    def close_all(self):
+        """Close all idle connections (connections in use close on release)."""
+        with self._lock:
+            idle = self._idle[False] + self._idle[True]
+            self._idle = {False: [], True: []}
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "profile": self.profile_name,
+                "idle_writers": len(self._idle[False]),
+                "idle_readers": len(self._idle[True]),
+                **self._stats,
+            }
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Union[str, Path], profile: Optional[str] = None) -> ConnectionPool:
+    """Get (or create) the pool for a database file."""
+    key = os.path.abspath(str(db_path))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(str(db_path), profile=profile)
+                _pools[key] = pool
+    return pool
+
+
+def get_pool_stats() -> List[dict]:
+    """Statistics of all pools."""
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def close_all_pools():
+    """Close idle connections of every pool (shutdown hook)."""
+    for pool in list(_pools.values()):
+        pool.close_all()
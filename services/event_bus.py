@@ -0,0 +1,275 @@
+"""
+MIRS Event Bus - In-process publish/subscribe for the events table
+
+Provides:
+- Fan-out of newly committed `events` rows to SSE subscribers
+  (replaces per-client 1-second DB polling)
+- Bounded in-memory ring buffer with replay from a given event_id
+- Thread-safe publish (sync endpoints run in the threadpool)
+
+Writers call publish_event(cursor, event) right after their INSERT;
+the event is fanned out only after the transaction commits.
+Subscribers that fall out of the ring (too far behind) are expected to
+catch up from the DB and resume from the ring afterwards.
+
+Under --workers N each worker also tails the events table (start_tail), so
+SSE clients see events committed by any worker.
+
+Environment:
+- MIRS_EVENT_BUS_CAPACITY        ring buffer size (default: 1000)
+- MIRS_EVENT_BUS_TAIL_INTERVAL   events-table poll interval, multi-worker only (default: 0.5s)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db_pool import after_commit, get_pool
+from .executor import run_in_executor
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUS_CAPACITY = int(os.environ.get("MIRS_EVENT_BUS_CAPACITY", "1000"))
+EVENT_BUS_TAIL_INTERVAL = float(os.environ.get("MIRS_EVENT_BUS_TAIL_INTERVAL", "0.5"))
+
+
+class Subscription:
+    """One SSE client: a wake-up signal bound to the subscriber's event loop."""
+
+    def __init__(self, bus: 'EventBus', entity_type: Optional[str]):
+        self.bus = bus
+        self.entity_type = entity_type
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+    def notify(self):
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            # Loop closed - subscriber is gone
+            self.bus.unsubscribe(self)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for new events; False on timeout."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.wakeup.clear()
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return self.entity_type is None or event.get("entity_type") == self.entity_type
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Ring buffer of recent events + subscriber fan-out."""
+
+    def __init__(self, capacity: int = EVENT_BUS_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._ring: deque = deque(maxlen=capacity)   # (seq, event)
+        self._positions: Dict[str, int] = {}          # event_id -> seq (ring members only)
+        self._seq = 0
+        self._subscribers: List[Subscription] = []
+        self._stats = {"published": 0, "ring_misses": 0, "tailed": 0}
+        self._tail_task: Optional[asyncio.Task] = None
+
+    # -------------------------------------------------------------------------
+    # Publish
+    # -------------------------------------------------------------------------
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Append an event to the ring and wake subscribers. Returns its seq."""
+        with self._lock:
+            if event["event_id"] in self._positions:
+                # Already buffered (local after_commit and the events-table tail both saw it)
+                return self._positions[event["event_id"]]
+            if len(self._ring) == self._ring.maxlen:
+                _, dropped = self._ring[0]
+                self._positions.pop(dropped["event_id"], None)
+            self._seq += 1
+            self._ring.append((self._seq, event))
+            self._positions[event["event_id"]] = self._seq
+            self._stats["published"] += 1
+            subscribers = list(self._subscribers)
+            seq = self._seq
+
+        for sub in subscribers:
+            if sub.matches(event):
+                sub.notify()
+        return seq
+
+    # -------------------------------------------------------------------------
+    # Subscribe / Replay
+    # -------------------------------------------------------------------------
+
+    def subscribe(self, entity_type: Optional[str] = None) -> Subscription:
+        """Register an SSE subscriber (must be called from its event loop)."""
+        sub = Subscription(self, entity_type)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    @property
+    def head_seq(self) -> int:
+        return self._seq
+
+    def last_event_id(self) -> Optional[str]:
+        with self._lock:
+            return self._ring[-1][1]["event_id"] if self._ring else None
+
+    def seq_of(self, event_id: str) -> Optional[int]:
+        """Ring position of an event_id, None if not (or no longer) buffered."""
+        with self._lock:
+            return self._positions.get(event_id)
+
+    def read_since(self, seq: int, limit: int = 100) -> Tuple[Optional[List[Tuple[int, Dict]]], int]:
+        """
+        Events with seq > given seq.
+
+        Returns:
+            (events, head_seq) - events is None if the ring no longer covers
+            seq (subscriber too far behind; caller falls back to the DB)
+        """
+        with self._lock:
+            head = self._seq
+            if seq >= head:
+                return [], head
+            oldest = self._ring[0][0] if self._ring else head + 1
+            if seq + 1 < oldest:
+                self._stats["ring_misses"] += 1
+                return None, head
+            start = seq + 1 - oldest
+            items = [self._ring[i] for i in range(start, min(len(self._ring), start + limit))]
+            return items, head
+
+    # -------------------------------------------------------------------------
+    # Events-table tail (--workers N)
+    # -------------------------------------------------------------------------
+
+    def start_tail(self, db_path: str, interval: float = EVENT_BUS_TAIL_INTERVAL):
+        """
+        Also publish rows committed by other worker processes.
+
+        Polls `events` by rowid; rows this worker already published are
+        skipped by publish(). Must be called from the event loop.
+        """
+        if self._tail_task is None:
+            self._tail_task = asyncio.create_task(self._tail_loop(db_path, interval))
+
+    async def stop_tail(self):
+        if self._tail_task:
+            self._tail_task.cancel()
+            try:
+                await self._tail_task
+            except asyncio.CancelledError:
+                pass
+            self._tail_task = None
+
+    async def _tail_loop(self, db_path: str, interval: float):
+        last_rowid: Optional[int] = None
+        while True:
+            try:
+                if last_rowid is None:
+                    last_rowid = await run_in_executor("db", _events_head, db_path)
+                else:
+                    for rowid, message in await run_in_executor("db", _read_events_after, db_path, last_rowid):
+                        last_rowid = rowid
+                        if self.seq_of(message["event_id"]) is None:
+                            self.publish(message)
+                            self._stats["tailed"] += 1
+            except Exception as e:
+                logger.warning(f"[EventBus] events tail failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "buffered": len(self._ring),
+                "head_seq": self._seq,
+                "subscribers": len(self._subscribers),
+                **self._stats,
+            }
+
+
+_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus."""
+    return _bus
+
+
+def _message(event: Dict[str, Any]) -> Dict[str, Any]:
+    payload = event.get("payload")
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            pass
+    return {
+        "event_id": event["event_id"],
+        "entity_type": event.get("entity_type"),
+        "entity_id": event.get("entity_id"),
+        "event_type": event.get("event_type"),
+        "ts_device": event.get("ts_device"),
+        "payload": payload,
+    }
+
+
+def _events_head(db_path: str) -> int:
+    """Current max rowid of the events table (tail starting point)."""
+    conn = get_pool(db_path).reader()
+    try:
+        return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _read_events_after(db_path: str, rowid: int, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+    """Events-table rows after `rowid` as (rowid, bus message)."""
+    conn = get_pool(db_path).reader()
+    try:
+        # Legacy oxygen writers fill `payload`; m009 rows fill `payload_json`
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+        payload = [c for c in ("payload_json", "payload") if c in columns]
+        payload = f"COALESCE({', '.join(payload)}, NULL)" if payload else "NULL"
+        rows = conn.execute(f"""
+            SELECT rowid, event_id, entity_type, entity_id, event_type, ts_device, {payload}
+            FROM events WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """, (rowid, limit)).fetchall()
+    finally:
+        conn.close()
+    return [(r[0], _message({"event_id": r[1], "entity_type": r[2], "entity_id": r[3],
+                             "event_type": r[4], "ts_device": r[5], "payload": r[6]}))
+            for r in rows]
+
+
+def publish_event(conn_or_cursor, event: Dict[str, Any]):
+    """
+    Publish an events-table row once its transaction commits.
+
+    Args:
+        conn_or_cursor: Connection/cursor used for the INSERT
+        event: {event_id, entity_type, entity_id, event_type, ts_device, payload}
+    """
+    message = _message(event)
+    after_commit(conn_or_cursor, lambda: _bus.publish(message))
@@ -0,0 +1,302 @@
+"""
+MIRS Event Digest - Merkle-range anti-entropy over the unified events table
+
+Two replicas (station, phone backup, hub) compare a hash tree instead of
+exporting everything, then pull only the HLC time ranges that differ.
+
+Tree layout (identical on every replica):
+- Leaf = bucket of DIGEST_BUCKET_MS (1 hour) of HLC physical time
+  (ts_device for rows without an HLC)
+- Leaf value = (count, digest) where digest is the sum mod 2^48 of the first
+  48 bits of each event's payload_hash. Additive, so triggers keep it up to
+  date on insert / update / delete without reading the bucket.
+- Level L node (L >= 1) = sha256 over its non-empty children
+  "index:count:hash|..." (16 hex); node index = bucket // DIGEST_FANOUT^L
+- Root = node hash over the level DIGEST_LEVELS nodes
+
+Provides:
+- ensure_event_digest_schema(cursor): event_digest_buckets + triggers
+- replay / rebuild / verify (backfill, like stock_ledger)
+- digest_root / digest_nodes / bucket_events: data for GET /api/dr/digest
+- find_divergent_buckets(local_conn, fetch_nodes): client-side descent
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import hashlib
+import logging
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIGEST_BUCKET_MS = 3_600_000
+DIGEST_FANOUT = 16
+DIGEST_LEVELS = 4            # level-4 nodes span 16^4 hours (~7.5 years)
+DIGEST_MOD = 1 << 48
+
+_HEX = "0123456789abcdef"
+
+# (index, count, hash)
+Node = Tuple[int, int, str]
+
+
+def _bucket_sql(r: str) -> str:
+    """Leaf bucket of an events row (same expression in triggers and replay)."""
+    physical = (f"CASE WHEN instr({r}.hlc, '.') > 1 "
+                f"THEN CAST(substr({r}.hlc, 1, instr({r}.hlc, '.') - 1) AS INTEGER) "
+                f"ELSE COALESCE({r}.ts_device, 0) END")
+    return f"(({physical}) / {DIGEST_BUCKET_MS})"
+
+
+def _value_sql(r: str) -> str:
+    """First 48 bits of payload_hash as an integer (0 if missing / not hex)."""
+    h = f"lower({r}.payload_hash)"
+    digits = " + ".join(
+        f"(instr('{_HEX}', substr({h}, {i + 1}, 1)) - 1) * {16 ** (11 - i)}" for i in range(12)
+    )
+    return (f"(CASE WHEN length({r}.payload_hash) >= 12 "
+            f"AND substr({h}, 1, 12) NOT GLOB '*[^0-9a-f]*' THEN {digits} ELSE 0 END)")
+
+
+def _leaf_hash(digest: int) -> str:
+    return f"{digest:012x}"
+
+
+def node_hash(children: List[Node]) -> str:
+    """Hash of a node from its (index, count, hash) children, sorted by index."""
+    body = "|".join(f"{i}:{c}:{h}" for i, c, h in sorted(children))
+    return hashlib.sha256(body.encode("ascii")).hexdigest()[:16]
+
+
+def bucket_range_ms(level: int, index: int) -> Tuple[int, int]:
+    """[start, end) HLC physical milliseconds covered by a node."""
+    span = DIGEST_BUCKET_MS * DIGEST_FANOUT ** level
+    return index * span, (index + 1) * span
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+
+def digest_source_present(cursor: sqlite3.Cursor) -> bool:
+    """True if events has the unified (m009) columns the digest reads."""
+    cursor.execute("PRAGMA table_info(events)")
+    columns = {row[1] for row in cursor.fetchall()}
+    return {"hlc", "ts_device", "payload_hash"} <= columns
+
+
+def ensure_event_digest_schema(cursor: sqlite3.Cursor):
+    """
+    Create event_digest_buckets and the events triggers maintaining it (idempotent).
+
+    Must be called after the events table exists (m009).
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_digest_buckets (
+            bucket INTEGER PRIMARY KEY,
+            event_count INTEGER NOT NULL DEFAULT 0,
+            digest INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    def add(r: str) -> str:
+        return f"""
+            INSERT INTO event_digest_buckets (bucket, event_count, digest)
+            VALUES ({_bucket_sql(r)}, 1, {_value_sql(r)})
+            ON CONFLICT(bucket) DO UPDATE SET
+                event_count = event_count + 1,
+                digest = (digest + excluded.digest) % {DIGEST_MOD};
+        """
+
+    def remove(r: str) -> str:
+        return f"""
+            UPDATE event_digest_buckets SET
+                event_count = event_count - 1,
+                digest = (digest - {_value_sql(r)} + {DIGEST_MOD}) % {DIGEST_MOD}
+            WHERE bucket = {_bucket_sql(r)};
+            DELETE FROM event_digest_buckets WHERE bucket = {_bucket_sql(r)} AND event_count <= 0;
+        """
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_event_digest_ai
+        AFTER INSERT ON events
+        BEGIN
+            {add('NEW')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_event_digest_ad
+        AFTER DELETE ON events
+        BEGIN
+            {remove('OLD')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_event_digest_au
+        AFTER UPDATE OF hlc, ts_device, payload_hash ON events
+        BEGIN
+            {remove('OLD')}
+            {add('NEW')}
+        END
+    """)
+
+
+# =============================================================================
+# Rebuild / Verify
+# =============================================================================
+
+def _replay(cursor: sqlite3.Cursor) -> Dict[int, Tuple[int, int]]:
+    """bucket -> (count, digest) recomputed from events (sum mod 2^48 in Python: no SUM overflow)."""
+    leaves: Dict[int, Tuple[int, int]] = {}
+    cursor.execute(f"SELECT {_bucket_sql('e')}, {_value_sql('e')} FROM events AS e")
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        for bucket, value in rows:
+            count, digest = leaves.get(bucket, (0, 0))
+            leaves[bucket] = (count + 1, (digest + value) % DIGEST_MOD)
+    return leaves
+
+
+def replay_event_digest(cursor: sqlite3.Cursor) -> int:
+    """Rewrite event_digest_buckets from events (no commit). Returns leaf count."""
+    ensure_event_digest_schema(cursor)
+    leaves = _replay(cursor)
+    cursor.execute("DELETE FROM event_digest_buckets")
+    cursor.executemany("INSERT INTO event_digest_buckets (bucket, event_count, digest) VALUES (?, ?, ?)",
+                       [(b, c, d) for b, (c, d) in leaves.items()])
+    return len(leaves)
+
+
+def rebuild_event_digest(conn: sqlite3.Connection) -> int:
+    """Backfill: replay events and rewrite all digest leaves."""
+    written = replay_event_digest(conn.cursor())
+    conn.commit()
+    logger.info(f"[EventDigest] {written} buckets rebuilt")
+    return written
+
+
+def verify_event_digest(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Replay events and compare against the stored leaves.
+
+    Returns:
+        {"ok": bool, "checked": int, "drift": [{bucket, expected, actual}]}
+    """
+    cursor = conn.cursor()
+    expected = _replay(cursor)
+    cursor.execute("SELECT bucket, event_count, digest FROM event_digest_buckets")
+    actual = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    drift = [
+        {"bucket": b, "expected": expected.get(b), "actual": actual.get(b)}
+        for b in sorted(set(expected) | set(actual)) if expected.get(b) != actual.get(b)
+    ]
+    return {"ok": not drift, "checked": len(set(expected) | set(actual)), "drift": drift}
+
+
+# =============================================================================
+# Tree
+# =============================================================================
+
+def _leaves(conn: sqlite3.Connection, lo: Optional[int] = None, hi: Optional[int] = None) -> List[Node]:
+    sql = "SELECT bucket, event_count, digest FROM event_digest_buckets"
+    params: list = []
+    if lo is not None:
+        sql += " WHERE bucket >= ? AND bucket < ?"
+        params = [lo, hi]
+    rows = conn.execute(sql + " ORDER BY bucket", params).fetchall()
+    return [(row[0], row[1], _leaf_hash(row[2])) for row in rows]
+
+
+def _build(leaves: List[Node], level: int) -> List[Node]:
+    """Nodes at `level` built bottom-up from leaves."""
+    nodes = leaves
+    for _ in range(level):
+        groups: Dict[int, List[Node]] = {}
+        for node in nodes:
+            groups.setdefault(node[0] // DIGEST_FANOUT, []).append(node)
+        nodes = [(index, sum(c for _, c, _ in children), node_hash(children))
+                 for index, children in sorted(groups.items())]
+    return nodes
+
+
+def digest_nodes(conn: sqlite3.Connection, level: int, parent: Optional[int] = None) -> List[Node]:
+    """
+    Nodes at `level` (0 = leaf buckets), optionally only the children of
+    node `parent` at level + 1.
+    """
+    if not 0 <= level <= DIGEST_LEVELS:
+        raise ValueError(f"level must be 0..{DIGEST_LEVELS}")
+    if parent is None:
+        return _build(_leaves(conn), level)
+    if level == DIGEST_LEVELS:
+        raise ValueError("top-level nodes have no parent")
+    span = DIGEST_FANOUT ** (level + 1)
+    return _build(_leaves(conn, parent * span, (parent + 1) * span), level)
+
+
+def digest_root(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Root hash + top-level nodes (the first digest exchange)."""
+    top = digest_nodes(conn, DIGEST_LEVELS)
+    return {
+        "root": node_hash(top),
+        "events_count": sum(c for _, c, _ in top),
+        "bucket_ms": DIGEST_BUCKET_MS,
+        "fanout": DIGEST_FANOUT,
+        "levels": DIGEST_LEVELS,
+        "nodes": top,
+    }
+
+
+def bucket_events(conn: sqlite3.Connection, bucket: int, full: bool = False) -> List[Dict[str, Any]]:
+    """
+    Events of one leaf bucket: (event_id, payload_hash), or full rows.
+
+    HLCs start with a 13-digit physical ms, so the bucket is an indexed hlc
+    string range (idx_events_hlc); rows without an HLC use ts_device.
+    """
+    start, end = bucket_range_ms(0, bucket)
+    columns = "*" if full else "event_id, payload_hash"
+    cursor = conn.execute(f"""
+        SELECT {columns} FROM events AS e
+        WHERE ((e.hlc >= ? AND e.hlc < ?) OR (e.hlc IS NULL AND e.ts_device >= ? AND e.ts_device < ?))
+          AND {_bucket_sql('e')} = ?
+        ORDER BY e.hlc, e.event_id
+    """, (str(start), str(end), start, end, bucket))
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+# =============================================================================
+# Client-side reconciliation
+# =============================================================================
+
+def find_divergent_buckets(local_conn: sqlite3.Connection,
+                           fetch_nodes: Callable[[int, Optional[int]], List[Node]]) -> List[int]:
+    """
+    Descend the remote tree only where it differs from the local one.
+
+    Args:
+        local_conn: local replica
+        fetch_nodes: (level, parent) -> remote nodes, e.g. GET /api/dr/digest?level=&parent=
+
+    Returns:
+        Leaf buckets whose (count, hash) differ (pull them via /api/dr/digest/buckets/{bucket})
+    """
+    divergent: List[int] = []
+    pending: List[Tuple[int, Optional[int]]] = [(DIGEST_LEVELS, None)]
+    while pending:
+        level, parent = pending.pop()
+        remote = {n[0]: n for n in fetch_nodes(level, parent)}
+        local = {n[0]: n for n in digest_nodes(local_conn, level, parent)}
+        for index in sorted(set(remote) | set(local)):
+            if remote.get(index) == local.get(index):
+                continue
+            if level == 0:
+                divergent.append(index)
+            else:
+                pending.append((level - 1, index))
+    return sorted(divergent)
@@ -3,9 +3,11 @@ MIRS Event Service - Event Sourcing for Disaster Recovery
 
 Provides:
 - Event creation and storage
-- Batch restore with idempotency
+- Batch restore with idempotency (bulk: one hash pass, set-based duplicate
+  lookup, executemany; throughput reported per batch)
 - Snapshot UPSERT for immediate UI usability
 - Hash-based duplicate detection
+- Keyset export pages (row dicts or columnar) with counter-based totals
 
 Version: 1.0
 Date: 2026-01-26
@@ -16,19 +18,24 @@ import json
 import logging
 import os
 import sqlite3
+import time
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
+from itertools import groupby
 from typing import Optional, List, Dict, Any, Tuple
 
 from .id_service import (
     generate_event_id,
     compute_event_hash,
+    compute_event_hashes,
     get_current_timestamp_ms,
     get_server_uuid,
     get_db_fingerprint,
 )
 from .hlc import hlc_now, get_hlc
+from .event_digest import DIGEST_BUCKET_MS
+from .event_bus import publish_event
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +46,12 @@ logger = logging.getLogger(__name__)
 DB_PATH = os.environ.get('MIRS_DB_PATH', 'medical_inventory.db')
 STATION_ID = os.environ.get('MIRS_STATION_ID', 'MIRS-DEFAULT')
 
+# Bulk restore: event_ids per IN (...) lookup (below SQLite's 999 host parameter limit)
+RESTORE_LOOKUP_CHUNK = 900
+
+# (database file, schema_version, table) -> column names, see _table_columns()
+_TABLE_COLUMNS_CACHE: Dict[tuple, List[str]] = {}
+
 
 # =============================================================================
 # Data Classes
@@ -111,6 +124,8 @@ class RestoreResult:
     rejected_event_ids: List[str]
     snapshot_tables_restored: List[str]
     message: str
+    elapsed_ms: float = 0.0
+    events_per_second: float = 0.0
 
 
 # =============================================================================
@@ -200,6 +215,16 @@ def create_event(
         event.synced, event.acknowledged,
     ))
 
+    # SSE fan-out once the caller commits
+    publish_event(conn, {
+        'event_id': event_id,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'event_type': event_type,
+        'ts_device': ts_device,
+        'payload': payload,
+    })
+
     logger.debug(f"Created event {event_id}: {entity_type}/{entity_id} - {event_type}")
     return event
 
@@ -208,61 +233,102 @@ def create_event(
 # Event Export (for DR)
 # =============================================================================
 
+# Exported event columns (restore reads these; synced / acknowledged are per-replica state)
+EXPORT_COLUMNS = [
+    'event_id', 'site_id', 'entity_type', 'entity_id', 'actor_id', 'actor_name',
+    'actor_role', 'device_id', 'ts_device', 'ts_server', 'hlc', 'event_type',
+    'schema_version', 'payload_json', 'payload_hash', 'created_at',
+]
+_EXPORT_SELECT = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM events"
+
+
+def export_events_page(
+    conn: sqlite3.Connection,
+    since_hlc: Optional[str] = None,
+    limit: int = 1000,
+) -> Tuple[List[tuple], bool]:
+    """
+    One keyset page of events ordered by hlc (rows are EXPORT_COLUMNS tuples).
+
+    `hlc > ?` seeks idx_events_hlc, so every page costs the same however deep
+    the cursor is (no OFFSET scan).
+
+    Returns:
+        Tuple of (rows, has_more)
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    if since_hlc:
+        cursor.execute(f"{_EXPORT_SELECT} WHERE hlc > ? ORDER BY hlc ASC LIMIT ?",
+                       (since_hlc, limit + 1))  # +1 to check has_more
+    else:
+        cursor.execute(f"{_EXPORT_SELECT} ORDER BY hlc ASC LIMIT ?", (limit + 1,))
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    return rows[:limit], has_more
+
+
 def export_events(
     conn: sqlite3.Connection,
     since_hlc: Optional[str] = None,
     limit: int = 1000,
-    offset: int = 0,
 ) -> Tuple[List[dict], bool, int]:
     """
     Export events for disaster recovery.
 
     Args:
         conn: Database connection
-        since_hlc: Only export events after this HLC (cursor-based pagination)
+        since_hlc: Only export events after this HLC (keyset pagination)
         limit: Maximum number of events to return
-        offset: Offset for pagination (deprecated, use since_hlc)
 
     Returns:
-        Tuple of (events, has_more, total_count)
+        Tuple of (events, has_more, total_count); total_count is the
+        estimate from estimate_event_count()
     """
-    cursor = conn.cursor()
-    cursor.row_factory = sqlite3.Row
+    rows, has_more = export_events_page(conn, since_hlc, limit)
+    events = [dict(zip(EXPORT_COLUMNS, row)) for row in rows]
+    return events, has_more, estimate_event_count(conn, since_hlc)
 
-    # Get total count
-    if since_hlc:
-        cursor.execute(
-            "SELECT COUNT(*) FROM events WHERE hlc > ?",
-            (since_hlc,)
-        )
-    else:
-        cursor.execute("SELECT COUNT(*) FROM events")
-    total_count = cursor.fetchone()[0]
 
-    # Get events
-    if since_hlc:
-        cursor.execute("""
-            SELECT * FROM events
-            WHERE hlc > ?
-            ORDER BY hlc ASC
-            LIMIT ? OFFSET ?
-        """, (since_hlc, limit + 1, offset))  # +1 to check has_more
-    else:
-        cursor.execute("""
-            SELECT * FROM events
-            ORDER BY hlc ASC
-            LIMIT ? OFFSET ?
-        """, (limit + 1, offset))
+def events_to_columns(rows: List[tuple]) -> Dict[str, List[Any]]:
+    """Columnar page encoding: {column: [values...]} instead of one dict per event."""
+    if not rows:
+        return {name: [] for name in EXPORT_COLUMNS}
+    return {name: list(values) for name, values in zip(EXPORT_COLUMNS, zip(*rows))}
 
-    rows = cursor.fetchall()
 
-    # Check if there are more
-    has_more = len(rows) > limit
-    if has_more:
-        rows = rows[:limit]
+def events_from_columns(columns: Dict[str, List[Any]]) -> List[dict]:
+    """Decode a columnar export page back into event dicts (e.g. for restore)."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def estimate_event_count(conn: sqlite3.Connection, since_hlc: Optional[str] = None) -> int:
+    """
+    Events at or after since_hlc's hour, from the trigger-maintained
+    event_digest_buckets counts (no COUNT(*) scan per page).
 
-    events = [dict(row) for row in rows]
-    return events, has_more, total_count
+    Exact without since_hlc; with it, also counts the part of since_hlc's
+    bucket already exported. Falls back to an exact COUNT(*) if the digest table is missing.
+    """
+    cursor = conn.cursor()
+    try:
+        if since_hlc:
+            physical = since_hlc.split('.', 1)[0]
+            if not physical.isdigit():
+                raise ValueError(since_hlc)
+            cursor.execute("SELECT COALESCE(SUM(event_count), 0) FROM event_digest_buckets WHERE bucket >= ?",
+                           (int(physical) // DIGEST_BUCKET_MS,))
+        else:
+            cursor.execute("SELECT COALESCE(SUM(event_count), 0) FROM event_digest_buckets")
+        return cursor.fetchone()[0]
+    except (sqlite3.OperationalError, ValueError):
+        if since_hlc:
+            cursor.execute("SELECT COUNT(*) FROM events WHERE hlc > ?", (since_hlc,))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM events")
+        return cursor.fetchone()[0]
 
 
 def export_snapshot(conn: sqlite3.Connection) -> Dict[str, List[dict]]:
@@ -304,6 +370,40 @@ def export_snapshot(conn: sqlite3.Connection) -> Dict[str, List[dict]]:
 # Event Restore (for DR)
 # =============================================================================
 
+def _event_row(event: dict, payload_hash: str) -> tuple:
+    """Column values for _EVENT_INSERT_SQL (restored events are synced + acknowledged)."""
+    return (
+        event.get('event_id'),
+        event.get('site_id', STATION_ID),
+        event.get('entity_type'),
+        event.get('entity_id'),
+        event.get('actor_id', 'restored'),
+        event.get('actor_name'),
+        event.get('actor_role'),
+        event.get('device_id'),
+        event.get('ts_device'),
+        event.get('ts_server'),
+        event.get('hlc'),
+        event.get('event_type'),
+        event.get('schema_version', '1.0'),
+        event.get('payload_json') or json.dumps(event.get('payload', {})),
+        payload_hash,
+        1,  # Mark as synced (came from restore)
+        1,  # Mark as acknowledged
+    )
+
+
+_EVENT_INSERT_SQL = """
+    INSERT INTO events (
+        event_id, site_id, entity_type, entity_id,
+        actor_id, actor_name, actor_role, device_id,
+        ts_device, ts_server, hlc, event_type,
+        schema_version, payload_json, payload_hash,
+        synced, acknowledged
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
 def insert_event_idempotent(
     cursor: sqlite3.Cursor,
     event: dict,
@@ -338,7 +438,7 @@ def insert_event_idempotent(
 
     if existing:
         existing_hash = existing[0]
-        if existing_hash == incoming_hash:
+        if _same_event_hash(existing_hash, incoming_hash, event):
             return EventInsertResult.ALREADY_PRESENT, None
         else:
             # Hash mismatch - reject and log
@@ -350,37 +450,99 @@ def insert_event_idempotent(
             return EventInsertResult.REJECTED, f"Hash mismatch: {existing_hash} != {incoming_hash}"
 
     # Insert new event
-    cursor.execute("""
-        INSERT INTO events (
-            event_id, site_id, entity_type, entity_id,
-            actor_id, actor_name, actor_role, device_id,
-            ts_device, ts_server, hlc, event_type,
-            schema_version, payload_json, payload_hash,
-            synced, acknowledged
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        event_id,
-        event.get('site_id', STATION_ID),
-        event.get('entity_type'),
-        event.get('entity_id'),
-        event.get('actor_id', 'restored'),
-        event.get('actor_name'),
-        event.get('actor_role'),
-        event.get('device_id'),
-        event.get('ts_device'),
-        event.get('ts_server'),
-        event.get('hlc'),
-        event.get('event_type'),
-        event.get('schema_version', '1.0'),
-        event.get('payload_json') or json.dumps(event.get('payload', {})),
-        incoming_hash,
-        1,  # Mark as synced (came from restore)
-        1,  # Mark as acknowledged
-    ))
+    cursor.execute(_EVENT_INSERT_SQL, _event_row(event, incoming_hash))
 
     return EventInsertResult.INSERTED, None
 
 
+def _same_event_hash(existing_hash: Optional[str], incoming_hash: str, event: dict) -> bool:
+    """Stored hash matches, including rows stored with the pre-v3.6 raw payload_json hash."""
+    if existing_hash == incoming_hash:
+        return True
+    return existing_hash == compute_event_hash(event, parse_payload_json=False)
+
+
+def _fetch_existing_hashes(cursor: sqlite3.Cursor, event_ids: List[str]) -> Dict[str, str]:
+    """payload_hash of every event_id already stored, in IN (...) chunks (not one SELECT per event)."""
+    existing = {}
+    unique_ids = list(dict.fromkeys(eid for eid in event_ids if eid is not None))
+    for i in range(0, len(unique_ids), RESTORE_LOOKUP_CHUNK):
+        chunk = unique_ids[i:i + RESTORE_LOOKUP_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"SELECT event_id, payload_hash FROM events WHERE event_id IN ({placeholders})", chunk)
+        existing.update(cursor.fetchall())
+    return existing
+
+
+def insert_events_bulk(
+    cursor: sqlite3.Cursor,
+    events: List[dict],
+    restore_session_id: str,
+) -> Tuple[int, int, List[str]]:
+    """
+    Set-based equivalent of calling insert_event_idempotent() for each event.
+
+    Hashes the whole batch in one pass, looks up existing hashes with chunked
+    IN queries, then writes new events and rejects with executemany.
+    Duplicates inside the batch behave as in the per-event path: the first
+    copy wins, later copies count as ALREADY_PRESENT or REJECTED.
+
+    Returns:
+        Tuple of (inserted, already_present, rejected_event_ids)
+    """
+    hashes = compute_event_hashes(events)
+    known = _fetch_existing_hashes(cursor, [event.get('event_id') for event in events])
+
+    new_rows = []
+    reject_rows = []
+    already_present = 0
+    for event, incoming_hash in zip(events, hashes):
+        event_id = event.get('event_id')
+        existing_hash = known.get(event_id)
+        if existing_hash is None and event_id not in known:
+            new_rows.append(_event_row(event, incoming_hash))
+            if event_id is not None:
+                known[event_id] = incoming_hash
+        elif _same_event_hash(existing_hash, incoming_hash, event):
+            already_present += 1
+        else:
+            reject_rows.append((event_id, restore_session_id, existing_hash, incoming_hash))
+            logger.warning(f"Rejected event {event_id}: Hash mismatch: {existing_hash} != {incoming_hash}")
+
+    if new_rows:
+        cursor.executemany(_EVENT_INSERT_SQL, new_rows)
+    if reject_rows:
+        cursor.executemany("""
+            INSERT INTO restore_rejects
+            (event_id, restore_session_id, reason, old_hash, new_hash)
+            VALUES (?, ?, 'HASH_MISMATCH', ?, ?)
+        """, reject_rows)
+
+    return len(new_rows), already_present, [row[0] for row in reject_rows]
+
+
+def _table_columns(cursor: sqlite3.Cursor, table_name: str) -> List[str]:
+    """
+    Column names of a table, cached across restore batches.
+
+    The cache is keyed by database file and PRAGMA schema_version, so a
+    migration adding columns invalidates it.
+    """
+    cursor.execute("PRAGMA database_list")
+    db_file = next((row[2] for row in cursor.fetchall() if row[1] == 'main'), '')
+    cursor.execute("PRAGMA schema_version")
+    key = (db_file or id(cursor.connection), cursor.fetchone()[0], table_name)
+
+    columns = _TABLE_COLUMNS_CACHE.get(key)
+    if columns is None:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns = [col[1] for col in cursor.fetchall()]
+        if len(_TABLE_COLUMNS_CACHE) > 256:
+            _TABLE_COLUMNS_CACHE.clear()
+        _TABLE_COLUMNS_CACHE[key] = columns
+    return columns
+
+
 def restore_snapshot(
     cursor: sqlite3.Cursor,
     snapshot: Dict[str, List[dict]],
@@ -389,6 +551,8 @@ def restore_snapshot(
     Restore snapshot data using UPSERT.
 
     This makes UI immediately usable while events are being restored.
+    Consecutive rows with the same column set are written with one
+    executemany, so row order (and INSERT OR REPLACE semantics) is kept.
 
     Args:
         cursor: Database cursor
@@ -403,31 +567,21 @@ def restore_snapshot(
         if not rows:
             continue
 
-        # Get table columns
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns_info = cursor.fetchall()
-        if not columns_info:
+        columns = _table_columns(cursor, table_name)
+        if not columns:
             logger.warning(f"Table {table_name} does not exist, skipping")
             continue
-
-        columns = [col[1] for col in columns_info]
-        pk_column = next((col[1] for col in columns_info if col[5] == 1), columns[0])
-
-        for row in rows:
-            # Filter to only columns that exist in table
-            row_filtered = {k: v for k, v in row.items() if k in columns}
-            if not row_filtered:
-                continue
-
-            col_names = list(row_filtered.keys())
-            placeholders = ', '.join(['?' for _ in col_names])
-            col_list = ', '.join(col_names)
-
-            # Build UPSERT (INSERT OR REPLACE)
-            cursor.execute(f"""
-                INSERT OR REPLACE INTO {table_name} ({col_list})
+        column_set = set(columns)
+
+        # Filter to only columns that exist in table, grouped by column list
+        filtered = ([k for k in row if k in column_set] for row in rows)
+        keyed = ((tuple(cols), row) for cols, row in zip(filtered, rows) if cols)
+        for col_names, group in groupby(keyed, key=lambda item: item[0]):
+            placeholders = ', '.join('?' * len(col_names))
+            cursor.executemany(f"""
+                INSERT OR REPLACE INTO {table_name} ({', '.join(col_names)})
                 VALUES ({placeholders})
-            """, list(row_filtered.values()))
+            """, [[row[c] for c in col_names] for _, row in group])
 
         restored_tables.append(table_name)
         logger.info(f"Restored {len(rows)} rows to {table_name}")
@@ -448,6 +602,8 @@ def restore_events_batch(
     Restore a batch of events (and optionally snapshot) from a client.
 
     All operations are performed in a single transaction for SD card protection.
+    Events go through insert_events_bulk (one hash pass, set-based duplicate
+    lookup, executemany); throughput is reported in the result.
 
     Args:
         conn: Database connection
@@ -462,12 +618,8 @@ def restore_events_batch(
         RestoreResult with statistics
     """
     cursor = conn.cursor()
-
-    inserted = 0
-    already_present = 0
-    rejected = 0
-    rejected_ids = []
     snapshot_tables = []
+    started = time.perf_counter()
 
     try:
         # Start transaction (G3: single batch transaction)
@@ -478,16 +630,8 @@ def restore_events_batch(
             snapshot_tables = restore_snapshot(cursor, snapshot)
 
         # Step 2: Insert events with idempotency check (C3: hash validation)
-        for event in events:
-            result, error = insert_event_idempotent(cursor, event, restore_session_id)
-            if result == EventInsertResult.INSERTED:
-                inserted += 1
-            elif result == EventInsertResult.ALREADY_PRESENT:
-                already_present += 1
-            elif result == EventInsertResult.REJECTED:
-                rejected += 1
-                rejected_ids.append(event.get('event_id'))
-                logger.warning(f"Rejected event {event.get('event_id')}: {error}")
+        inserted, already_present, rejected_ids = insert_events_bulk(cursor, events, restore_session_id)
+        rejected = len(rejected_ids)
 
         # Log restore operation
         cursor.execute("""
@@ -502,8 +646,11 @@ def restore_events_batch(
 
         conn.commit()
 
+        elapsed = time.perf_counter() - started
+        events_per_second = round(len(events) / elapsed, 1) if elapsed > 0 else 0.0
         status = "COMPLETED" if is_final_batch else "IN_PROGRESS"
-        message = f"Batch {batch_number} processed: {inserted} inserted, {already_present} existing, {rejected} rejected"
+        message = (f"Batch {batch_number} processed: {inserted} inserted, {already_present} existing, "
+                   f"{rejected} rejected ({events_per_second:.0f} events/s)")
 
         return RestoreResult(
             status=status,
@@ -516,6 +663,8 @@ def restore_events_batch(
             rejected_event_ids=rejected_ids,
             snapshot_tables_restored=snapshot_tables,
             message=message,
+            elapsed_ms=round(elapsed * 1000, 1),
+            events_per_second=events_per_second,
         )
 
     except Exception as e:
@@ -547,10 +696,8 @@ def get_events_by_entity(
 
 
 def get_event_count(conn: sqlite3.Connection) -> int:
-    """Get total event count."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM events")
-    return cursor.fetchone()[0]
+    """Get total event count (exact: the digest bucket counts cover every row)."""
+    return estimate_event_count(conn)
 
 
 def get_last_hlc(conn: sqlite3.Connection) -> Optional[str]:
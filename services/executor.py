@@ -0,0 +1,226 @@
+"""
+MIRS Managed Executor - Blocking work off the event loop, with limits and metrics
+
+Provides:
+- Categories with their own concurrency limit, so a slow export or a burst of
+  PIN logins cannot take every worker (and every other tablet's latency):
+    auth    bcrypt PIN verification
+    crypto  NaCl envelope sign/encrypt/verify
+    export  zip / backup / CSV streams
+    qr      QR image rendering (process pool: pure-Python, holds the GIL)
+    db      synchronous sqlite3 work from async endpoints
+- run_in_executor(category, fn, *args): await blocking work
+- iterate_in_executor(category, iterator): async wrapper for StreamingResponse
+- Per-category metrics: queue depth, running, wait time (submit -> start,
+  avg / p95 / max), run time, errors - reported by /api/health
+
+Environment:
+- MIRS_EXECUTOR_THREADS     shared thread pool size (default: 16)
+- MIRS_EXECUTOR_PROCESSES   process pool size for "process" categories (default: 1)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_THREADS = int(os.environ.get("MIRS_EXECUTOR_THREADS", "16"))
+EXECUTOR_PROCESSES = int(os.environ.get("MIRS_EXECUTOR_PROCESSES", "1"))
+
+# name -> (kind, concurrency limit)
+CATEGORIES = {
+    "auth": ("thread", 2),
+    "crypto": ("thread", 2),
+    "export": ("thread", 2),
+    "qr": ("process", 1),
+    "db": ("thread", 8),
+}
+
+_SAMPLES = 256
+_STOP = object()
+
+
+@dataclass
+class CategoryStats:
+    kind: str
+    limit: int
+    waiting: int = 0
+    running: int = 0
+    completed: int = 0
+    errors: int = 0
+    wait_ms_max: float = 0.0
+    run_ms_max: float = 0.0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=_SAMPLES))
+    runs: Deque[float] = field(default_factory=lambda: deque(maxlen=_SAMPLES))
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        return {
+            "kind": self.kind,
+            "limit": self.limit,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "errors": self.errors,
+            "wait_ms_avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 2),
+            "run_ms_avg": round(sum(self.runs) / len(self.runs), 2) if self.runs else 0.0,
+            "run_ms_max": round(self.run_ms_max, 2),
+        }
+
+
+def _timed_call(submitted: float, fn: Callable, args, kwargs):
+    """Runs in the worker: returns (result, wait_s, run_s).
+
+    perf_counter is system-wide monotonic on Linux, so wait_s is valid for
+    forked process workers too.
+    """
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, started - submitted, time.perf_counter() - started
+
+
+class ManagedExecutor:
+    """Shared thread/process pools gated by per-category semaphores."""
+
+    def __init__(self, categories: Dict[str, tuple] = None,
+                 threads: int = EXECUTOR_THREADS, processes: int = EXECUTOR_PROCESSES):
+        self._categories = dict(categories or CATEGORIES)
+        self._threads = threads
+        self._processes = processes
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # asyncio.Semaphore 綁定 event loop；每個 loop 各一組 (測試 / TestClient 會建新 loop)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+            weakref.WeakKeyDictionary()
+        self._stats = {name: CategoryStats(kind, limit) for name, (kind, limit) in self._categories.items()}
+
+    def _semaphore(self, category: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.get(loop)
+        if per_loop is None:
+            per_loop = {name: asyncio.Semaphore(limit) for name, (_, limit) in self._categories.items()}
+            self._semaphores[loop] = per_loop
+        return per_loop[category]
+
+    def _pool(self, kind: str):
+        with self._pool_lock:
+            if kind == "process":
+                if self._process_pool is None:
+                    # fork: 與 pdf_worker 相同，避免 spawn 重新 import main.py
+                    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self._processes,
+                        mp_context=multiprocessing.get_context(method),
+                    )
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self._threads, thread_name_prefix="mirs-exec")
+            return self._thread_pool
+
+    async def run(self, category: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run blocking `fn(*args, **kwargs)` in the category's pool."""
+        stats = self._stats[category]
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        stats.waiting += 1
+        acquired = False
+        try:
+            async with self._semaphore(category):
+                stats.waiting -= 1
+                acquired = True
+                stats.running += 1
+                try:
+                    result, wait_s, run_s = await loop.run_in_executor(
+                        self._pool(stats.kind), _timed_call, submitted, fn, args, kwargs
+                    )
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.running -= 1
+        finally:
+            if not acquired:  # 排隊中被取消
+                stats.waiting -= 1
+        stats.completed += 1
+        stats.waits.append(wait_s * 1000)
+        stats.runs.append(run_s * 1000)
+        stats.wait_ms_max = max(stats.wait_ms_max, wait_s * 1000)
+        stats.run_ms_max = max(stats.run_ms_max, run_s * 1000)
+        return result
+
+    async def iterate(self, category: str, iterator: Iterable, first: Any = _STOP) -> AsyncIterator:
+        """Pull a blocking iterator chunk by chunk through a thread category."""
+        iterator = iter(iterator)
+        try:
+            if first is not _STOP:
+                yield first
+            while True:
+                chunk = await self.run(category, next, iterator, _STOP)
+                if chunk is _STOP:
+                    break
+                yield chunk
+        finally:
+            # 客戶端中斷下載: 關閉 generator，釋放其持有的連線
+            close = getattr(iterator, "close", None)
+            if close:
+                try:
+                    close()
+                except ValueError:
+                    pass  # 仍在 worker 執行中，由 GC 收尾
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": self._threads,
+            "processes": self._processes,
+            "categories": {name: s.snapshot() for name, s in self._stats.items()},
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+
+_executor: Optional[ManagedExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ManagedExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ManagedExecutor()
+    return _executor
+
+
+async def run_in_executor(category: str, fn: Callable, *args, **kwargs) -> Any:
+    return await get_executor().run(category, fn, *args, **kwargs)
+
+
+def iterate_in_executor(category: str, iterator: Iterable, first: Any = _STOP) -> AsyncIterator:
+    return get_executor().iterate(category, iterator, first)
+
+
+def shutdown_executors():
+    if _executor is not None:
+        _executor.shutdown()
@@ -7,7 +7,9 @@ HLC combines physical time with a logical counter to provide:
 - Monotonically increasing timestamps
 
 Format: "{physical_ms}.{logical_counter}.{node_id}"
+Bulk writers reserve many timestamps at once with hlc_now_many(n) (HLCBlock).
 Example: "1737856800000.5.BORP-DNO-01"
+         "1737856800000.0.BORP-DNO-01-w2"  (worker slot 2 under --workers N)
 
 Reference: Logical Physical Clocks (Kulkarni et al., 2014)
 Version: 1.0
@@ -16,7 +18,7 @@ Date: 2026-01-25
 
 import time
 import threading
-from typing import Tuple, Optional
+from typing import Iterator, Tuple, Optional
 
 
 def parse_hlc(hlc_str: str) -> Tuple[int, int, str]:
@@ -40,6 +42,41 @@ def format_hlc(physical: int, logical: int, node_id: str) -> str:
     return f"{physical}.{logical}.{node_id}"
 
 
+class HLCBlock:
+    """
+    n consecutive HLC timestamps reserved by HybridLogicalClock.now_many().
+
+    Stored as (physical, first logical, count, node_id); the strings are
+    only formatted when indexed / iterated.
+    """
+
+    __slots__ = ("physical", "logical", "count", "node_id")
+
+    def __init__(self, physical: int, logical: int, count: int, node_id: str):
+        self.physical = physical
+        self.logical = logical
+        self.count = count
+        self.node_id = node_id
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("HLCBlock index out of range")
+        return format_hlc(self.physical, self.logical + index, self.node_id)
+
+    def __iter__(self) -> Iterator[str]:
+        prefix, suffix = f"{self.physical}.", f".{self.node_id}"
+        for logical in range(self.logical, self.logical + self.count):
+            yield f"{prefix}{logical}{suffix}"
+
+    def __repr__(self) -> str:
+        return f"HLCBlock({self.physical}, {self.logical}..{self.logical + self.count - 1}, {self.node_id!r})"
+
+
 class HybridLogicalClock:
     """
     Thread-safe Hybrid Logical Clock implementation.
@@ -99,6 +136,29 @@ class HybridLogicalClock:
 
             return format_hlc(self._physical, self._logical, self.node_id)
 
+    def now_many(self, n: int) -> HLCBlock:
+        """
+        Reserve n local-event timestamps under one lock.
+
+        Equivalent to n calls of now() within one millisecond: the block
+        shares one physical time with consecutive logical counters.
+
+        Returns:
+            HLCBlock (formatted lazily)
+        """
+        with self._lock:
+            wall = self._wall_time_ms()
+
+            if wall > self._physical:
+                self._physical = wall
+                first = 0
+            else:
+                first = self._logical + 1
+            if n > 0:
+                self._logical = first + n - 1
+
+            return HLCBlock(self._physical, first, max(n, 0), self.node_id)
+
     def receive(self, remote_hlc: str) -> str:
         """
         Update clock upon receiving a remote event.
@@ -230,6 +290,7 @@ class HybridLogicalClock:
 
 # Global HLC instance (initialized on first use)
 _global_hlc: Optional[HybridLogicalClock] = None
+_global_node_id: Optional[str] = None     # station node id before the worker suffix
 _global_lock = threading.Lock()
 
 
@@ -243,16 +304,29 @@ def get_hlc(node_id: Optional[str] = None) -> HybridLogicalClock:
     Returns:
         Global HybridLogicalClock instance
     """
-    global _global_hlc
+    global _global_hlc, _global_node_id
 
     with _global_lock:
         if _global_hlc is None:
             if node_id is None:
                 raise ValueError("node_id required for first HLC initialization")
-            _global_hlc = HybridLogicalClock(node_id)
+            # v3.6: 多 worker 時每個 worker 是獨立節點 ("<station>-w<slot>")，避免同毫秒重複
+            from .worker_coordination import worker_node_id
+            _global_node_id = node_id
+            _global_hlc = HybridLogicalClock(worker_node_id(node_id))
         return _global_hlc
 
 
+def refresh_worker_node_id():
+    """Re-derive the global clock's node id after this worker moved to another slot."""
+    with _global_lock:
+        if _global_hlc is None:
+            return
+        from .worker_coordination import worker_node_id
+        with _global_hlc._lock:
+            _global_hlc.node_id = worker_node_id(_global_node_id)
+
+
 def hlc_now(node_id: Optional[str] = None) -> str:
     """
     Convenience function to get current HLC timestamp.
@@ -266,6 +340,20 @@ def hlc_now(node_id: Optional[str] = None) -> str:
     return get_hlc(node_id).now()
 
 
+def hlc_now_many(n: int, node_id: Optional[str] = None) -> HLCBlock:
+    """
+    Convenience function to reserve n HLC timestamps for a bulk write.
+
+    Args:
+        n: Number of timestamps
+        node_id: Node identifier (required on first call)
+
+    Returns:
+        HLCBlock
+    """
+    return get_hlc(node_id).now_many(n)
+
+
 def hlc_receive(remote_hlc: str, node_id: Optional[str] = None) -> str:
     """
     Convenience function to update HLC on receiving remote event.
@@ -2,7 +2,8 @@
 MIRS ID Service - UUIDv7 + Time Validity Gate
 
 Provides:
-- UUIDv7 generation (time-sortable unique IDs)
+- UUIDv7 generation (time-sortable unique IDs; generate_many reserves a block
+  for bulk writers, formatted only at serialization time)
 - Server UUID management (persistent instance identity)
 - Time validity gate (prevents operation with invalid system time)
 
@@ -12,6 +13,7 @@ Reference: DEV_SPEC_LIFEBOAT_MIRS_v1.1
 """
 
 import hashlib
+import json
 import os
 import random
 import sqlite3
@@ -20,7 +22,10 @@ import threading
 import time
 import uuid
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+
+from .db_pool import get_pool
+from .worker_coordination import get_worker_slot
 
 # =============================================================================
 # Constants
@@ -33,6 +38,9 @@ BUILD_DATE_TS = 1737849600000  # 2026-01-26 00:00:00 UTC in milliseconds
 # Database path
 DB_PATH = os.environ.get('MIRS_DB_PATH', 'medical_inventory.db')
 
+# (database file, inode) -> server_uuid, see get_server_uuid()
+_SERVER_UUID_CACHE: dict = {}
+
 
 # =============================================================================
 # Exceptions
@@ -95,6 +103,20 @@ def is_time_valid() -> Tuple[bool, Optional[str]]:
 # UUIDv7 Generator
 # =============================================================================
 
+def _uuid7_int(pos: int, rand_b: int) -> int:
+    """128-bit UUIDv7 from a reserved (ms << 12 | sequence) position and 62 bits of rand_b."""
+    # 48 bits timestamp | version 7 | 12 bits sequence | variant 10 | rand_b
+    return ((((pos >> 12) << 16) | 0x7000 | (pos & 0xFFF)) << 64) | 0x8000000000000000 | rand_b
+
+
+def format_uuidv7(value) -> str:
+    """Hyphenated string of a UUIDv7 int or 16-byte value (see generate_many)."""
+    if isinstance(value, (bytes, bytearray)):
+        value = int.from_bytes(value, 'big')
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
 class UUIDv7Generator:
     """
     Thread-safe UUIDv7 generator.
@@ -104,7 +126,7 @@ class UUIDv7Generator:
     - 4 bits: Version (7)
     - 12 bits: Random (rand_a)
     - 2 bits: Variant (10)
-    - 62 bits: Random (rand_b)
+    - 62 bits: Random (rand_b; top 8 bits = worker slot under --workers N)
 
     Benefits:
     - Time-sortable (older IDs sort before newer)
@@ -117,6 +139,27 @@ class UUIDv7Generator:
         self._last_timestamp = 0
         self._sequence = 0
 
+    def _reserve(self, n: int) -> int:
+        """
+        Reserve n consecutive (timestamp_ms << 12 | sequence) positions (caller holds the lock).
+
+        A new millisecond starts at a random sequence; when the 12-bit
+        sequence runs out the block continues into the next millisecond
+        (RFC 9562 6.2 method 1), so a block never waits and never goes
+        backwards, even if the wall clock does.
+
+        Returns:
+            First reserved position
+        """
+        now_ms = int(time.time() * 1000)
+        if now_ms > self._last_timestamp:
+            first = (now_ms << 12) | random.randint(0, 0xFFF)
+        else:
+            first = ((self._last_timestamp << 12) | self._sequence) + 1
+        last = first + n - 1
+        self._last_timestamp, self._sequence = last >> 12, last & 0xFFF
+        return first
+
     def generate(self) -> str:
         """
         Generate a new UUIDv7.
@@ -130,41 +173,46 @@ class UUIDv7Generator:
         validate_time()
 
         with self._lock:
-            now_ms = int(time.time() * 1000)
-
-            if now_ms == self._last_timestamp:
-                # Same millisecond - use sequence counter
-                self._sequence += 1
-                if self._sequence > 0xFFF:  # 12 bits max
-                    # Sequence exhausted - wait for next millisecond
-                    while now_ms == self._last_timestamp:
-                        time.sleep(0.001)
-                        now_ms = int(time.time() * 1000)
-                    self._sequence = 0
-            else:
-                self._last_timestamp = now_ms
-                self._sequence = random.randint(0, 0xFFF)
-
-            # Build UUIDv7
-            # First 48 bits: timestamp
-            # Next 4 bits: version (7)
-            # Next 12 bits: sequence/random
-            time_high = (now_ms >> 16) & 0xFFFFFFFF
-            time_low = now_ms & 0xFFFF
-
-            # Version 7 + 12-bit sequence
-            ver_seq = 0x7000 | (self._sequence & 0x0FFF)
-
-            # Variant (10) + 62 bits random
+            pos = self._reserve(1)
+
+        # Variant (10) + 62 bits random
+        # v3.6: 多 worker 時前 8 bits 為 worker slot，不同 worker 同毫秒同序號也不會相撞
+        slot = get_worker_slot()
+        if slot is None:
             rand_b = random.getrandbits(62)
-            var_rand = 0x8000000000000000 | rand_b
+        else:
+            rand_b = (slot << 54) | random.getrandbits(54)
 
-            # Combine into UUID
-            uuid_int = (time_high << 96) | (time_low << 80) | (ver_seq << 64) | var_rand
+        return format_uuidv7(_uuid7_int(pos, rand_b))
 
-            # Format as hyphenated string
-            uuid_bytes = uuid_int.to_bytes(16, 'big')
-            return str(uuid.UUID(bytes=uuid_bytes))
+    def generate_many(self, n: int, as_bytes: bool = False) -> List:
+        """
+        Reserve n UUIDv7s at once: one time validation, one lock, one random read.
+
+        The IDs are consecutive and sort after everything generated before.
+        They are returned as 128-bit ints (or 16-byte big-endian values);
+        format with format_uuidv7() only when serializing.
+
+        Raises:
+            TimeValidityError if system time is invalid
+        """
+        if n <= 0:
+            return []
+        validate_time()
+
+        with self._lock:
+            first = self._reserve(n)
+
+        slot = get_worker_slot()
+        if slot is None:
+            prefix, mask = 0, (1 << 62) - 1
+        else:
+            prefix, mask = slot << 54, (1 << 54) - 1
+        randoms = struct.unpack(f">{n}Q", os.urandom(8 * n))
+        ids = [_uuid7_int(pos, prefix | (r & mask)) for pos, r in zip(range(first, first + n), randoms)]
+        if as_bytes:
+            return [v.to_bytes(16, 'big') for v in ids]
+        return ids
 
     def parse_timestamp(self, uuid7: str) -> int:
         """
@@ -228,15 +276,37 @@ def generate_uuidv7() -> str:
     return get_uuid7_generator().generate()
 
 
+def generate_uuidv7_many(n: int, as_bytes: bool = False) -> List:
+    """Convenience function: n UUIDv7s as ints / bytes (see UUIDv7Generator.generate_many)."""
+    return get_uuid7_generator().generate_many(n, as_bytes=as_bytes)
+
+
 def generate_event_id() -> str:
     """Generate an event ID (alias for UUIDv7)."""
     return generate_uuidv7()
 
 
+def generate_event_ids(n: int) -> List[str]:
+    """n event IDs from one reserved UUIDv7 block, formatted."""
+    return [format_uuidv7(v) for v in generate_uuidv7_many(n)]
+
+
 # =============================================================================
 # Server UUID Management
 # =============================================================================
 
+def _database_key(conn: sqlite3.Connection) -> Optional[tuple]:
+    """(file, inode) of the main database (a replaced file gets a new key); None for :memory:."""
+    row = next((r for r in conn.execute("PRAGMA database_list") if r[1] == 'main'), None)
+    path = row[2] if row else ''
+    if not path:
+        return None
+    try:
+        return (path, os.stat(path).st_ino)
+    except OSError:
+        return None
+
+
 def get_server_uuid(conn: Optional[sqlite3.Connection] = None) -> str:
     """
     Get or create the persistent server UUID.
@@ -247,6 +317,9 @@ def get_server_uuid(conn: Optional[sqlite3.Connection] = None) -> str:
     Used by clients to detect when they're talking to a new/different server
     (triggering Lifeboat restore).
 
+    Cached in memory per database file (keyed by inode, so a replaced file
+    is read again); export pages no longer hit system_config.
+
     Args:
         conn: Optional database connection (creates one if not provided)
 
@@ -255,10 +328,14 @@ def get_server_uuid(conn: Optional[sqlite3.Connection] = None) -> str:
     """
     close_conn = False
     if conn is None:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_pool(DB_PATH).writer()
         close_conn = True
 
     try:
+        key = _database_key(conn)
+        if key in _SERVER_UUID_CACHE:
+            return _SERVER_UUID_CACHE[key]
+
         cursor = conn.cursor()
 
         # Ensure system_config table exists
@@ -275,6 +352,8 @@ def get_server_uuid(conn: Optional[sqlite3.Connection] = None) -> str:
         row = cursor.fetchone()
 
         if row:
+            if key:
+                _SERVER_UUID_CACHE[key] = row[0]
             return row[0]
 
         # Generate new server_uuid
@@ -286,6 +365,8 @@ def get_server_uuid(conn: Optional[sqlite3.Connection] = None) -> str:
         )
         conn.commit()
 
+        if key:
+            _SERVER_UUID_CACHE[key] = server_uuid
         return server_uuid
 
     finally:
@@ -307,7 +388,7 @@ def get_db_fingerprint(conn: Optional[sqlite3.Connection] = None) -> Optional[st
     """
     close_conn = False
     if conn is None:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_pool(DB_PATH).writer()
         close_conn = True
 
     try:
@@ -336,7 +417,12 @@ def get_db_fingerprint(conn: Optional[sqlite3.Connection] = None) -> Optional[st
 # Event Hash Computation
 # =============================================================================
 
-def compute_event_hash(event: dict) -> str:
+# Same output as json.dumps(..., sort_keys=True, ensure_ascii=False), without
+# constructing a new encoder per call (dominant cost of hashing a restore batch)
+_HASH_ENCODER = json.JSONEncoder(sort_keys=True, ensure_ascii=False)
+
+
+def compute_event_hash(event: dict, parse_payload_json: bool = True) -> str:
     """
     Compute a hash of event content for idempotency checking.
 
@@ -345,11 +431,19 @@ def compute_event_hash(event: dict) -> str:
 
     Args:
         event: Event dictionary
+        parse_payload_json: Hash a payload_json string as its decoded object,
+            so an exported row hashes like the original event. False gives the
+            pre-digest hash of the raw string (rows restored before v3.6).
 
     Returns:
         16-character hex hash
     """
-    import json
+    payload = event.get('payload') or event.get('payload_json')
+    if parse_payload_json and isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            pass
 
     # Fields that define event identity
     hashable = {
@@ -357,16 +451,21 @@ def compute_event_hash(event: dict) -> str:
         'entity_type': event.get('entity_type'),
         'entity_id': event.get('entity_id'),
         'event_type': event.get('event_type'),
-        'payload': event.get('payload') or event.get('payload_json'),
+        'payload': payload,
         'ts_device': event.get('ts_device'),
         'hlc': event.get('hlc') or event.get('hlc_timestamp'),
     }
 
     # Sort keys for deterministic hashing
-    content = json.dumps(hashable, sort_keys=True, ensure_ascii=False)
+    content = _HASH_ENCODER.encode(hashable)
     return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
 
 
+def compute_event_hashes(events: List[dict]) -> List[str]:
+    """compute_event_hash() over a whole restore batch in one pass."""
+    return [compute_event_hash(event) for event in events]
+
+
 # =============================================================================
 # Utility Functions
 # =============================================================================
@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 import uuid
 
+from .db_pool import get_pool
+
 
 class InventoryService(ABC):
     """
@@ -27,9 +29,7 @@ class InventoryService(ABC):
 
     def _get_connection(self) -> sqlite3.Connection:
         """取得資料庫連接"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_pool(self.db_path).writer()
 
     @abstractmethod
     def _get_table_name(self) -> str:
@@ -0,0 +1,136 @@
+"""
+MIRS Lazy Routers - Import optional route modules on first use
+
+Provides:
+- LazyRouterRegistry: prefix -> "module:attr" of an APIRouter; the module
+  is imported (in a worker thread) and included into the app on the first
+  request under that prefix
+- LazyRouterMiddleware: pure ASGI middleware that triggers the load before
+  routing; /openapi.json and /docs load everything so the schema is complete
+- stats() for /api/health (loaded modules and their import time)
+
+Station profiles that never touch e.g. /api/anesthesia or /api/ota no
+longer pay their import time (and matplotlib / aiohttp / PDF stacks) at boot.
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DOC_PATHS = ("/openapi.json", "/docs", "/redoc")
+
+
+@dataclass
+class LazyRouter:
+    prefix: str
+    target: str                     # "routes.anesthesia:router"
+    label: str
+    on_load: Optional[Callable[[Any], None]] = None
+    loaded: bool = False
+    failed: Optional[str] = None
+    load_ms: Optional[float] = None
+
+    @property
+    def module_name(self) -> str:
+        return self.target.split(":", 1)[0]
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+def module_available(module_name: str) -> bool:
+    """True if the module can be found (without importing it)."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyRouterRegistry:
+    """Routers included into `app` on the first request under their prefix."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routers: List[LazyRouter] = []
+        self._lock = threading.Lock()
+
+    def register(self, prefix: str, target: str, label: str,
+                 on_load: Optional[Callable[[Any], None]] = None) -> bool:
+        """Register a lazy router; returns False if its module is not installed."""
+        entry = LazyRouter(prefix=prefix.rstrip("/"), target=target, label=label, on_load=on_load)
+        if not module_available(entry.module_name):
+            logger.warning(f"{label} 模組未啟用 ({entry.module_name} not found)")
+            return False
+        self._routers.append(entry)
+        logger.info(f"✓ {label} 已註冊 ({entry.prefix}, 首次請求時載入)")
+        return True
+
+    @property
+    def pending(self) -> List[LazyRouter]:
+        return [r for r in self._routers if not r.loaded and r.failed is None]
+
+    def _load(self, entry: LazyRouter):
+        with self._lock:
+            if entry.loaded or entry.failed is not None:
+                return
+            start = time.perf_counter()
+            module_name, attr = entry.target.split(":", 1)
+            try:
+                module = importlib.import_module(module_name)
+                self.app.include_router(getattr(module, attr))
+                if entry.on_load:
+                    entry.on_load(module)
+            except Exception as e:
+                entry.failed = str(e)
+                logger.error(f"{entry.label} 載入失敗: {e}")
+                return
+            entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+            entry.loaded = True
+            self.app.openapi_schema = None  # 重新產生 OpenAPI
+            logger.info(f"✓ {entry.label} 已載入 ({entry.prefix}, {entry.load_ms} ms)")
+
+    def load_for_path(self, path: str) -> bool:
+        """Load whatever `path` needs (blocking). Returns True if anything was attempted."""
+        targets = self.pending if path in DOC_PATHS else [r for r in self.pending if r.matches(path)]
+        for entry in targets:
+            self._load(entry)
+        return bool(targets)
+
+    def load_all(self):
+        for entry in self.pending:
+            self._load(entry)
+
+    def needs_load(self, path: str) -> bool:
+        if path in DOC_PATHS:
+            return bool(self.pending)
+        return any(r.matches(path) for r in self.pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            r.prefix: {"loaded": r.loaded, "load_ms": r.load_ms, "error": r.failed}
+            for r in self._routers
+        }
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware: load the lazy router for this path before routing."""
+
+    def __init__(self, app, registry: LazyRouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.registry.needs_load(scope["path"]):
+            # import 可能數百毫秒，不佔用 event loop
+            await asyncio.to_thread(self.registry.load_for_path, scope["path"])
+        await self.app(scope, receive, send)
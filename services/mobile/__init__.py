@@ -4,6 +4,6 @@ MIRS Mobile API v1
 """
 
 from .auth import MobileAuth
-from .routes import router as mobile_router, init_mobile_services
+from .routes import router as mobile_router, init_mobile_services, shutdown_mobile_services
 
-__all__ = ['mobile_router', 'MobileAuth', 'init_mobile_services']
+__all__ = ['mobile_router', 'MobileAuth', 'init_mobile_services', 'shutdown_mobile_services']
@@ -1,13 +1,19 @@
 """
-MIRS Mobile Authentication v1.4
+MIRS Mobile Authentication v1.5
 配對碼 + JWT 認證模組
 支援裝置黑名單、撤銷恢復、Rate Limiting
+
+v1.5: verify_token 不再存取資料庫
+- 撤銷/黑名單狀態快取於記憶體 (撤銷、黑名單及其復原時失效重載)
+- last_seen 先緩衝於記憶體，每 MIRS_MOBILE_LAST_SEEN_FLUSH 秒批次寫入一次
 """
 
+import os
 import secrets
 import hashlib
 import json
 import logging
+import threading
 import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
@@ -17,12 +23,18 @@ import jwt
 import sqlite3
 from pathlib import Path
 
+from ..db_pool import get_pool
+from ..worker_coordination import is_multi_worker, shared_generation, shared_rate_limit
+
 logger = logging.getLogger(__name__)
 
 # Rate limiting settings (v1.4)
 RATE_LIMIT_ATTEMPTS = 5            # Max attempts per minute per IP
 RATE_LIMIT_WINDOW = 60             # Window in seconds
-_rate_limit_store = defaultdict(list)  # IP -> list of timestamps
+_rate_limit_store = defaultdict(list)  # IP -> list of timestamps (single worker)
+
+# v3.6: shared_generations key for revoked / blacklisted device state (--workers N)
+DEVICE_STATE_GENERATION = "mobile_devices"
 
 
 def check_rate_limit(ip: str) -> bool:
@@ -30,6 +42,10 @@ def check_rate_limit(ip: str) -> bool:
     Check if IP has exceeded rate limit.
     Returns True if allowed, False if rate limited.
     """
+    if is_multi_worker():
+        # v3.6: 多 worker 時計數存於 SQLite，否則每個 worker 各自允許 5 次
+        return shared_rate_limit(f"mobile-exchange:{ip}", RATE_LIMIT_ATTEMPTS, RATE_LIMIT_WINDOW)
+
     now = time.time()
     window_start = now - RATE_LIMIT_WINDOW
 
@@ -49,6 +65,9 @@ JWT_SECRET = "mirs-mobile-secret-key-change-in-production"
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 12
 
+# v1.5: last_seen 批次寫入間隔 (秒)
+LAST_SEEN_FLUSH_INTERVAL = float(os.environ.get("MIRS_MOBILE_LAST_SEEN_FLUSH", "30"))
+
 @dataclass
 class PairingCode:
     """配對碼資料結構"""
@@ -83,14 +102,22 @@ class MobileAuth:
 
     def __init__(self, db_path: str = "medical_inventory.db"):
         self.db_path = db_path
+        # v1.5: 撤銷/黑名單快取 (None = 需重新載入)
+        self._state_lock = threading.Lock()
+        self._revoked: Optional[set] = None
+        self._blacklisted: Optional[set] = None
+        self._state_generation = 0  # --workers N: shared_generations["mobile_devices"] when loaded
+        # v1.5: last_seen 緩衝 device_id -> UTC 時間 (同 datetime('now') 格式)
+        self._last_seen_lock = threading.Lock()
+        self._pending_last_seen: Dict[str, str] = {}
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
         self._init_tables()
         self._cleanup_expired_codes()
 
     def _get_conn(self) -> sqlite3.Connection:
         """取得資料庫連線"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_pool(self.db_path).writer()
 
     def _init_tables(self):
         """初始化資料表"""
@@ -280,19 +307,46 @@ class MobileAuth:
         finally:
             conn.close()
 
-    def is_device_blacklisted(self, device_id: str) -> bool:
-        """檢查裝置是否在黑名單中 (v1.4)"""
-        conn = self._get_conn()
+    # =========================================================================
+    # v1.5: 撤銷/黑名單快取
+    # =========================================================================
+
+    def _load_device_state(self):
+        """一次載入所有已撤銷/黑名單裝置"""
+        conn = get_pool(self.db_path).reader()
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT blacklisted FROM mirs_mobile_devices
-                WHERE device_id = ?
-            """, (device_id,))
-            row = cursor.fetchone()
-            return row is not None and row['blacklisted'] == 1
+            rows = conn.execute("""
+                SELECT device_id, revoked, blacklisted FROM mirs_mobile_devices
+                WHERE revoked = 1 OR blacklisted = 1
+            """).fetchall()
         finally:
             conn.close()
+        self._revoked = {row['device_id'] for row in rows if row['revoked'] == 1}
+        self._blacklisted = {row['device_id'] for row in rows if row['blacklisted'] == 1}
+
+    def _device_state(self):
+        with self._state_lock:
+            if is_multi_worker():
+                # v3.6: 其他 worker 的撤銷/黑名單變更以共享 generation 通知
+                generation = shared_generation(DEVICE_STATE_GENERATION)
+                if generation != self._state_generation:
+                    self._revoked = None
+                    self._state_generation = generation
+            if self._revoked is None or self._blacklisted is None:
+                self._load_device_state()
+            return self._revoked, self._blacklisted
+
+    def invalidate_device_state(self):
+        """撤銷/黑名單狀態變更後呼叫，下次檢查時重新載入"""
+        with self._state_lock:
+            self._revoked = None
+            self._blacklisted = None
+        if is_multi_worker():
+            shared_generation(DEVICE_STATE_GENERATION, bump=True)
+
+    def is_device_blacklisted(self, device_id: str) -> bool:
+        """檢查裝置是否在黑名單中 (v1.4; v1.5 記憶體快取)"""
+        return device_id in self._device_state()[1]
 
     def exchange_pairing_code(
         self,
@@ -389,6 +443,7 @@ class MobileAuth:
             ))
 
             conn.commit()
+            self.invalidate_device_state()  # 重新配對會清除 revoked
 
             # 產生 JWT Token
             token_payload = {
@@ -450,18 +505,8 @@ class MobileAuth:
             return None
 
     def is_device_revoked(self, device_id: str) -> bool:
-        """檢查裝置是否已被撤銷"""
-        conn = self._get_conn()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT revoked FROM mirs_mobile_devices
-                WHERE device_id = ?
-            """, (device_id,))
-            row = cursor.fetchone()
-            return row is not None and row['revoked'] == 1
-        finally:
-            conn.close()
+        """檢查裝置是否已被撤銷 (v1.5 記憶體快取)"""
+        return device_id in self._device_state()[0]
 
     def revoke_device(self, device_id: str, reason: str, revoked_by: str = "admin") -> bool:
         """撤銷裝置"""
@@ -488,6 +533,7 @@ class MobileAuth:
             return False
         finally:
             conn.close()
+            self.invalidate_device_state()
 
     def unrevoke_device(self, device_id: str, unrevoked_by: str = "admin") -> bool:
         """恢復已撤銷的裝置 (v1.4)"""
@@ -519,6 +565,7 @@ class MobileAuth:
             return False
         finally:
             conn.close()
+            self.invalidate_device_state()
 
     def blacklist_device(self, device_id: str, reason: str, blacklisted_by: str = "admin") -> bool:
         """將裝置加入黑名單 (v1.4)"""
@@ -563,6 +610,7 @@ class MobileAuth:
             return False
         finally:
             conn.close()
+            self.invalidate_device_state()
 
     def unblacklist_device(self, device_id: str, unblacklisted_by: str = "admin") -> bool:
         """將裝置從黑名單移除 (v1.4)"""
@@ -592,20 +640,61 @@ class MobileAuth:
             return False
         finally:
             conn.close()
+            self.invalidate_device_state()
 
     def _update_last_seen(self, device_id: str):
-        """更新裝置最後活動時間"""
+        """記錄裝置最後活動時間 (v1.5: 緩衝，由背景執行緒批次寫入)"""
+        if not device_id:
+            return
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        with self._last_seen_lock:
+            self._pending_last_seen[device_id] = now
+            if self._flush_thread is None and not self._flush_stop.is_set():
+                self._flush_thread = threading.Thread(
+                    target=self._flush_loop, name="mobile-last-seen", daemon=True
+                )
+                self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(LAST_SEEN_FLUSH_INTERVAL):
+            try:
+                self.flush_last_seen()
+            except Exception as e:
+                logger.warning(f"last_seen 批次寫入失敗: {e}")
+
+    def flush_last_seen(self) -> int:
+        """將緩衝的 last_seen 以單一交易寫入，回傳更新筆數"""
+        with self._last_seen_lock:
+            pending, self._pending_last_seen = self._pending_last_seen, {}
+        if not pending:
+            return 0
+
         conn = self._get_conn()
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
+            conn.executemany("""
                 UPDATE mirs_mobile_devices
-                SET last_seen = datetime('now')
+                SET last_seen = ?
                 WHERE device_id = ?
-            """, (device_id,))
+            """, [(seen, device_id) for device_id, seen in pending.items()])
             conn.commit()
+        except Exception:
+            conn.rollback()
+            with self._last_seen_lock:
+                # 保留較新的值，下次重試
+                for device_id, seen in pending.items():
+                    self._pending_last_seen.setdefault(device_id, seen)
+            raise
         finally:
             conn.close()
+        return len(pending)
+
+    def close(self):
+        """停止背景寫入並寫出剩餘的 last_seen (應用關閉時)"""
+        self._flush_stop.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=5)
+            self._flush_thread = None
+        self.flush_last_seen()
 
     def _get_station_name(self, station_id: str) -> str:
         """取得站點名稱"""
@@ -659,6 +748,7 @@ class MobileAuth:
 
     def get_paired_devices(self, station_id: str = None) -> List[Dict[str, Any]]:
         """取得已配對裝置列表 (v1.4: 包含黑名單狀態)"""
+        self.flush_last_seen()  # v1.5: 顯示最新活動時間
         conn = self._get_conn()
         try:
             cursor = conn.cursor()
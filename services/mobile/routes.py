@@ -64,6 +64,12 @@ def init_mobile_services(db_path: str = "medical_inventory.db", resilience_servi
     logger.info("MIRS Mobile 服務初始化完成")
 
 
+def shutdown_mobile_services():
+    """關閉 Mobile 服務 (寫出緩衝的 last_seen)"""
+    if _mobile_auth is not None:
+        _mobile_auth.close()
+
+
 def get_mobile_auth() -> MobileAuth:
     """取得 MobileAuth 實例"""
     if _mobile_auth is None:
@@ -24,7 +24,7 @@ from enum import Enum
 from pathlib import Path
 from typing import Optional, Tuple, List
 
-import aiohttp
+# aiohttp 僅健康檢查用 - 延到函式內 import (v3.6: 冷啟動不載入)
 
 logger = logging.getLogger(__name__)
 
@@ -371,6 +371,7 @@ async def check_health_comprehensive() -> Tuple[SafetyCheckResult, str]:
 async def _check_api_health() -> bool:
     """Check if API health endpoint responds."""
     try:
+        import aiohttp
         async with aiohttp.ClientSession() as session:
             async with session.get(
                 f"{API_BASE_URL}/api/health",
@@ -417,6 +418,7 @@ def _check_db_query() -> bool:
 async def _check_static_assets() -> bool:
     """Check if static assets are accessible."""
     try:
+        import aiohttp
         async with aiohttp.ClientSession() as session:
             # Try to fetch a known static file
             async with session.get(
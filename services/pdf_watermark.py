@@ -9,27 +9,26 @@ Date: 2026-01-25
 Reference: DEV_SPEC_COMMERCIAL_APPLIANCE_v1.4 (P1-02)
 """
 
+import importlib.util
 import io
 import logging
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-# Try to import PDF libraries
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.colors import Color
-    from PyPDF2 import PdfReader, PdfWriter
-    PDF_WATERMARK_AVAILABLE = True
-except ImportError:
-    PDF_WATERMARK_AVAILABLE = False
+# Check PDF libraries without importing them (imported on first watermark)
+PDF_WATERMARK_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ("reportlab", "PyPDF2")
+)
+if not PDF_WATERMARK_AVAILABLE:
     logger.warning("PDF watermark disabled: missing reportlab or PyPDF2. Install: pip install reportlab PyPDF2")
 
+A4_SIZE = (595.27, 841.89)
+
 
 def create_watermark_pdf(
     text: str,
-    page_size: tuple = A4 if PDF_WATERMARK_AVAILABLE else (595.27, 841.89),
+    page_size: tuple = A4_SIZE,
     opacity: float = 0.15,
     font_size: int = 60,
     angle: int = 45
@@ -51,6 +50,9 @@ def create_watermark_pdf(
         logger.warning("Watermark not available - missing dependencies")
         return None
 
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.colors import Color
+
     buffer = io.BytesIO()
     c = canvas.Canvas(buffer, pagesize=page_size)
 
@@ -116,6 +118,8 @@ def apply_watermark_to_pdf(
         return pdf_buffer
 
     try:
+        from PyPDF2 import PdfReader, PdfWriter
+
         # Read original PDF
         pdf_buffer.seek(0)
         reader = PdfReader(pdf_buffer)
@@ -0,0 +1,456 @@
+"""
+MIRS PDF Render Worker Pool
+
+Provides:
+- Bounded process pool for M0073 rendering (Matplotlib + Jinja2 + WeasyPrint)
+  so the FastAPI event loop never blocks on a PDF
+- Job / status tracking for asynchronous downloads; job ids are
+  <case_id>.<fingerprint> and job state lives next to the cached PDF, so
+  any worker (--workers N) can answer status / download for a job
+- Disk cache keyed by case_id + content fingerprint; unchanged cases are
+  served from cache, only changed cases are re-rendered
+
+Environment:
+- MIRS_PDF_WORKERS      max render processes (default: 1, RPi5 friendly)
+- MIRS_PDF_CACHE_DIR    cache directory (default: exports/pdf_cache)
+- MIRS_PDF_CACHE_MAX    max cached PDFs kept on disk (default: 200)
+- MIRS_PDF_MP_CONTEXT   multiprocessing start method (default: fork on Linux)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates"
+M0073_TEMPLATE = "anesthesia_record_m0073.html"
+
+PDF_WORKERS = max(1, int(os.environ.get("MIRS_PDF_WORKERS", "1")))
+PDF_CACHE_DIR = Path(os.environ.get("MIRS_PDF_CACHE_DIR", "exports/pdf_cache"))
+PDF_CACHE_MAX = int(os.environ.get("MIRS_PDF_CACHE_MAX", "200"))
+JOB_RETENTION_SECONDS = 3600
+_JOB_ID_RE = re.compile(r"^([\w-]+)\.([0-9a-f]+)$")
+
+# fork on Linux/RPi: spawn would re-import main.py (`python main.py`) in every worker
+PDF_MP_CONTEXT = os.environ.get(
+    "MIRS_PDF_MP_CONTEXT", "fork" if sys.platform.startswith("linux") else "spawn"
+)
+
+
+# =============================================================================
+# Rendering (runs inside worker processes - must stay picklable)
+# =============================================================================
+
+def generate_vitals_chart(page_vitals: List[Dict]) -> str:
+    """
+    Generate Matplotlib chart for BP/HR trends of one page.
+    Returns base64-encoded PNG image.
+
+    Chart is designed to align with vitals table below:
+    - Table has fixed 28px row-header + equal-width data columns
+    - Chart uses same structure: Y-axis area + data area
+    - Data points centered in each column
+    - No X-axis labels (table shows time below)
+    """
+    if not page_vitals:
+        return ""
+
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend
+    import matplotlib.pyplot as plt
+
+    n_cols = len(page_vitals)
+
+    # Extract data - X position at column center (0.5, 1.5, 2.5, ...)
+    x_positions = []
+    sbp_values = []
+    dbp_values = []
+    hr_values = []
+
+    for i, v in enumerate(page_vitals):
+        x_positions.append(i + 0.5)  # Center of each column
+        sbp_values.append(v.get('sbp') or None)
+        dbp_values.append(v.get('dbp') or None)
+        hr_values.append(v.get('hr') or None)
+
+    # Create figure - wide aspect ratio to match table width
+    fig_width = 12  # Wide figure for better resolution
+    fig_height = 1.8
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height), dpi=150)
+
+    # Set X-axis to match table columns (0 to n_cols)
+    ax.set_xlim(0, n_cols)
+    ax.set_ylim(0, 200)
+
+    # Plot BP (red/blue) and HR (green) with data points at column centers
+    if any(v is not None for v in sbp_values):
+        ax.plot(x_positions, sbp_values, 'r-', marker='o', markersize=4, linewidth=1.2, label='SBP')
+    if any(v is not None for v in dbp_values):
+        ax.plot(x_positions, dbp_values, 'b-', marker='o', markersize=4, linewidth=1.2, label='DBP')
+    if any(v is not None for v in hr_values):
+        ax.plot(x_positions, hr_values, 'g--', marker='s', markersize=4, linewidth=1.2, label='HR')
+
+    # Vertical grid lines at column boundaries for alignment reference
+    for i in range(n_cols + 1):
+        ax.axvline(x=i, color='#e0e0e0', linestyle='-', linewidth=0.3)
+
+    # Horizontal grid lines at Y values
+    for y in [50, 100, 150]:
+        ax.axhline(y=y, color='#e0e0e0', linestyle='-', linewidth=0.3)
+    ax.axhline(y=100, color='#ccc', linestyle='--', linewidth=0.5)  # 100 reference line
+
+    # Remove X-axis completely (table shows time)
+    ax.set_xticks([])
+    ax.set_xticklabels([])
+    ax.tick_params(axis='x', length=0)
+
+    # Y-axis: show ticks inside the plot area
+    ax.set_yticks([50, 100, 150, 200])
+    ax.tick_params(axis='y', labelsize=8, direction='in', pad=-22)
+    ax.yaxis.set_tick_params(labelleft=True)
+
+    # Remove Y-axis label (external label in HTML)
+    ax.set_ylabel('')
+
+    # Remove spines for cleaner look
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_linewidth(0.5)
+    ax.spines['left'].set_linewidth(0.5)
+
+    # Legend inside the plot area, upper right
+    ax.legend(fontsize=8, loc='upper right', framealpha=0.9, edgecolor='none')
+
+    # Zero margins - Y-axis label is external (in HTML wrapper)
+    # This makes the chart data area align with table data columns
+    plt.subplots_adjust(left=0.001, right=0.999, top=0.95, bottom=0.02)
+
+    # Convert to base64 PNG
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=150, facecolor='#fafafa', edgecolor='none')
+    plt.close(fig)
+    buffer.seek(0)
+    return base64.b64encode(buffer.read()).decode('utf-8')
+
+
+def render_m0073(context: Dict[str, Any], preview: bool = False,
+                 watermark_text: Optional[str] = None, with_charts: bool = True) -> bytes:
+    """
+    Render M0073 anesthesia record. PDF = f(context)
+
+    Args:
+        context: Template context (pages without chart_image)
+        preview: Return HTML instead of PDF
+        watermark_text: License watermark (P1-02), None if licensed
+        with_charts: Draw BP/HR charts (requires matplotlib)
+
+    Returns:
+        HTML (utf-8) or PDF bytes
+    """
+    from jinja2 import Environment, FileSystemLoader
+
+    if with_charts:
+        for page in context.get("pages", []):
+            if not page.get("chart_image"):
+                page["chart_image"] = generate_vitals_chart(page.get("vitals", []))
+
+    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
+    html_content = env.get_template(M0073_TEMPLATE).render(**context)
+    if preview:
+        return html_content.encode('utf-8')
+
+    from weasyprint import HTML as WeasyHTML
+
+    pdf_buffer = io.BytesIO()
+    WeasyHTML(string=html_content, base_url=str(TEMPLATE_DIR)).write_pdf(pdf_buffer)
+    pdf_buffer.seek(0)
+
+    if watermark_text:
+        from services.pdf_watermark import apply_watermark_to_pdf, PDF_WATERMARK_AVAILABLE
+        if PDF_WATERMARK_AVAILABLE:
+            pdf_buffer = apply_watermark_to_pdf(pdf_buffer, watermark_text)
+
+    return pdf_buffer.getvalue()
+
+
+# =============================================================================
+# Fingerprint / Disk Cache
+# =============================================================================
+
+def compute_fingerprint(*parts: Any) -> str:
+    """Stable content hash of everything a rendered PDF depends on."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class PdfCache:
+    """On-disk PDF cache: <dir>/<case_id>/<fingerprint>.pdf (+ .json job state)"""
+
+    def __init__(self, cache_dir: Path = PDF_CACHE_DIR, max_files: int = PDF_CACHE_MAX):
+        self.cache_dir = Path(cache_dir)
+        self.max_files = max_files
+
+    @staticmethod
+    def safe_case(case_id: str) -> str:
+        return "".join(c for c in case_id if c.isalnum() or c in "-_")
+
+    def path_for(self, case_id: str, fingerprint: str) -> Path:
+        return self.cache_dir / self.safe_case(case_id) / f"{fingerprint}.pdf"
+
+    def read_state(self, case_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Job state written by whichever worker owns the render."""
+        try:
+            return json.loads(self.path_for(case_id, fingerprint).with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def write_state(self, case_id: str, fingerprint: str, job: Dict[str, Any]):
+        path = self.path_for(case_id, fingerprint).with_suffix(".json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(job))
+        os.replace(tmp, path)
+
+    def get(self, case_id: str, fingerprint: str) -> Optional[Path]:
+        path = self.path_for(case_id, fingerprint)
+        return path if path.exists() else None
+
+    def put(self, case_id: str, fingerprint: str, data: bytes) -> Path:
+        path = self.path_for(case_id, fingerprint)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Older renders of the same case are stale once a new fingerprint lands
+        for old in path.parent.glob("*.pdf"):
+            if old != path:
+                old.unlink(missing_ok=True)
+                old.with_suffix(".json").unlink(missing_ok=True)
+
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._evict()
+        return path
+
+    def _evict(self):
+        files = sorted(self.cache_dir.glob("*/*.pdf"), key=lambda p: p.stat().st_mtime)
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".json").unlink(missing_ok=True)
+
+        # Job state of renders that never produced a PDF (failed / worker died)
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for state in self.cache_dir.glob("*/*.json"):
+            if not state.with_suffix(".pdf").exists() and state.stat().st_mtime < cutoff:
+                state.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.cache_dir.glob("*/*.pdf")) if self.cache_dir.exists() else []
+        return {
+            "dir": str(self.cache_dir),
+            "files": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+            "max_files": self.max_files,
+        }
+
+
+# =============================================================================
+# Render Service (job tracking + process pool)
+# =============================================================================
+
+class PdfRenderService:
+    """
+    Bounded process pool with job/status tracking and disk cache.
+
+    A job is identified by case + fingerprint; one that is already
+    queued/running in this worker is reused instead of rendering twice.
+    Job state is mirrored to the cache directory so other workers can
+    report it (get_job); only the submitting worker can wait() on it.
+    """
+
+    def __init__(self, max_workers: int = PDF_WORKERS, cache: Optional[PdfCache] = None):
+        self.max_workers = max_workers
+        self.cache = cache or PdfCache()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._stats = {"submitted": 0, "cache_hits": 0, "completed": 0, "failed": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(PDF_MP_CONTEXT),
+            )
+            logger.info(f"[PdfWorker] Process pool started (workers={self.max_workers})")
+        return self._executor
+
+    def submit(self, case_id: str, fingerprint: str, context: Dict[str, Any],
+               watermark_text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Submit a PDF render job (or resolve it from cache).
+
+        Returns:
+            Job dict (status: DONE | PENDING | FAILED)
+        """
+        self._prune()
+
+        cached = self.cache.get(case_id, fingerprint)
+        with self._lock:
+            if cached:
+                self._stats["cache_hits"] += 1
+                return self._new_job(case_id, fingerprint, status="DONE", path=cached, cached=True)
+
+            job = self._jobs.get(self.job_id_for(case_id, fingerprint))
+            if job is not None and job["status"] == "PENDING":
+                return job
+
+            job = self._new_job(case_id, fingerprint, status="PENDING")
+            self._stats["submitted"] += 1
+
+        future = self._get_executor().submit(render_m0073, context, False, watermark_text)
+        with self._lock:
+            self._futures[job["job_id"]] = future
+        future.add_done_callback(lambda f, job_id=job["job_id"]: self._on_done(job_id, f))
+        return job
+
+    def job_id_for(self, case_id: str, fingerprint: str) -> str:
+        return f"{self.cache.safe_case(case_id)}.{fingerprint}"
+
+    def _new_job(self, case_id: str, fingerprint: str, status: str,
+                 path: Optional[Path] = None, cached: bool = False) -> Dict[str, Any]:
+        job = {
+            "job_id": self.job_id_for(case_id, fingerprint),
+            "case_id": case_id,
+            "fingerprint": fingerprint,
+            "status": status,
+            "cached": cached,
+            "path": str(path) if path else None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": time.time() if status == "DONE" else None,
+        }
+        self._jobs[job["job_id"]] = job
+        self._save_state(job)
+        return job
+
+    def _save_state(self, job: Dict[str, Any]):
+        try:
+            self.cache.write_state(job["case_id"], job["fingerprint"], job)
+        except OSError as e:
+            logger.warning(f"[PdfWorker] Could not persist job {job['job_id']}: {e}")
+
+    def _on_done(self, job_id: str, future: Future):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            path = self.cache.put(job["case_id"], job["fingerprint"], future.result())
+            job.update(status="DONE", path=str(path))
+            self._stats["completed"] += 1
+        except Exception as e:
+            logger.error(f"[PdfWorker] Render failed for {job['case_id']}: {e}")
+            job.update(status="FAILED", error=str(e))
+            self._stats["failed"] += 1
+        finally:
+            job["finished_at"] = time.time()
+            self._save_state(job)
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    async def wait(self, job_id: str) -> Dict[str, Any]:
+        """Await a job without blocking the event loop."""
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                pass  # recorded on the job by _on_done (callbacks run in registration order)
+        return self._jobs[job_id]
+
+    async def render_inline(self, context: Dict[str, Any], preview: bool,
+                            watermark_text: Optional[str] = None, with_charts: bool = True) -> bytes:
+        """Render once in the pool without caching (HTML preview)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), render_m0073, context, preview, watermark_text, with_charts
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job from this worker, else from the state another worker left on disk."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        match = _JOB_ID_RE.match(job_id)
+        if not match:
+            return None
+        case_id, fingerprint = match.groups()
+        job = self.cache.read_state(case_id, fingerprint)
+        if job is None:
+            return None
+        if job["status"] == "PENDING" and job["created_at"] < time.time() - JOB_RETENTION_SECONDS:
+            return None  # owner worker went away mid-render
+        if job["status"] == "DONE" and not self.cache.get(case_id, fingerprint):
+            return None  # evicted
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items()
+                           if job["finished_at"] and job["finished_at"] < cutoff]:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j["status"] == "PENDING")
+            return {
+                "workers": self.max_workers,
+                "pool_started": self._executor is not None,
+                "pending": pending,
+                **self._stats,
+                "cache": self.cache.stats(),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_service: Optional[PdfRenderService] = None
+
+
+def get_pdf_service() -> PdfRenderService:
+    """Get the process-wide PDF render service."""
+    global _service
+    if _service is None:
+        _service = PdfRenderService()
+    return _service
+
+
+def shutdown_pdf_service():
+    """Stop the render pool (shutdown hook)."""
+    if _service is not None:
+        _service.shutdown()
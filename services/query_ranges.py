@@ -0,0 +1,90 @@
+"""
+MIRS Query Ranges - Index-friendly (sargable) date filters
+
+`DATE(col) >= ?` wraps the column in a function, so SQLite cannot use an
+index on it and every dashboard / history load becomes a full table scan.
+Stored timestamps are ISO text ('YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DDTHH:MM:SS'),
+so the same day filter is a half-open range on the raw column:
+
+    DATE(col) >= '2026-10-01'  ->  col >= '2026-10-01'
+    DATE(col) <= '2026-10-16'  ->  col <  '2026-10-17'
+
+Provides:
+- day_bounds(start_date, end_date): (lower, upper_exclusive) strings
+- add_day_range(where_clauses, params, column, start_date, end_date)
+- add_item_code_search(where_clauses, params, column, item_code): substring
+  search on the small items / medicines code tables, then an index lookup
+  on the event column (a leading-% LIKE on the event table cannot use one)
+- DATE_RANGE_INDEXES / ensure_date_range_indexes(cursor): indexes backing
+  the range filters (created by migration m013; tables that do not exist
+  on this station, e.g. anesthesia_* without the module, are skipped)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+# (index name, table, columns)
+DATE_RANGE_INDEXES = [
+    ("idx_inventory_events_type_time", "inventory_events", "event_type, timestamp"),
+    ("idx_blood_events_station_time", "blood_events", "station_id, timestamp"),
+    ("idx_dispense_records_created", "dispense_records", "created_at"),
+    ("idx_anes_cases_created", "anesthesia_cases", "created_at"),
+    ("idx_anes_events_type_time", "anesthesia_events", "event_type, clinical_time"),
+]
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise ValueError(f"無效的日期 (YYYY-MM-DD): {value}")
+
+
+def day_bounds(start_date: Optional[str] = None,
+               end_date: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Inclusive YYYY-MM-DD days -> half-open [lower, upper) timestamp bounds."""
+    lower = _parse_day(start_date).isoformat() if start_date else None
+    upper = (_parse_day(end_date) + timedelta(days=1)).isoformat() if end_date else None
+    return lower, upper
+
+
+def add_day_range(where_clauses: List[str], params: list, column: str,
+                  start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Append `column >= lower` / `column < upper` for an inclusive day range."""
+    lower, upper = day_bounds(start_date, end_date)
+    if lower:
+        where_clauses.append(f"{column} >= ?")
+        params.append(lower)
+    if upper:
+        where_clauses.append(f"{column} < ?")
+        params.append(upper)
+
+
+def add_item_code_search(where_clauses: List[str], params: list, column: str, item_code: str):
+    """
+    Append a substring match of `column` against item and medicine codes.
+
+    inventory_events.item_code holds both items.item_code and
+    medicines.medicine_code (dispense writes medicine codes), so both
+    tables are searched.
+    """
+    where_clauses.append(f"""{column} IN (
+        SELECT item_code FROM items WHERE item_code LIKE ?
+        UNION SELECT medicine_code FROM medicines WHERE medicine_code LIKE ?
+    )""")
+    params.extend([f"%{item_code}%"] * 2)
+
+
+def ensure_date_range_indexes(cursor: sqlite3.Cursor) -> List[str]:
+    """Create the range indexes for tables present on this station (idempotent)."""
+    created = []
+    for name, table, columns in DATE_RANGE_INDEXES:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if cursor.fetchone():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+            created.append(name)
+    return created
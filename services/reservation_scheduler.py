@@ -0,0 +1,249 @@
+"""
+MIRS Reservation Expiry Scheduler - Deadline-driven release of blood reservations
+
+Provides:
+- ReservationExpiryScheduler: asyncio task holding a min-heap of
+  reserve_expires_at deadlines; sleeps until the earliest one and runs the
+  release callback exactly when it is due (no write-on-read cleanup)
+- Lazy deletion: re-reserved / cancelled units leave stale heap entries that
+  are skipped when popped; the release callback re-checks the DB anyway
+- Periodic resync from the DB (reservations written by other processes,
+  sync imports, manual edits)
+- Lag metrics (deadline -> release) for /api/blood/reserve-timeout/status
+
+Environment:
+- MIRS_RESERVATION_RESYNC_INTERVAL   seconds between DB resyncs (default: 300)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+RESYNC_INTERVAL = float(os.environ.get("MIRS_RESERVATION_RESYNC_INTERVAL", "300"))
+
+
+def parse_deadline(value: Union[str, datetime]) -> datetime:
+    """reserve_expires_at (ISO, local time) -> naive datetime"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace(" ", "T"))
+
+
+class ReservationExpiryScheduler:
+    """Min-heap of (deadline, unit_id); fires the release callback when due."""
+
+    def __init__(self, release: Callable[[datetime], Dict[str, Any]],
+                 load: Callable[[], Iterable[Tuple[str, Union[str, datetime]]]],
+                 resync_interval: float = RESYNC_INTERVAL,
+                 clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            release: releases every reservation expired at `now` (blocking, run in a thread)
+            load: returns (unit_id, reserve_expires_at) for all active reservations
+        """
+        self._release = release
+        self._load = load
+        self.resync_interval = resync_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[datetime, str]] = []
+        self._deadlines: Dict[str, datetime] = {}
+        # unit_id -> deadline (None = cancelled) changed while resync() loads
+        self._changes: Optional[Dict[str, Optional[datetime]]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_resync: Optional[datetime] = None
+        self.is_running = False
+        self._stats = {
+            "runs": 0, "released_total": 0, "resyncs": 0, "errors": 0,
+            "last_run_at": None, "last_lag_ms": None, "max_lag_ms": 0.0,
+        }
+
+    # =========================================================================
+    # Heap
+    # =========================================================================
+
+    def schedule(self, unit_id: str, expires_at: Union[str, datetime]):
+        """Register (or move) a unit's reservation deadline."""
+        deadline = parse_deadline(expires_at)
+        with self._lock:
+            self._deadlines[unit_id] = deadline
+            if self._changes is not None:
+                self._changes[unit_id] = deadline
+            heapq.heappush(self._heap, (deadline, unit_id))
+            is_earliest = self._heap[0] == (deadline, unit_id)
+        if is_earliest:
+            self._notify()
+
+    def cancel(self, unit_id: str):
+        """Reservation ended early (unreserve / issue); heap entry becomes stale."""
+        with self._lock:
+            self._deadlines.pop(unit_id, None)
+            if self._changes is not None:
+                self._changes[unit_id] = None
+
+    def _pop_due(self, now: datetime) -> List[Tuple[datetime, str]]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, unit_id = heapq.heappop(self._heap)
+                if self._deadlines.get(unit_id) == deadline:
+                    del self._deadlines[unit_id]
+                    due.append((deadline, unit_id))
+            return due
+
+    def _restore(self, due: List[Tuple[datetime, str]]):
+        """Put popped entries back after a failed release (unless rescheduled meanwhile)."""
+        with self._lock:
+            for deadline, unit_id in due:
+                if unit_id not in self._deadlines:
+                    self._deadlines[unit_id] = deadline
+                    heapq.heappush(self._heap, (deadline, unit_id))
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)  # stale
+            return self._heap[0][0] if self._heap else None
+
+    def resync(self):
+        """
+        Reload all active reservation deadlines from the DB (blocking).
+
+        schedule() / cancel() calls made while the snapshot loads are newer
+        than it and are merged on top instead of being overwritten.
+        """
+        with self._lock:
+            self._changes = {}
+        try:
+            rows = list(self._load())
+        except BaseException:
+            with self._lock:
+                self._changes = None
+            raise
+        deadlines = {}
+        for unit_id, expires_at in rows:
+            try:
+                deadlines[unit_id] = parse_deadline(expires_at)
+            except ValueError:
+                logger.warning(f"[Blood] Invalid reserve_expires_at for {unit_id}: {expires_at}")
+        with self._lock:
+            for unit_id, deadline in self._changes.items():
+                if deadline is None:
+                    deadlines.pop(unit_id, None)
+                else:
+                    deadlines[unit_id] = deadline
+            self._changes = None
+            heap = [(deadline, unit_id) for unit_id, deadline in deadlines.items()]
+            heapq.heapify(heap)
+            self._heap, self._deadlines = heap, deadlines
+        self._last_resync = self._clock()
+        self._stats["resyncs"] += 1
+
+    # =========================================================================
+    # Loop
+    # =========================================================================
+
+    def _notify(self):
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run_due(self) -> Dict[str, Any]:
+        """Release everything due now (called by the loop; usable directly in tests)."""
+        now = self._clock()
+        due = self._pop_due(now)
+        if not due:
+            return {"released_count": 0, "unit_ids": []}
+
+        try:
+            result = await asyncio.to_thread(self._release, now)
+        except BaseException:
+            self._restore(due)  # retried on the next loop pass, not at the next resync
+            raise
+        lag_ms = (now - due[0][0]).total_seconds() * 1000
+        self._stats["runs"] += 1
+        self._stats["released_total"] += result.get("released_count", 0)
+        self._stats["last_run_at"] = now.isoformat()
+        self._stats["last_lag_ms"] = round(lag_ms, 1)
+        self._stats["max_lag_ms"] = round(max(self._stats["max_lag_ms"], lag_ms), 1)
+        return result
+
+    async def start(self):
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self.resync)
+        self.is_running = True
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"[Blood] Reservation expiry scheduler started ({len(self._deadlines)} active reservations)")
+
+    async def stop(self):
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_loop(self):
+        while self.is_running:
+            try:
+                now = self._clock()
+                if (now - self._last_resync).total_seconds() >= self.resync_interval:
+                    await asyncio.to_thread(self.resync)
+
+                await self.run_due()
+
+                timeout = self.resync_interval - (self._clock() - self._last_resync).total_seconds()
+                deadline = self.next_deadline()
+                if deadline is not None:
+                    timeout = min(timeout, (deadline - self._clock()).total_seconds())
+
+                self._wakeup.clear()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"[Blood] Reservation expiry scheduler error: {e}")
+                await asyncio.sleep(5)
+
+    def get_status(self) -> Dict[str, Any]:
+        deadline = self.next_deadline()
+        with self._lock:
+            pending = len(self._deadlines)
+            heap_size = len(self._heap)
+        return {
+            "running": self.is_running,
+            "pending_reservations": pending,
+            "heap_size": heap_size,
+            "next_deadline": deadline.isoformat() if deadline else None,
+            "seconds_to_next": round((deadline - self._clock()).total_seconds(), 1) if deadline else None,
+            "last_resync": self._last_resync.isoformat() if self._last_resync else None,
+            **self._stats,
+        }
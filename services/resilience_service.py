@@ -12,6 +12,8 @@ from typing import Optional, Dict, List, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from .db_pool import get_pool
+
 
 class StatusLevel(str, Enum):
     """韌性警戒狀態"""
@@ -86,9 +88,7 @@ class ResilienceService:
             return self._db_manager.get_connection()
         else:
             # Fallback to direct connection (for file-based databases)
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            return conn
+            return get_pool(self.db_path).writer()
 
     # =========================================================================
     # Configuration Methods
@@ -0,0 +1,301 @@
+"""
+MIRS Resilience Simulator - Monte Carlo what-if bands on top of ResilienceService
+
+ResilienceService.calculate_resilience_status gives one hours-to-empty figure
+per lifeline from point estimates (battery level, fuel rate, load, O2 flow).
+The simulator takes the same inputs, applies scenario overrides (population
+growth, extra fuel, load scale...) and samples thousands of consumption
+scenarios at once with NumPy, returning P10 / P50 / P90 bands and the chance
+of lasting the isolation target.
+
+Model (same laws as the service, vectorized):
+- Power  = LINEAR(battery Wh × level / load W) + FUEL_BASED(fuel L × level / L/hr)
+- Oxygen = MAX(LINEAR(cylinder L × level / (flow L/min × 60)),
+               POWER_DEPENDENT(power hours) for power-limited concentrators)
+- Weakest link = MIN(power, oxygen) per sample
+- load / flow / fuel rate: lognormal multipliers with mean 1 (load_cv, flow_cv,
+  fuel_rate_cv); levels: normal around the reported level (level_cv), >= 0
+
+Provides:
+- Scenario: overrides + sampling parameters
+- simulation_inputs(service, station_id): inputs from the service's own calculations
+- simulate(inputs, scenario): bands per lifeline (LRU cached)
+- run_simulation(service, station_id, scenario): both, for POST /api/resilience/simulate
+
+Environment:
+- MIRS_SIMULATION_CACHE_SIZE     cached results (default: 128)
+- MIRS_SIMULATION_MAX_SAMPLES    upper bound on samples per request (default: 100000)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SIMULATION_CACHE_SIZE = int(os.environ.get("MIRS_SIMULATION_CACHE_SIZE", "128"))
+SIMULATION_MAX_SAMPLES = int(os.environ.get("MIRS_SIMULATION_MAX_SAMPLES", "100000"))
+
+DEFAULT_FUEL_RATE_LPH = 1.5      # same fallback as _calculate_power_endurance
+_INF_CAP = 1e9                   # hours; percentiles of "never runs out" samples
+
+
+@dataclass
+class Scenario:
+    """What-if overrides (None = use the station config) and sampling parameters."""
+    samples: int = 5000
+    seed: Optional[int] = None                 # None: derived from inputs + scenario (repeatable)
+    isolation_target_days: Optional[float] = None
+    population_count: Optional[float] = None
+    population_growth: float = 0.0             # 0.3 = +30% on top of population_count
+    load_scale: float = 1.0                    # power load multiplier
+    flow_scale: float = 1.0                    # O2 flow multiplier
+    extra_fuel_liters: float = 0.0
+    extra_oxygen_liters: float = 0.0
+    load_cv: float = 0.15
+    flow_cv: float = 0.2
+    level_cv: float = 0.1
+    fuel_rate_cv: float = 0.1
+
+
+# =============================================================================
+# Inputs
+# =============================================================================
+
+def _finite_hours(value) -> Optional[float]:
+    """effective_hours from a lifeline ('∞' / inf -> None)."""
+    if isinstance(value, str) or value is None or value == float('inf'):
+        return None
+    return float(value)
+
+
+def simulation_inputs(service, station_id: str) -> Dict[str, Any]:
+    """
+    Point-estimate inputs for one station, read through the service's own
+    power / oxygen calculations so the simulation starts from the same numbers.
+
+    Returns plain JSON data; its digest is the cache's inventory version.
+    """
+    config = service.get_config(station_id)
+    isolation_hours = config.get('isolation_target_days', 3) * 24
+    oxygen_profile = service.get_profile(config.get('oxygen_profile_id')) or \
+        service._get_default_profile('OXYGEN')
+    power_profile = service.get_profile(config.get('power_profile_id')) or \
+        service._get_default_profile('POWER')
+
+    power = service._calculate_power_endurance(station_id, power_profile, isolation_hours, config)
+    endurance_map = {'POWER': power['endurance']['effective_hours']}
+    oxygen = service._calculate_oxygen_endurance(
+        station_id, oxygen_profile, isolation_hours, config, endurance_map
+    )
+
+    generators = [i for i in power['inventory']['items'] if i.get('device_type') == 'GENERATOR']
+    cylinders = [o for o in oxygen if o['item_code'] == 'O2-SUPPLY']
+    cylinder_liters = None
+    if cylinders:
+        cylinder_liters = sum(
+            i['effective_total'] if i.get('tracking_mode') == 'PER_UNIT' else i['capacity_each'] * i['qty']
+            for i in cylinders[0]['inventory']['items']
+        )
+    oxygen_hours = [h for h in (_finite_hours(o['endurance']['effective_hours']) for o in oxygen) if h]
+
+    return {
+        'station_id': station_id,
+        'isolation_hours': isolation_hours,
+        'population': config.get('population_count', 1),
+        'power': {
+            'battery_wh': power['inventory']['total_battery_wh'],
+            'fuel_liters': power['inventory']['total_fuel_liters'],
+            'fuel_rate_lph': generators[0]['fuel_rate_lph'] if generators else DEFAULT_FUEL_RATE_LPH,
+            'load_watts': power['consumption']['load_watts'],
+            'hours': _finite_hours(power['endurance']['effective_hours']),
+        },
+        'oxygen': {
+            'cylinder_liters': cylinder_liters,
+            'burn_rate_lpm': oxygen_profile.get('burn_rate', 10),
+            'per_person': bool(oxygen_profile.get('population_multiplier', 0)),
+            'power_limited_concentrators': sum(1 for o in oxygen if o.get('dependency')),
+            'hours': max(oxygen_hours) if oxygen_hours else None,
+        },
+    }
+
+
+# =============================================================================
+# Vectorized strategies (capacity_calculator LINEAR / FUEL_BASED / POWER_DEPENDENT)
+# =============================================================================
+
+def _linear_hours(capacity, level, rate):
+    """LINEAR: capacity × level / rate per hour (rate 0 -> inf)."""
+    return np.where(rate > 0, capacity * level / np.where(rate > 0, rate, 1.0), np.inf)
+
+
+def _fuel_based_hours(tank_liters, level, fuel_rate_lph):
+    """FUEL_BASED: tank × level / fuel_rate_lph (rate 0 -> 0, like FuelBasedCalculator)."""
+    fuel = tank_liters * level
+    return np.where(fuel_rate_lph > 0, fuel / np.where(fuel_rate_lph > 0, fuel_rate_lph, 1.0), 0.0)
+
+
+def _power_dependent_hours(power_hours):
+    """POWER_DEPENDENT: unlimited supply, limited by power hours."""
+    return power_hours
+
+
+def _multiplier(rng, cv: float, n: int):
+    """Lognormal factor with mean 1 and coefficient of variation cv (ones without noise)."""
+    if rng is None or cv <= 0:
+        return np.ones(n)
+    sigma2 = np.log1p(cv * cv)
+    return rng.lognormal(-sigma2 / 2, np.sqrt(sigma2), n)
+
+
+def _level(rng, cv: float, n: int):
+    """Reported fill level error: normal around 1, clipped at empty."""
+    if rng is None or cv <= 0:
+        return np.ones(n)
+    return np.maximum(rng.normal(1.0, cv, n), 0.0)
+
+
+def _lifelines(inputs: Dict[str, Any], scenario: Scenario, rng, n: int) -> Dict[str, Any]:
+    """Hours per lifeline for n samples (rng None = the scenario's point estimate)."""
+    power_in, oxygen_in = inputs['power'], inputs['oxygen']
+
+    load = power_in['load_watts'] * scenario.load_scale * _multiplier(rng, scenario.load_cv, n)
+    fuel_rate = power_in['fuel_rate_lph'] * _multiplier(rng, scenario.fuel_rate_cv, n)
+    power = (_linear_hours(power_in['battery_wh'], _level(rng, scenario.level_cv, n), load)
+             + _fuel_based_hours(power_in['fuel_liters'] + scenario.extra_fuel_liters,
+                                 _level(rng, scenario.level_cv, n), fuel_rate))
+
+    population = inputs['population'] if scenario.population_count is None else scenario.population_count
+    population *= 1 + scenario.population_growth
+    burn = oxygen_in['burn_rate_lpm'] * scenario.flow_scale
+    if oxygen_in['per_person']:
+        burn = burn * population if population > 0 else 0.0
+
+    sources = []
+    liters = (oxygen_in['cylinder_liters'] or 0) + scenario.extra_oxygen_liters
+    if oxygen_in['cylinder_liters'] is not None or scenario.extra_oxygen_liters > 0:
+        flow = burn * _multiplier(rng, scenario.flow_cv, n)
+        sources.append(_linear_hours(liters, _level(rng, scenario.level_cv, n), flow * 60))
+    if oxygen_in['power_limited_concentrators']:
+        sources.append(_power_dependent_hours(power))
+    oxygen = np.maximum.reduce(sources) if sources else None
+
+    return {'POWER': power, 'OXYGEN': oxygen}
+
+
+def _hours(value: float):
+    return '∞' if value >= _INF_CAP else round(float(value), 1)
+
+
+def _band(samples, point, deterministic, isolation_hours: float) -> Dict[str, Any]:
+    capped = np.minimum(samples, _INF_CAP)
+    p10, p50, p90 = np.percentile(capped, [10, 50, 90])
+    return {
+        'deterministic': None if deterministic is None else round(deterministic, 1),
+        'point': _hours(point[0]),
+        'p10': _hours(p10),
+        'p50': _hours(p50),
+        'p90': _hours(p90),
+        'mean': _hours(capped.mean()),
+        'p_survive': round(float(np.mean(samples >= isolation_hours)), 3),
+    }
+
+
+# =============================================================================
+# Simulation + cache
+# =============================================================================
+
+_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _digest(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def simulate(inputs: Dict[str, Any], scenario: Optional[Scenario] = None) -> Dict[str, Any]:
+    """
+    Monte Carlo bands per lifeline and for the weakest link.
+
+    Cached by (inputs digest, scenario): a config or inventory change yields
+    new inputs and therefore a new entry.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy not installed")
+    scenario = scenario or Scenario()
+    if not 1 <= scenario.samples <= SIMULATION_MAX_SAMPLES:
+        raise ValueError(f"samples must be 1..{SIMULATION_MAX_SAMPLES}")
+
+    inventory_version = _digest(inputs)[:16]
+    key = _digest({'inputs': inventory_version, 'scenario': asdict(scenario)})
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return dict(_cache[key], cached=True)
+
+    started = time.perf_counter()
+    n = scenario.samples
+    seed = scenario.seed if scenario.seed is not None else int(key[:8], 16)
+    isolation_hours = (inputs['isolation_hours'] if scenario.isolation_target_days is None
+                       else scenario.isolation_target_days * 24)
+
+    sampled = _lifelines(inputs, scenario, np.random.default_rng(seed), n)
+    point = _lifelines(inputs, scenario, None, 1)
+
+    lifelines = {}
+    for name in ('POWER', 'OXYGEN'):
+        if sampled[name] is not None:
+            lifelines[name] = _band(sampled[name], point[name], inputs[name.lower()]['hours'], isolation_hours)
+
+    weakest = None
+    if sampled['OXYGEN'] is not None:
+        limited_by_power = sampled['POWER'] <= sampled['OXYGEN']
+        weakest = _band(np.minimum(sampled['POWER'], sampled['OXYGEN']),
+                        np.minimum(point['POWER'], point['OXYGEN']), None, isolation_hours)
+        weakest['limited_by'] = {
+            'POWER': round(float(limited_by_power.mean()), 3),
+            'OXYGEN': round(float(1 - limited_by_power.mean()), 3),
+        }
+
+    result = {
+        'station_id': inputs.get('station_id'),
+        'inventory_version': inventory_version,
+        'isolation_target_hours': isolation_hours,
+        'scenario': dict(asdict(scenario), seed=seed),
+        'samples': n,
+        'lifelines': lifelines,
+        'weakest_link': weakest,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        'cached': False,
+    }
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > SIMULATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def run_simulation(service, station_id: str, scenario: Optional[Scenario] = None) -> Dict[str, Any]:
+    """simulation_inputs + simulate (blocking: call through the executor)."""
+    return simulate(simulation_inputs(service, station_id), scenario)
+
+
+def clear_simulation_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,178 @@
+"""
+MIRS Schema Fingerprint - Cold-start fast path for schema initialisation
+
+Provides:
+- SchemaFingerprint: hash of app version + schema-defining source files +
+  station identity, stored in the DB together with a hash of sqlite_master
+  after a full init. On the next start, if both still match, init_database,
+  legacy run_migrations(), idempotent migrations, auto-seed and module
+  schema inits can all be skipped.
+- StartupTimer: per-phase wall-clock timing reported by /api/health
+
+Any code upgrade (source hash), station change, or out-of-band DDL change
+(restored backup, manual ALTER) falls back to the full init path once.
+
+Environment:
+- MIRS_SCHEMA_FAST_PATH   "false" forces the full init on every start (default: true)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FAST_PATH_ENABLED = os.environ.get("MIRS_SCHEMA_FAST_PATH", "true").lower() != "false"
+
+FINGERPRINT_TABLE = "_mirs_schema_fingerprint"
+
+
+def source_digest(root: str, patterns: Iterable[str]) -> str:
+    """sha256 over the bytes of every file matching `patterns` (relative to root)."""
+    h = hashlib.sha256()
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            h.update(os.path.relpath(path, root).encode("utf-8"))
+            with open(path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def ddl_hash(conn: sqlite3.Connection) -> str:
+    """sha256 over sqlite_master (tables, indexes, views, triggers)."""
+    rows = conn.execute(f"""
+        SELECT type, name, tbl_name, COALESCE(sql, '') FROM sqlite_master
+        WHERE name NOT LIKE 'sqlite_%' AND name != '{FINGERPRINT_TABLE}'
+        ORDER BY type, name
+    """).fetchall()
+    h = hashlib.sha256()
+    for row in rows:
+        h.update("\x1f".join(row).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class SchemaFingerprint:
+    """Expected fingerprint for this build; compared against the one stored in the DB."""
+
+    def __init__(self, db_path: str, version: str, root: str, sources: List[str],
+                 extra: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.version = version
+        self.root = root
+        self.sources = sources
+        self.extra = extra or {}
+        self.reason: Optional[str] = None
+        self._expected: Optional[str] = None
+
+    @property
+    def expected(self) -> str:
+        if self._expected is None:
+            h = hashlib.sha256()
+            h.update(self.version.encode("utf-8"))
+            h.update(source_digest(self.root, self.sources).encode("ascii"))
+            h.update(json.dumps(self.extra, sort_keys=True, default=str).encode("utf-8"))
+            self._expected = h.hexdigest()
+        return self._expected
+
+    def matches(self) -> bool:
+        """True if the stored fingerprint and live DDL hash match (reads only)."""
+        if not FAST_PATH_ENABLED:
+            self.reason = "disabled"
+            return False
+        if self.db_path == ":memory:" or not os.path.exists(self.db_path):
+            self.reason = "no_database"
+            return False
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute(
+                    f"SELECT fingerprint, ddl_hash FROM {FINGERPRINT_TABLE} WHERE id = 1"
+                ).fetchone()
+                if row is None:
+                    self.reason = "not_recorded"
+                    return False
+                if row[0] != self.expected:
+                    self.reason = "code_changed"
+                    return False
+                if row[1] != ddl_hash(conn):
+                    self.reason = "schema_changed"
+                    return False
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.reason = "not_recorded" if "no such table" in str(e) else f"error: {e}"
+            return False
+        self.reason = "match"
+        return True
+
+    def store(self, conn: sqlite3.Connection):
+        """Record the fingerprint after every init step succeeded."""
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                fingerprint TEXT NOT NULL,
+                ddl_hash TEXT NOT NULL,
+                app_version TEXT,
+                recorded_at TEXT
+            )
+        """)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {FINGERPRINT_TABLE} (id, fingerprint, ddl_hash, app_version, recorded_at)
+            VALUES (1, ?, ?, ?, ?)
+        """, (self.expected, ddl_hash(conn), self.version, datetime.now().isoformat()))
+        conn.commit()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": FAST_PATH_ENABLED,
+            "reason": self.reason,
+            "fingerprint": self._expected[:16] if self._expected else None,
+        }
+
+
+class StartupTimer:
+    """Wall-clock timing of cold-start phases (module import -> startup complete)."""
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.fast_path: Optional[bool] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def mark_ready(self):
+        self.ready_ms = round((time.perf_counter() - self._t0) * 1000, 1)
+        logger.info(f"[Startup] Ready in {self.ready_ms} ms "
+                    f"(schema fast path: {self.fast_path}, phases: {self.phases})")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready_ms": self.ready_ms,
+            "schema_fast_path": self.fast_path,
+            "phases_ms": dict(self.phases),
+        }
+
+
+_startup_timer = StartupTimer()
+
+
+def get_startup_timer() -> StartupTimer:
+    return _startup_timer
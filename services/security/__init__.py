@@ -7,16 +7,26 @@ Security Model: Authenticated Encryption + Digital Signatures + Replay Protectio
 Library: PyNaCl (libsodium binding)
 """
 
-from .crypto_engine import KeyManager, SecureEnvelopeBuilder
-from .envelope_verifier import EnvelopeVerifier
-from .models import SecureEnvelope, EnvelopeHeader
-from .exchange_routes import router as exchange_router
+import importlib
 
-__all__ = [
-    'KeyManager',
-    'SecureEnvelopeBuilder',
-    'EnvelopeVerifier',
-    'SecureEnvelope',
-    'EnvelopeHeader',
-    'exchange_router',
-]
+# v3.6: 延遲載入 - import services.security (或 .models) 不再載入 PyNaCl/libsodium，
+# 直到真的用到 KeyManager / EnvelopeVerifier 等密碼學類別
+_LAZY_EXPORTS = {
+    'KeyManager': ('.crypto_engine', 'KeyManager'),
+    'SecureEnvelopeBuilder': ('.crypto_engine', 'SecureEnvelopeBuilder'),
+    'EnvelopeVerifier': ('.envelope_verifier', 'EnvelopeVerifier'),
+    'SecureEnvelope': ('.models', 'SecureEnvelope'),
+    'EnvelopeHeader': ('.models', 'EnvelopeHeader'),
+    'exchange_router': ('.exchange_routes', 'router'),
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module_name, attr = _LAZY_EXPORTS[name]
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
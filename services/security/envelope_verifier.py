@@ -12,7 +12,7 @@ Verification Steps:
 
 import json
 import base64
-import sqlite3
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
@@ -22,6 +22,7 @@ from nacl.public import PrivateKey, PublicKey, Box
 from nacl.encoding import Base64Encoder
 from nacl.exceptions import BadSignatureError, CryptoError
 
+from ..db_pool import get_pool
 from .models import SecureEnvelope, DecryptedPayload
 from .crypto_engine import KeyManager
 
@@ -37,9 +38,13 @@ class ReplayProtector:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
+    def _connect(self):
+        """Lease a pooled connection (returned to the pool on close)."""
+        return get_pool(self.db_path).writer()
+
     def _init_db(self) -> None:
         """Initialize the processed envelopes database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(self._connect()) as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS processed_envelopes (
                     envelope_id TEXT PRIMARY KEY,
@@ -56,7 +61,7 @@ class ReplayProtector:
 
     def is_processed(self, envelope_id: str) -> bool:
         """Check if an envelope has already been processed."""
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(self._connect()) as conn:
             cursor = conn.execute(
                 "SELECT 1 FROM processed_envelopes WHERE envelope_id = ?",
                 (envelope_id,)
@@ -70,7 +75,7 @@ class ReplayProtector:
         data_type: str = ""
     ) -> None:
         """Mark an envelope as processed."""
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(self._connect()) as conn:
             conn.execute(
                 """
                 INSERT OR REPLACE INTO processed_envelopes
@@ -87,7 +92,7 @@ class ReplayProtector:
         Returns number of entries removed.
         """
         cutoff = int((datetime.now() - timedelta(days=days)).timestamp())
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(self._connect()) as conn:
             cursor = conn.execute(
                 "DELETE FROM processed_envelopes WHERE processed_at < ?",
                 (cutoff,)
@@ -97,7 +102,7 @@ class ReplayProtector:
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about processed envelopes."""
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(self._connect()) as conn:
             cursor = conn.execute(
                 "SELECT COUNT(*), MIN(processed_at), MAX(processed_at) FROM processed_envelopes"
             )
@@ -22,6 +22,7 @@ import tempfile
 import json
 import os
 
+from ..executor import run_in_executor
 from .crypto_engine import KeyManager, SecureEnvelopeBuilder
 from .envelope_verifier import EnvelopeVerifier, VerificationError
 from .models import SecureEnvelope, TrustedKey
@@ -302,8 +303,10 @@ async def export_data(request: ExportRequest):
         )
 
     try:
+        # Sign + encrypt off the event loop (crypto executor category)
         builder = SecureEnvelopeBuilder(key_mgr, station_id)
-        envelope = builder.build_envelope(
+        envelope = await run_in_executor(
+            "crypto", builder.build_envelope,
             payload=request.payload,
             recipient_id=request.recipient_id,
             data_type=request.data_type,
@@ -317,7 +320,7 @@ async def export_data(request: ExportRequest):
         filename = f"{request.data_type}_{request.recipient_id}_{timestamp}.xirs"
         filepath = exports_dir / filename
 
-        builder.envelope_to_file(envelope, str(filepath))
+        await run_in_executor("crypto", builder.envelope_to_file, envelope, str(filepath))
 
         return ExportResponse(
             success=True,
@@ -395,7 +398,7 @@ async def import_data(file: UploadFile = File(...)):
     # Verify and decrypt
     try:
         verifier = EnvelopeVerifier(key_mgr, station_id)
-        payload, verify_info = verifier.verify_and_decrypt(envelope)
+        payload, verify_info = await run_in_executor("crypto", verifier.verify_and_decrypt, envelope)
 
         return ImportResponse(
             success=True,
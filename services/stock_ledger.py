@@ -0,0 +1,274 @@
+"""
+MIRS Stock Ledger - Materialized per-item stock projection
+
+Provides:
+- item_stock projection keyed by (station_id, item_code)
+- Triggers that keep the projection in step with inventory_events
+  (the projection is updated inside the same transaction as the event write)
+- Rebuild / verify by replaying the event log, with a drift report
+- O(1) stock lookups for dashboards and consume paths
+
+Stock formulas:
+- on_hand   = RECEIVE - CONSUME                       (DatabaseManager / 主站 UI)
+- available = RECEIVE - CONSUME - RESERVE + RELEASE   (Inventory Engine / 撥發)
+
+Usage:
+    python scripts/stock_ledger.py --verify
+    python scripts/stock_ledger.py --rebuild
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Constants
+# =============================================================================
+
+# 各欄位對應的事件類型
+LEDGER_COLUMNS = {
+    'received_qty': 'RECEIVE',
+    'consumed_qty': 'CONSUME',
+    'reserved_qty': 'DISPATCH_RESERVE',
+    'released_qty': 'DISPATCH_RELEASE',
+}
+
+ON_HAND_SQL = "(received_qty - consumed_qty)"
+AVAILABLE_SQL = "(received_qty - consumed_qty - reserved_qty + released_qty)"
+
+
+def _delta_values(prefix: str, sign: str = "") -> str:
+    """Build the per-column CASE expressions for one event row (NEW/OLD)."""
+    return ",\n            ".join(
+        f"CASE WHEN {prefix}.event_type = '{event_type}' THEN {sign}{prefix}.quantity ELSE 0 END"
+        for event_type in LEDGER_COLUMNS.values()
+    )
+
+
+def _upsert_sql(prefix: str, sign: str) -> str:
+    """UPSERT statement applying one event row to item_stock (used inside triggers)."""
+    count_delta = "1" if sign == "" else "-1"
+    return f"""
+        INSERT INTO item_stock (
+            station_id, item_code,
+            received_qty, consumed_qty, reserved_qty, released_qty,
+            event_count, last_event_id, updated_at
+        ) VALUES (
+            COALESCE({prefix}.station_id, ''), {prefix}.item_code,
+            {_delta_values(prefix, sign)},
+            {count_delta}, {prefix}.id, CURRENT_TIMESTAMP
+        )
+        ON CONFLICT(station_id, item_code) DO UPDATE SET
+            received_qty = received_qty + excluded.received_qty,
+            consumed_qty = consumed_qty + excluded.consumed_qty,
+            reserved_qty = reserved_qty + excluded.reserved_qty,
+            released_qty = released_qty + excluded.released_qty,
+            event_count = event_count + excluded.event_count,
+            last_event_id = MAX(COALESCE(last_event_id, 0), excluded.last_event_id),
+            updated_at = CURRENT_TIMESTAMP;
+    """
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+
+def ensure_item_stock_schema(cursor: sqlite3.Cursor):
+    """
+    Create item_stock table and the inventory_events triggers (idempotent).
+
+    Must be called after inventory_events exists.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS item_stock (
+            station_id TEXT NOT NULL,
+            item_code TEXT NOT NULL,
+            received_qty INTEGER NOT NULL DEFAULT 0,
+            consumed_qty INTEGER NOT NULL DEFAULT 0,
+            reserved_qty INTEGER NOT NULL DEFAULT 0,
+            released_qty INTEGER NOT NULL DEFAULT 0,
+            event_count INTEGER NOT NULL DEFAULT 0,
+            last_event_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (station_id, item_code)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_item_stock_item
+        ON item_stock(item_code)
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_item_stock_ai
+        AFTER INSERT ON inventory_events
+        BEGIN
+            {_upsert_sql('NEW', '')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_item_stock_ad
+        AFTER DELETE ON inventory_events
+        BEGIN
+            {_upsert_sql('OLD', '-')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_item_stock_au
+        AFTER UPDATE OF event_type, item_code, quantity, station_id ON inventory_events
+        BEGIN
+            {_upsert_sql('OLD', '-')}
+            {_upsert_sql('NEW', '')}
+        END
+    """)
+
+
+# =============================================================================
+# Reads
+# =============================================================================
+
+def _sum_stock(cursor: sqlite3.Cursor, expr: str, item_code: str, station_id: Optional[str]) -> float:
+    if station_id:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM({expr}), 0) FROM item_stock
+            WHERE item_code = ? AND station_id = ?
+        """, (item_code, station_id))
+    else:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM({expr}), 0) FROM item_stock
+            WHERE item_code = ?
+        """, (item_code,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def get_on_hand(cursor: sqlite3.Cursor, item_code: str, station_id: Optional[str] = None):
+    """現有庫存 (RECEIVE - CONSUME)"""
+    return _sum_stock(cursor, ON_HAND_SQL, item_code, station_id)
+
+
+def get_available(cursor: sqlite3.Cursor, item_code: str, station_id: Optional[str] = None):
+    """可用庫存 (扣除撥發保留)"""
+    return _sum_stock(cursor, AVAILABLE_SQL, item_code, station_id)
+
+
+def get_available_many(cursor: sqlite3.Cursor, item_codes: List[str]) -> Dict[str, float]:
+    """可用庫存 (多品項一次查詢; 無帳本列的品項為 0)"""
+    codes = list(dict.fromkeys(item_codes))
+    if not codes:
+        return {}
+    placeholders = ",".join("?" * len(codes))
+    cursor.execute(f"""
+        SELECT item_code, COALESCE(SUM({AVAILABLE_SQL}), 0) FROM item_stock
+        WHERE item_code IN ({placeholders})
+        GROUP BY item_code
+    """, codes)
+    stock = {code: 0 for code in codes}
+    stock.update({row[0]: row[1] for row in cursor.fetchall()})
+    return stock
+
+
+# =============================================================================
+# Rebuild / Verify
+# =============================================================================
+
+_REPLAY_SELECT = f"""
+    SELECT
+        COALESCE(station_id, '') AS station_id,
+        item_code,
+        {", ".join(
+            f"COALESCE(SUM(CASE WHEN event_type = '{t}' THEN quantity ELSE 0 END), 0) AS {c}"
+            for c, t in LEDGER_COLUMNS.items()
+        )},
+        COUNT(*) AS event_count,
+        MAX(id) AS last_event_id
+    FROM inventory_events
+    GROUP BY COALESCE(station_id, ''), item_code
+"""
+
+
+def replay_item_stock(cursor: sqlite3.Cursor) -> int:
+    """
+    Rewrite item_stock from inventory_events (no commit; caller owns the transaction).
+
+    Returns:
+        Number of projection rows written
+    """
+    ensure_item_stock_schema(cursor)
+    cursor.execute("DELETE FROM item_stock")
+    cursor.execute(f"""
+        INSERT INTO item_stock (
+            station_id, item_code,
+            received_qty, consumed_qty, reserved_qty, released_qty,
+            event_count, last_event_id
+        )
+        {_REPLAY_SELECT}
+    """)
+    return cursor.rowcount
+
+
+def rebuild_item_stock(conn: sqlite3.Connection) -> int:
+    """
+    Replay inventory_events and rewrite item_stock from scratch.
+
+    Returns:
+        Number of projection rows written
+    """
+    rows = replay_item_stock(conn.cursor())
+    conn.commit()
+    logger.info(f"[StockLedger] item_stock rebuilt: {rows} rows")
+    return rows
+
+
+def verify_item_stock(conn: sqlite3.Connection) -> Dict:
+    """
+    Replay inventory_events and compare against item_stock.
+
+    Returns:
+        {"ok": bool, "checked": int, "drift": [{station_id, item_code, column, expected, actual}]}
+    """
+    cursor = conn.cursor()
+    columns = list(LEDGER_COLUMNS.keys()) + ['event_count']
+
+    cursor.execute(_REPLAY_SELECT)
+    expected = {
+        (row[0], row[1]): dict(zip(columns, row[2:2 + len(columns)]))
+        for row in cursor.fetchall()
+    }
+
+    cursor.execute(f"""
+        SELECT station_id, item_code, {", ".join(columns)}
+        FROM item_stock
+    """)
+    actual = {
+        (row[0], row[1]): dict(zip(columns, row[2:]))
+        for row in cursor.fetchall()
+    }
+
+    drift: List[Dict] = []
+    zero = dict.fromkeys(columns, 0)
+    for key in sorted(set(expected) | set(actual)):
+        exp = expected.get(key, zero)
+        act = actual.get(key, zero)
+        for col in columns:
+            if exp[col] != act[col]:
+                drift.append({
+                    "station_id": key[0],
+                    "item_code": key[1],
+                    "column": col,
+                    "expected": exp[col],
+                    "actual": act[col],
+                })
+
+    if drift:
+        logger.warning(f"[StockLedger] item_stock drift detected: {len(drift)} mismatches")
+
+    return {
+        "ok": not drift,
+        "checked": len(set(expected) | set(actual)),
+        "drift": drift,
+    }
@@ -0,0 +1,163 @@
+"""
+MIRS Streaming Export - CSV / JSON / NDJSON exports without building them in memory
+
+Provides:
+- iter_query_rows(connect, sql, params): walk a cursor with fetchmany(), closing
+  the (pooled) connection when the stream ends or is abandoned
+- iter_csv / iter_json_array / iter_ndjson: encode rows into UTF-8 chunks of
+  roughly EXPORT_CHUNK_BYTES, flushing as they fill up
+- iter_gzip(chunks): on-the-fly gzip (.gz member, one compressor per stream)
+- stream_export(chunks, filename, media_type, compress): StreamingResponse
+  pulled chunk by chunk through the "export" executor category; the first
+  chunk is produced before the response starts, so query errors still
+  surface as HTTP 500 instead of a truncated download
+
+Memory use is bounded by one fetchmany() batch plus one output chunk,
+regardless of how many rows are exported (no row cap).
+
+Environment:
+- MIRS_EXPORT_BATCH_SIZE    rows per fetchmany() (default: 500)
+- MIRS_EXPORT_CHUNK_BYTES   target size of each yielded chunk (default: 64 KB)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from .executor import iterate_in_executor, run_in_executor
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.environ.get("MIRS_EXPORT_BATCH_SIZE", "500"))
+EXPORT_CHUNK_BYTES = int(os.environ.get("MIRS_EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+CSV_MEDIA_TYPE = "text/csv;charset=utf-8"
+JSON_MEDIA_TYPE = "application/json;charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+def _close(iterable):
+    """Close an upstream generator (releases its connection on early exit)."""
+    close = getattr(iterable, "close", None)
+    if close:
+        close()
+
+
+def iter_query_rows(connect: Callable[[], Any], sql: str, params: Sequence[Any] = (),
+                    batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Any]:
+    """Yield rows of `sql` in fetchmany() batches.
+
+    The connection is opened on the first next() (in the worker thread) and
+    closed when the stream is exhausted, fails or is closed early.
+    """
+    conn = connect()
+    try:
+        cursor = conn.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Any],
+             to_row: Optional[Callable[[Any], Sequence[Any]]] = None,
+             chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding UTF-8 chunks of about `chunk_bytes`."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    try:
+        for row in rows:
+            writer.writerow(to_row(row) if to_row else row)
+            if buffer.tell() >= chunk_bytes:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        _close(rows)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]],
+                chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """One JSON object per line."""
+    parts, size = [], 0
+    try:
+        for row in rows:
+            line = json.dumps(dict(row), ensure_ascii=False, default=str) + "\n"
+            parts.append(line)
+            size += len(line)
+            if size >= chunk_bytes:
+                yield "".join(parts).encode("utf-8")
+                parts, size = [], 0
+    finally:
+        _close(rows)
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def iter_json_array(rows: Iterable[Dict[str, Any]], indent: Optional[int] = 2,
+                    chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """A JSON array, element by element (same text as json.dumps(list, indent=...))."""
+    pad = " " * indent if indent else ""
+    sep, newline = (",\n", "\n") if indent else (", ", "")
+    parts, size, first = ["["], 1, True
+    try:
+        for row in rows:
+            text = json.dumps(dict(row), ensure_ascii=False, indent=indent, default=str)
+            if pad:
+                text = "\n".join(pad + line for line in text.split("\n"))
+            piece = (newline if first else sep) + text
+            first = False
+            parts.append(piece)
+            size += len(piece)
+            if size >= chunk_bytes:
+                yield "".join(parts).encode("utf-8")
+                parts, size = [], 0
+    finally:
+        _close(rows)
+    parts.append("]" if first else newline + "]")
+    yield "".join(parts).encode("utf-8")
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member as it is produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+    finally:
+        _close(chunks)
+    yield compressor.flush()
+
+
+async def stream_export(chunks: Iterator[bytes], filename: str, media_type: str,
+                        compress: bool = False) -> StreamingResponse:
+    """StreamingResponse for an export generator (optionally gzipped as `<filename>.gz`)."""
+    if compress:
+        chunks = iter_gzip(chunks)
+        filename += ".gz"
+        media_type = GZIP_MEDIA_TYPE
+    # 先取第一段: 查詢於此執行，失敗時仍可回 500
+    first = await run_in_executor("export", next, chunks, b"")
+    return StreamingResponse(
+        iterate_in_executor("export", chunks, first),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
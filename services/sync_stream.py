@@ -0,0 +1,529 @@
+"""
+MIRS Sync Stream - Chunked NDJSON sync packages
+
+Streaming replacement for the one-shot JSON sync package:
+- Generation walks the sync tables with fetchmany() and yields the package
+  as it goes (no full list in memory); hashes are computed incrementally
+- Import parses the stream incrementally and applies one chunk per
+  transaction, recording each applied chunk so an interrupted import can
+  be resumed (already-applied chunks are verified and skipped)
+
+Package format (every line is JSON, chunk bodies are length-prefixed):
+
+    {"type": "header", "format": "mirs-sync-ndjson", "version": 1, "package_id": ..., ...}\\n
+    {"type": "chunk", "seq": 0, "count": 500, "length": <bytes>, "sha256": <hex>}\\n
+    <length bytes: one change per line, canonical JSON (sort_keys)>
+    ...
+    {"type": "footer", "chunks": N, "changes_count": M, "checksum": <hex>}\\n
+
+checksum = sha256 over the concatenated chunk sha256 hex digests, so it can
+be re-verified from the recorded chunk hashes after a resumed import.
+
+Environment:
+- MIRS_SYNC_CHUNK_SIZE        changes per chunk (default: 500)
+- MIRS_SYNC_MAX_CHUNK_BYTES   largest chunk body accepted on import (default: 64 MB)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYNC_STREAM_FORMAT = "mirs-sync-ndjson"
+SYNC_STREAM_VERSION = 1
+SYNC_STREAM_MEDIA_TYPE = "application/x-ndjson"
+SYNC_CHUNK_SIZE = int(os.environ.get("MIRS_SYNC_CHUNK_SIZE", "500"))
+SYNC_MAX_CHUNK_BYTES = int(os.environ.get("MIRS_SYNC_MAX_CHUNK_BYTES", str(64 * 1024 * 1024)))
+
+# 增量同步: table -> timestamp column (皆以 station_id 過濾)
+DELTA_SYNC_TABLES = {
+    'inventory_events': 'timestamp',
+    'blood_events': 'timestamp',
+    'equipment_checks': 'timestamp',
+    'surgery_records': 'created_at',
+    'emergency_blood_bags': 'created_at'
+}
+
+# 全量同步: (table, filter_col, timestamp_col)
+FULL_SYNC_TABLES = [
+    ('items', None, 'updated_at'),
+    ('inventory_events', 'station_id', 'timestamp'),
+    ('blood_events', 'station_id', 'timestamp'),
+    ('equipment_checks', 'station_id', 'timestamp'),
+    ('surgery_records', 'station_id', 'created_at'),
+]
+
+
+class SyncStreamError(ValueError):
+    """Malformed or corrupted sync stream."""
+
+
+# =============================================================================
+# Change Collection
+# =============================================================================
+
+def sync_table_queries(station_id: str, sync_type: str,
+                       since_timestamp: Optional[str]) -> List[Tuple[str, str, tuple, str]]:
+    """(table, sql, params, timestamp_col) for each table in the package."""
+    if sync_type == "DELTA" and since_timestamp:
+        return [
+            (table, f"""
+                SELECT * FROM {table}
+                WHERE station_id = ? AND {ts_col} > ?
+                ORDER BY {ts_col}
+            """, (station_id, since_timestamp), ts_col)
+            for table, ts_col in DELTA_SYNC_TABLES.items()
+        ]
+    queries = []
+    for table, filter_col, ts_col in FULL_SYNC_TABLES:
+        if filter_col:
+            queries.append((table, f"SELECT * FROM {table} WHERE {filter_col} = ?", (station_id,), ts_col))
+        else:
+            queries.append((table, f"SELECT * FROM {table}", (), ts_col))
+    return queries
+
+
+def iter_sync_changes(cursor: sqlite3.Cursor, station_id: str, sync_type: str,
+                      since_timestamp: Optional[str], default_timestamp: str,
+                      fetch_size: int = SYNC_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield change records table by table, fetchmany() at a time."""
+    for table, sql, params, ts_col in sync_table_queries(station_id, sync_type, since_timestamp):
+        cursor.execute(sql, params)
+        total = 0
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            total += len(rows)
+            for row in rows:
+                keys = row.keys()
+                yield {
+                    'table': table,
+                    'operation': 'INSERT',
+                    'data': dict(row),
+                    'timestamp': row[ts_col] if ts_col in keys else default_timestamp
+                }
+        logger.info(f"查詢表 {table}: 找到 {total} 筆記錄")
+
+
+# =============================================================================
+# Hashing
+# =============================================================================
+
+_canonical = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
+
+def encode_change(change: Dict[str, Any]) -> bytes:
+    """One change as a canonical NDJSON line."""
+    return (_canonical.encode(change) + "\n").encode("utf-8")
+
+
+def checksum_of_changes(changes: Iterable[Dict[str, Any]]) -> Tuple[str, int]:
+    """
+    Legacy package checksum: sha256 of json.dumps(changes, sort_keys=True),
+    computed incrementally (same digest, without building the string).
+
+    Returns:
+        (checksum, size_bytes)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for piece in _canonical.iterencode(list(changes)):
+        data = piece.encode("utf-8")
+        digest.update(data)
+        size += len(data)
+    return digest.hexdigest(), size
+
+
+def package_checksum(chunk_hashes: Iterable[str]) -> str:
+    """Package checksum from the ordered chunk sha256 hex digests."""
+    digest = hashlib.sha256()
+    for h in chunk_hashes:
+        digest.update(h.encode("ascii"))
+    return digest.hexdigest()
+
+
+def _line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# =============================================================================
+# Generation
+# =============================================================================
+
+def iter_package_stream(header: Dict[str, Any], changes: Iterable[Dict[str, Any]],
+                        chunk_size: int = SYNC_CHUNK_SIZE,
+                        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[bytes]:
+    """
+    Encode changes as a chunked NDJSON package.
+
+    Args:
+        header: package metadata (package_id, package_type, station_id, ...)
+        on_complete: called with {checksum, changes_count, chunks, package_size}
+                     after the footer has been produced
+    """
+    size = 0
+    chunk_hashes: List[str] = []
+    total = 0
+
+    head = _line({"type": "header", "format": SYNC_STREAM_FORMAT, "version": SYNC_STREAM_VERSION,
+                  "chunk_size": chunk_size, **header})
+    size += len(head)
+    yield head
+
+    def flush(lines: List[bytes]) -> Iterator[bytes]:
+        nonlocal size
+        body = b"".join(lines)
+        sha = hashlib.sha256(body).hexdigest()
+        prefix = _line({"type": "chunk", "seq": len(chunk_hashes), "count": len(lines),
+                        "length": len(body), "sha256": sha})
+        chunk_hashes.append(sha)
+        size += len(prefix) + len(body)
+        yield prefix
+        yield body
+
+    pending: List[bytes] = []
+    for change in changes:
+        pending.append(encode_change(change))
+        total += 1
+        if len(pending) >= chunk_size:
+            yield from flush(pending)
+            pending = []
+    if pending:
+        yield from flush(pending)
+
+    summary = {"checksum": package_checksum(chunk_hashes), "changes_count": total,
+               "chunks": len(chunk_hashes)}
+    foot = _line({"type": "footer", **summary})
+    size += len(foot)
+    yield foot
+
+    if on_complete:
+        on_complete({**summary, "package_size": size})
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+class PackageParser:
+    """
+    Incremental (push) parser: feed() arbitrary byte blocks, get back parsed
+    items as they complete. Memory is bounded by one chunk body.
+
+    Items: ("header", dict) | ("chunk", (meta, [changes])) | ("footer", dict)
+    """
+
+    def __init__(self, max_chunk_bytes: int = SYNC_MAX_CHUNK_BYTES):
+        self.max_chunk_bytes = max_chunk_bytes
+        self._buf = bytearray()
+        self._pending_chunk: Optional[Dict[str, Any]] = None
+        self._seen_header = False
+        self.finished = False
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        self._buf.extend(data)
+        items = []
+        while not self.finished:
+            if self._pending_chunk is not None:
+                length = self._pending_chunk["length"]
+                if len(self._buf) < length:
+                    break
+                body = bytes(self._buf[:length])
+                del self._buf[:length]
+                items.append(("chunk", self._decode_chunk(self._pending_chunk, body)))
+                self._pending_chunk = None
+                continue
+
+            nl = self._buf.find(b"\n")
+            if nl < 0:
+                if len(self._buf) > 1024 * 1024:
+                    raise SyncStreamError("控制列過長，封包格式錯誤")
+                break
+            raw = bytes(self._buf[:nl])
+            del self._buf[:nl + 1]
+            if not raw.strip():
+                continue
+            try:
+                obj = json.loads(raw)
+            except ValueError:
+                raise SyncStreamError("無法解析控制列，封包格式錯誤")
+            item = self._handle_control(obj)
+            if item is not None:
+                items.append(item)
+        return items
+
+    def _handle_control(self, obj: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+        kind = obj.get("type")
+        if not self._seen_header:
+            if kind != "header" or obj.get("format") != SYNC_STREAM_FORMAT:
+                raise SyncStreamError("缺少封包標頭或格式不符")
+            if obj.get("version") != SYNC_STREAM_VERSION:
+                raise SyncStreamError(f"不支援的封包版本: {obj.get('version')}")
+            self._seen_header = True
+            return ("header", obj)
+        if kind == "chunk":
+            length = obj.get("length")
+            if not isinstance(length, int) or length < 0 or length > self.max_chunk_bytes:
+                raise SyncStreamError(f"區塊長度不合法: {length}")
+            self._pending_chunk = obj  # body follows
+            return None
+        if kind == "footer":
+            self.finished = True
+            return ("footer", obj)
+        raise SyncStreamError(f"未知的控制列: {kind}")
+
+    @staticmethod
+    def _decode_chunk(meta: Dict[str, Any], body: bytes) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        if hashlib.sha256(body).hexdigest() != meta.get("sha256"):
+            raise SyncStreamError(f"區塊 {meta.get('seq')} 校驗碼不符，封包可能已損毀")
+        changes = [json.loads(line) for line in body.splitlines() if line]
+        if len(changes) != meta.get("count"):
+            raise SyncStreamError(f"區塊 {meta.get('seq')} 筆數不符")
+        return meta, changes
+
+    def close(self):
+        if not self.finished:
+            raise SyncStreamError("封包不完整 (缺少結尾)")
+
+
+# =============================================================================
+# Applying
+# =============================================================================
+
+def apply_sync_changes(cursor: sqlite3.Cursor, changes: Iterable[Dict[str, Any]]) -> Tuple[int, List[Dict]]:
+    """
+    Apply change records (INSERT = INSERT OR REPLACE, UPDATE/DELETE by id).
+
+    Caller owns the transaction and should enable PRAGMA recursive_triggers
+    so REPLACE fires the item_stock DELETE trigger.
+
+    Returns:
+        (changes_applied, conflicts)
+    """
+    applied = 0
+    conflicts = []
+    for change in changes:
+        table = change['table']
+        operation = change['operation']
+        data = change['data']
+
+        try:
+            if operation == 'INSERT':
+                columns = ', '.join(data.keys())
+                placeholders = ', '.join(['?' for _ in data.keys()])
+                cursor.execute(f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+                               list(data.values()))
+                applied += 1
+
+            elif operation == 'UPDATE':
+                set_clause = ', '.join([f"{k} = ?" for k in data.keys() if k != 'id'])
+                values = [v for k, v in data.items() if k != 'id'] + [data.get('id')]
+                cursor.execute(f"UPDATE {table} SET {set_clause} WHERE id = ?", values)
+                applied += 1
+
+            elif operation == 'DELETE':
+                cursor.execute(f"DELETE FROM {table} WHERE id = ?", (data.get('id'),))
+                applied += 1
+
+        except Exception as e:
+            conflicts.append({
+                'table': table,
+                'operation': operation,
+                'error': str(e),
+                'data': data
+            })
+            logger.warning(f"套用變更失敗: {table} - {e}")
+    return applied, conflicts
+
+
+def ensure_sync_stream_schema(cursor: sqlite3.Cursor):
+    """Chunk progress table for resumable imports (idempotent)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_import_chunks (
+            package_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            changes_count INTEGER NOT NULL,
+            changes_applied INTEGER NOT NULL,
+            conflicts_count INTEGER NOT NULL DEFAULT 0,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (package_id, seq)
+        )
+    """)
+
+
+def get_import_progress(cursor: sqlite3.Cursor, package_id: str) -> Dict[str, Any]:
+    """Chunks already applied for a package (resume point = next_chunk)."""
+    ensure_sync_stream_schema(cursor)
+    cursor.execute("""
+        SELECT COUNT(*), COALESCE(MAX(seq), -1), COALESCE(SUM(changes_applied), 0)
+        FROM sync_import_chunks WHERE package_id = ?
+    """, (package_id,))
+    chunks, max_seq, applied = cursor.fetchone()
+    return {
+        "package_id": package_id,
+        "chunks_applied": chunks,
+        "next_chunk": max_seq + 1 if chunks == max_seq + 1 else chunks,
+        "changes_applied": applied,
+    }
+
+
+class StreamImporter:
+    """
+    Apply a parsed package chunk by chunk (one transaction per chunk).
+
+    Usage:
+        importer = StreamImporter(conn)
+        for kind, item in parser.feed(data): importer.handle(kind, item)
+        result = importer.result()
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_conflicts_reported: int = 100):
+        self.conn = conn
+        self.max_conflicts_reported = max_conflicts_reported
+        self.header: Optional[Dict[str, Any]] = None
+        self.footer: Optional[Dict[str, Any]] = None
+        self.changes_applied = 0
+        self.chunks_applied = 0
+        self.chunks_skipped = 0
+        self.conflicts: List[Dict] = []
+        self.conflicts_count = 0
+        self._done: Dict[int, str] = {}
+        self._next_seq: Optional[int] = None
+
+        cursor = conn.cursor()
+        ensure_sync_stream_schema(cursor)
+        conn.commit()
+        # INSERT OR REPLACE 刪除舊列時需觸發 DELETE trigger，item_stock 才不會重複累加
+        conn.execute("PRAGMA recursive_triggers = ON")
+
+    def handle(self, kind: str, item: Any):
+        if kind == "header":
+            self._on_header(item)
+        elif kind == "chunk":
+            self._on_chunk(*item)
+        elif kind == "footer":
+            self.footer = item
+
+    def _on_header(self, header: Dict[str, Any]):
+        if not header.get("package_id"):
+            raise SyncStreamError("封包格式錯誤：缺少封包ID")
+        self.header = header
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT seq, sha256 FROM sync_import_chunks WHERE package_id = ?",
+                       (header["package_id"],))
+        self._done = {row[0]: row[1] for row in cursor.fetchall()}
+
+    def _on_chunk(self, meta: Dict[str, Any], changes: List[Dict[str, Any]]):
+        seq = meta["seq"]
+        if self._next_seq is None:
+            # 續傳: 第一個區塊之前的區塊必須都已匯入
+            resumable = all(s in self._done for s in range(seq))
+        else:
+            resumable = seq == self._next_seq
+        if not resumable:
+            raise SyncStreamError(f"區塊順序錯誤: 收到 {seq}，請從區塊 {self._resume_point()} 續傳")
+        self._next_seq = seq + 1
+
+        if seq in self._done:
+            if self._done[seq] != meta["sha256"]:
+                raise SyncStreamError(f"區塊 {seq} 與先前匯入內容不同")
+            self.chunks_skipped += 1
+            return
+
+        cursor = self.conn.cursor()
+        try:
+            applied, conflicts = apply_sync_changes(cursor, changes)
+            cursor.execute("""
+                INSERT INTO sync_import_chunks
+                    (package_id, seq, sha256, changes_count, changes_applied, conflicts_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (self.header["package_id"], seq, meta["sha256"], len(changes), applied, len(conflicts)))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        self._done[seq] = meta["sha256"]
+        self.chunks_applied += 1
+        self.changes_applied += applied
+        self.conflicts_count += len(conflicts)
+        room = self.max_conflicts_reported - len(self.conflicts)
+        if room > 0:
+            self.conflicts.extend(conflicts[:room])
+
+    def _resume_point(self) -> int:
+        seq = 0
+        while seq in self._done:
+            seq += 1
+        return seq
+
+    def result(self, source_id: str = 'UNKNOWN', transfer_method: str = 'USB') -> Dict[str, Any]:
+        """Verify the footer against recorded chunks and record the package."""
+        if self.header is None or self.footer is None:
+            raise SyncStreamError("封包不完整 (缺少標頭或結尾)")
+        package_id = self.header["package_id"]
+        total_chunks = self.footer.get("chunks", 0)
+
+        missing = [seq for seq in range(total_chunks) if seq not in self._done]
+        if missing:
+            return {
+                "success": False,
+                "package_id": package_id,
+                "error": f"封包不完整，缺少 {len(missing)} 個區塊",
+                "next_chunk": missing[0],
+                "changes_applied": self.changes_applied,
+            }
+
+        calculated = package_checksum(self._done[seq] for seq in range(total_chunks))
+        status = 'APPLIED' if calculated == self.footer.get("checksum") else 'FAILED'
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO sync_packages (
+                package_id, package_type, source_type, source_id,
+                destination_type, destination_id, hospital_id,
+                transfer_method, checksum, changes_count, status, processed_at, error_message
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+        """, (
+            package_id, self.header.get("package_type", "FULL"), 'STATION',
+            self.header.get("station_id") or source_id,
+            'HOSPITAL', 'LOCAL', self.header.get("hospital_id") or 'HOSP-001',
+            transfer_method, self.footer.get("checksum", ""), self.footer.get("changes_count", 0), status,
+            None if status == 'APPLIED' else "checksum mismatch"
+        ))
+        self.conn.commit()
+
+        if status != 'APPLIED':
+            return {
+                "success": False,
+                "package_id": package_id,
+                "error": "校驗碼不符，封包可能已損毀",
+                "expected": self.footer.get("checksum"),
+                "actual": calculated,
+                "changes_applied": self.changes_applied,
+            }
+        return {
+            "success": True,
+            "package_id": package_id,
+            "changes_applied": self.changes_applied,
+            "chunks_applied": self.chunks_applied,
+            "chunks_skipped": self.chunks_skipped,
+            "conflicts_detected": self.conflicts_count,
+            "conflicts": self.conflicts,
+            "message": f"同步完成，已套用 {self.changes_applied} 項變更"
+        }
+
+    def close(self):
+        try:
+            self.conn.execute("PRAGMA recursive_triggers = OFF")
+        finally:
+            self.conn.close()
@@ -0,0 +1,369 @@
+"""
+MIRS Worker Coordination - Cross-process-safe shared state for `--workers N`
+
+With several uvicorn worker processes serving the same SQLite file, state
+that used to live in one process must be shared, elected or made per-worker:
+
+Provides:
+- SQLite leases (worker_leases): acquire / renew / release with a TTL;
+  a crashed worker's lease simply expires
+- Worker slots: each worker leases "slot:<n>" at startup; the slot is the
+  per-worker node id used by the HLC node id and UUIDv7 node bits
+  (worker_node_id / get_worker_slot). A worker whose slot lease was taken
+  over moves to a free slot on its next renewal
+- Exclusive jobs: WorkerCoordinator.run_exclusive(name, start, stop) runs a
+  background job (daily equipment reset, OTA scheduler, USB snapshots) in
+  exactly one worker; the lease holder renews it every TTL/3 and another
+  worker takes over when it stops renewing
+- Shared generation counters (shared_generations) for caches invalidated in
+  one worker and read in all (blood availability, mobile revocation state)
+- Shared sliding-window rate limits (rate_limit_hits)
+
+Single-worker mode (the default) keeps the in-process behaviour: exclusive
+jobs start immediately without leases and callers keep their local state.
+
+Environment:
+- MIRS_WORKERS      worker processes (default: 1; set by `python main.py --workers N`)
+- MIRS_LEASE_TTL    lease TTL in seconds (default: 30)
+
+Version: 1.0
+Date: 2026-10-16
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .db_pool import get_pool
+from .executor import run_in_executor
+
+logger = logging.getLogger(__name__)
+
+WORKERS = max(1, int(os.environ.get("MIRS_WORKERS", "1")))
+LEASE_TTL = float(os.environ.get("MIRS_LEASE_TTL", "30"))
+
+# UUIDv7 reserves 8 bits of rand_b for the slot (see id_service.UUIDv7Generator)
+MAX_WORKER_SLOTS = 256
+
+
+def is_multi_worker() -> bool:
+    return WORKERS > 1
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+
+def ensure_coordination_schema(cursor: sqlite3.Cursor):
+    """Create lease / generation / rate-limit tables (idempotent)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS worker_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            acquired_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shared_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_hits (
+            bucket TEXT NOT NULL,
+            hit_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_bucket ON rate_limit_hits(bucket, hit_at)")
+
+
+# =============================================================================
+# Leases
+# =============================================================================
+
+def owner_id() -> str:
+    """host:pid of the calling worker."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(conn: sqlite3.Connection, name: str, owner: str, ttl: float = LEASE_TTL) -> bool:
+    """
+    Take or renew a lease; True if `owner` holds it afterwards.
+
+    A single UPSERT: inserts a free lease, renews our own, or takes over an
+    expired one. Held by someone else and not expired -> no row changes.
+    """
+    now = time.time()
+    cursor = conn.execute("""
+        INSERT INTO worker_leases (name, owner, expires_at, acquired_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            owner = excluded.owner,
+            expires_at = excluded.expires_at,
+            acquired_at = CASE WHEN worker_leases.owner = excluded.owner
+                               THEN worker_leases.acquired_at ELSE excluded.acquired_at END
+        WHERE worker_leases.owner = excluded.owner OR worker_leases.expires_at < ?
+    """, (name, owner, now + ttl, now, now))
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def release_lease(conn: sqlite3.Connection, name: str, owner: str):
+    conn.execute("DELETE FROM worker_leases WHERE name = ? AND owner = ?", (name, owner))
+    conn.commit()
+
+
+def list_leases(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    now = time.time()
+    rows = conn.execute("SELECT name, owner, expires_at, acquired_at FROM worker_leases ORDER BY name").fetchall()
+    return [{"name": r[0], "owner": r[1], "expires_in": round(r[2] - now, 1),
+             "held_for": round(now - r[3], 1)} for r in rows]
+
+
+# =============================================================================
+# Shared generations / rate limits
+# =============================================================================
+
+def bump_shared_generation(conn: sqlite3.Connection, name: str) -> int:
+    conn.execute("""
+        INSERT INTO shared_generations (name, generation) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+    """, (name,))
+    generation = get_shared_generation(conn, name)
+    conn.commit()
+    return generation
+
+
+def get_shared_generation(conn: sqlite3.Connection, name: str) -> int:
+    row = conn.execute("SELECT generation FROM shared_generations WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def rate_limit_hit(conn: sqlite3.Connection, bucket: str, limit: int, window: float) -> bool:
+    """
+    Sliding-window limit shared by all workers: True if allowed (and recorded).
+
+    BEGIN IMMEDIATE serialises the count + insert across processes.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM rate_limit_hits WHERE bucket = ? AND hit_at <= ?", (bucket, now - window))
+        count = conn.execute("SELECT COUNT(*) FROM rate_limit_hits WHERE bucket = ?", (bucket,)).fetchone()[0]
+        allowed = count < limit
+        if allowed:
+            conn.execute("INSERT INTO rate_limit_hits (bucket, hit_at) VALUES (?, ?)", (bucket, now))
+        conn.commit()
+        return allowed
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# =============================================================================
+# Coordinator
+# =============================================================================
+
+@dataclass
+class ExclusiveJob:
+    name: str
+    start: Callable[[], Awaitable[Any]]
+    stop: Optional[Callable[[], Awaitable[Any]]] = None
+    running: bool = False
+
+
+class WorkerCoordinator:
+    """Per-process view of the worker group: slot, held leases, exclusive jobs."""
+
+    def __init__(self, workers: int = WORKERS, ttl: float = LEASE_TTL):
+        self.workers = workers
+        self.ttl = ttl
+        self.db_path: Optional[str] = None
+        self.owner: Optional[str] = None
+        self.slot: Optional[int] = None
+        self._jobs: Dict[str, ExclusiveJob] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def multi_worker(self) -> bool:
+        return self.workers > 1
+
+    def _connect(self, readonly: bool = False):
+        pool = get_pool(self.db_path)
+        return pool.reader() if readonly else pool.writer()
+
+    def _with_conn(self, fn, *args, readonly: bool = False):
+        conn = self._connect(readonly)
+        try:
+            return fn(conn, *args)
+        finally:
+            conn.close()
+
+    def _claim_slot(self) -> int:
+        conn = self._connect()
+        try:
+            ensure_coordination_schema(conn.cursor())
+            conn.commit()
+            for slot in range(MAX_WORKER_SLOTS):
+                if acquire_lease(conn, f"slot:{slot}", self.owner, self.ttl):
+                    return slot
+        finally:
+            conn.close()
+        raise RuntimeError(f"No free worker slot (max {MAX_WORKER_SLOTS})")
+
+    async def start(self, db_path: str):
+        """Claim a worker slot and start renewing leases (multi-worker only)."""
+        self.db_path = db_path
+        self.owner = owner_id()
+        if not self.multi_worker:
+            return
+        self.slot = await run_in_executor("db", self._claim_slot)
+        logger.info(f"[Workers] {self.owner} holds slot {self.slot} of {self.workers} workers")
+        self._task = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        """Stop exclusive jobs held here and release our leases so another worker takes over."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for job in self._jobs.values():
+            await self._stop_job(job)
+        if self.multi_worker and self.db_path:
+            names = [f"job:{name}" for name in self._jobs]
+            if self.slot is not None:
+                names.append(f"slot:{self.slot}")
+            for name in names:
+                try:
+                    await run_in_executor("db", self._with_conn, release_lease, name, self.owner)
+                except Exception as e:
+                    logger.warning(f"[Workers] Failed to release lease {name}: {e}")
+        self._jobs.clear()
+
+    async def run_exclusive(self, name: str, start: Callable[[], Awaitable[Any]],
+                            stop: Optional[Callable[[], Awaitable[Any]]] = None):
+        """
+        Run a background job in exactly one worker.
+
+        Single worker: start now. Multi worker: start when this worker holds
+        lease "job:<name>"; stop it if the lease is lost.
+        """
+        job = ExclusiveJob(name, start, stop)
+        self._jobs[name] = job
+        if not self.multi_worker:
+            await self._start_job(job)
+        else:
+            await self._sync_job(job)
+
+    def exclusive_task(self, name: str, coro_factory: Callable[[], Awaitable[Any]]):
+        """run_exclusive() for a plain `while True` coroutine (asyncio task, cancelled on stop)."""
+        holder: Dict[str, asyncio.Task] = {}
+
+        async def start():
+            holder["task"] = asyncio.create_task(coro_factory())
+
+        async def stop():
+            task = holder.pop("task", None)
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        return self.run_exclusive(name, start, stop)
+
+    async def _start_job(self, job: ExclusiveJob):
+        await job.start()
+        job.running = True
+        logger.info(f"[Workers] Exclusive job '{job.name}' started in {self.owner}")
+
+    async def _stop_job(self, job: ExclusiveJob):
+        if job.running:
+            job.running = False
+            if job.stop:
+                await job.stop()
+            logger.info(f"[Workers] Exclusive job '{job.name}' stopped in {self.owner}")
+
+    async def _sync_job(self, job: ExclusiveJob):
+        held = await run_in_executor("db", self._with_conn, acquire_lease, f"job:{job.name}", self.owner, self.ttl)
+        if held and not job.running:
+            await self._start_job(job)
+        elif not held and job.running:
+            logger.warning(f"[Workers] Lost lease for '{job.name}'")
+            await self._stop_job(job)
+
+    async def _renew_slot(self):
+        """
+        Renew our slot lease. If it expired and another worker took it (renewals
+        failed for longer than the TTL), move to a free slot: two processes must
+        never share an HLC node id / UUIDv7 slot bits.
+        """
+        held = await run_in_executor("db", self._with_conn, acquire_lease, f"slot:{self.slot}", self.owner, self.ttl)
+        if held:
+            return
+        lost = self.slot
+        logger.error(f"[Workers] {self.owner} lost the lease on slot {lost} (taken by another worker) - re-claiming")
+        self.slot = await run_in_executor("db", self._claim_slot)
+        from .hlc import refresh_worker_node_id
+        refresh_worker_node_id()
+        logger.error(f"[Workers] {self.owner} moved from slot {lost} to slot {self.slot}")
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self._renew_slot()
+                for job in list(self._jobs.values()):
+                    await self._sync_job(job)
+            except Exception as e:
+                logger.warning(f"[Workers] Lease renewal failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pid": os.getpid(),
+            "slot": self.slot,
+            "exclusive_jobs": {name: job.running for name, job in self._jobs.items()},
+        }
+
+
+_coordinator = WorkerCoordinator()
+
+
+def get_coordinator() -> WorkerCoordinator:
+    """Get the process-wide coordinator."""
+    return _coordinator
+
+
+def get_worker_slot() -> Optional[int]:
+    """This worker's slot (None in single-worker mode or before startup)."""
+    return _coordinator.slot
+
+
+def worker_node_id(node_id: str) -> str:
+    """Per-worker node id for HLC timestamps: "<station>-w<slot>" when running multi-worker."""
+    slot = _coordinator.slot
+    return node_id if slot is None else f"{node_id}-w{slot}"
+
+
+def shared_generation(name: str, bump: bool = False) -> int:
+    """Read (or bump) a shared generation counter in the coordinator's database."""
+    if bump:
+        return _coordinator._with_conn(bump_shared_generation, name)
+    return _coordinator._with_conn(get_shared_generation, name, readonly=True)
+
+
+def shared_rate_limit(bucket: str, limit: int, window: float) -> bool:
+    """rate_limit_hit() in the coordinator's database."""
+    return _coordinator._with_conn(rate_limit_hit, bucket, limit, window)
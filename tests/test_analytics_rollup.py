@@ -0,0 +1,168 @@
+"""
+Analytics Rollup Tests
+
+Tests for services/analytics_rollup.py (trigger-maintained daily rollups,
+backfill / verify) and the analytics endpoints reading them.
+
+Usage:
+    python -m pytest tests/test_analytics_rollup.py -v
+    python tests/test_analytics_rollup.py
+"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from routes import analytics
+from services.analytics_rollup import (
+    ensure_analytics_rollup_schema, rebuild_analytics_rollups, verify_analytics_rollups,
+)
+
+SCHEMA = """
+    CREATE TABLE anesthesia_cases (
+        id TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'PREOP',
+        anesthesia_start_at DATETIME, anesthesia_end_at DATETIME,
+        surgery_start_at DATETIME, surgery_end_at DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE anesthesia_events (
+        id TEXT PRIMARY KEY, case_id TEXT NOT NULL, event_type TEXT NOT NULL,
+        clinical_time DATETIME NOT NULL, payload TEXT NOT NULL
+    );
+    CREATE TABLE equipment (id TEXT PRIMARY KEY, name TEXT);
+    CREATE TABLE equipment_units (
+        id INTEGER PRIMARY KEY, equipment_id TEXT, unit_label TEXT, unit_serial TEXT,
+        level_percent INTEGER, status TEXT, is_active INTEGER DEFAULT 1
+    );
+"""
+
+
+def event(conn, event_id, event_type, payload, when="-1 hours"):
+    conn.execute("INSERT INTO anesthesia_events VALUES (?, 'C1', ?, datetime('now', ?), ?)",
+                 (event_id, event_type, when, payload if isinstance(payload, str) else json.dumps(payload)))
+
+
+def make_history(conn):
+    for i in range(40):
+        conn.execute(
+            "INSERT INTO anesthesia_cases (id, status, anesthesia_start_at, anesthesia_end_at, created_at) "
+            "VALUES (?, 'PREOP', datetime('now', ?), datetime('now', ?), datetime('now', ?))",
+            (f"C{i}", f"-{i * 20 + 2} hours", f"-{i * 20} hours", f"-{i * 20 + 3} hours"))
+    conn.execute("UPDATE anesthesia_cases SET status = 'CLOSED' WHERE rowid % 3 = 0")
+    conn.execute("UPDATE anesthesia_cases SET status = 'IN_PROGRESS' WHERE id = 'C0'")
+    for i in range(60):
+        event(conn, f"M{i}", "MEDICATION_ADMIN",
+              {"drug_name": "Propofol" if i % 2 else "Fentanyl", "dose": 10 + i, "unit": "mg"}, f"-{i * 7} hours")
+    event(conn, "M-bad", "MEDICATION_ADMIN", "not json")
+    conn.executemany("INSERT INTO equipment_units VALUES (?, 'O2', ?, ?, 60, 'AVAILABLE', 1)",
+                     [(1, "H 瓶 1", "H-001"), (2, "E 瓶 2", "E-002")])
+    conn.execute("INSERT INTO equipment VALUES ('O2', '氧氣瓶')")
+    event(conn, "R1", "RESOURCE_CLAIM", {"unit_id": "1"})
+    event(conn, "R2", "RESOURCE_CHECK", {"unit_id": "1", "level_before": 90, "level_after": 70})
+    event(conn, "R3", "RESOURCE_RELEASE", {"unit_id": "2", "level_before": 50, "level_after": 45})
+    conn.commit()
+
+
+def test_triggers_match_backfill():
+    """Inserts, status updates, payload edits and deletes keep rollups equal to a replay."""
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    ensure_analytics_rollup_schema(conn.cursor())
+    make_history(conn)
+    assert verify_analytics_rollups(conn)["ok"]
+
+    conn.execute("UPDATE anesthesia_events SET payload = ? WHERE id = 'M1'",
+                 (json.dumps({"drug_name": "Ketamine", "dose": 5, "unit": "mg"}),))
+    conn.execute("UPDATE anesthesia_cases SET created_at = datetime('now', '-400 days') WHERE id = 'C5'")
+    conn.execute("DELETE FROM anesthesia_events WHERE id IN ('M2', 'R3')")
+    conn.execute("DELETE FROM anesthesia_cases WHERE id = 'C7'")
+    conn.commit()
+    report = verify_analytics_rollups(conn)
+    assert report["ok"], report["drift"][:5]
+
+    # 漂移 (例如手動修改彙總表) 由 verify 偵測，rebuild 修復
+    conn.execute("UPDATE rollup_case_daily SET case_count = case_count + 1")
+    assert not verify_analytics_rollups(conn)["ok"]
+    rows = rebuild_analytics_rollups(conn)
+    assert rows["rollup_medication_daily"] > 0
+    assert verify_analytics_rollups(conn)["ok"]
+
+
+def test_endpoints_read_rollups_only():
+    """Dashboard / daily / medication / equipment / oxygen agree with raw aggregation, without touching raw tables."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "mirs.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        ensure_analytics_rollup_schema(conn.cursor())
+        make_history(conn)
+
+        statements = []
+
+        def traced_db():
+            traced = sqlite3.connect(path)
+            traced.row_factory = sqlite3.Row
+            traced.set_trace_callback(statements.append)
+            return traced
+
+        original = analytics.get_db
+        analytics.get_db = traced_db
+        try:
+            dashboard = asyncio.run(analytics.get_dashboard_summary())
+            daily = asyncio.run(analytics.get_daily_stats(days=30))
+            usage = asyncio.run(analytics.get_medication_usage(start_date=None, end_date=None, limit=20))
+            utilization = asyncio.run(analytics.get_equipment_utilization())
+            oxygen = asyncio.run(analytics.get_oxygen_consumption(days=30))
+        finally:
+            analytics.get_db = original
+
+        assert not [s for s in statements if "FROM anesthesia_" in s], "endpoints read raw history"
+
+        now = datetime.now()
+        month = conn.execute("SELECT COUNT(*) FROM anesthesia_cases WHERE date(created_at) BETWEEN ? AND ?",
+                             ((now - timedelta(days=30)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d"))).fetchone()[0]
+        assert dashboard.month_cases == month and dashboard.active_cases == 1
+        assert sum(d.case_count for d in daily) == conn.execute(
+            "SELECT COUNT(*) FROM anesthesia_cases WHERE created_at >= date('now', '-30 days')").fetchone()[0]
+        assert all(d.avg_duration_min and abs(d.avg_duration_min - 120) < 0.01 for d in daily)
+
+        raw = {r[0]: (r[1], r[2]) for r in conn.execute("""
+            SELECT json_extract(payload, '$.drug_name'), COUNT(*), SUM(json_extract(payload, '$.dose'))
+            FROM anesthesia_events WHERE event_type = 'MEDICATION_ADMIN' AND json_valid(payload)
+            GROUP BY 1""")}
+        assert {u.drug_name: (u.administrations, u.total_dose) for u in usage} == raw
+        assert all(u.unit == "mg" for u in usage)
+
+        assert sorted(u.total_claims for u in utilization) == [0, 1]
+        assert oxygen["by_type"]["H-type"]["usage_events"] == 1
+        assert oxygen["by_type"]["H-type"]["estimated_liters"] == round(0.20 * 6900, 1)
+        assert oxygen["by_type"]["E-type"]["level_drop_percent"] == 5
+        conn.close()
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_triggers_match_backfill,
+        test_endpoints_read_rollups_only,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,181 @@
+"""
+Anesthesia Case Projection Tests
+
+Tests for services/anesthesia_projection.py (incremental apply, versions, DB validation).
+
+Usage:
+    python -m pytest tests/test_anesthesia_projection.py -v
+    python tests/test_anesthesia_projection.py
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.anesthesia_projection import (
+    ProjectionStore, get_projection_store, project_inserted_event,
+)
+
+
+# =============================================================================
+# Test Fixtures
+# =============================================================================
+
+def create_test_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE anesthesia_events (
+            id TEXT PRIMARY KEY,
+            case_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            clinical_time DATETIME NOT NULL,
+            recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            payload TEXT NOT NULL,
+            actor_id TEXT NOT NULL,
+            is_correction INTEGER DEFAULT 0
+        )
+    """)
+    return conn
+
+
+def add_event(conn, event_id, event_type, clinical_time, payload=None, case_id="ANES-1", is_correction=0):
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO anesthesia_events (id, case_id, event_type, clinical_time, payload, actor_id, is_correction)
+        VALUES (?, ?, ?, ?, ?, 'u1', ?)
+    """, (event_id, case_id, event_type, clinical_time, json.dumps(payload or {}), is_correction))
+    return cursor
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_grouping_and_chronological_order():
+    """Late entries are inserted in clinical_time order; corrections excluded from timeline."""
+    conn = create_test_conn()
+    store = ProjectionStore()
+    add_event(conn, "e1", "VITAL_SIGN", "2026-01-01T08:10:00", {"hr": 70})
+    add_event(conn, "e2", "MEDICATION_ADMIN", "2026-01-01T08:20:00", {"drug_name": "Propofol"})
+    add_event(conn, "e3", "VITAL_SIGN", "2026-01-01T08:05:00", {"hr": 90})  # 補登
+    add_event(conn, "e4", "NOTE", "2026-01-01T08:30:00", is_correction=1)
+
+    proj = store.get(conn.cursor(), "ANES-1")
+    timeline = proj.grouped()
+    assert [e["id"] for e in timeline["vitals"]] == ["e3", "e1"]
+    assert timeline["vitals"][0]["payload"] == {"hr": 90}
+    assert [e["id"] for e in timeline["all"]] == ["e3", "e1", "e2"]
+    assert proj.counts_by_type() == {"VITAL_SIGN": 2, "MEDICATION_ADMIN": 1}
+    assert len(proj.events(include_corrections=True)) == 4
+
+
+def test_since_version_delta():
+    """Applied events get increasing versions; since_version returns only new ones."""
+    conn = create_test_conn()
+    store = get_projection_store()  # project_inserted_event feeds the shared store
+    store.invalidate()
+    add_event(conn, "e1", "VITAL_SIGN", "2026-01-01T08:10:00")
+    proj = store.get(conn.cursor(), "ANES-1")
+    version = proj.version
+    before = store.stats()
+
+    cursor = add_event(conn, "e2", "VITAL_SIGN", "2026-01-01T08:00:00")
+    project_inserted_event(cursor, "ANES-1")  # not pooled -> applied immediately
+    assert store.stats()["applied"] == before["applied"] + 1
+
+    proj = store.get(conn.cursor(), "ANES-1")
+    assert store.stats()["hits"] == before["hits"] + 1, "Writer-applied event must not trigger a reload"
+    assert not proj.is_full(version)
+    assert [e["id"] for e in proj.grouped(since_version=version)["vitals"]] == ["e2"]
+    assert proj.is_full(proj.version + 5), "Unknown future version -> full reload"
+
+
+def test_external_writes_are_picked_up():
+    """Rows written without the hook are caught up incrementally; deletes force a rebuild."""
+    conn = create_test_conn()
+    store = ProjectionStore()
+    add_event(conn, "e1", "VITAL_SIGN", "2026-01-01T08:10:00")
+    store.get(conn.cursor(), "ANES-1")
+
+    add_event(conn, "e2", "FLUID_IN", "2026-01-01T08:15:00", {"amount_ml": 500})
+    proj = store.get(conn.cursor(), "ANES-1")
+    assert proj.count == 2
+    assert store.stats()["incremental"] == 1
+
+    old_version = proj.version
+    conn.execute("DELETE FROM anesthesia_events WHERE id = 'e1'")
+    proj = store.get(conn.cursor(), "ANES-1")
+    assert [e["id"] for e in proj.events()] == ["e2"]
+    assert proj.is_full(old_version), "A client holding the deleted row must reload"
+    assert proj.version != old_version
+
+
+def test_derived_state_cached_per_version():
+    """Derived state is rebuilt only when the projection changes, and returned as a copy."""
+    conn = create_test_conn()
+    store = ProjectionStore()
+    add_event(conn, "e1", "VITAL_SIGN", "2026-01-01T08:10:00")
+    calls = []
+
+    def build(p):
+        calls.append(p.version)
+        return {"vitals": [e["payload"] for e in p.raw_events()]}
+
+    proj = store.get(conn.cursor(), "ANES-1")
+    state = proj.derived("pdf_state", build)
+    state["vitals"].append("mutated")
+    assert proj.derived("pdf_state", build) == {"vitals": ["{}"]}
+    assert len(calls) == 1
+
+    add_event(conn, "e2", "VITAL_SIGN", "2026-01-01T08:20:00")
+    store.get(conn.cursor(), "ANES-1").derived("pdf_state", build)
+    assert len(calls) == 2
+
+
+def test_versions_agree_across_workers():
+    """Each worker has its own store; a version from one is a valid delta anchor on another."""
+    conn = create_test_conn()
+    worker_a, worker_b = ProjectionStore(), ProjectionStore()
+    add_event(conn, "e1", "VITAL_SIGN", "2026-01-01T08:10:00")
+    add_event(conn, "e2", "VITAL_SIGN", "2026-01-01T08:20:00")
+    version = worker_a.get(conn.cursor(), "ANES-1").version
+
+    worker_b.get(conn.cursor(), "ANES-1")  # B's cache predates e3 as well
+    add_event(conn, "e3", "MEDICATION_ADMIN", "2026-01-01T08:15:00")
+    proj_b = worker_b.get(conn.cursor(), "ANES-1")
+    assert not proj_b.is_full(version)
+    assert [e["id"] for e in proj_b.grouped(since_version=version)["all"]] == ["e3"]
+    assert proj_b.version == worker_a.get(conn.cursor(), "ANES-1").version
+
+    fresh = ProjectionStore().get(conn.cursor(), "ANES-1")  # worker that never saw the case
+    assert fresh.version == proj_b.version and not fresh.is_full(version)
+    assert [e["id"] for e in fresh.events(since_version=version)] == ["e3"]
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_grouping_and_chronological_order,
+        test_since_version_delta,
+        test_external_writes_are_picked_up,
+        test_derived_state_cached_per_version,
+        test_versions_agree_across_workers,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,173 @@
+"""
+Backup Engine Tests
+
+Tests for services/backup_engine.py (SQLite online backup, streamed zip, USB snapshots).
+
+Usage:
+    python -m pytest tests/test_backup_engine.py -v
+    python tests/test_backup_engine.py
+"""
+
+import io
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services import backup_engine
+from services.backup_engine import UsbSnapshotScheduler, backup_to_file, iter_zip, snapshot_chunks
+from services.db_pool import get_pool
+
+
+# =============================================================================
+# Test Fixtures
+# =============================================================================
+
+def create_db(directory: Path, rows: int = 500) -> Path:
+    db_path = directory / "live.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE inventory_events (id INTEGER PRIMARY KEY, item_code TEXT, note TEXT)")
+    conn.executemany(
+        "INSERT INTO inventory_events (item_code, note) VALUES (?, ?)",
+        [(f"ITEM-{i}", "x" * 200) for i in range(rows)]
+    )
+    conn.commit()
+    conn.close()  # 最後一條連線關閉 -> checkpoint
+    return db_path
+
+
+def insert_rows(db_path: Path, count: int):
+    conn = sqlite3.connect(str(db_path))
+    for i in range(count):
+        conn.execute("INSERT INTO inventory_events (item_code, note) VALUES (?, 'w')", (f"W-{i}",))
+        conn.commit()
+    conn.close()
+
+
+def count_rows(db_path: Path) -> int:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM inventory_events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_backup_consistent_under_concurrent_writes():
+    """Snapshot taken while another connection commits passes quick_check."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = create_db(Path(tmp))
+        writer = threading.Thread(target=insert_rows, args=(db_path, 200))
+        writer.start()
+        result = backup_to_file(str(db_path), Path(tmp) / "snap.db", pages=4)
+        writer.join()
+        get_pool(str(db_path)).close_all()
+
+        snap = sqlite3.connect(result["path"])
+        assert snap.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+        assert snap.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        snap.close()
+        assert 500 <= count_rows(Path(result["path"])) <= 700
+        assert not (Path(tmp) / "snap.db.tmp").exists()
+
+
+def test_snapshot_chunks_memory_and_spooled():
+    """In-memory and spooled snapshots both yield a self-contained database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = create_db(Path(tmp))
+        insert_rows(db_path, 3)
+
+        original_limit = backup_engine.BACKUP_MEMORY_LIMIT
+        try:
+            outputs = []
+            for limit in (original_limit, 0):
+                backup_engine.BACKUP_MEMORY_LIMIT = limit
+                outputs.append(b"".join(snapshot_chunks(str(db_path), chunk_size=4096, spool_dir=tmp)))
+        finally:
+            backup_engine.BACKUP_MEMORY_LIMIT = original_limit
+            get_pool(str(db_path)).close_all()
+
+        for i, data in enumerate(outputs):
+            assert data[18:20] == b"\x01\x01", "Rollback-journal header (no -wal needed)"
+            out = Path(tmp) / f"out{i}.db"
+            out.write_bytes(data)
+            assert count_rows(out) == 503
+        assert [p.name for p in Path(tmp).iterdir() if p.name.startswith("mirs-snapshot-")] == []
+
+
+def test_streamed_zip_with_manifest():
+    """iter_zip output is a valid zip; later entries can list earlier sizes."""
+    infos = []
+
+    def entries():
+        yield "exports/a.csv", [b"id,name\n", b"1,gauze\n"]
+        yield "database/big.bin", (bytes([i % 7]) * 100000 for i in range(3))
+        yield "manifest.json", [json.dumps({i["name"]: i["size"] for i in infos}).encode()]
+
+    data = b"".join(iter_zip(entries(), infos))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.read("exports/a.csv") == b"id,name\n1,gauze\n"
+        manifest = json.loads(zf.read("manifest.json"))
+    assert manifest == {"exports/a.csv": 16, "database/big.bin": 300000}
+
+
+def test_usb_snapshot_skips_unchanged_and_rotates():
+    """Unchanged DB is not re-snapshotted; only the newest `keep` files remain."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = create_db(Path(tmp))
+        usb = Path(tmp) / "usb"
+        usb.mkdir()
+        scheduler = UsbSnapshotScheduler(str(db_path), str(usb), keep=2)
+        try:
+            assert scheduler.snapshot_now()["status"] == "CREATED"
+            assert scheduler.snapshot_now()["status"] == "UNCHANGED"
+
+            created = []
+            for _ in range(3):
+                insert_rows(db_path, 1)
+                result = scheduler.snapshot_now()
+                assert result["status"] == "CREATED"
+                created.append(Path(result["path"]).name)
+        finally:
+            scheduler._watch.close()
+            get_pool(str(db_path)).close_all()
+
+        assert sorted(p.name for p in usb.glob("mirs_*.db")) == created[-2:]
+        assert count_rows(usb / created[-1]) == 503
+
+        missing = UsbSnapshotScheduler(str(db_path), str(Path(tmp) / "not-mounted"))
+        assert missing.snapshot_now()["status"] == "NO_TARGET"
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_backup_consistent_under_concurrent_writes,
+        test_snapshot_chunks_memory_and_spooled,
+        test_streamed_zip_with_manifest,
+        test_usb_snapshot_skips_unchanged_and_rotates,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,144 @@
+"""
+Blood Availability Cache Tests
+
+Tests for services/blood_availability.py and the ETag/304 handling of
+GET /api/blood/availability.
+
+Usage:
+    python -m pytest tests/test_blood_availability.py -v
+    python tests/test_blood_availability.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m007_blood_bank import m007_blood_bank
+from services.blood_availability import BloodAvailabilityCache, bump_generation, get_generation
+from services.db_pool import get_pool
+from routes import blood
+
+
+def test_rebuild_on_generation_and_day_change():
+    """Snapshot reused until blood_units changes or the local date rolls over."""
+    now = [datetime(2026, 10, 16, 23, 59, 0)]
+    computed = []
+
+    def compute():
+        computed.append(now[0])
+        return [{"blood_type": "O+", "unit_type": "PRBC", "available_count": 3}]
+
+    cache = BloodAvailabilityCache(compute=compute, clock=lambda: now[0])
+    first = cache.get()
+    assert cache.get() is first
+    assert len(computed) == 1
+
+    bump_generation("blood_units")
+    second = cache.get()
+    assert len(computed) == 2
+    assert second.etag == first.etag, "Same content -> same ETag"
+
+    now[0] += timedelta(minutes=2)  # 跨日: 效期分類改變
+    cache.get()
+    assert len(computed) == 3
+    assert cache.stats()["hits"] == 1
+    assert second.select(blood_type="A+") == []
+    assert cache.etag_for(second, "O+") != second.etag
+
+
+def test_etag_304_until_blood_write():
+    """Unchanged polls get 304; a reserve invalidates and returns new data."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = get_pool(db_path).writer()
+    m007_blood_bank(conn.cursor())
+    expiry = (datetime.now() + timedelta(days=10)).strftime("%Y-%m-%d")
+    conn.execute("""
+        INSERT INTO blood_units (id, blood_type, unit_type, volume_ml, expiry_date, status)
+        VALUES ('BU-1', 'O+', 'PRBC', 250, ?, 'AVAILABLE')
+    """, (expiry,))
+    conn.commit()
+    conn.close()
+
+    original = blood.get_db, blood.get_read_db
+    blood.get_db = lambda: get_pool(db_path).writer()
+    blood.get_read_db = lambda: get_pool(db_path).reader()
+    blood.get_availability_cache().invalidate()
+    app = FastAPI()
+    app.include_router(blood.router)
+    try:
+        with TestClient(app) as client:
+            r = client.get("/api/blood/availability")
+            assert r.status_code == 200
+            etag = r.headers["ETag"]
+            assert r.json()["data"][0]["available_count"] == 1
+
+            r = client.get("/api/blood/availability", headers={"If-None-Match": etag})
+            assert r.status_code == 304
+
+            r = client.post("/api/blood/units/BU-1/reserve", json={"order_id": "ORD-1", "reserver_id": "RN-1"})
+            assert r.status_code == 200
+
+            r = client.get("/api/blood/availability", headers={"If-None-Match": etag})
+            assert r.status_code == 200
+            assert r.headers["ETag"] != etag
+            row = r.json()["data"][0]
+            assert (row["available_count"], row["reserved_count"]) == (0, 1)
+    finally:
+        blood.get_db, blood.get_read_db = original
+        blood.get_reservation_scheduler().cancel("BU-1")
+        blood.get_availability_cache().invalidate()
+        get_pool(db_path).close_all()
+        os.unlink(db_path)
+
+
+def test_generation_bumps_only_after_commit():
+    """log_blood_event on a connection outside a transaction bumps once the write commits, not before."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = get_pool(db_path).writer()
+    m007_blood_bank(conn.cursor())
+    conn.commit()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM blood_units")   # like record_custody_event: read first
+        cursor.fetchone()
+        before = get_generation("blood_units")
+        blood.log_blood_event(cursor, "BU-1", "CUSTODY_CHECKOUT", "RN-1")
+        assert get_generation("blood_units") == before, "Bumped before the write committed"
+        conn.commit()
+        assert get_generation("blood_units") > before
+    finally:
+        conn.close()
+        get_pool(db_path).close_all()
+        os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_rebuild_on_generation_and_day_change,
+        test_etag_304_until_blood_write,
+        test_generation_bumps_only_after_commit,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,168 @@
+"""
+CIRS Hub Client Tests
+
+Tests for services/cirs_client.py (circuit breaker, stale-while-revalidate cache).
+
+Usage:
+    python -m pytest tests/test_cirs_client.py -v
+    python tests/test_cirs_client.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.cirs_client import (
+    CircuitBreaker, CirsHubClient, HubResponseCache, HubUnavailableError,
+)
+
+
+def test_breaker_opens_and_probes():
+    """Open after N failures, reject during cooldown, allow one probe after."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now[0] = 31
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow(), "First probe after cooldown goes out"
+    assert not breaker.allow(), "Only one probe at a time"
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_client_fails_fast_when_hub_down():
+    """Connect errors open the circuit; later calls never reach the network."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = CirsHubClient(breaker=CircuitBreaker(failure_threshold=2, cooldown=60),
+                           transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        for _ in range(2):
+            try:
+                await client.get("http://hub/api/health")
+            except httpx.ConnectError:
+                pass
+        try:
+            await client.get("http://hub/api/health")
+            assert False, "Expected HubUnavailableError"
+        except HubUnavailableError as e:
+            assert isinstance(e, httpx.ConnectError), "Existing ConnectError handlers must catch it"
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert not client.is_available
+
+
+def test_cancelled_requests_do_not_trip_breaker():
+    """Cancelled requests free the probe slot but are not counted as Hub failures."""
+    now = [0.0]
+    hub_up = [True]
+
+    async def handler(request):
+        if request.url.path == "/slow" or not hub_up[0]:
+            await asyncio.sleep(3600)         # hangs until cancelled
+        return httpx.Response(200, json={"ok": True})
+
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30, clock=lambda: now[0])
+    client = CirsHubClient(breaker=breaker, transport=httpx.MockTransport(handler))
+
+    async def cancel_in_flight(url):
+        request = asyncio.create_task(client.get(url))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        try:
+            await request
+            assert False, "Expected CancelledError"
+        except asyncio.CancelledError:
+            pass
+
+    async def scenario():
+        for _ in range(3):                    # e.g. PWA navigations aborting proxy fetches
+            await cancel_in_flight("http://hub/slow")
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.stats()["consecutive_failures"] == 0
+
+        breaker.record_failure()
+        breaker.record_failure()
+        now[0] = 31
+        hub_up[0] = False
+        await cancel_in_flight("http://hub/api/health")   # half-open probe cancelled
+        assert breaker.state == CircuitBreaker.HALF_OPEN, "No new cooldown for a cancelled probe"
+
+        hub_up[0] = True
+        response = await client.get("http://hub/api/health")
+        assert response.status_code == 200
+        assert breaker.state == CircuitBreaker.CLOSED
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_stale_while_revalidate():
+    """Fresh hits skip fetch; stale hits return at once and refresh in background."""
+    cache = HubResponseCache(fresh_seconds=60, max_stale_seconds=3600)
+    revisions = iter([5, 7])
+    fetches = []
+
+    async def fetch():
+        revision = next(revisions)
+        fetches.append(revision)
+        return [f"patient@{revision}"], revision
+
+    async def scenario():
+        entry, from_cache = await cache.get("waiting", fetch)
+        assert not from_cache and entry.hub_revision == 5
+
+        entry, from_cache = await cache.get("waiting", fetch)
+        assert from_cache and fetches == [5]
+
+        cache.peek("waiting").fetched_at -= 120  # make it stale
+        entry, from_cache = await cache.get("waiting", fetch)
+        assert from_cache and entry.value == ["patient@5"], "Stale value served immediately"
+        await asyncio.sleep(0)  # let the refresh task run
+        await asyncio.sleep(0)
+        assert cache.peek("waiting").hub_revision == 7
+        assert cache.peek("waiting").value == ["patient@7"]
+
+    asyncio.run(scenario())
+    assert cache.stats()["refreshes"] == 1
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_breaker_opens_and_probes,
+        test_client_fails_fast_when_hub_down,
+        test_cancelled_requests_do_not_trip_breaker,
+        test_stale_while_revalidate,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
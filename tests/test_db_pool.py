@@ -0,0 +1,113 @@
+"""
+SQLite Connection Pool Tests
+
+Tests for services/db_pool.py (PRAGMA profile, writer/reader split, reuse).
+
+Usage:
+    python -m pytest tests/test_db_pool.py -v
+    python tests/test_db_pool.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.db_pool import ConnectionPool, PRAGMA_PROFILES
+
+
+def _temp_db() -> str:
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return db_path
+
+
+def test_profile_applied_to_writer():
+    """Writers get WAL + the profile's busy_timeout/cache_size."""
+    db_path = _temp_db()
+    pool = ConnectionPool(db_path, profile="sdcard")
+    try:
+        conn = pool.writer()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == PRAGMA_PROFILES["sdcard"]["busy_timeout"]
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == PRAGMA_PROFILES["sdcard"]["cache_size"]
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 0
+        conn.close()
+    finally:
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def test_reader_is_query_only():
+    """Readers cannot write."""
+    db_path = _temp_db()
+    pool = ConnectionPool(db_path, profile="ssd")
+    try:
+        conn = pool.writer()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.close()
+
+        reader = pool.reader()
+        try:
+            reader.execute("INSERT INTO t VALUES (1)")
+            assert False, "reader should be query_only"
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            reader.close()
+    finally:
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def test_close_returns_connection_and_rolls_back():
+    """close() rolls back open transactions and the connection is reused."""
+    db_path = _temp_db()
+    pool = ConnectionPool(db_path, profile="sdcard")
+    try:
+        conn = pool.writer()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")  # left uncommitted
+        conn.row_factory = None
+        conn.close()
+        conn.close()  # idempotent
+
+        conn = pool.writer()
+        assert conn.execute("SELECT COUNT(*) AS n FROM t").fetchone()["n"] == 0
+        conn.close()
+
+        stats = pool.stats()
+        assert stats["created"] == 1
+        assert stats["reused"] == 1
+        assert stats["in_use"] == 0
+    finally:
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_profile_applied_to_writer,
+        test_reader_is_query_only,
+        test_close_returns_connection_and_rolls_back,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,128 @@
+"""
+DR Export Tests
+
+Tests for the Lifeboat export path in services/event_service.py (keyset
+pages, counter-based totals, columnar encoding) and the cached server UUID.
+
+Usage:
+    python -m pytest tests/test_dr_export.py -v
+    python tests/test_dr_export.py
+"""
+
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m009_walkaway import m009_walkaway
+from database.migrations.m016_event_digest import m016_event_digest
+from services.event_service import (
+    estimate_event_count, events_from_columns, events_to_columns,
+    export_events, export_events_page, restore_events_batch,
+)
+from services.id_service import get_server_uuid
+
+BASE_MS = 1760000000000
+
+
+def make_database(path=":memory:"):
+    conn = sqlite3.connect(path)
+    m009_walkaway(conn.cursor())
+    m016_event_digest(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def make_event(i):
+    ts = BASE_MS + i * 1000
+    return {
+        "event_id": f"EVT-{i:06d}",
+        "entity_type": "inventory",
+        "entity_id": f"MED-{i % 50:03d}",
+        "event_type": "STOCK_RECEIVE",
+        "ts_device": ts,
+        "hlc": f"{ts}.0.STATION",
+        "payload": {"quantity": i % 7},
+    }
+
+
+def test_keyset_pages_cover_all_events_without_count_scans():
+    """Pages seek by hlc (no OFFSET / COUNT(*)), cover every event once, and re-restore cleanly."""
+    conn = make_database()
+    restore_events_batch(conn, "S1", "STATION", [make_event(i) for i in range(12_345)])
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    exported, cursor_hlc, pages = [], None, 0
+    while True:
+        events, has_more, total = export_events(conn, since_hlc=cursor_hlc, limit=1000)
+        remaining = 12_345 - len(exported)
+        if pages == 0:
+            assert total == remaining
+        else:
+            assert remaining <= total <= remaining + 3600      # at most one extra hour bucket
+        exported += events
+        pages += 1
+        if not has_more:
+            break
+        cursor_hlc = events[-1]["hlc"]
+    conn.set_trace_callback(None)
+
+    assert pages == 13
+    assert [e["event_id"] for e in exported] == [f"EVT-{i:06d}" for i in range(12_345)]
+    sql = " ".join(statements).upper()
+    assert "OFFSET" not in sql and "COUNT(*)" not in sql
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT event_id FROM events WHERE hlc > ? ORDER BY hlc LIMIT 10",
+                        ("1",)).fetchall()
+    assert "idx_events_hlc" in str(plan)
+
+    replica = make_database()
+    result = restore_events_batch(replica, "S2", "PHONE", exported)
+    assert result.events_inserted == 12_345 and result.events_rejected == 0
+    assert restore_events_batch(conn, "S3", "PHONE", exported).events_already_present == 12_345
+
+
+def test_columnar_round_trip_and_cached_server_uuid():
+    """Columnar pages decode to the row dicts; the server UUID is read from system_config once."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_database(str(Path(tmp) / "mirs.db"))
+        restore_events_batch(conn, "S1", "STATION", [make_event(i) for i in range(500)])
+
+        rows, has_more = export_events_page(conn, limit=200)
+        columns = events_to_columns(rows)
+        assert len(columns["event_id"]) == 200 and has_more
+        assert events_from_columns(columns) == export_events(conn, limit=200)[0]
+        assert events_from_columns(events_to_columns([])) == []
+        assert 300 <= estimate_event_count(conn, rows[-1][10]) <= 500
+
+        uuid = get_server_uuid(conn)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        assert get_server_uuid(conn) == uuid
+        conn.set_trace_callback(None)
+        assert not any("system_config" in s for s in statements)
+        conn.close()
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_keyset_pages_cover_all_events_without_count_scans,
+        test_columnar_round_trip_and_cached_server_uuid,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,124 @@
+"""
+DR Restore Tests
+
+Tests for the bulk restore path in services/event_service.py (set-based
+duplicate detection, executemany inserts, snapshot UPSERT, throughput).
+
+Usage:
+    python -m pytest tests/test_dr_restore.py -v
+    python tests/test_dr_restore.py
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m009_walkaway import m009_walkaway
+from services.event_service import (
+    EventInsertResult, insert_event_idempotent, restore_events_batch,
+)
+
+
+def make_database():
+    conn = sqlite3.connect(":memory:")
+    m009_walkaway(conn.cursor())
+    conn.execute("CREATE TABLE items (item_code TEXT PRIMARY KEY, item_name TEXT, unit TEXT)")
+    conn.commit()
+    return conn
+
+
+def make_event(i, payload=None):
+    return {
+        "event_id": f"EVT-{i:06d}",
+        "entity_type": "inventory",
+        "entity_id": f"MED-{i % 50:03d}",
+        "event_type": "STOCK_RECEIVE",
+        "actor_id": "nurse-01",
+        "ts_device": 1760000000000 + i,
+        "hlc": f"1760000000000.{i:06d}.PHONE",
+        "payload": payload or {"quantity": i % 7},
+    }
+
+
+def dump(conn):
+    return (
+        conn.execute("SELECT event_id, payload_json, payload_hash, synced FROM events ORDER BY event_id").fetchall(),
+        conn.execute("SELECT event_id, reason, old_hash, new_hash FROM restore_rejects ORDER BY id").fetchall(),
+    )
+
+
+def test_bulk_restore_matches_per_event_path():
+    """Inserted / existing / rejected counts and stored rows equal the one-event-at-a-time path."""
+    first = [make_event(i) for i in range(0, 1500)]
+    second = [make_event(i) for i in range(1000, 2500)]
+    second[10] = make_event(1010, {"quantity": 999})         # tampered copy of a stored event
+    second += [make_event(2000), make_event(2001, {"x": 1})]  # duplicates inside the batch
+
+    bulk = make_database()
+    restore_events_batch(bulk, "S1", "PHONE-1", first)
+    result = restore_events_batch(bulk, "S1", "PHONE-1", second, batch_number=2)
+
+    reference = make_database()
+    for batch in (first, second):
+        cursor = reference.cursor()
+        counts = {r: 0 for r in EventInsertResult}
+        for event in batch:
+            counts[insert_event_idempotent(cursor, event, "S1")[0]] += 1
+        reference.commit()
+
+    assert result.events_received == len(second)
+    assert result.events_inserted == counts[EventInsertResult.INSERTED] == 1000
+    assert result.events_already_present == counts[EventInsertResult.ALREADY_PRESENT] == 500
+    assert result.events_rejected == counts[EventInsertResult.REJECTED] == 2
+    assert result.rejected_event_ids == ["EVT-001010", "EVT-002001"]
+    assert dump(bulk) == dump(reference)
+    assert bulk.execute("SELECT SUM(inserted), SUM(rejected) FROM restore_log").fetchone() == (2500, 2)
+
+
+def test_snapshot_upsert_and_throughput():
+    """Snapshot rows are upserted (unknown columns dropped); elapsed and events/s are reported."""
+    conn = make_database()
+    conn.execute("INSERT INTO items VALUES ('MED-001', '舊名稱', '瓶')")
+    conn.commit()
+    snapshot = {
+        "items": [
+            {"item_code": "MED-001", "item_name": "生理食鹽水", "unit": "袋", "legacy_column": 1},
+            {"item_code": "MED-002", "item_name": "紗布"},
+            {"item_code": "MED-003", "item_name": "手套", "unit": "盒"},
+        ],
+        "no_such_table": [{"id": 1}],
+    }
+    events = [make_event(i) for i in range(5000)]
+    result = restore_events_batch(conn, "S2", "PHONE-1", events, snapshot=snapshot)
+
+    assert result.snapshot_tables_restored == ["items"]
+    assert conn.execute("SELECT * FROM items ORDER BY item_code").fetchall() == [
+        ("MED-001", "生理食鹽水", "袋"), ("MED-002", "紗布", None), ("MED-003", "手套", "盒"),
+    ]
+    assert result.events_inserted == 5000 and result.status == "COMPLETED"
+    assert result.elapsed_ms > 0 and result.events_per_second > 0
+    assert "events/s" in result.message
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_bulk_restore_matches_per_event_path,
+        test_snapshot_upsert_and_throughput,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
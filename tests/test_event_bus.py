@@ -0,0 +1,209 @@
+"""
+Event Bus Tests
+
+Tests for services/event_bus.py (ring buffer replay, publish-after-commit).
+
+Usage:
+    python -m pytest tests/test_event_bus.py -v
+    python tests/test_event_bus.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.db_pool import ConnectionPool, get_pool
+from services.event_bus import EventBus, get_event_bus, publish_event
+from routes import oxygen_tracking
+from routes.oxygen_tracking import create_oxygen_event, init_oxygen_events_schema
+
+
+def _event(event_id: str, entity_type: str = "equipment_unit") -> dict:
+    return {"event_id": event_id, "entity_type": entity_type, "entity_id": "1",
+            "event_type": "OXYGEN_CHECKED", "ts_device": 0, "payload": {}}
+
+
+def test_ring_replay_and_overflow():
+    """read_since replays from a known seq; too-old seqs report a ring miss."""
+    bus = EventBus(capacity=3)
+    for i in range(3):
+        bus.publish(_event(f"e{i}"))
+
+    seq = bus.seq_of("e0")
+    items, head = bus.read_since(seq)
+    assert [e["event_id"] for _, e in items] == ["e1", "e2"]
+    assert head == 3
+
+    bus.publish(_event("e3"))  # e0 drops out of the ring
+    assert bus.seq_of("e0") is None
+    assert bus.read_since(0)[0] is None, "Subscriber behind the ring must fall back to DB"
+    assert [e["event_id"] for _, e in bus.read_since(1)[0]] == ["e1", "e2", "e3"]
+    assert bus.stats()["ring_misses"] == 1
+
+
+def test_subscriber_wakes_on_publish():
+    """Subscribers are woken (thread-safe) and filter by entity_type."""
+    bus = EventBus(capacity=10)
+
+    async def scenario():
+        sub = bus.subscribe("equipment_unit")
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, bus.publish, _event("e1"))
+        woke = await sub.wait(timeout=2)
+        assert woke
+        assert sub.matches(_event("e1"))
+        assert not sub.matches(_event("e2", entity_type="anesthesia_case"))
+        assert not await sub.wait(timeout=0.05), "No publish -> heartbeat timeout"
+        sub.close()
+        assert bus.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_publish_only_after_commit():
+    """Pooled writes publish on commit and are dropped on rollback."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    pool = ConnectionPool(db_path)
+    bus = get_event_bus()
+    try:
+        conn = pool.writer()
+        conn.execute("CREATE TABLE events (event_id TEXT)")
+        conn.commit()
+
+        conn.execute("INSERT INTO events VALUES ('c1')")
+        publish_event(conn.cursor(), _event("commit-1"))
+        assert bus.seq_of("commit-1") is None
+        conn.commit()
+        assert bus.seq_of("commit-1") is not None
+
+        conn.execute("INSERT INTO events VALUES ('r1')")
+        publish_event(conn, _event("rollback-1"))
+        conn.close()  # returned uncommitted -> rolled back
+        assert bus.seq_of("rollback-1") is None
+    finally:
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def test_tail_reads_legacy_oxygen_payload():
+    """A second worker's tail delivers oxygen events on both events schemas."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    pool = get_pool(db_path)
+    other = EventBus(capacity=10)
+
+    def write(unit_id):
+        conn = pool.writer()
+        event = create_oxygen_event(conn.cursor(), unit_id, "OXYGEN_CHECKED",
+                                    {"level_percent": 80}, "nurse-1")
+        conn.commit()
+        conn.close()
+        return event["event_id"]
+
+    async def tailed(event_id):
+        for _ in range(200):
+            seq = other.seq_of(event_id)
+            if seq is not None:
+                return other.read_since(seq - 1)[0][0][1]
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"{event_id} never reached the other worker")
+
+    async def scenario():
+        other.start_tail(db_path, interval=0.01)
+        try:
+            await asyncio.sleep(0.05)  # tail anchors at the current head
+
+            legacy = await tailed(write(1))          # init_oxygen_events_schema: payload only
+            assert legacy["payload"] == {"level_percent": 80}
+
+            conn = pool.writer()
+            conn.execute("ALTER TABLE events ADD COLUMN payload_json TEXT")  # as m009 does
+            conn.commit()
+            conn.close()
+            migrated = await tailed(write(2))
+            assert migrated["payload"] == {"level_percent": 80}
+        finally:
+            await other.stop_tail()
+
+    try:
+        conn = pool.writer()
+        init_oxygen_events_schema(conn.cursor())
+        conn.commit()
+        conn.close()
+        asyncio.run(scenario())
+        assert other.stats()["tailed"] == 2
+    finally:
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def test_sse_catch_up_reads_past_page_limit():
+    """A client further behind than one DB page still receives every event."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    pool = get_pool(db_path)
+    saved = oxygen_tracking.DB_PATH, oxygen_tracking.SSE_DB_CATCHUP_LIMIT
+    oxygen_tracking.DB_PATH, oxygen_tracking.SSE_DB_CATCHUP_LIMIT = db_path, 5
+
+    async def scenario():
+        response = await oxygen_tracking.event_stream(entity_type=None, since_event_id="ev-00")
+        stream = response.body_iterator
+        received = []
+        try:
+            async for chunk in stream:
+                message = json.loads(chunk[len("data: "):])
+                if message["type"] == "event":
+                    received.append(message["event_id"])
+                if len(received) == 12 or message["type"] == "heartbeat":
+                    break
+        finally:
+            await stream.aclose()
+        return received
+
+    try:
+        conn = pool.writer()
+        init_oxygen_events_schema(conn.cursor())
+        conn.executemany("""
+            INSERT INTO events (id, event_id, entity_type, entity_id, event_type, ts_device, actor_id, payload)
+            VALUES (?, ?, 'equipment_unit', '1', 'OXYGEN_CHECKED', ?, 'nurse-1', '{}')
+        """, [(f"ev-{i:02d}", f"ev-{i:02d}", 1000 + i) for i in range(13)])
+        conn.commit()
+        conn.close()
+
+        received = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+        assert received == [f"ev-{i:02d}" for i in range(1, 13)], received
+    finally:
+        oxygen_tracking.DB_PATH, oxygen_tracking.SSE_DB_CATCHUP_LIMIT = saved
+        pool.close_all()
+        os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_ring_replay_and_overflow,
+        test_subscriber_wakes_on_publish,
+        test_publish_only_after_commit,
+        test_tail_reads_legacy_oxygen_payload,
+        test_sse_catch_up_reads_past_page_limit,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,125 @@
+"""
+Event Digest Tests
+
+Tests for services/event_digest.py (trigger-maintained Merkle-range digest
+over the events table, divergence search between two replicas).
+
+Usage:
+    python -m pytest tests/test_event_digest.py -v
+    python tests/test_event_digest.py
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m009_walkaway import m009_walkaway
+from database.migrations.m016_event_digest import m016_event_digest
+from services.event_digest import (
+    DIGEST_BUCKET_MS, bucket_events, digest_nodes, digest_root,
+    find_divergent_buckets, rebuild_event_digest, verify_event_digest,
+)
+from services.event_service import restore_events_batch
+
+BASE_MS = 1760000000000
+
+
+def make_database():
+    conn = sqlite3.connect(":memory:")
+    m009_walkaway(conn.cursor())
+    m016_event_digest(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def make_event(i, step_ms=1000):
+    ts = BASE_MS + i * step_ms
+    return {
+        "event_id": f"EVT-{i:06d}",
+        "entity_type": "inventory",
+        "entity_id": f"MED-{i % 50:03d}",
+        "event_type": "STOCK_RECEIVE",
+        "ts_device": ts,
+        "hlc": f"{ts}.{i % 3}.STATION",
+        "payload": {"quantity": i % 7},
+    }
+
+
+def test_triggers_match_rebuild():
+    """Insert / update / delete keep the buckets equal to a full replay."""
+    conn = make_database()
+    restore_events_batch(conn, "S1", "PHONE-1", [make_event(i, 60_000) for i in range(3000)])
+    conn.execute("INSERT INTO events (event_id, entity_type, entity_id, actor_id, event_type, ts_device, payload_json) "
+                 "VALUES ('LEGACY-1', 'inventory', 'MED-001', 'nurse-01', 'NOTE', ?, '{}')", (BASE_MS,))
+    conn.execute("UPDATE events SET payload_hash = 'ffffffffffff0000' WHERE event_id = 'EVT-000100'")
+    conn.execute("UPDATE events SET hlc = ? WHERE event_id = 'EVT-000200'", (f"{BASE_MS + 10 ** 9}.0.STATION",))
+    conn.execute("DELETE FROM events WHERE event_id BETWEEN 'EVT-000500' AND 'EVT-000700'")
+    conn.commit()
+
+    assert verify_event_digest(conn)["ok"]
+    before = digest_root(conn)
+    assert before["events_count"] == 3000 + 1 - 201
+    rebuild_event_digest(conn)
+    assert digest_root(conn) == before
+
+    bucket = (BASE_MS + 10 ** 9) // DIGEST_BUCKET_MS
+    assert [e["event_id"] for e in bucket_events(conn, bucket)] == ["EVT-000200"]
+    legacy = BASE_MS // DIGEST_BUCKET_MS
+    assert "LEGACY-1" in {e["event_id"] for e in bucket_events(conn, legacy)}
+
+
+def test_divergent_replicas_exchange_only_differing_buckets():
+    """A phone missing / holding extra events finds exactly those buckets with a few KB of digest traffic."""
+    events = [make_event(i) for i in range(100_000)]          # ~28 hours at 1 event/s
+    station, phone = make_database(), make_database()
+    restore_events_batch(station, "S1", "STATION", events)
+    restore_events_batch(phone, "S1", "STATION", events[:50_000] + events[50_100:])
+    restore_events_batch(phone, "S1", "PHONE", [make_event(200_000)])   # phone-only event
+    assert digest_root(station)["root"] != digest_root(phone)["root"]
+
+    traffic = []
+
+    def fetch_nodes(level, parent):
+        nodes = digest_nodes(station, level, parent)
+        traffic.append(len(json.dumps(nodes)))
+        return [tuple(n) for n in json.loads(json.dumps(nodes))]
+
+    divergent = find_divergent_buckets(phone, fetch_nodes)
+    expected = sorted({(BASE_MS + i * 1000) // DIGEST_BUCKET_MS for i in (50_000, 50_099, 200_000)})
+    assert divergent == expected
+    assert sum(traffic) < 8 * 1024
+
+    for bucket in divergent:
+        missing = bucket_events(station, bucket, full=True)
+        restore_events_batch(phone, "S2", "STATION", missing)
+    station_ids = {e["event_id"] for b in divergent for e in bucket_events(station, b)}
+    restore_events_batch(station, "S2", "PHONE", [
+        e for b in divergent for e in bucket_events(phone, b, full=True) if e["event_id"] not in station_ids
+    ])
+    assert digest_root(station)["root"] == digest_root(phone)["root"]
+    assert find_divergent_buckets(phone, lambda level, parent: digest_nodes(station, level, parent)) == []
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_triggers_match_rebuild,
+        test_divergent_replicas_exchange_only_differing_buckets,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,90 @@
+"""
+Managed Executor Tests
+
+Tests for services/executor.py (per-category limits, metrics, streaming).
+
+Usage:
+    python -m pytest tests/test_executor.py -v
+    python tests/test_executor.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.executor import ManagedExecutor
+
+
+def test_category_limit_isolates_slow_work():
+    """A saturated category queues its own work; other categories still run."""
+    executor = ManagedExecutor({"export": ("thread", 1), "auth": ("thread", 2)}, threads=4)
+    release = threading.Event()
+
+    async def scenario():
+        slow = [asyncio.create_task(executor.run("export", release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        export = executor.stats()["categories"]["export"]
+        assert (export["running"], export["queue_depth"]) == (1, 2)
+
+        started = time.perf_counter()
+        assert await executor.run("auth", lambda pin: pin == "1234", "1234") is True
+        assert time.perf_counter() - started < 0.5, "auth not blocked by export"
+
+        release.set()
+        await asyncio.gather(*slow)
+
+    asyncio.run(scenario())
+    stats = executor.stats()["categories"]
+    assert stats["export"]["completed"] == 3
+    assert stats["export"]["queue_depth"] == 0
+    assert stats["export"]["wait_ms_max"] >= 40, "queued calls record their wait"
+    assert stats["auth"]["completed"] == 1
+    executor.shutdown()
+
+
+def test_iterate_and_errors():
+    """iterate() streams every chunk (after a pre-fetched first); errors are counted."""
+    executor = ManagedExecutor({"export": ("thread", 2)}, threads=2)
+
+    async def scenario():
+        chunks = iter([b"b", b"c"])
+        out = [chunk async for chunk in executor.iterate("export", chunks, b"a")]
+        try:
+            await executor.run("export", int, "not-a-number")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("error not propagated")
+        return out
+
+    assert asyncio.run(scenario()) == [b"a", b"b", b"c"]
+    stats = executor.stats()["categories"]["export"]
+    assert stats["errors"] == 1
+    assert stats["completed"] == 3  # 2 chunks + StopIteration sentinel
+    executor.shutdown()
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_category_limit_isolates_slow_work,
+        test_iterate_and_errors,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
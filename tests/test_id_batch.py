@@ -0,0 +1,166 @@
+"""
+Batched ID / HLC Generation Tests
+
+Tests for UUIDv7Generator.generate_many and HybridLogicalClock.now_many
+(reserved blocks for bulk writers), plus a single-vs-batched micro-benchmark.
+
+Usage:
+    python -m pytest tests/test_id_batch.py -v
+    python tests/test_id_batch.py             # also prints the benchmark table
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m007_blood_bank import m007_blood_bank
+from routes import anesthesia, blood
+from services import id_service, worker_coordination
+from services.db_pool import get_pool
+from services.hlc import HybridLogicalClock
+from services.id_service import TimeValidityError, UUIDv7Generator, format_uuidv7
+
+BENCH_N = 20_000
+
+
+def test_uuid_blocks_are_monotonic_and_valid():
+    """Blocks interleaved with single IDs stay strictly increasing, unique and RFC 9562 v7."""
+    generator = UUIDv7Generator()
+    ids = [generator.generate()]
+    for n in (1, 10, 5000, 3):
+        ids += [format_uuidv7(v) for v in generator.generate_many(n)]
+        ids.append(generator.generate())
+    assert ids == sorted(ids) and len(set(ids)) == len(ids) == 5019
+    parsed = [uuid.UUID(i) for i in ids]
+    assert {(u.version, u.variant) for u in parsed} == {(7, uuid.RFC_4122)}
+    assert abs(generator.parse_timestamp(ids[-1]) - time.time() * 1000) < 5000
+
+    as_bytes = generator.generate_many(2, as_bytes=True)
+    assert all(len(b) == 16 for b in as_bytes) and format_uuidv7(as_bytes[0]) < format_uuidv7(as_bytes[1])
+    assert generator.generate_many(0) == []
+
+    coordinator = worker_coordination.get_coordinator()
+    coordinator.slot = 37
+    try:
+        assert {(v >> 54) & 0xFF for v in generator.generate_many(100)} == {37}
+    finally:
+        coordinator.slot = None
+
+
+def test_hlc_blocks_match_single_calls():
+    """now_many(n) continues the clock like n calls of now(), formatted lazily."""
+    clock = HybridLogicalClock("BORP-01")
+    clock._wall_time_ms = lambda: 1760000000000
+    first = clock.now()
+    block = clock.now_many(4)
+    after = clock.now()
+    assert first == "1760000000000.0.BORP-01"
+    assert list(block) == [f"1760000000000.{i}.BORP-01" for i in range(1, 5)]
+    assert (len(block), block[0], block[-1]) == (4, "1760000000000.1.BORP-01", "1760000000000.4.BORP-01")
+    assert after == "1760000000000.5.BORP-01"
+
+    clock._wall_time_ms = lambda: 1760000000001
+    assert list(clock.now_many(2)) == ["1760000000001.0.BORP-01", "1760000000001.1.BORP-01"]
+    assert len(clock.now_many(0)) == 0
+
+
+def test_bulk_writers_survive_invalid_clock():
+    """RTC reset (TimeValidityError): blood receipt falls back to uuid4, sync_batch fails only event items."""
+    def invalid_clock():
+        raise TimeValidityError("System time 1970-01-01 is before build date")
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = get_pool(db_path).writer()
+    m007_blood_bank(conn.cursor())
+    anesthesia.init_anesthesia_schema(conn.cursor())
+    conn.commit()
+    conn.close()
+
+    original = id_service.validate_time, blood.get_db, anesthesia.get_db_connection
+    id_service.validate_time = invalid_clock
+    blood.get_db = lambda: get_pool(db_path).writer()
+    anesthesia.get_db_connection = lambda: get_pool(db_path).writer()
+    try:
+        result = asyncio.run(blood.batch_receive_blood(blood.SimpleBatchReceive(blood_type="O+", quantity=3)))
+        assert result["count"] == 3
+        conn = get_pool(db_path).reader()
+        event_ids = [r[0] for r in conn.execute("SELECT id FROM blood_unit_events WHERE event_type = 'RECEIVE'")]
+        conn.close()
+        assert len(event_ids) == 3 and {uuid.UUID(i).version for i in event_ids} == {4}
+
+        def item(n, endpoint):
+            return anesthesia.SyncQueueItem(id=f"Q-{n}", device_id="PAD-1", operation="POST", endpoint=endpoint,
+                                            payload={"event_type": "NOTE"}, idempotency_key=f"K-{n}",
+                                            created_at="2026-10-16T12:00:00")
+
+        response = asyncio.run(anesthesia.sync_batch(anesthesia.SyncBatchRequest(
+            device_id="PAD-1", items=[item(1, "/cases"), item(2, "/cases/ANES-1/events")])))
+        statuses = [r["status"] for r in response["results"]]
+        assert statuses == ["synced", "failed"]
+        assert "before build date" in response["results"][1]["message"]
+    finally:
+        id_service.validate_time, blood.get_db, anesthesia.get_db_connection = original
+        get_pool(db_path).close_all()
+        os.unlink(db_path)
+
+
+def benchmark(n: int = BENCH_N) -> dict:
+    """ops/s for single vs batched UUIDv7 and HLC generation (batched includes formatting)."""
+    generator = UUIDv7Generator()
+    clock = HybridLogicalClock("BORP-01")
+
+    def rate(fn):
+        started = time.perf_counter()
+        fn()
+        return n / (time.perf_counter() - started)
+
+    return {
+        "uuid7 single": rate(lambda: [generator.generate() for _ in range(n)]),
+        "uuid7 batch (int)": rate(lambda: generator.generate_many(n)),
+        "uuid7 batch (str)": rate(lambda: [format_uuidv7(v) for v in generator.generate_many(n)]),
+        "hlc single": rate(lambda: [clock.now() for _ in range(n)]),
+        "hlc batch (block)": rate(lambda: clock.now_many(n)),
+        "hlc batch (str)": rate(lambda: list(clock.now_many(n))),
+    }
+
+
+def test_batched_generation_is_faster():
+    """Micro-benchmark: reserving a block beats one lock + time check per ID."""
+    rates = benchmark()
+    assert rates["uuid7 batch (str)"] > rates["uuid7 single"]
+    assert rates["hlc batch (str)"] > rates["hlc single"]
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_uuid_blocks_are_monotonic_and_valid,
+        test_hlc_blocks_match_single_calls,
+        test_bulk_writers_survive_invalid_clock,
+        test_batched_generation_is_faster,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+
+    print(f"\nMicro-benchmark ({BENCH_N} IDs)")
+    for name, ops in benchmark().items():
+        print(f"  {name:<20} {ops:>12,.0f} /s")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,139 @@
+"""
+Cold Import Budget Tests
+
+Tests for services/lazy_router.py and the `python -X importtime` startup
+budget of main.py (warm reboot: schema fingerprint already recorded).
+
+Usage:
+    python -m pytest tests/test_import_budget.py -v
+    python tests/test_import_budget.py
+
+Environment:
+    MIRS_IMPORT_BUDGET_MS   cumulative import time budget for main (default: 3000)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.lazy_router import LazyRouterMiddleware, LazyRouterRegistry
+
+PROJECT_ROOT = Path(__file__).parent.parent
+IMPORT_BUDGET_MS = float(os.environ.get("MIRS_IMPORT_BUDGET_MS", "3000"))
+
+# 冷啟動不應載入的模組 (延遲路由 / PDF / 加密 / OTA HTTP)
+DEFERRED_MODULES = [
+    "routes.anesthesia", "routes.ota", "routes.dr", "routes.transfer",
+    "routes.analytics", "routes.surgery_codes", "routes.procedure",
+    "services.anesthesia_billing", "services.pdf_watermark", "services.security",
+    "aiohttp", "matplotlib", "weasyprint", "jinja2", "reportlab", "PyPDF2", "pandas", "nacl",
+]
+
+
+def run_python(cwd, code, *flags):
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+def test_warm_import_within_budget():
+    """After one full start, `import main` skips deferred modules and fits the budget."""
+    with tempfile.TemporaryDirectory() as cwd:
+        # 首次啟動: 完整 schema 初始化並記錄 fingerprint (不啟動背景排程)
+        first = run_python(cwd, textwrap.dedent("""
+            import main
+            assert main.run_schema_init()
+            conn = main.db.get_connection()
+            main.schema_fingerprint.store(conn)
+            conn.close()
+        """))
+        assert first.returncode == 0, first.stderr[-2000:]
+
+        probe = run_python(cwd, textwrap.dedent(f"""
+            import json, sys
+            import main
+            print(json.dumps({{
+                "fast_path": main.SCHEMA_FAST_PATH,
+                "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules],
+            }}))
+        """), "-X", "importtime")
+        assert probe.returncode == 0, probe.stderr[-2000:]
+
+        result = json.loads(probe.stdout.strip().splitlines()[-1])
+        assert result["fast_path"] is True
+        assert result["loaded"] == [], f"Eagerly imported: {result['loaded']}"
+
+        main_line = next(l for l in probe.stderr.splitlines()
+                         if l.startswith("import time:") and l.rstrip().endswith("| main"))
+        cumulative_ms = int(main_line.split("|")[1]) / 1000
+        assert cumulative_ms < IMPORT_BUDGET_MS, \
+            f"import main took {cumulative_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_lazy_router_loads_on_first_request():
+    """Module imported on first hit under its prefix; /openapi.json loads the rest."""
+    with tempfile.TemporaryDirectory() as pkg:
+        for name, prefix in [("lazy_demo_a", "/api/demo-a"), ("lazy_demo_b", "/api/demo-b")]:
+            Path(pkg, f"{name}.py").write_text(textwrap.dedent(f"""
+                from fastapi import APIRouter
+                router = APIRouter(prefix="{prefix}")
+
+                @router.get("/ping")
+                async def ping():
+                    return {{"module": "{name}"}}
+            """))
+        sys.path.insert(0, pkg)
+        try:
+            app = FastAPI()
+            registry = LazyRouterRegistry(app)
+            app.add_middleware(LazyRouterMiddleware, registry=registry)
+            loaded = []
+            assert registry.register("/api/demo-a", "lazy_demo_a:router", "Demo A", on_load=loaded.append)
+            assert registry.register("/api/demo-b", "lazy_demo_b:router", "Demo B")
+            assert not registry.register("/api/missing", "lazy_demo_missing:router", "Missing")
+
+            with TestClient(app) as client:
+                assert "lazy_demo_a" not in sys.modules
+                assert client.get("/api/demo-a/ping").json() == {"module": "lazy_demo_a"}
+                assert [m.__name__ for m in loaded] == ["lazy_demo_a"]
+                assert "lazy_demo_b" not in sys.modules
+                assert client.get("/api/demo-ab").status_code == 404  # prefix 邊界
+
+                paths = client.get("/openapi.json").json()["paths"]
+                assert set(paths) == {"/api/demo-a/ping", "/api/demo-b/ping"}
+                assert all(s["loaded"] for s in registry.stats().values())
+        finally:
+            sys.path.remove(pkg)
+            sys.modules.pop("lazy_demo_a", None)
+            sys.modules.pop("lazy_demo_b", None)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_warm_import_within_budget,
+        test_lazy_router_loads_on_first_request,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,168 @@
+"""
+Inventory Engine Tests
+
+Tests for the batched consume path in routes/inventory_engine.py.
+
+Usage:
+    python -m pytest tests/test_inventory_engine.py -v
+    python tests/test_inventory_engine.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from routes import inventory_engine
+from routes.inventory_engine import ConsumeItem, ConsumeRequest, _deduct_batch
+from services.db_pool import ConnectionPool
+from services.stock_ledger import ensure_item_stock_schema, get_on_hand
+
+
+# =============================================================================
+# Test Fixtures
+# =============================================================================
+
+def create_test_pool():
+    """Temp DB with items, ledger and blood tables; engine pointed at it."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    pool = ConnectionPool(db_path)
+    conn = pool.writer()
+    conn.executescript("""
+        CREATE TABLE items (item_code TEXT PRIMARY KEY, item_name TEXT, min_stock INTEGER DEFAULT 0);
+        CREATE TABLE inventory_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL, item_code TEXT NOT NULL, quantity INTEGER NOT NULL,
+            batch_number TEXT, remarks TEXT, operator TEXT, station_id TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE blood_bags (
+            bag_code TEXT PRIMARY KEY, blood_type TEXT, volume_ml INTEGER, status TEXT,
+            used_at TIMESTAMP, used_for TEXT
+        );
+        CREATE TABLE blood_inventory (blood_type TEXT PRIMARY KEY, quantity INTEGER);
+        CREATE TABLE blood_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT, blood_type TEXT,
+            quantity INTEGER, operator TEXT, remarks TEXT
+        );
+    """)
+    ensure_item_stock_schema(conn.cursor())
+    conn.executemany("INSERT INTO items (item_code, item_name) VALUES (?, ?)",
+                     [("GAUZE", "Gauze"), ("SYRINGE", "Syringe")])
+    conn.executemany("INSERT INTO inventory_events (event_type, item_code, quantity) VALUES ('RECEIVE', ?, ?)",
+                     [("GAUZE", 10), ("SYRINGE", 5)])
+    conn.execute("INSERT INTO blood_bags VALUES ('BAG-1', 'O+', 250, 'IN_STOCK', NULL, NULL)")
+    conn.execute("INSERT INTO blood_inventory VALUES ('O+', 3)")
+    conn.commit()
+    conn.close()
+    inventory_engine._get_db_connection = pool.writer
+    return pool, db_path
+
+
+def make_request(items, all_or_nothing=False) -> ConsumeRequest:
+    return ConsumeRequest(
+        intent_id="INT-1", execution_id="EXE-1", station_id="ST-01",
+        items=[ConsumeItem(**item) for item in items], all_or_nothing=all_or_nothing,
+    )
+
+
+_original_get_db_connection = inventory_engine._get_db_connection
+
+
+def cleanup(pool, db_path):
+    inventory_engine._get_db_connection = _original_get_db_connection
+    pool.close_all()
+    os.unlink(db_path)
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_batch_uses_running_balance():
+    """Lines for the same item share one snapshot; later lines see earlier deductions."""
+    pool, db_path = create_test_pool()
+    try:
+        results = _deduct_batch(make_request([
+            {"item_code": "GAUZE", "quantity": 6},
+            {"item_code": "SYRINGE", "quantity": 2},
+            {"item_code": "GAUZE", "quantity": 6},
+            {"item_code": "NOPE", "quantity": 1},
+            {"item_code": "BLOOD", "quantity": 1, "blood_unit_id": "BAG-1"},
+        ]))
+        assert [r.status for r in results] == ["CONFIRMED", "CONFIRMED", "FAILED", "FAILED", "CONFIRMED"]
+        assert results[0].remaining_stock == 4
+        assert results[2].error.startswith("INSUFFICIENT_STOCK")
+        assert results[3].error.startswith("ITEM_NOT_FOUND")
+
+        conn = pool.reader()
+        assert get_on_hand(conn.cursor(), "GAUZE") == 4
+        assert get_on_hand(conn.cursor(), "SYRINGE") == 3
+        assert conn.execute("SELECT status FROM blood_bags").fetchone()[0] == "USED"
+        assert conn.execute("SELECT quantity FROM blood_inventory").fetchone()[0] == 2
+        conn.close()
+    finally:
+        cleanup(pool, db_path)
+
+
+def test_all_or_nothing_rolls_back():
+    """With all_or_nothing, one failing line leaves stock and blood untouched."""
+    pool, db_path = create_test_pool()
+    try:
+        results = _deduct_batch(make_request([
+            {"item_code": "GAUZE", "quantity": 3},
+            {"item_code": "BLOOD", "quantity": 1, "blood_unit_id": "BAG-1"},
+            {"item_code": "SYRINGE", "quantity": 50},
+        ], all_or_nothing=True))
+        assert all(r.status == "FAILED" for r in results)
+        assert results[0].error == "ROLLED_BACK: all_or_nothing"
+        assert results[0].remaining_stock == 10
+
+        conn = pool.reader()
+        assert conn.execute("SELECT COUNT(*) FROM inventory_events WHERE event_type = 'CONSUME'").fetchone()[0] == 0
+        assert conn.execute("SELECT status FROM blood_bags").fetchone()[0] == "IN_STOCK"
+        conn.close()
+    finally:
+        cleanup(pool, db_path)
+
+
+def test_duplicate_blood_unit_consumed_once():
+    """The same bag listed twice is only consumed by the first line."""
+    pool, db_path = create_test_pool()
+    try:
+        results = _deduct_batch(make_request([
+            {"item_code": "BLOOD", "quantity": 1, "blood_unit_id": "BAG-1"},
+            {"item_code": "BLOOD", "quantity": 1, "blood_unit_id": "BAG-1"},
+        ]))
+        assert [r.status for r in results] == ["CONFIRMED", "FAILED"]
+        conn = pool.reader()
+        assert conn.execute("SELECT quantity FROM blood_inventory").fetchone()[0] == 2
+        conn.close()
+    finally:
+        cleanup(pool, db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_batch_uses_running_balance,
+        test_all_or_nothing_rolls_back,
+        test_duplicate_blood_unit_consumed_once,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,136 @@
+"""
+Mobile Auth Tests
+
+Tests for services/mobile/auth.py (cached revocation state, batched last_seen).
+
+Usage:
+    python -m pytest tests/test_mobile_auth.py -v
+    python tests/test_mobile_auth.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.mobile import auth as auth_module
+from services.mobile.auth import MobileAuth
+from services.db_pool import get_pool
+
+
+# =============================================================================
+# Test Fixtures
+# =============================================================================
+
+def create_auth():
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    auth = MobileAuth(db_path)
+    code = auth.generate_pairing_code("ST-01")["code"]
+    token = auth.exchange_pairing_code(code, "device-0001")["access_token"]
+    return auth, db_path, token
+
+
+def cleanup(auth, db_path):
+    auth.close()
+    get_pool(db_path).close_all()
+    os.unlink(db_path)
+
+
+class PoolCounter:
+    """Count pool checkouts made by the auth module."""
+
+    def __init__(self):
+        self.calls = 0
+        self._original = auth_module.get_pool
+
+    def __enter__(self):
+        def counting(*args, **kwargs):
+            self.calls += 1
+            return self._original(*args, **kwargs)
+        auth_module.get_pool = counting
+        return self
+
+    def __exit__(self, *exc):
+        auth_module.get_pool = self._original
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_verify_token_without_db_access():
+    """After the state is loaded, verify_token touches no connection."""
+    auth, db_path, token = create_auth()
+    try:
+        assert auth.verify_token(token) is not None  # loads revocation state
+        with PoolCounter() as counter:
+            for _ in range(50):
+                assert auth.verify_token(token)["device_id"] == "device-0001"
+        assert counter.calls == 0
+    finally:
+        cleanup(auth, db_path)
+
+
+def test_revoke_and_restore_invalidate_cache():
+    """Revoke/blacklist and their undo take effect on the next verify."""
+    auth, db_path, token = create_auth()
+    try:
+        assert auth.verify_token(token) is not None
+        assert auth.revoke_device("device-0001", "lost")
+        assert auth.verify_token(token) is None
+        assert auth.unrevoke_device("device-0001")
+        assert auth.verify_token(token) is not None
+
+        assert auth.blacklist_device("device-0001", "stolen")
+        assert auth.verify_token(token) is None
+        assert auth.is_device_blacklisted("device-0001")
+        assert auth.unblacklist_device("device-0001")
+        assert auth.verify_token(token) is not None
+        assert not auth.is_device_blacklisted("device-0001")
+    finally:
+        cleanup(auth, db_path)
+
+
+def test_last_seen_flushed_in_one_batch():
+    """last_seen is buffered and written once per flush."""
+    auth, db_path, token = create_auth()
+    try:
+        for _ in range(20):
+            auth.verify_token(token)
+        conn = get_pool(db_path).reader()
+        row = conn.execute("SELECT last_seen FROM mirs_mobile_devices WHERE device_id = 'device-0001'").fetchone()
+        conn.close()
+        assert row["last_seen"] is None, "Not written on the request path"
+
+        assert auth.flush_last_seen() == 1
+        assert auth.flush_last_seen() == 0
+        devices = auth.get_paired_devices()
+        assert devices[0]["last_seen"] is not None
+    finally:
+        cleanup(auth, db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_verify_token_without_db_access,
+        test_revoke_and_restore_invalidate_cache,
+        test_last_seen_flushed_in_one_batch,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,136 @@
+"""
+PDF Worker Pool Tests
+
+Tests for services/pdf_worker.py (disk cache, fingerprint, job tracking).
+
+Usage:
+    python -m pytest tests/test_pdf_worker.py -v
+    python tests/test_pdf_worker.py
+"""
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.pdf_worker import PdfCache, PdfRenderService, compute_fingerprint
+
+
+def test_fingerprint_changes_with_events():
+    """Same inputs -> same key; a new event -> new key."""
+    case = {"id": "ANES-1", "status": "IN_PROGRESS"}
+    events = [{"id": "e1", "event_type": "VITAL_SIGN", "payload": '{"hr": 72}'}]
+    fp1 = compute_fingerprint(case, events, "Hospital")
+    assert fp1 == compute_fingerprint(dict(case), list(events), "Hospital")
+
+    events.append({"id": "e2", "event_type": "VITAL_SIGN", "payload": '{"hr": 80}'})
+    assert compute_fingerprint(case, events, "Hospital") != fp1
+
+
+def test_cache_replaces_stale_render():
+    """A new fingerprint for the same case drops the old PDF."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfCache(Path(tmp), max_files=10)
+        old = cache.put("ANES-1", "aaa", b"%PDF-old")
+        assert cache.get("ANES-1", "aaa") == old
+
+        cache.put("ANES-1", "bbb", b"%PDF-new")
+        assert cache.get("ANES-1", "aaa") is None
+        assert cache.get("ANES-1", "bbb").read_bytes() == b"%PDF-new"
+        assert cache.stats()["files"] == 1
+
+
+def test_cache_hit_skips_render():
+    """Unchanged case is served from cache without touching the pool."""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = PdfRenderService(max_workers=1, cache=PdfCache(Path(tmp)))
+        service.cache.put("ANES-1", "fp", b"%PDF-cached")
+
+        job = service.submit("ANES-1", "fp", context={})
+        assert job["status"] == "DONE"
+        assert job["cached"] is True
+        assert asyncio.run(service.wait(job["job_id"]))["path"] == job["path"]
+        assert service.stats()["pool_started"] is False
+        assert service.stats()["cache_hits"] == 1
+
+
+def test_html_preview_renders_in_pool():
+    """HTML preview renders in a worker process and returns bytes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = PdfRenderService(max_workers=1, cache=PdfCache(Path(tmp)))
+        context = {
+            "hospital_name": "Test Hospital",
+            "case_id": "ANES-1",
+            "patient": {}, "surgery": {}, "times": {},
+            "io_balance": {"input": {}, "output": {}, "balance_ml": 0},
+            "pages": [{"page_number": 1, "vitals": [], "drugs": [], "chart_image": ""}],
+            "total_pages": 1,
+        }
+        try:
+            html = asyncio.run(service.render_inline(context, preview=True, with_charts=False))
+        finally:
+            service.shutdown()
+        assert b"Test Hospital" in html
+
+
+def test_jobs_visible_from_other_workers():
+    """Status / download of a job work on a worker that did not submit it."""
+
+    class ManualPool:
+        def __init__(self):
+            self.futures = []
+
+        def submit(self, *args):
+            self.futures.append(Future())
+            return self.futures[-1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ManualPool()
+        worker_a = PdfRenderService(max_workers=1, cache=PdfCache(Path(tmp)))
+        worker_a._get_executor = lambda: pool
+        worker_b = PdfRenderService(max_workers=1, cache=PdfCache(Path(tmp)))
+
+        ok = worker_a.submit("ANES-1", "abc123", context={})
+        bad = worker_a.submit("ANES-2", "def456", context={})
+        assert worker_a.submit("ANES-1", "abc123", context={}) is ok, "Pending job reused"
+        assert worker_b.get_job(ok["job_id"])["status"] == "PENDING"
+
+        pool.futures[0].set_result(b"%PDF-rendered")
+        pool.futures[1].set_exception(RuntimeError("boom"))
+
+        done = worker_b.get_job(ok["job_id"])
+        assert done["status"] == "DONE" and done["case_id"] == "ANES-1"
+        assert Path(done["path"]).read_bytes() == b"%PDF-rendered"
+        failed = worker_b.get_job(bad["job_id"])
+        assert failed["status"] == "FAILED" and failed["error"] == "boom"
+
+        assert worker_b.get_job("ANES-1.ffff") is None
+        assert worker_b.get_job("../ANES-1.abc123") is None
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_fingerprint_changes_with_events,
+        test_cache_replaces_stale_render,
+        test_cache_hit_skips_render,
+        test_html_preview_renders_in_pool,
+        test_jobs_visible_from_other_workers,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
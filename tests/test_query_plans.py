@@ -0,0 +1,196 @@
+"""
+Query Plan Regression Tests
+
+EXPLAIN QUERY PLAN checks that the analytics dashboard and the event history
+queries filter dates with half-open ranges on indexed columns
+(services/query_ranges.py, migration m013) or read the daily rollups
+(services/analytics_rollup.py) instead of full table scans.
+
+Usage:
+    python -m pytest tests/test_query_plans.py -v
+    python tests/test_query_plans.py
+"""
+
+import asyncio
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from routes import analytics
+from services.analytics_rollup import ensure_analytics_rollup_schema
+from services.query_ranges import add_day_range, add_item_code_search, day_bounds, ensure_date_range_indexes
+
+# 與正式 schema 相同的既有索引 (main.py / routes/anesthesia.py)
+SCHEMA = """
+    CREATE TABLE items (item_code TEXT PRIMARY KEY, item_name TEXT, unit TEXT);
+    CREATE TABLE medicines (medicine_code TEXT PRIMARY KEY, generic_name TEXT NOT NULL);
+    CREATE TABLE inventory_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT NOT NULL, item_code TEXT NOT NULL,
+        quantity REAL, batch_number TEXT, expiry_date TEXT, remarks TEXT,
+        station_id TEXT, operator TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_inventory_events_item ON inventory_events(item_code);
+    CREATE INDEX idx_inventory_events_timestamp ON inventory_events(timestamp);
+    CREATE TABLE anesthesia_cases (
+        id TEXT PRIMARY KEY, status TEXT, asa_classification TEXT, primary_anesthesiologist_id TEXT,
+        anesthesia_start_at DATETIME, anesthesia_end_at DATETIME,
+        surgery_start_at DATETIME, surgery_end_at DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_anes_cases_status ON anesthesia_cases(status, created_at DESC);
+    CREATE TABLE anesthesia_events (
+        id TEXT PRIMARY KEY, case_id TEXT NOT NULL, event_type TEXT NOT NULL,
+        clinical_time DATETIME NOT NULL, payload TEXT, sync_status TEXT
+    );
+    CREATE INDEX idx_anes_events_timeline ON anesthesia_events(case_id, clinical_time);
+    CREATE INDEX idx_anes_events_type ON anesthesia_events(case_id, event_type);
+    CREATE TABLE equipment_units (
+        id INTEGER PRIMARY KEY, equipment_id TEXT, unit_label TEXT, unit_serial TEXT,
+        level_percent INTEGER, status TEXT, is_active INTEGER DEFAULT 1
+    );
+"""
+
+
+def make_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    ensure_analytics_rollup_schema(conn.cursor())
+    conn.executemany("INSERT INTO items VALUES (?, ?, '個')",
+                     [(f"MED-{i:03d}", f"藥品 {i}") for i in range(50)])
+    conn.executemany(
+        "INSERT INTO inventory_events (event_type, item_code, quantity, station_id, operator, timestamp) "
+        "VALUES (?, ?, 1, 'BORP-01', 'op', datetime('2026-01-01', ?))",
+        [("RECEIVE" if i % 3 else "CONSUME", f"MED-{i % 50:03d}", f"+{i} minutes") for i in range(5000)])
+    conn.executemany(
+        "INSERT INTO anesthesia_cases (id, status, created_at) VALUES (?, 'CLOSED', datetime('now', ?))",
+        [(f"C{i}", f"-{i} hours") for i in range(3000)])
+    conn.executemany(
+        "INSERT INTO anesthesia_events (id, case_id, event_type, clinical_time, payload) "
+        "VALUES (?, ?, ?, datetime('now', ?), '{\"drug_name\": \"Propofol\", \"dose\": 50, \"unit\": \"mg\"}')",
+        [(f"E{i}", f"C{i % 3000}", "MEDICATION_ADMIN" if i % 2 else "VITAL_SIGN", f"-{i} minutes")
+         for i in range(6000)])
+    ensure_date_range_indexes(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def plan_of(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def assert_no_full_scan(conn, sql, tables, params=()):
+    plan = plan_of(conn, sql, params)
+    for table in tables:
+        scans = [step for step in plan if step.startswith(f"SCAN {table}")]
+        assert not scans, f"full scan of {table}: {plan}\n{sql}"
+        assert any(step.startswith(f"SEARCH {table}") for step in plan), f"{table} not searched: {plan}"
+    return plan
+
+
+def test_analytics_queries_use_indexes():
+    """Dashboard, case summary, daily trend, medication, equipment, oxygen: no full scans."""
+    with tempfile.TemporaryDirectory() as tmp:
+        setup = make_database(str(Path(tmp) / "mirs.db"))
+        statements = []
+
+        def traced_db():
+            conn = sqlite3.connect(str(Path(tmp) / "mirs.db"))
+            conn.row_factory = sqlite3.Row
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        original = analytics.get_db
+        analytics.get_db = traced_db
+        try:
+            dashboard = asyncio.run(analytics.get_dashboard_summary())
+            summary = asyncio.run(analytics.get_case_summary(start_date="2026-01-01", end_date="2026-12-31"))
+            daily = asyncio.run(analytics.get_daily_stats(days=7))
+            asyncio.run(analytics.get_medication_usage(start_date="2026-01-01", end_date="2026-12-31", limit=20))
+            asyncio.run(analytics.get_oxygen_consumption(days=30))
+        finally:
+            analytics.get_db = original
+
+        assert dashboard.month_cases > 0 and summary.total_cases >= 0
+        assert daily and sum(d.medication_count for d in daily) > 0
+
+        checked = 0
+        for sql in statements:
+            assert "date(created_at) >" not in sql and "date(clinical_time) =" not in sql, sql
+            for table in ("anesthesia_cases", "anesthesia_events", "rollup_case_daily",
+                          "rollup_medication_daily", "rollup_resource_daily"):
+                match = re.search(rf"FROM {table}(?: (?!WHERE)(\w+))?", sql)
+                if match:
+                    assert_no_full_scan(setup, sql, [match.group(1) or table])
+                    checked += 1
+        assert checked >= 9, f"only {checked} statements checked"
+        setup.close()
+
+
+def test_inventory_event_history_uses_indexes():
+    """Event history (DatabaseManager.get_inventory_events query shape) searches indexes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_database(str(Path(tmp) / "mirs.db"))
+
+        where_clauses, params = ["e.event_type = ?"], ["RECEIVE"]
+        add_day_range(where_clauses, params, "e.timestamp", "2026-01-02", "2026-01-03")
+        assert params == ["RECEIVE", "2026-01-02", "2026-01-04"]
+        sql = f"""
+            SELECT e.id, e.event_type, e.item_code, i.item_name, e.timestamp
+            FROM inventory_events e
+            LEFT JOIN items i ON e.item_code = i.item_code
+            WHERE {" AND ".join(where_clauses)}
+            ORDER BY e.timestamp DESC
+            LIMIT 100
+        """
+        plan = assert_no_full_scan(conn, sql, ["e"], params)
+        assert any("idx_inventory_events_type_time" in step for step in plan), plan
+
+        # 模糊品項搜尋: 掃描 items / medicines (小表)，事件表以 item_code 索引查找
+        conn.execute("INSERT INTO medicines VALUES ('DRUG-0107', 'Morphine')")
+        conn.execute("INSERT INTO inventory_events (event_type, item_code, quantity, timestamp) "
+                     "VALUES ('EMERGENCY_DISPENSE', 'DRUG-0107', 1, '2026-01-02 08:00:00')")
+        where_clauses, params = [], []
+        add_item_code_search(where_clauses, params, "e.item_code", "010")
+        add_day_range(where_clauses, params, "e.timestamp", "2026-01-01", "2026-01-04")
+        sql = f"""
+            SELECT e.item_code FROM inventory_events e
+            WHERE {" AND ".join(where_clauses)}
+            ORDER BY e.timestamp DESC LIMIT 100
+        """
+        assert_no_full_scan(conn, sql, ["e"], params)
+        codes = {row[0] for row in conn.execute(sql, params)}
+        assert codes == {"MED-010", "DRUG-0107"}, "Medicine codes (dispense) must stay searchable"
+
+        # 半開區間與 DATE() 篩選結果一致
+        legacy = conn.execute("SELECT COUNT(*) FROM inventory_events "
+                              "WHERE DATE(timestamp) >= '2026-01-02' AND DATE(timestamp) <= '2026-01-03'").fetchone()
+        ranged = conn.execute("SELECT COUNT(*) FROM inventory_events WHERE timestamp >= ? AND timestamp < ?",
+                              day_bounds("2026-01-02", "2026-01-03")).fetchone()
+        assert legacy == ranged and ranged[0] > 0
+        conn.close()
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_analytics_queries_use_indexes,
+        test_inventory_event_history_uses_indexes,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
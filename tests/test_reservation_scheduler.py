@@ -0,0 +1,254 @@
+"""
+Reservation Expiry Scheduler Tests
+
+Tests for services/reservation_scheduler.py and the blood reservation
+release path in routes/blood.py.
+
+Usage:
+    python -m pytest tests/test_reservation_scheduler.py -v
+    python tests/test_reservation_scheduler.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m007_blood_bank import m007_blood_bank
+from services.db_pool import get_pool
+from services.reservation_scheduler import ReservationExpiryScheduler
+from routes import blood
+from routes.blood import (
+    BloodUnitReserve, get_blood_availability, release_expired_reservations, reserve_blood_unit,
+)
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_heap_releases_in_deadline_order_and_skips_stale():
+    """Only due, still-current deadlines trigger a release; lag is measured."""
+    t0 = datetime(2026, 10, 16, 12, 0, 0)
+    now = [t0]
+    calls = []
+
+    def release(at):
+        calls.append(at)
+        return {"released_count": 1, "unit_ids": []}
+
+    scheduler = ReservationExpiryScheduler(release=release, load=lambda: [], clock=lambda: now[0])
+    scheduler.schedule("BU-LATE", t0 + timedelta(hours=2))
+    scheduler.schedule("BU-EARLY", (t0 + timedelta(minutes=10)).isoformat())
+    scheduler.schedule("BU-CANCELLED", t0 + timedelta(minutes=5))
+    scheduler.cancel("BU-CANCELLED")
+    assert scheduler.next_deadline() == t0 + timedelta(minutes=10), "Stale entry skipped"
+
+    async def scenario():
+        now[0] = t0 + timedelta(minutes=6)
+        assert (await scheduler.run_due())["released_count"] == 0
+        assert calls == [], "Cancelled deadline does not release"
+
+        now[0] = t0 + timedelta(minutes=10, seconds=2)
+        await scheduler.run_due()
+
+    asyncio.run(scenario())
+    assert calls == [t0 + timedelta(minutes=10, seconds=2)]
+    status = scheduler.get_status()
+    assert status["last_lag_ms"] == 2000.0
+    assert status["pending_reservations"] == 1
+    assert status["next_deadline"] == (t0 + timedelta(hours=2)).isoformat()
+
+
+def test_failed_release_is_retried_and_resync_keeps_new_schedules():
+    """A release error re-queues the due units; schedule() during a resync load is not lost."""
+    t0 = datetime(2026, 10, 16, 12, 0, 0)
+    now = [t0 + timedelta(minutes=1)]
+    failures = [1]
+
+    def release(at):
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError("database is locked")
+        return {"released_count": 1, "unit_ids": ["BU-DUE"]}
+
+    def load():
+        scheduler.schedule("BU-NEW", t0 + timedelta(hours=1))    # reserved while the snapshot loads
+        scheduler.cancel("BU-GONE")                              # issued while the snapshot loads
+        return [("BU-DUE", t0), ("BU-GONE", t0 + timedelta(hours=2))]
+
+    scheduler = ReservationExpiryScheduler(release=release, load=load, clock=lambda: now[0])
+    scheduler.resync()
+    assert scheduler.get_status()["pending_reservations"] == 2     # BU-DUE + BU-NEW
+
+    async def scenario():
+        try:
+            await scheduler.run_due()
+            assert False, "Expected the release error"
+        except RuntimeError:
+            pass
+        assert scheduler.next_deadline() == t0, "Due unit re-queued"
+        return await scheduler.run_due()
+
+    assert asyncio.run(scenario())["unit_ids"] == ["BU-DUE"]
+    assert scheduler.next_deadline() == t0 + timedelta(hours=1)
+
+
+def test_loop_fires_at_deadline():
+    """The running loop wakes for a newly scheduled earlier deadline."""
+    fired = []
+
+    async def scenario():
+        scheduler = ReservationExpiryScheduler(
+            release=lambda at: fired.append(time.monotonic()) or {"released_count": 1},
+            load=lambda: [("BU-FAR", datetime.now() + timedelta(hours=1))],
+        )
+        await scheduler.start()
+        started = time.monotonic()
+        scheduler.schedule("BU-SOON", datetime.now() + timedelta(milliseconds=150))
+        for _ in range(100):
+            if fired:
+                break
+            await asyncio.sleep(0.02)
+        await scheduler.stop()
+        return started, scheduler.get_status()
+
+    started, status = asyncio.run(scenario())
+    assert len(fired) == 1
+    assert 0.1 <= fired[0] - started < 1.0
+    assert status["pending_reservations"] == 1
+
+
+def test_release_path_and_pure_reads():
+    """Expired reservations are released at `now`; availability GET writes nothing."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = get_pool(db_path).writer()
+    m007_blood_bank(conn.cursor())
+    expiry = (datetime.now() + timedelta(days=10)).strftime("%Y-%m-%d")
+    conn.execute("""
+        INSERT INTO blood_units (id, blood_type, unit_type, volume_ml, expiry_date, status)
+        VALUES ('BU-1', 'O+', 'PRBC', 250, ?, 'AVAILABLE')
+    """, (expiry,))
+    conn.commit()
+    conn.close()
+
+    original = blood.get_db, blood.get_read_db
+    blood.get_db = lambda: get_pool(db_path).writer()
+    blood.get_read_db = lambda: get_pool(db_path).reader()
+    try:
+        result = asyncio.run(reserve_blood_unit("BU-1", BloodUnitReserve(order_id="ORD-1", reserver_id="RN-1")))
+        expires_at = datetime.fromisoformat(result["reserved_until"])
+
+        asyncio.run(get_blood_availability())
+        conn = get_pool(db_path).reader()
+        assert conn.execute("SELECT COUNT(*) FROM blood_unit_events").fetchone()[0] == 1
+        conn.close()
+
+        assert release_expired_reservations(now=expires_at - timedelta(seconds=1))["released_count"] == 0
+        # 同日 ISO 'T' 格式亦能正確比較
+        released = release_expired_reservations(now=expires_at + timedelta(seconds=1))
+        assert released["unit_ids"] == ["BU-1"]
+    finally:
+        blood.get_db, blood.get_read_db = original
+        blood.get_reservation_scheduler().cancel("BU-1")
+        get_pool(db_path).close_all()
+        os.unlink(db_path)
+
+
+class _RacingCursor:
+    """Cursor proxy: runs `interloper` right after the expiry SELECT is fetched."""
+
+    def __init__(self, cursor, interloper):
+        self._cursor, self._interloper = cursor, interloper
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._interloper()
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RacingConnection:
+    def __init__(self, conn, interloper):
+        self._conn, self._interloper = conn, interloper
+
+    def cursor(self):
+        return _RacingCursor(self._conn.cursor(), self._interloper)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_release_skips_units_changed_after_select():
+    """A unit issued (or released by another worker) between SELECT and UPDATE stays put, no event."""
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = get_pool(db_path).writer()
+    m007_blood_bank(conn.cursor())
+    expiry = (datetime.now() + timedelta(days=10)).strftime("%Y-%m-%d")
+    expired = (datetime.now() - timedelta(minutes=1)).isoformat()
+    conn.executemany("""
+        INSERT INTO blood_units (id, blood_type, unit_type, volume_ml, expiry_date, status,
+                                 reserved_for_order, reserved_by, reserve_expires_at)
+        VALUES (?, 'O+', 'PRBC', 250, ?, 'RESERVED', 'ORD-1', 'RN-1', ?)
+    """, [("BU-ISSUED", expiry, expired), ("BU-EXPIRED", expiry, expired)])
+    conn.commit()
+    conn.close()
+
+    def issue_concurrently():
+        other = get_pool(db_path).writer()
+        other.execute("UPDATE blood_units SET status = 'ISSUED', reserve_expires_at = NULL WHERE id = 'BU-ISSUED'")
+        other.commit()
+        other.close()
+
+    try:
+        conn = get_pool(db_path).writer()
+        result = release_expired_reservations(conn=_RacingConnection(conn, issue_concurrently))
+        conn.close()
+        assert result["unit_ids"] == ["BU-EXPIRED"]
+
+        conn = get_pool(db_path).reader()
+        status = dict(conn.execute("SELECT id, status FROM blood_units").fetchall())
+        events = conn.execute("SELECT unit_id FROM blood_unit_events WHERE event_type = 'RESERVE_TIMEOUT'").fetchall()
+        conn.close()
+        assert status == {"BU-ISSUED": "ISSUED", "BU-EXPIRED": "AVAILABLE"}
+        assert [e[0] for e in events] == ["BU-EXPIRED"]
+
+        # A second worker's scheduler running the same release finds nothing to do
+        assert release_expired_reservations(conn=get_pool(db_path).writer())["released_count"] == 0
+    finally:
+        get_pool(db_path).close_all()
+        os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_heap_releases_in_deadline_order_and_skips_stale,
+        test_failed_release_is_retried_and_resync_keeps_new_schedules,
+        test_loop_fires_at_deadline,
+        test_release_path_and_pure_reads,
+        test_release_skips_units_changed_after_select,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
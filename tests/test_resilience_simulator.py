@@ -0,0 +1,144 @@
+"""
+Resilience Simulator Tests
+
+Tests for services/resilience_simulator.py (vectorized Monte Carlo bands on
+top of ResilienceService power / oxygen endurance, cached by inventory version).
+
+Usage:
+    python -m pytest tests/test_resilience_simulator.py -v
+    python tests/test_resilience_simulator.py
+"""
+
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations.m001_resilience_tables import apply as m001_resilience_tables
+from services.capacity_calculator import get_calculator
+from services.resilience_service import ResilienceService
+from services.resilience_simulator import (
+    Scenario, _fuel_based_hours, _linear_hours, clear_simulation_cache, run_simulation,
+)
+
+QUIET = dict(load_cv=0, flow_cv=0, level_cv=0, fuel_rate_cv=0)
+
+
+def make_service(tmp):
+    """
+    Station S1: 2 people on 10 L/min, 4 full H cylinders (27600 L = 23 h),
+    a power-limited concentrator, 2000 Wh battery + 10 L fuel at 2 L/hr
+    for a 400 W load (5 h + 5 h = 10 h).
+    """
+    path = str(Path(tmp) / "mirs.db")
+    conn = sqlite3.connect(path)
+    m001_resilience_tables(conn.cursor())
+    conn.execute("""
+        CREATE TABLE equipment (
+            id TEXT PRIMARY KEY, name TEXT NOT NULL, quantity INTEGER DEFAULT 1,
+            power_level INTEGER, tracking_mode TEXT DEFAULT 'AGGREGATE', device_type TEXT,
+            power_watts REAL, capacity_wh REAL, output_watts REAL, fuel_rate_lph REAL
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO equipment (id, name, quantity, power_level, power_watts, capacity_wh, output_watts, fuel_rate_lph)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        ("RESP-001", "H型氧氣瓶", 4, 100, None, None, None, None),
+        ("RESP-002", "氧氣濃縮機", 1, None, None, None, None, None),
+        ("PS-01", "行動電源站", 2, 50, None, 2000, 1000, None),
+        ("UTIL-002", "發電機", 1, 20, None, None, 2000, 2.0),
+        ("MON-01", "生理監視器", 2, None, 200, None, None, None),
+    ])
+    conn.execute("INSERT INTO resilience_config (station_id, isolation_target_days, population_count) "
+                 "VALUES ('S1', 3, 2)")
+    conn.commit()
+    conn.close()
+    return ResilienceService(path), path
+
+
+def test_quiet_scenario_matches_service_and_calculators():
+    """With no noise every sample equals the service's figure; kernels match capacity_calculator."""
+    clear_simulation_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        service, _ = make_service(tmp)
+        result = run_simulation(service, "S1", Scenario(samples=200, **QUIET))
+
+    power, oxygen = result["lifelines"]["POWER"], result["lifelines"]["OXYGEN"]
+    assert power["deterministic"] == power["point"] == power["p10"] == power["p90"] == 10.0
+    assert oxygen["deterministic"] == oxygen["point"] == oxygen["p50"] == 23.0
+    assert result["weakest_link"]["p50"] == 10.0 and result["weakest_link"]["limited_by"]["POWER"] == 1.0
+    assert power["p_survive"] == oxygen["p_survive"] == 0.0           # 72 h target
+
+    fuel_based = get_calculator("FUEL_BASED").calculate_hours(20, {"tank_liters": 50, "fuel_rate_lph": 2.0})
+    linear = get_calculator("LINEAR").calculate_hours(80, {"hours_per_100pct": 27600 / 600})
+    assert _fuel_based_hours(50, 0.2, np.array([2.0]))[0] == fuel_based.hours
+    assert _linear_hours(27600, 0.8, np.array([600.0]))[0] == linear.hours
+    assert _linear_hours(27600, 1.0, np.array([0.0]))[0] == float("inf")
+
+
+def test_population_growth_bands():
+    """+30% population: O2 point estimate scales by 1/1.3, bands are ordered, 10k samples in milliseconds."""
+    clear_simulation_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        service, _ = make_service(tmp)
+        result = run_simulation(service, "S1", Scenario(samples=10_000, population_growth=0.3))
+        more_fuel = run_simulation(service, "S1", Scenario(samples=10_000, extra_fuel_liters=200))
+
+    oxygen = result["lifelines"]["OXYGEN"]
+    assert oxygen["point"] == round(23 / 1.3, 1)
+    assert oxygen["p10"] < oxygen["p50"] < oxygen["p90"]
+    assert abs(oxygen["p50"] - oxygen["point"]) < 0.1 * oxygen["point"]
+    assert result["lifelines"]["POWER"]["point"] == 10.0
+    assert result["elapsed_ms"] < 200
+
+    assert more_fuel["lifelines"]["POWER"]["point"] == 110.0
+    assert more_fuel["lifelines"]["POWER"]["p_survive"] > 0.9
+    assert more_fuel["lifelines"]["OXYGEN"]["point"] == 110.0     # concentrator outlasts the cylinders
+
+
+def test_cache_follows_inventory_version():
+    """Repeat requests hit the cache; an equipment change is a new inventory version."""
+    clear_simulation_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        service, path = make_service(tmp)
+        first = run_simulation(service, "S1")
+        again = run_simulation(service, "S1")
+        assert (first["cached"], again["cached"]) == (False, True)
+        assert again["lifelines"] == first["lifelines"]
+
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE equipment SET power_level = 100 WHERE id = 'UTIL-002'")
+        conn.commit()
+        conn.close()
+        changed = run_simulation(service, "S1")
+
+    assert not changed["cached"] and changed["inventory_version"] != first["inventory_version"]
+    assert changed["lifelines"]["POWER"]["point"] == 30.0
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_quiet_scenario_matches_service_and_calculators,
+        test_population_growth_bands,
+        test_cache_follows_inventory_version,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
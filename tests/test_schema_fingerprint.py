@@ -0,0 +1,122 @@
+"""
+Schema Fingerprint Tests
+
+Tests for services/schema_fingerprint.py (cold-start fast path).
+
+Usage:
+    python -m pytest tests/test_schema_fingerprint.py -v
+    python tests/test_schema_fingerprint.py
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.schema_fingerprint import SchemaFingerprint, StartupTimer
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def make_fingerprint(root, db_path, version="3.6.0", station="BORP-01"):
+    return SchemaFingerprint(db_path, version, root, ["*.py"], extra={"station_id": station})
+
+
+def test_fast_path_only_when_code_and_ddl_unchanged():
+    """Stored fingerprint matches until source, version, station or DDL changes."""
+    with tempfile.TemporaryDirectory() as root:
+        schema_src = os.path.join(root, "schema.py")
+        with open(schema_src, "w") as f:
+            f.write("CREATE TABLE items (id TEXT)\n")
+        db_path = os.path.join(root, "mirs.db")
+
+        fp = make_fingerprint(root, db_path)
+        assert not fp.matches() and fp.reason == "no_database"
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE items (id TEXT)")
+        assert not fp.matches() and fp.reason == "not_recorded"
+        fp.store(conn)
+
+        assert make_fingerprint(root, db_path).matches()
+        assert not make_fingerprint(root, db_path, version="3.7.0").matches()
+        assert not make_fingerprint(root, db_path, station="BORP-02").matches()
+
+        with open(schema_src, "a") as f:
+            f.write("CREATE INDEX idx_items ON items(id)\n")
+        fp = make_fingerprint(root, db_path)
+        assert not fp.matches() and fp.reason == "code_changed"
+        fp.store(conn)
+        assert make_fingerprint(root, db_path).matches()
+
+        # 資料變更不影響；DDL 變更 (例如還原舊備份、手動 ALTER) 走完整初始化
+        conn.execute("INSERT INTO items VALUES ('A')")
+        conn.commit()
+        assert make_fingerprint(root, db_path).matches()
+        conn.execute("ALTER TABLE items ADD COLUMN name TEXT")
+        conn.commit()
+        fp = make_fingerprint(root, db_path)
+        assert not fp.matches() and fp.reason == "schema_changed"
+        conn.close()
+
+
+def test_failed_module_schema_blocks_fingerprint():
+    """A module schema step that fails at boot (e.g. database is locked) is not fingerprinted."""
+    with tempfile.TemporaryDirectory() as cwd:
+        code = textwrap.dedent("""
+            import sqlite3
+            import routes.oxygen_tracking as oxygen_tracking
+
+            def locked():
+                raise sqlite3.OperationalError("database is locked")
+
+            oxygen_tracking.init_schema = locked
+            import main
+            assert main.schema_init_errors == ["oxygen_tracking: database is locked"]
+            assert main.run_schema_init() is False
+        """)
+        env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+        result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                                capture_output=True, text=True, timeout=300)
+        assert result.returncode == 0, result.stderr[-2000:]
+
+
+def test_startup_timer_report():
+    """Phases are recorded in ms; ready_ms covers import -> startup complete."""
+    timer = StartupTimer()
+    with timer.phase("init_database"):
+        pass
+    timer.fast_path = True
+    timer.mark_ready()
+    report = timer.report()
+    assert report["schema_fast_path"] is True
+    assert set(report["phases_ms"]) == {"init_database"}
+    assert report["ready_ms"] >= report["phases_ms"]["init_database"]
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_fast_path_only_when_code_and_ddl_unchanged,
+        test_failed_module_schema_blocks_fingerprint,
+        test_startup_timer_report,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
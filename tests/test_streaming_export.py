@@ -0,0 +1,118 @@
+"""
+Streaming Export Tests
+
+Tests for services/streaming_export.py (fetchmany batches, chunked CSV/JSON,
+on-the-fly gzip, connection release).
+
+Usage:
+    python -m pytest tests/test_streaming_export.py -v
+    python tests/test_streaming_export.py
+"""
+
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.streaming_export import (
+    iter_csv, iter_gzip, iter_json_array, iter_ndjson, iter_query_rows,
+)
+
+
+class TrackedConnection:
+    """sqlite3 connection wrapper recording close() and fetchmany() sizes."""
+
+    def __init__(self, rows=25000):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("CREATE TABLE inventory_events (id INTEGER PRIMARY KEY, item_code TEXT, quantity INTEGER)")
+        self.conn.executemany("INSERT INTO inventory_events VALUES (?, ?, ?)",
+                              [(i, f"品項-{i % 7}", i % 13) for i in range(rows)])
+        self.closed = False
+        self.batches = []
+
+    def execute(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        tracked = self
+
+        class Cursor:
+            def fetchmany(self, size):
+                rows = cursor.fetchmany(size)
+                tracked.batches.append(len(rows))
+                return rows
+
+        return Cursor()
+
+    def close(self):
+        self.closed = True
+
+
+def test_csv_streams_all_rows_in_batches():
+    """Past the old 10k cap, in fetchmany batches, same bytes as csv.writer."""
+    tracked = TrackedConnection()
+    rows = iter_query_rows(lambda: tracked, "SELECT * FROM inventory_events ORDER BY id", batch_size=1000)
+    chunks = list(iter_csv(["ID", "代碼", "數量"], rows, tuple, chunk_bytes=4096))
+
+    assert tracked.closed
+    assert max(tracked.batches) == 1000 and sum(tracked.batches) == 25000
+    assert len(chunks) > 10 and max(len(c) for c in chunks) < 2 * 4096
+
+    expected = io.StringIO()
+    writer = csv.writer(expected)
+    writer.writerow(["ID", "代碼", "數量"])
+    writer.writerows(tuple(r) for r in tracked.conn.execute("SELECT * FROM inventory_events ORDER BY id"))
+    assert b"".join(chunks).decode("utf-8") == expected.getvalue()
+
+
+def test_early_close_releases_connection():
+    """An abandoned download closes the generator chain and the connection."""
+    tracked = TrackedConnection()
+    rows = iter_query_rows(lambda: tracked, "SELECT * FROM inventory_events", batch_size=100)
+    stream = iter_gzip(iter_csv(["ID", "代碼", "數量"], rows, tuple, chunk_bytes=512))
+    next(stream)
+    assert not tracked.closed
+    stream.close()
+    assert tracked.closed
+    assert sum(tracked.batches) < 25000
+
+
+def test_json_formats_and_gzip():
+    """JSON array text equals json.dumps(indent=2); NDJSON and gzip round-trip."""
+    items = [{"code": f"M{i:03d}", "name": "生理食鹽水", "stock": i} for i in range(300)]
+    array = b"".join(iter_json_array(iter(items), chunk_bytes=1024)).decode("utf-8")
+    assert array == json.dumps(items, ensure_ascii=False, indent=2)
+    assert b"".join(iter_json_array(iter([]))) == b"[]"
+
+    ndjson = b"".join(iter_ndjson(iter(items), chunk_bytes=1024)).decode("utf-8")
+    assert [json.loads(line) for line in ndjson.splitlines()] == items
+
+    compressed = b"".join(iter_gzip(iter_ndjson(iter(items), chunk_bytes=1024)))
+    assert gzip.decompress(compressed).decode("utf-8") == ndjson
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_csv_streams_all_rows_in_batches,
+        test_early_close_releases_connection,
+        test_json_formats_and_gzip,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
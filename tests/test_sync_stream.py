@@ -0,0 +1,161 @@
+"""
+Sync Stream Tests
+
+Tests for services/sync_stream.py (chunked NDJSON sync packages).
+
+Usage:
+    python -m pytest tests/test_sync_stream.py -v
+    python tests/test_sync_stream.py
+"""
+
+import hashlib
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.sync_stream import (
+    PackageParser, StreamImporter, SyncStreamError,
+    checksum_of_changes, iter_package_stream, iter_sync_changes,
+)
+
+
+# =============================================================================
+# Test Fixtures
+# =============================================================================
+
+SCHEMA = """
+    CREATE TABLE items (item_code TEXT PRIMARY KEY, item_name TEXT, updated_at TEXT);
+    CREATE TABLE inventory_events (
+        id INTEGER PRIMARY KEY, event_type TEXT, item_code TEXT, quantity INTEGER,
+        station_id TEXT, timestamp TEXT
+    );
+    CREATE TABLE blood_events (id INTEGER PRIMARY KEY, station_id TEXT, timestamp TEXT);
+    CREATE TABLE equipment_checks (id INTEGER PRIMARY KEY, station_id TEXT, timestamp TEXT);
+    CREATE TABLE surgery_records (id INTEGER PRIMARY KEY, station_id TEXT, created_at TEXT);
+    CREATE TABLE sync_packages (
+        package_id TEXT PRIMARY KEY, package_type TEXT, source_type TEXT, source_id TEXT,
+        destination_type TEXT, destination_id TEXT, hospital_id TEXT, transfer_method TEXT,
+        package_size INTEGER, checksum TEXT, changes_count INTEGER, status TEXT,
+        processed_at TIMESTAMP, error_message TEXT
+    );
+"""
+
+
+def create_db(rows: int = 0) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO items VALUES ('GAUZE', '紗布', '2026-01-01')")
+    conn.executemany(
+        "INSERT INTO inventory_events VALUES (?, 'RECEIVE', 'GAUZE', ?, 'ST-01', ?)",
+        [(i, i, f"2026-01-01T00:00:{i:02d}") for i in range(1, rows + 1)]
+    )
+    conn.commit()
+    return conn
+
+
+def build_package(conn, chunk_size=2, package_id="PKG-TEST"):
+    changes = iter_sync_changes(conn.cursor(), "ST-01", "FULL", None, "2026-01-01", fetch_size=3)
+    summary = {}
+    data = b"".join(iter_package_stream(
+        {"package_id": package_id, "package_type": "FULL", "station_id": "ST-01"},
+        changes, chunk_size=chunk_size, on_complete=summary.update,
+    ))
+    return data, summary
+
+
+def feed_all(importer, data, block=7):
+    parser = PackageParser()
+    for i in range(0, len(data), block):
+        for kind, item in parser.feed(data[i:i + block]):
+            importer.handle(kind, item)
+    parser.close()
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+def test_round_trip_in_small_blocks():
+    """Package parsed from odd-sized blocks applies every change and verifies."""
+    source = create_db(rows=5)
+    data, summary = build_package(source)
+    assert summary["changes_count"] == 6  # 1 item + 5 events
+    assert summary["chunks"] == 3
+    assert summary["package_size"] == len(data)
+
+    target = create_db()
+    importer = StreamImporter(target)
+    feed_all(importer, data)
+    result = importer.result()
+    assert result["success"], result
+    assert result["changes_applied"] == 6
+    assert target.execute("SELECT COUNT(*) FROM inventory_events").fetchone()[0] == 5
+    assert target.execute("SELECT status FROM sync_packages").fetchone()[0] == "APPLIED"
+
+
+def test_resume_skips_applied_chunks():
+    """An interrupted import resumes; already applied chunks are not re-applied."""
+    source = create_db(rows=5)
+    data, _ = build_package(source)
+    target = create_db()
+
+    importer = StreamImporter(target)
+    parser = PackageParser()
+    for kind, item in parser.feed(data[:len(data) // 2]):  # connection dropped mid-way
+        importer.handle(kind, item)
+    assert importer.chunks_applied >= 1
+
+    importer = StreamImporter(target)
+    feed_all(importer, data)
+    result = importer.result()
+    assert result["success"], result
+    assert result["chunks_skipped"] >= 1
+    assert result["chunks_skipped"] + result["chunks_applied"] == 3
+    assert target.execute("SELECT COUNT(*) FROM inventory_events").fetchone()[0] == 5
+
+
+def test_corrupted_chunk_rejected():
+    """A flipped byte in a chunk body fails that chunk's sha256."""
+    data, _ = build_package(create_db(rows=3))
+    corrupted = data.replace(b'"quantity": 2', b'"quantity": 9')
+    assert corrupted != data
+    try:
+        PackageParser().feed(corrupted)
+        assert False, "Expected SyncStreamError"
+    except SyncStreamError as e:
+        assert "校驗碼不符" in str(e)
+
+
+def test_legacy_checksum_matches_json_dumps():
+    """Incremental legacy checksum equals sha256(json.dumps(..., sort_keys=True))."""
+    changes = [{"table": "items", "operation": "INSERT", "data": {"名稱": "紗布", "a": 1}, "timestamp": "t"}]
+    content = json.dumps(changes, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    assert checksum_of_changes(changes) == (hashlib.sha256(content).hexdigest(), len(content))
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_round_trip_in_small_blocks,
+        test_resume_skips_applied_chunks,
+        test_corrupted_chunk_rejected,
+        test_legacy_checksum_matches_json_dumps,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
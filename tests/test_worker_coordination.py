@@ -0,0 +1,203 @@
+"""
+Worker Coordination Tests
+
+Tests for services/worker_coordination.py (SQLite leases, worker slots,
+exclusive jobs, shared rate limits / generations) across processes.
+
+Usage:
+    python -m pytest tests/test_worker_coordination.py -v
+    python tests/test_worker_coordination.py
+"""
+
+import asyncio
+import multiprocessing
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services import worker_coordination as wc
+
+
+def make_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    wc.ensure_coordination_schema(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def worker_process(db_path, results):
+    """One simulated uvicorn worker: claim a slot, generate ids, hit the shared rate limit."""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from services import worker_coordination
+    from services.hlc import HybridLogicalClock
+    from services.id_service import UUIDv7Generator
+
+    coordinator = worker_coordination.get_coordinator()
+    coordinator.workers = 4
+    coordinator.db_path = db_path
+    coordinator.owner = worker_coordination.owner_id()
+    coordinator.slot = coordinator._claim_slot()
+
+    hlc = HybridLogicalClock(worker_coordination.worker_node_id("BORP-01"))
+    generator = UUIDv7Generator()
+    uuids = [generator.generate() for _ in range(2000)]
+    hlcs = [hlc.now() for _ in range(2000)]
+    allowed = sum(worker_coordination.shared_rate_limit("mobile-exchange:10.0.0.9", 5, 60) for _ in range(5))
+    results.put((coordinator.slot, uuids, hlcs, allowed))
+
+
+def test_lease_acquire_renew_expire():
+    """A held lease blocks other owners until it expires or is released."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_database(str(Path(tmp) / "mirs.db"))
+        assert wc.acquire_lease(conn, "job:ota", "host:1", ttl=30)
+        assert wc.acquire_lease(conn, "job:ota", "host:1", ttl=30)          # renew
+        assert not wc.acquire_lease(conn, "job:ota", "host:2", ttl=30)
+        wc.release_lease(conn, "job:ota", "host:2")                         # not ours: no-op
+        assert not wc.acquire_lease(conn, "job:ota", "host:2", ttl=30)
+
+        conn.execute("UPDATE worker_leases SET expires_at = ? WHERE name = 'job:ota'", (time.time() - 1,))
+        conn.commit()
+        assert wc.acquire_lease(conn, "job:ota", "host:2", ttl=30)          # crashed holder: takeover
+        assert not wc.acquire_lease(conn, "job:ota", "host:1", ttl=30)
+        wc.release_lease(conn, "job:ota", "host:2")
+        assert wc.acquire_lease(conn, "job:ota", "host:1", ttl=30)
+
+        assert wc.bump_shared_generation(conn, "blood_units") == 1
+        assert wc.bump_shared_generation(conn, "blood_units") == 2
+        assert wc.get_shared_generation(conn, "mobile_devices") == 0
+        conn.close()
+
+
+def test_workers_get_distinct_slots_and_ids():
+    """Four processes: distinct slots, no colliding UUIDv7 / HLC values, one rate limit."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "mirs.db")
+        make_database(db_path).close()
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        processes = [ctx.Process(target=worker_process, args=(db_path, results)) for _ in range(4)]
+        for p in processes:
+            p.start()
+        outputs = [results.get(timeout=60) for _ in processes]
+        for p in processes:
+            p.join(timeout=30)
+
+        slots = sorted(o[0] for o in outputs)
+        assert slots == [0, 1, 2, 3]
+        uuids = [u for o in outputs for u in o[1]]
+        hlcs = [h for o in outputs for h in o[2]]
+        assert len(set(uuids)) == len(uuids) == 8000
+        assert len(set(hlcs)) == len(hlcs) == 8000
+        assert {h.rsplit(".", 1)[1] for h in hlcs} == {f"BORP-01-w{s}" for s in range(4)}
+        # 每個 worker 嘗試 5 次，合計只允許 5 次 (單一 worker 時會是 20 次)
+        assert sum(o[3] for o in outputs) == 5
+
+
+def test_exclusive_job_runs_once_and_fails_over():
+    """Only one worker runs an exclusive job; another takes over when it stops."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "mirs.db")
+        make_database(db_path).close()
+        running = []
+
+        def job(worker):
+            async def start():
+                running.append(worker)
+
+            async def stop():
+                running.remove(worker)
+            return start, stop
+
+        async def scenario():
+            a, b = wc.WorkerCoordinator(workers=2), wc.WorkerCoordinator(workers=2)
+            for coordinator, owner in ((a, "host:1"), (b, "host:2")):
+                coordinator.db_path, coordinator.owner = db_path, owner
+            await a.run_exclusive("daily_equipment_reset", *job("a"))
+            await b.run_exclusive("daily_equipment_reset", *job("b"))
+            assert running == ["a"]
+            assert b.status()["exclusive_jobs"] == {"daily_equipment_reset": False}
+
+            await a.stop()                                  # releases the lease
+            assert running == []
+            await b._sync_job(b._jobs["daily_equipment_reset"])   # next renewal tick
+            assert running == ["b"]
+            await b.stop()
+
+            single = wc.WorkerCoordinator(workers=1)        # single worker: no lease needed
+            await single.run_exclusive("daily_equipment_reset", *job("single"))
+            assert running == ["single"]
+            await single.stop()
+
+        asyncio.run(scenario())
+
+
+def test_lost_slot_is_reclaimed():
+    """A worker whose slot lease expired and was taken over moves to a free slot (and HLC node id)."""
+    from services import hlc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "mirs.db")
+        conn = make_database(db_path)
+
+        async def scenario():
+            a, b = wc.WorkerCoordinator(workers=2), wc.WorkerCoordinator(workers=2)
+            for coordinator, owner in ((a, "host:1"), (b, "host:2")):
+                coordinator.db_path, coordinator.owner = db_path, owner
+            a.slot = a._claim_slot()
+            conn.execute("UPDATE worker_leases SET expires_at = ? WHERE name = 'slot:0'", (time.time() - 1,))
+            conn.commit()
+            b.slot = b._claim_slot()                        # a missed its renewals: b takes slot 0
+            assert (a.slot, b.slot) == (0, 0)
+
+            await a._renew_slot()
+            assert a.slot == 1
+            owners = dict(conn.execute("SELECT name, owner FROM worker_leases").fetchall())
+            assert owners == {"slot:0": "host:2", "slot:1": "host:1"}
+            await a._renew_slot()                           # held: stays put
+            assert a.slot == 1
+
+        original = wc._coordinator, hlc._global_hlc, hlc._global_node_id
+        wc._coordinator = wc.WorkerCoordinator(workers=2)
+        wc._coordinator.slot = 0
+        hlc._global_hlc, hlc._global_node_id = None, None
+        try:
+            clock = hlc.get_hlc("BORP-01")
+            assert clock.node_id == "BORP-01-w0"
+            wc._coordinator.slot = 3
+            hlc.refresh_worker_node_id()
+            assert clock.now().endswith(".BORP-01-w3")
+            asyncio.run(scenario())
+        finally:
+            wc._coordinator, hlc._global_hlc, hlc._global_node_id = original
+            conn.close()
+
+
+def run_all_tests():
+    """Run all tests without pytest."""
+    tests = [
+        test_lease_acquire_renew_expire,
+        test_workers_get_distinct_slots_and_ids,
+        test_exclusive_job_runs_once_and_fails_over,
+        test_lost_slot_is_reclaimed,
+    ]
+    failed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+        except Exception as e:
+            print(f"❌ {test_func.__name__}: FAILED - {e}")
+            failed += 1
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)